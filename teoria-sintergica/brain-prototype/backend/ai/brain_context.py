@@ -0,0 +1,167 @@
+"""
+Contextos del cerebro: el estado de cada cliente, separado del SyntergicBrain
+compartido.
+
+Un contexto (token) tiene su propio modo (relax / focus / session / muse /
+neurofeedback), su posición en los datasets, su sesión del playlist con
+posición, play/pause y velocidad propios, y sus buffers de smoothing. Lo pesado e inmutable
+(modelo activo, datasets PhysioNet, sesiones cargadas en el LRU del
+playlist) vive una sola vez en SyntergicBrain y los contextos lo leen.
+
+    POST /set-mode/session?ctx=<token>
+    POST /session/seek/120?ctx=<token>
+    WS   /ws/brain-state?ctx=<token>
+
+Sin token se usa el contexto 'default' (comportamiento anterior: un único
+cerebro global). Los demás tokens los emite POST /brain/contexts: un token
+que el servidor no emitió (o ya descartado) responde 404, así un cliente no
+puede crear contextos a voluntad ni desalojar los de otros.
+
+Descarte: un contexto sin actividad durante BRAIN_CONTEXT_TTL_SECONDS
+expira, y al emitir uno nuevo con BRAIN_MAX_CONTEXTS ya ocupados (contando
+'default', que nunca se descarta) se desaloja el menos usado. Su cliente
+recibe 404 y debe pedir otro token.
+"""
+
+import os
+import re
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+BRAIN_CONTEXT_TTL_SECONDS = float(os.getenv('BRAIN_CONTEXT_TTL_SECONDS', '1800'))
+BRAIN_MAX_CONTEXTS = int(os.getenv('BRAIN_MAX_CONTEXTS', '64'))
+
+DEFAULT_CONTEXT = 'default'
+BANDS = ('delta', 'theta', 'alpha', 'beta', 'gamma')
+
+_TOKEN_RE = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+
+
+class InvalidBrainContext(ValueError):
+    """Token de contexto con formato inválido (la API responde 400)."""
+
+
+class UnknownBrainContext(LookupError):
+    """Token no emitido por POST /brain/contexts, expirado o desalojado (404)."""
+
+
+def validate_token(token: Optional[str]) -> str:
+    """Token normalizado; None / vacío → contexto por defecto."""
+    if not token:
+        return DEFAULT_CONTEXT
+    if not _TOKEN_RE.match(token):
+        raise InvalidBrainContext(f"Invalid brain context token '{token[:80]}' (1-64 chars: A-Z a-z 0-9 _ . -)")
+    return token
+
+
+class BrainContext:
+    """Estado mutable de un cliente del cerebro."""
+
+    def __init__(self, token: str):
+        self.token = token
+        self.current_mode = 'focus'
+        self.session_mode_active = False  # False = dataset, True = sesión secuencial
+        self.muse_mode_active = False
+        self.muse_connector = None
+        # Vista propia (SessionPlayer.fork) de una sesión cargada y compartida
+        self.session_player = None
+        self.playlist_index = 0
+        # Siguiente ventana de cada dataset (relax / focus)
+        self.dataset_positions: Dict[str, int] = {}
+        # Modo 'neurofeedback': configuración (analysis/neurofeedback.py; se
+        # reemplaza entera al cambiarla) y procesador del /ws/neurofeedback
+        self.neurofeedback_config: Optional[Dict] = None
+        self.neurofeedback = None
+        self.reset_smoothing()
+        self.created_at = self.last_seen = time.time()
+
+    def reset_smoothing(self):
+        """Vacía los buffers del promedio móvil (al cambiar de modo o sesión)."""
+        self.coherence_history = []
+        self.entropy_history = []
+        self.bands_history = {band: [] for band in BANDS}
+        self.plv_history = []
+
+    def touch(self):
+        self.last_seen = time.time()
+
+    def to_dict(self) -> Dict:
+        player = self.session_player
+        return {
+            'token': self.token,
+            'mode': 'session' if self.session_mode_active else self.current_mode,
+            'playlist_index': self.playlist_index,
+            'session': player.session_metadata.get('name') if player is not None else None,
+            'session_position': round(player.current_position, 2) if player is not None else None,
+            'is_playing': player.is_playing if player is not None else False,
+            'neurofeedback': self.neurofeedback_config,
+            'idle_seconds': round(time.time() - self.last_seen, 1),
+            'created_at': self.created_at,
+        }
+
+
+class BrainContextRegistry:
+    """Contextos por token, con expiración por inactividad y tope de cantidad."""
+
+    def __init__(self, ttl_seconds: float = BRAIN_CONTEXT_TTL_SECONDS,
+                 max_contexts: int = BRAIN_MAX_CONTEXTS):
+        self.ttl_seconds = ttl_seconds
+        # 'default' + al menos un contexto emitido
+        self.max_contexts = max(2, max_contexts)
+        self.default = BrainContext(DEFAULT_CONTEXT)
+        self._contexts: "OrderedDict[str, BrainContext]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: Optional[str] = None) -> BrainContext:
+        """Contexto del token (UnknownBrainContext si no fue emitido o ya se descartó)."""
+        token = validate_token(token)
+        if token == DEFAULT_CONTEXT:
+            self.default.touch()
+            return self.default
+        with self._lock:
+            ctx = self._contexts.get(token)
+            if ctx is not None and ctx.last_seen < time.time() - self.ttl_seconds:
+                del self._contexts[token]
+                ctx = None
+            if ctx is None:
+                raise UnknownBrainContext(
+                    f"Unknown or expired brain context '{token}'. Create one with POST /brain/contexts"
+                )
+            self._contexts.move_to_end(token)
+        ctx.touch()
+        return ctx
+
+    def create(self) -> BrainContext:
+        """Emite un token nuevo (puede desalojar el contexto menos usado)."""
+        ctx = BrainContext(uuid.uuid4().hex)
+        with self._lock:
+            self._expire()
+            self._contexts[ctx.token] = ctx
+            active = len(self._contexts)
+        print(f"🧠 New brain context '{ctx.token}' ({active} active)")
+        return ctx
+
+    def drop(self, token: str) -> bool:
+        token = validate_token(token)
+        if token == DEFAULT_CONTEXT:
+            return False
+        with self._lock:
+            return self._contexts.pop(token, None) is not None
+
+    def all(self) -> List[BrainContext]:
+        with self._lock:
+            return [self.default, *self._contexts.values()]
+
+    def _expire(self):
+        """Antes de emitir uno: descarta inactivos y deja lugar dentro del tope (con el lock)."""
+        cutoff = time.time() - self.ttl_seconds
+        for token in [t for t, c in self._contexts.items() if c.last_seen < cutoff]:
+            del self._contexts[token]
+        # El default cuenta dentro del tope: tras añadir, 1 + len ≤ max_contexts
+        while self._contexts and 1 + len(self._contexts) >= self.max_contexts:
+            token, _ = self._contexts.popitem(last=False)
+            print(f"🧠 Brain context '{token}' evicted (BRAIN_MAX_CONTEXTS={self.max_contexts})")
@@ -1,63 +1,125 @@
 import torch
 from torch.utils.data import Dataset, DataLoader
-import mne
-from mne.datasets import eegbci
 import numpy as np
+import hashlib
+import json
 import os
+import threading
+
+# Cache de épocas preprocesadas (float32 normalizado, .npy memmap).
+# Subir EPOCH_CACHE_VERSION si cambia el preprocesado de _preprocess().
+EPOCH_CACHE_VERSION = 1
+EPOCH_CACHE_DIR = os.getenv(
+    'EPOCH_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'epoch_cache')
+)
+EPOCH_CACHE_ENABLED = os.getenv('EPOCH_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+# Preprocesado (Delta a Gamma: 1-50Hz, ventanas de 1 segundo)
+L_FREQ = 1.
+H_FREQ = 50.
+FIR_DESIGN = 'firwin'
+EPOCH_DURATION = 1.0
+
+_cache_lock = threading.Lock()
+
+
+def epoch_cache_key(subjects, runs) -> str:
+    """Clave del cache: sujetos, runs, parámetros de filtro/épocas y versión."""
+    params = {
+        'subjects': list(subjects), 'runs': list(runs),
+        'l_freq': L_FREQ, 'h_freq': H_FREQ, 'fir_design': FIR_DESIGN,
+        'epoch_duration': EPOCH_DURATION, 'version': EPOCH_CACHE_VERSION,
+    }
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+    return f"eegbci-s{'-'.join(map(str, subjects))}-r{'-'.join(map(str, runs))}-{digest}"
+
 
 class EEGDataset(Dataset):
     """
     Dataset que carga datos reales de EEG de PhysioNet (Motor Imagery).
     Sujetos imaginando mover manos/pies.
+
+    Las épocas normalizadas se cachean en EPOCH_CACHE_DIR como .npy y se
+    abren con mmap: en arranques siguientes no se ejecuta nada de MNE.
     """
-    def __init__(self, subjects=[1], runs=[6, 10, 14]):
+    def __init__(self, subjects=[1], runs=[6, 10, 14], cache: bool = EPOCH_CACHE_ENABLED):
         super().__init__()
-        
+
         print(f"Loading EEG data for subjects {subjects}...")
-        
+
+        if cache:
+            self.data = self._load_cached(subjects, runs)
+        else:
+            self.data = self._preprocess(subjects, runs)
+
+        # Convertir a Tensor de PyTorch y aplanar canal x tiempo para el MLP simple
+        # Input shape original: (64, 160) -> 160 samples (1s a 160Hz)
+        # Flatten: 64 * 160 = 10240 features
+        self.n_samples = self.data.shape[0]
+        self.n_channels = self.data.shape[1]
+        self.n_timepoints = self.data.shape[2]
+
+        print(f"Dataset created: {self.n_samples} samples of shape ({self.n_channels}, {self.n_timepoints})")
+
+    @staticmethod
+    def _load_cached(subjects, runs) -> np.ndarray:
+        """Épocas desde el cache (memmap); si no existe, preprocesa y lo escribe."""
+        path = os.path.join(EPOCH_CACHE_DIR, f"{epoch_cache_key(subjects, runs)}.npy")
+        with _cache_lock:
+            if not os.path.exists(path):
+                data = EEGDataset._preprocess(subjects, runs)
+                os.makedirs(EPOCH_CACHE_DIR, exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, 'wb') as f:
+                    np.save(f, data)
+                os.replace(tmp, path)
+                print(f"✓ Epoch cache written: {path}")
+            else:
+                print(f"✓ Epoch cache hit: {os.path.basename(path)}")
+        return np.load(path, mmap_mode='r')
+
+    @staticmethod
+    def _preprocess(subjects, runs) -> np.ndarray:
+        """Descarga + filtro + épocas + z-score con MNE → (N_epochs, Channels, Time) float32."""
+        import mne
+        from mne.datasets import eegbci
+
         # Guardar datos en la carpeta del proyecto para mantenerlo ordenado
         data_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
         os.makedirs(data_path, exist_ok=True)
         # Configurar MNE para usar esta ruta
         mne.set_config('MNE_DATASETS_EEGBCI_PATH', data_path, set_env=True)
-        
+
         # 1. Descargar datos (se guardan en data_path)
         # runs 6, 10, 14 son de Imaginar Movimiento (Manos vs Pies)
         raw_fnames = eegbci.load_data(subjects, runs, path=data_path, update_path=False)
         raw_files = [mne.io.read_raw_edf(f, preload=True, verbose=False) for f in raw_fnames]
-        
+
         # 2. Concatenar todos los runs
         raw = mne.concatenate_raws(raw_files)
-        
+
         # 3. Preprocesamiento (Estándar en neurociencia)
         # Standard 10-20 electrode layout
-        eegbci.standardize(raw) 
+        eegbci.standardize(raw)
         # Seleccionar 64 canales de EEG
-        raw.pick_types(eeg=True, exclude='bads') 
+        raw.pick_types(eeg=True, exclude='bads')
         # Filtrar frecuencias relevantes (Delta a Gamma: 1-50Hz)
-        raw.filter(1., 50., fir_design='firwin', verbose=False)
-        
+        raw.filter(L_FREQ, H_FREQ, fir_design=FIR_DESIGN, verbose=False)
+
         # 4. Crear épocas (ventanas de tiempo)
         # Dividimos la señal continua en ventanas de 1 segundo
-        durn = 1.0 # segundos
+        durn = EPOCH_DURATION # segundos
         events = mne.make_fixed_length_events(raw, id=1, duration=durn)
         epochs = mne.Epochs(raw, events, tmin=0, tmax=durn, baseline=None, verbose=False)
-        
+
         # Obtener matriz de datos: (N_epochs, Channels, Time)
-        self.data = epochs.get_data(copy=True)
-        
+        data = epochs.get_data(copy=True)
+
         # Normalizar datos (Z-score por canal)
         # Importante para que la Neural Network aprenda bien
-        self.data = (self.data - np.mean(self.data, axis=2, keepdims=True)) / np.std(self.data, axis=2, keepdims=True)
-        
-        # Convertir a Tensor de PyTorch y aplanar canal x tiempo para el MLP simple
-        # Input shape original: (64, 160) -> 160 samples (1s a 160Hz)
-        # Flatten: 64 * 160 = 10240 features
-        self.n_samples = self.data.shape[0]
-        self.n_channels = self.data.shape[1]
-        self.n_timepoints = self.data.shape[2]
-        
-        print(f"Dataset created: {self.n_samples} samples of shape ({self.n_channels}, {self.n_timepoints})")
+        data = (data - np.mean(data, axis=2, keepdims=True)) / np.std(data, axis=2, keepdims=True)
+        return data.astype(np.float32)
 
     def __len__(self):
         return self.n_samples
@@ -0,0 +1,195 @@
+"""
+Lazy EDF/BDF reader: lee sólo los data records de la ventana pedida.
+
+mne.io.read_raw_edf(preload=True) carga el archivo entero en RAM (79 canales
+@ 1024 Hz para el set de meditación) antes de reproducir el primer frame.
+Este lector parsea el header, y en cada read(start, stop) lee del disco los
+bloques de records que cubren la ventana, con un pequeño LRU de bloques
+decodificados y read-ahead del bloque siguiente en la dirección de la
+reproducción. Memoria O(ventana), apertura instantánea.
+
+Expone la misma interfaz que SessionArchive (read / n_samples / fs /
+duration), así el SessionPlayer lo usa por el mismo camino de ventanas.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Records por bloque de lectura (~1 s por record en EDF típicos)
+EDF_BLOCK_RECORDS = int(os.getenv('EDF_BLOCK_RECORDS', '4'))
+EDF_CACHE_BLOCKS = int(os.getenv('EDF_CACHE_BLOCKS', '8'))
+
+# Señales que no son EEG (mismo criterio que pick_types(eeg=True) en la práctica)
+_NON_EEG_LABELS = ('edf annotations', 'bdf annotations', 'status', 'trigger')
+
+_UNIT_SCALE = {'uv': 1e-6, 'µv': 1e-6, 'μv': 1e-6, 'mv': 1e-3, 'nv': 1e-9, 'v': 1.0}
+
+_readahead = ThreadPoolExecutor(max_workers=1, thread_name_prefix='edf-readahead')
+
+
+def _field(raw: bytes, start: int, size: int) -> str:
+    return raw[start:start + size].decode('latin-1').strip()
+
+
+class LazyEDFReader:
+    """
+    EDF (int16) / BDF (int24) sin preload.
+
+    Canales: señales EEG con la frecuencia de muestreo dominante (se
+    descartan anotaciones / trigger). Valores en Volts, como MNE.
+    """
+
+    def __init__(self, path, cache_blocks: int = EDF_CACHE_BLOCKS, block_records: int = EDF_BLOCK_RECORDS):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            head = f.read(256)
+            self.is_bdf = head[0] == 0xFF
+            self.header_bytes = int(_field(head, 184, 8))
+            self.n_records = int(_field(head, 236, 8))
+            self.record_duration = float(_field(head, 244, 8))
+            ns = int(_field(head, 252, 4))
+            sig = f.read(ns * 256)
+
+        def column(offset: int, size: int) -> List[str]:
+            base = offset * ns
+            return [_field(sig, base + i * size, size) for i in range(ns)]
+
+        labels = column(0, 16)
+        units = column(96, 8)
+        phys_min = np.array(column(104, 8), dtype=np.float64)
+        phys_max = np.array(column(112, 8), dtype=np.float64)
+        dig_min = np.array(column(120, 8), dtype=np.float64)
+        dig_max = np.array(column(128, 8), dtype=np.float64)
+        spr = np.array([int(v) for v in column(216, 8)], dtype=np.int64)
+
+        self.sample_bytes = 3 if self.is_bdf else 2
+        self.record_samples = int(spr.sum())
+        self.record_bytes = self.record_samples * self.sample_bytes
+        if self.n_records < 0:  # header sin cerrar: deducir del tamaño
+            self.n_records = (os.path.getsize(self.path) - self.header_bytes) // self.record_bytes
+
+        eeg = [i for i, label in enumerate(labels) if label.lower() not in _NON_EEG_LABELS]
+        if not eeg:
+            raise ValueError(f"No EEG signals in {self.path}")
+        rates, counts = np.unique(spr[eeg], return_counts=True)
+        self.samples_per_record = int(rates[np.argmax(counts)])
+        self.signals = [i for i in eeg if spr[i] == self.samples_per_record]
+
+        offsets = np.concatenate([[0], np.cumsum(spr)[:-1]])
+        self._offsets = offsets[self.signals]
+        gain = (phys_max - phys_min) / np.where(dig_max == dig_min, 1.0, dig_max - dig_min)
+        scale = np.array([_UNIT_SCALE.get(units[i].lower(), 1.0) for i in range(ns)])
+        self._gain = (gain * scale)[self.signals][:, None]
+        self._offset = ((phys_min - dig_min * gain) * scale)[self.signals][:, None]
+
+        self.ch_names = [labels[i] for i in self.signals]
+        self.fs = self.samples_per_record / self.record_duration
+        self.block_records = max(1, block_records)
+        self.block_samples = self.block_records * self.samples_per_record
+
+        self._cache: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._cache_blocks = max(2, cache_blocks)
+        self._lock = threading.Lock()
+        self._pending: Dict[int, object] = {}
+        self._last_block: Optional[int] = None
+
+    # --- SessionArchive-compatible API ---
+
+    @property
+    def n_channels(self) -> int:
+        return len(self.signals)
+
+    @property
+    def n_samples(self) -> int:
+        return self.n_records * self.samples_per_record
+
+    @property
+    def n_chunks(self) -> int:
+        return -(-self.n_records // self.block_records)
+
+    @property
+    def duration(self) -> float:
+        return (self.n_samples - 1) / self.fs if self.n_samples else 0.0
+
+    def read(self, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Samples [start, stop) → (timestamps (n,), data (n_channels, n) float32)."""
+        start = max(0, start)
+        stop = min(stop, self.n_samples)
+        if stop <= start:
+            return np.empty(0), np.empty((self.n_channels, 0), dtype=np.float32)
+
+        b0, b1 = start // self.block_samples, (stop - 1) // self.block_samples
+        parts = [self._block(b) for b in range(b0, b1 + 1)]
+        data = parts[0] if len(parts) == 1 else np.concatenate(parts, axis=1)
+        a = start - b0 * self.block_samples
+        data = data[:, a:a + (stop - start)]
+
+        # Read-ahead en la dirección de reproducción
+        direction = 1 if self._last_block is None or b1 >= self._last_block else -1
+        self._last_block = b1
+        self._prefetch(b1 + 1 if direction > 0 else b0 - 1)
+
+        timestamps = np.arange(start, stop) / self.fs
+        return timestamps, data
+
+    # --- Block cache ---
+
+    def _block(self, b: int) -> np.ndarray:
+        with self._lock:
+            block = self._cache.get(b)
+            if block is not None:
+                self._cache.move_to_end(b)
+                return block
+            pending = self._pending.get(b)
+        if pending is not None:
+            return pending.result()
+        return self._load_block(b)
+
+    def _load_block(self, b: int) -> np.ndarray:
+        r0 = b * self.block_records
+        n_rec = min(self.block_records, self.n_records - r0)
+        with open(self.path, 'rb') as f:
+            f.seek(self.header_bytes + r0 * self.record_bytes)
+            raw = f.read(n_rec * self.record_bytes)
+        n_rec = len(raw) // self.record_bytes  # archivo truncado
+        digital = self._decode(raw[:n_rec * self.record_bytes]).reshape(n_rec, self.record_samples)
+
+        spr = self.samples_per_record
+        cols = (self._offsets[:, None] + np.arange(spr)[None, :])          # (n_ch, spr)
+        block = digital[:, cols].transpose(1, 0, 2).reshape(self.n_channels, n_rec * spr)
+        block = (block * self._gain + self._offset).astype(np.float32)
+
+        with self._lock:
+            self._cache[b] = block
+            self._cache.move_to_end(b)
+            while len(self._cache) > self._cache_blocks:
+                self._cache.popitem(last=False)
+        return block
+
+    def _decode(self, raw: bytes) -> np.ndarray:
+        if not self.is_bdf:
+            return np.frombuffer(raw, dtype='<i2').astype(np.int32)
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        value = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        return np.where(value >= 1 << 23, value - (1 << 24), value)
+
+    def _prefetch(self, b: int):
+        if b < 0 or b >= self.n_chunks:
+            return
+        with self._lock:
+            if b in self._cache or b in self._pending:
+                return
+            future = _readahead.submit(self._load_block, b)
+            self._pending[b] = future
+        future.add_done_callback(lambda _f, b=b: self._forget_pending(b))
+
+    def _forget_pending(self, b: int):
+        with self._lock:
+            self._pending.pop(b, None)
@@ -0,0 +1,297 @@
+"""
+Feature store: features MuseFeatureExtractor (24-dim) por ventana de cada
+sesión grabada, precalculadas una vez y leídas con mmap.
+
+Misma grilla que el análisis en vivo / reprocess (ventana 2 s cada 200 ms,
+database.reprocess.window_ends). Por sesión:
+
+    <FEATURE_STORE_DIR>/<recording_id>/
+        features.npy   (n_windows, 24) float32, abierto con mmap
+        times.npy      (n_windows,) float64 — fin de ventana, s desde la 1ª muestra
+        phases.npy     (n_windows,) int16 — índice en meta['phases'], -1 = sin fase
+        meta.json      versión, feature_names, fs, ventana/paso, fases
+
+Las fases salen de los eventos `<phase>_start` / `<phase>_end` con el mismo
+criterio que SessionAggregator (protocol no es fase, una fase repetida
+reemplaza a la anterior, una fase sin _end no cuenta).
+
+Se construye en background al cerrar cada grabación (recorder_v2.stop,
+FEATURE_STORE_ON_STOP) y para las sesiones anteriores con:
+
+    python scripts/build_feature_store.py --missing
+"""
+
+import os
+import json
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ai.muse_features import MuseFeatureExtractor
+from database.reprocess import (
+    load_session_samples, session_sampling_rate, window_ends, WINDOW_SECONDS, STEP_SECONDS,
+)
+
+
+FEATURE_STORE_DIR = Path(os.getenv(
+    'FEATURE_STORE_DIR', str(Path(__file__).parent.parent / 'data' / 'feature_store')
+))
+# Construir las features de cada grabación al cerrarla (thread en background)
+FEATURE_STORE_ON_STOP = os.getenv('FEATURE_STORE_ON_STOP', 'true').lower() == 'true'
+# Ventanas por llamada a extract_batch durante el build (acota la memoria)
+FEATURE_STORE_CHUNK_WINDOWS = int(os.getenv('FEATURE_STORE_CHUNK_WINDOWS', '1024'))
+
+# Subir cuando cambien las features o la grilla → open() ignora lo anterior
+FEATURE_STORE_VERSION = 1
+
+NO_PHASE = -1
+FEATURE_DIM = MuseFeatureExtractor.FEATURE_DIM
+FEATURE_NAMES = list(MuseFeatureExtractor.FEATURE_NAMES)
+
+
+# ==================== READER ====================
+
+class SessionFeatures:
+    """Features de una sesión (mmap, sólo lectura) con índices de tiempo y fase."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path / 'meta.json') as f:
+            self.meta: Dict = json.load(f)
+        self.features: np.ndarray = np.load(path / 'features.npy', mmap_mode='r')
+        self.times: np.ndarray = np.load(path / 'times.npy')
+        self.phases: np.ndarray = np.load(path / 'phases.npy')
+
+    @property
+    def recording_id(self) -> int:
+        return self.meta['recording_id']
+
+    @property
+    def phase_names(self) -> List[str]:
+        return self.meta['phases']
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def window(self, start: float = 0, end: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Ventanas que terminan en [start, end) s → (times, features)."""
+        a = int(np.searchsorted(self.times, start, side='left'))
+        b = len(self.times) if end is None else int(np.searchsorted(self.times, end, side='left'))
+        return self.times[a:b], self.features[a:b]
+
+    def phase(self, name: str) -> np.ndarray:
+        """Features de las ventanas dentro de la fase `name` (vacío si no existe)."""
+        if name not in self.phase_names:
+            return np.empty((0, FEATURE_DIM), dtype=np.float32)
+        return self.features[self.phases == self.phase_names.index(name)]
+
+    def phase_means(self) -> Dict[str, Dict[str, float]]:
+        """{phase: {feature_name: media}} (incluye 'session' con todas las ventanas)."""
+        result = {}
+        groups = [('session', np.ones(len(self), dtype=bool))]
+        groups += [(name, self.phases == i) for i, name in enumerate(self.phase_names)]
+        for name, mask in groups:
+            if not mask.any():
+                continue
+            means = np.asarray(self.features[mask], dtype=np.float64).mean(axis=0)
+            result[name] = {k: round(float(v), 4) for k, v in zip(FEATURE_NAMES, means)}
+        return result
+
+    def to_dict(self) -> Dict:
+        return {
+            **self.meta,
+            'phase_windows': {
+                name: int(np.count_nonzero(self.phases == i)) for i, name in enumerate(self.phase_names)
+            },
+        }
+
+
+def session_path(recording_id: int) -> Path:
+    return FEATURE_STORE_DIR / str(int(recording_id))
+
+
+def open_session_features(recording_id: int) -> Optional[SessionFeatures]:
+    """SessionFeatures de la grabación, o None si no existe o es de otra versión."""
+    path = session_path(recording_id)
+    if not (path / 'meta.json').exists():
+        return None
+    try:
+        features = SessionFeatures(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ [features] Unreadable feature store for #{recording_id}: {e}")
+        return None
+    if features.meta.get('version') != FEATURE_STORE_VERSION:
+        return None
+    return features
+
+
+def list_feature_sessions() -> List[int]:
+    """IDs con features de la versión actual."""
+    if not FEATURE_STORE_DIR.exists():
+        return []
+    ids = sorted(int(p.name) for p in FEATURE_STORE_DIR.iterdir() if p.name.isdigit())
+    return [rid for rid in ids if open_session_features(rid) is not None]
+
+
+def load_feature_matrix(
+    recording_ids: Optional[List[int]] = None,
+    phase: Optional[str] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Features de varias sesiones apiladas (entrenamiento / comparación).
+
+    Returns:
+        (X (n, 24) float32, recording_id por fila (n,) int64)
+    """
+    ids = list_feature_sessions() if recording_ids is None else recording_ids
+    blocks, owners = [], []
+    for rid in ids:
+        features = open_session_features(rid)
+        if features is None:
+            continue
+        x = features.phase(phase) if phase else np.asarray(features.features)
+        blocks.append(x)
+        owners.append(np.full(len(x), rid, dtype=np.int64))
+    if not blocks:
+        return np.empty((0, FEATURE_DIM), dtype=np.float32), np.empty(0, dtype=np.int64)
+    return np.concatenate(blocks).astype(np.float32, copy=False), np.concatenate(owners)
+
+
+def delete_session_features(recording_id: int) -> bool:
+    path = session_path(recording_id)
+    if not path.exists():
+        return False
+    shutil.rmtree(path, ignore_errors=True)
+    return True
+
+
+# ==================== BUILD ====================
+
+def phase_intervals(events: List[Dict]) -> Dict[str, Tuple[float, float]]:
+    """{phase: (start, end)} epoch s, con el criterio de SessionAggregator.add_marker."""
+    open_phases: Dict[str, float] = {}
+    closed: Dict[str, Tuple[float, float]] = {}
+    for ev in sorted(events, key=lambda e: e.get('timestamp', 0)):
+        label = ev.get('label', '')
+        if label.endswith('_start'):
+            phase = label[:-6]
+            if phase == 'protocol':
+                continue
+            open_phases[phase] = ev['timestamp']
+            closed.pop(phase, None)
+        elif label.endswith('_end'):
+            phase = label[:-4]
+            if phase in open_phases:
+                closed[phase] = (open_phases.pop(phase), ev['timestamp'])
+    return closed
+
+
+def _phase_index(end_times: np.ndarray, intervals: Dict[str, Tuple[float, float]]) -> Tuple[np.ndarray, List[str]]:
+    """Fase de cada ventana (por su instante final); si se solapan gana la última en empezar."""
+    phases = np.full(len(end_times), NO_PHASE, dtype=np.int16)
+    names = sorted(intervals, key=lambda p: intervals[p][0])
+    for i, name in enumerate(names):
+        start, end = intervals[name]
+        phases[(end_times >= start) & (end_times <= end)] = i
+    return phases, names
+
+
+def build_session_features(storage, recording_id: int, overwrite: bool = False) -> Dict:
+    """
+    Calcula y guarda las features de una grabación desde sus muestras crudas.
+
+    Escribe en un directorio temporal y lo renombra al final: un lector nunca
+    ve un store a medias.
+    """
+    t0 = time.perf_counter()
+    if not overwrite and open_session_features(recording_id) is not None:
+        return {'session_id': recording_id, 'skipped': True}
+
+    recording = storage.get_recording(recording_id)
+    if recording is None:
+        raise LookupError(f"Session {recording_id} not found ({storage.name})")
+    timestamps, data = load_session_samples(storage, recording_id)
+    if len(timestamps) == 0:
+        raise LookupError(f"Session {recording_id} has no raw samples ({storage.name})")
+    fs = session_sampling_rate(recording, timestamps)
+
+    ends = window_ends(len(timestamps), fs)
+    n = int(round(WINDOW_SECONDS * fs))
+    end_times = timestamps[ends - 1] if len(ends) else np.empty(0)
+    phases, phase_names = _phase_index(end_times, phase_intervals(storage.get_events(recording_id)))
+
+    final = session_path(recording_id)
+    tmp = final.with_name(f".{final.name}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    features = np.lib.format.open_memmap(
+        tmp / 'features.npy', mode='w+', dtype=np.float32, shape=(len(ends), FEATURE_DIM)
+    )
+    if len(ends):
+        # (4, n_samples - n + 1, n) sin copiar; cada tramo copia sólo sus ventanas
+        view = np.lib.stride_tricks.sliding_window_view(data, n, axis=1)
+        for k in range(0, len(ends), FEATURE_STORE_CHUNK_WINDOWS):
+            starts = ends[k:k + FEATURE_STORE_CHUNK_WINDOWS] - n
+            windows = view[:, starts].transpose(1, 0, 2)
+            features[k:k + len(starts)] = MuseFeatureExtractor.extract_batch(windows, fs)
+    features.flush()
+    del features
+
+    t_origin = float(timestamps[0])
+    np.save(tmp / 'times.npy', end_times - t_origin)
+    np.save(tmp / 'phases.npy', phases)
+    meta = {
+        'version': FEATURE_STORE_VERSION,
+        'recording_id': recording_id,
+        'n_windows': int(len(ends)),
+        'feature_names': FEATURE_NAMES,
+        'fs': fs,
+        'window_seconds': WINDOW_SECONDS,
+        'step_seconds': STEP_SECONDS,
+        't_origin': t_origin,
+        'phases': phase_names,
+        'built_at': time.time(),
+    }
+    with open(tmp / 'meta.json', 'w') as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(final, ignore_errors=True)
+    tmp.rename(final)
+    return {
+        'session_id': recording_id,
+        'windows': int(len(ends)),
+        'phases': phase_names,
+        'seconds': round(time.perf_counter() - t0, 2),
+    }
+
+
+def missing_feature_ids(storage, limit: int = 10000) -> List[int]:
+    """Grabaciones cerradas sin features de la versión actual."""
+    done = set(list_feature_sessions())
+    return [
+        r.id for r in storage.list_recordings(limit)
+        if r.ended_at is not None and r.id not in done
+    ]
+
+
+def build_in_background(storage, recording_id: int,
+                        on_built: Optional[Callable[[int], None]] = None) -> threading.Thread:
+    """Build best-effort en un thread (cierre de grabación); luego on_built(recording_id)."""
+    def run():
+        try:
+            result = build_session_features(storage, recording_id, overwrite=True)
+            print(f"✓ [features] #{recording_id}: {result['windows']} windows in {result['seconds']}s")
+        except Exception as e:
+            print(f"⚠️ [features] Feature store not built for #{recording_id}: {e}")
+            return
+        if on_built is not None:
+            on_built(recording_id)
+
+    thread = threading.Thread(target=run, name=f'features-{recording_id}', daemon=True)
+    thread.start()
+    return thread
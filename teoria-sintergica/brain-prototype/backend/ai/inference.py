@@ -1,17 +1,31 @@
 import torch
 import numpy as np
 from .model import SyntergicVAE
+from .vae_engine import VAEInferenceEngine, VAE_BACKEND
+from .model_registry import get_model_registry, LoadedModel
 from .dataset import EEGDataset
 from .session_player import SessionPlayer
 from .playlist_manager import PlaylistManager
+from .brain_context import BrainContext, BrainContextRegistry
 import os
 import sys
+import threading
+import time
 
 # Agregar path del backend para importar análisis
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from analysis.metrics import SyntergicMetrics
 from analysis.spectral import SpectralAnalyzer
 from analysis.coherence import CoherenceAnalyzer
+from analysis.neurofeedback import NeurofeedbackProcessor, default_config as neurofeedback_defaults
+
+from subsystems import Subsystem
+
+# Modos dataset → runs de PhysioNet (sujeto 1)
+DATASET_RUNS = {
+    'relax': [2],          # Eyes Closed (Meditación)
+    'focus': [6, 10, 14],  # Motor Imagery (Alta Actividad)
+}
 
 # Type hints para hardware (evitar import circular)
 from typing import TYPE_CHECKING
@@ -23,82 +37,179 @@ class SyntergicBrain:
     Clase principal que gestiona el "Cerebro Digital" en tiempo real.
     
     ACTUALIZADO: Ahora usa análisis científico completo (FFT, coherencia, entropía).
+    
+    Compartido por todos los clientes: modelo, datasets y sesiones cargadas.
+    El estado de cada cliente (modo, reproducción, smoothing) es un
+    BrainContext (ai/brain_context.py); los métodos reciben `ctx` y sin él
+    usan el contexto por defecto.
     """
-    def __init__(self, model_path="syntergic_vae.pth"):
+    def __init__(self, model_path="syntergic_vae.pth", lazy: bool = False):
         self.device = torch.device("cpu") # Inferencia en CPU
         
         # 1. Configurar dimensiones
         self.input_dim = 64 * 161 
         
-        # 2. Cargar Arquitectura
-        self.model = SyntergicVAE(input_dim=self.input_dim, hidden_dim=512, latent_dim=64)
-        
-        # 3. Cargar Pesos
+        # 2-3. Modelo activo del registro (ai/model_registry.py); con el registro
+        # vacío, syntergic_vae.pth se registra como v1
+        self.registry = get_model_registry()
+        self._swap_lock = threading.Lock()
         full_path = os.path.join(os.path.dirname(__file__), model_path)
-        if os.path.exists(full_path):
-            print(f"✓ Loading trained brain from {full_path}...")
-            self.model.load_state_dict(torch.load(full_path, map_location=self.device))
+        active_version = None
+        try:
+            active_version = self.registry.bootstrap(full_path)
+        except Exception as e:
+            print(f"⚠ Model registry unavailable: {e}")
+        if active_version:
+            print(f"✓ Loading trained brain {active_version} from {self.registry.weights_path(active_version)}...")
+            self._active = self.registry.load(active_version)
         else:
             print(f"⚠ WARNING: Model not found at {full_path}. Using random initialization.")
+            model = SyntergicVAE(input_dim=self.input_dim, hidden_dim=512, latent_dim=64).to(self.device).eval()
+            # Encoder + estadísticas sintérgicas en un solo forward (inference_mode)
+            self._active = LoadedModel(model, VAEInferenceEngine(model, backend=VAE_BACKEND), 'random')
+        print(f"✓ VAE inference backend: {self.vae.backend} (model {self.model_version})")
         
-        self.model.to(self.device)
-        self.model.eval()
-        
-        
-        # 4. Cargar datasets para distintos modos cognitivos
-        print("✓ Loading EEG datasets for different modes...")
-        self.datasets = {}
-        self.loaders = {}
-        self.iterators = {}
         
-        # Modo RELAX (Meditación) -> Run 2 (Eyes Closed)
-        self.datasets['relax'] = EEGDataset(subjects=[1], runs=[2])
-        self.loaders['relax'] = torch.utils.data.DataLoader(self.datasets['relax'], batch_size=1, shuffle=False)
-        self.iterators['relax'] = iter(self.loaders['relax'])
-        
-        # Modo FOCUS (Alta Actividad) -> Runs 6, 10, 14 (Motor Imagery)
-        self.datasets['focus'] = EEGDataset(subjects=[1], runs=[6, 10, 14])
-        self.loaders['focus'] = torch.utils.data.DataLoader(self.datasets['focus'], batch_size=1, shuffle=False)
-        self.iterators['focus'] = iter(self.loaders['focus'])
-        
-        # Estado actual
-        self.current_mode = 'focus' 
+        # Estado por cliente: modo, sesión y posición, smoothing
+        self.contexts = BrainContextRegistry()
         
         # Sampling rate del dataset PhysioNet
         self.fs = 160  # Hz (PhysioNet EEG Motor Imagery)
         
-        # --- SESSION PLAYER (Nuevo modo) ---
-        # Reproduce sesiones completas cronológicamente
-        print("✓ Loading Session Player (longitudinal playback)...")
-        self.session_player = SessionPlayer(window_duration=2.0)
-        self.session_mode_active = False  # False = dataset aleatorio, True = sesión secuencial
-        
-        # --- PLAYLIST MANAGER ---
-        # Gestiona múltiples sesiones para reproducción secuencial
-        print("✓ Loading Playlist Manager (multi-session playback)...")
-        self.playlist = PlaylistManager()
-        
-        # --- MUSE 2 HARDWARE MODE ---
-        # Referencia al conector Muse (se asigna cuando se activa modo 'muse')
-        self.muse_connector = None
-        self.muse_mode_active = False
+        # Partes pesadas como subsistemas lazy (ver subsystems.py):
+        # datasets PhysioNet (descarga + FIR + epochs), session player y playlist
+        # (Postgres). Con lazy=True se construyen bajo demanda / en background.
+        self.parts = {
+            'brain_datasets': Subsystem('brain_datasets', self._load_datasets),
+            'session_player': Subsystem('session_player', self._load_session_player),
+            'playlist': Subsystem('playlist', self._load_playlist),
+        }
         
         # --- SMOOTHING TEMPORAL ---
-        # Buffers para promediar últimos N frames y evitar cambios bruscos
+        # Promedio de los últimos N frames (buffers en cada contexto)
         self.smoothing_window = 5  # ~1 segundo a 5Hz
-        self.coherence_history = []
-        self.entropy_history = []
-        self.bands_history = {'delta': [], 'theta': [], 'alpha': [], 'beta': [], 'gamma': []}
-        self.plv_history = []
+        
+        if not lazy:
+            for part in self.parts.values():
+                part.get()
         
         print("✓ Syntergic Brain ready. Default mode: FOCUS")
         print("✓ Scientific metrics module loaded (FFT, Coherence, Entropy)")
-        print(f"✓ Playlist loaded with {len(self.playlist.get_playlist())} sessions")
         print("✓ Muse 2 hardware mode available (use set_mode('muse', muse_connector))")
+    
+    # ==================== MODEL (hot swap) ====================
+    
+    @property
+    def model(self) -> SyntergicVAE:
+        return self._active.model
+    
+    @property
+    def vae(self) -> VAEInferenceEngine:
+        return self._active.engine
+    
+    @property
+    def model_version(self) -> str:
+        return self._active.version
+    
+    def activate_model(self, version: str) -> dict:
+        """
+        Carga y calienta `version` (fuera del loop de frames) y la activa
+        reemplazando la referencia al modelo entre dos frames.
+        """
+        with self._swap_lock:
+            return self._swap(version, lambda: self.registry.set_active(version))
+    
+    def rollback_model(self) -> dict:
+        """Vuelve a la versión activa anterior del registro."""
+        with self._swap_lock:
+            version = self.registry.previous_version()
+            if version is None:
+                raise LookupError("No previous model version to roll back to")
+            return self._swap(version, self.registry.rollback)
+    
+    def _swap(self, version: str, commit) -> dict:
+        previous = self._active.version
+        t0 = time.perf_counter()
+        loaded = self.registry.load(version)
+        load_ms = (time.perf_counter() - t0) * 1000
+        if loaded.engine.input_dim != self.input_dim:
+            raise ValueError(f"Model {version} expects input_dim={loaded.engine.input_dim}, "
+                             f"the frame loop feeds {self.input_dim}")
+        commit()
+        self._active = loaded  # una sola referencia: el próximo frame usa el modelo nuevo
+        print(f"🔁 Model swapped {previous} → {version} ({load_ms:.0f} ms load + warmup)")
+        return {'previous': previous, 'active': version, 'load_ms': round(load_ms, 1)}
+    
+    # ==================== LAZY PARTS ====================
+    
+    def _load_datasets(self):
+        """Datasets PhysioNet para los modos relax / focus (solo lectura)."""
+        print("✓ Loading EEG datasets for different modes...")
+        return {mode: EEGDataset(subjects=[1], runs=runs) for mode, runs in DATASET_RUNS.items()}
+    
+    def _load_session_player(self):
+        # Sesión por defecto del modo 'session'; cada contexto reproduce un fork
+        print("✓ Loading Session Player (longitudinal playback)...")
+        return SessionPlayer(window_duration=2.0)
+    
+    def _load_playlist(self):
+        # Gestiona múltiples sesiones para reproducción secuencial
+        print("✓ Loading Playlist Manager (multi-session playback)...")
+        playlist = PlaylistManager()
+        print(f"✓ Playlist loaded with {len(playlist.sessions)} sessions")
+        return playlist
+    
+    @property
+    def datasets(self):
+        return self.parts['brain_datasets'].get(wait=False)
+    
+    @property
+    def default_session(self) -> SessionPlayer:
+        """Sesión por defecto, compartida: reproducir siempre un fork()."""
+        return self.parts['session_player'].get(wait=False)
+    
+    @property
+    def playlist(self) -> PlaylistManager:
+        return self.parts['playlist'].get(wait=False)
+    
+    # ==================== CONTEXTS ====================
+    
+    def context(self, ctx=None) -> BrainContext:
+        """BrainContext de un token (o el mismo contexto, o el default si None)."""
+        if isinstance(ctx, BrainContext):
+            return ctx
+        return self.contexts.get(ctx)
+    
+    def release_muse(self):
+        """Muse desconectado: los contextos en modo muse vuelven a 'focus'."""
+        for ctx in self.contexts.all():
+            if ctx.muse_mode_active:
+                self.set_mode('focus', ctx=ctx)
+    
+    def configure_neurofeedback(self, ctx=None, **changes) -> dict:
+        """
+        Cambia banda / umbral / histéresis / envelope_ms del contexto. Se valida
+        construyendo un procesador; el /ws/neurofeedback conectado aplica los
+        umbrales en caliente y rehace los filtros si cambia banda o envelope.
+        """
+        ctx = self.context(ctx)
+        config = {**(ctx.neurofeedback_config or neurofeedback_defaults()), **changes}
+        NeurofeedbackProcessor(**config)  # ValueError si no es válida
+        ctx.neurofeedback_config = config
+        return config
+    
+    def session_player(self, ctx=None) -> SessionPlayer:
+        """Vista de reproducción del contexto (fork de la sesión por defecto al principio)."""
+        ctx = self.context(ctx)
+        if ctx.session_player is None:
+            ctx.session_player = self.default_session.fork()
+        return ctx.session_player
 
-    def set_mode(self, mode, muse_connector=None):
-        # Modo especial: MUSE 2 HARDWARE (EEG en vivo)
-        if mode == 'muse':
+    def set_mode(self, mode, muse_connector=None, ctx=None):
+        ctx = self.context(ctx)
+        # Modo especial: MUSE 2 HARDWARE (EEG en vivo). 'neurofeedback' usa el
+        # mismo EEG y además emite envolventes IIR cada 50 ms en /ws/neurofeedback
+        if mode in ('muse', 'neurofeedback'):
             if muse_connector is None:
                 print("❌ Muse connector not provided")
                 return False
@@ -106,48 +217,43 @@ class SyntergicBrain:
                 print("❌ Muse not streaming. Start stream first.")
                 return False
             
-            print(f"🎧 Switching to MUSE 2 LIVE MODE (real-time EEG)")
-            self.muse_connector = muse_connector
-            self.muse_mode_active = True
-            self.session_mode_active = False
-            self.current_mode = 'muse'
+            if mode == 'neurofeedback':
+                print(f"🎯 Switching to NEUROFEEDBACK mode (Muse 2, IIR envelopes) [{ctx.token}]")
+                if ctx.neurofeedback_config is None:
+                    ctx.neurofeedback_config = neurofeedback_defaults()
+            else:
+                print(f"🎧 Switching to MUSE 2 LIVE MODE (real-time EEG) [{ctx.token}]")
+            ctx.muse_connector = muse_connector
+            ctx.muse_mode_active = True
+            ctx.session_mode_active = False
+            ctx.current_mode = mode
             # Reset smoothing
-            self.coherence_history = []
-            self.entropy_history = []
-            self.bands_history = {'delta': [], 'theta': [], 'alpha': [], 'beta': [], 'gamma': []}
-            self.plv_history = []
+            ctx.reset_smoothing()
             return True
         
         # Modo especial: reproducción de sesión completa
         if mode == 'session':
-            print(f"📼 Switching to SESSION PLAYER mode (longitudinal playback)")
-            self.session_mode_active = True
-            self.session_player.restart()
-            self.session_player.play()
-            # Sincronizar playlist con session_player actual
-            self.playlist.current_player = self.session_player
+            print(f"📼 Switching to SESSION PLAYER mode (longitudinal playback) [{ctx.token}]")
+            player = self.session_player(ctx)
+            player.restart()
+            player.play()
+            ctx.session_mode_active = True
             # Desactivar modo muse si estaba activo
-            self.muse_mode_active = False
-            self.muse_connector = None
+            ctx.muse_mode_active = False
+            ctx.muse_connector = None
             # Reset smoothing
-            self.coherence_history = []
-            self.entropy_history = []
-            self.bands_history = {'delta': [], 'theta': [], 'alpha': [], 'beta': [], 'gamma': []}
-            self.plv_history = []
+            ctx.reset_smoothing()
             return True
         
         # Modos dataset (relax/focus)
-        if mode in self.datasets:
-            print(f"→ Switching brain mode to: {mode.upper()}")
-            self.current_mode = mode
-            self.session_mode_active = False  # Desactivar session player
-            self.muse_mode_active = False  # Desactivar modo muse
-            self.muse_connector = None
+        if mode in DATASET_RUNS:
+            print(f"→ Switching brain mode to: {mode.upper()} [{ctx.token}]")
+            ctx.current_mode = mode
+            ctx.session_mode_active = False  # Desactivar session player
+            ctx.muse_mode_active = False  # Desactivar modo muse
+            ctx.muse_connector = None
             # Reset smoothing buffers al cambiar de modo
-            self.coherence_history = []
-            self.entropy_history = []
-            self.bands_history = {'delta': [], 'theta': [], 'alpha': [], 'beta': [], 'gamma': []}
-            self.plv_history = []
+            ctx.reset_smoothing()
             return True
         return False
     
@@ -162,103 +268,98 @@ class SyntergicBrain:
     
     # --- PLAYLIST MANAGEMENT METHODS ---
     
-    def get_playlist(self):
-        """Retorna lista de sesiones disponibles."""
-        return self.playlist.get_playlist()
+    def get_playlist(self, ctx=None):
+        """Retorna lista de sesiones disponibles ('is_current' del contexto)."""
+        return self.playlist.get_playlist(current_index=self.context(ctx).playlist_index)
     
-    def get_current_playlist_info(self):
-        """Información de la sesión actual en el playlist."""
-        return self.playlist.get_current_session_info()
+    def get_current_playlist_info(self, ctx=None):
+        """Información de la sesión actual del contexto en el playlist."""
+        return self.playlist.get_session_info(self.context(ctx).playlist_index)
     
-    def next_playlist_session(self):
+    def next_playlist_session(self, ctx=None):
         """Avanza a la siguiente sesión del playlist."""
-        session_info = self.playlist.next_session()
-        if session_info:
-            # Cargar nueva sesión en session_player
-            self.session_player = self.playlist.load_session(self.playlist.current_index)
-            self.session_player.restart()
-            # Sincronizar current_player con session_player
-            self.playlist.current_player = self.session_player
-            # Limpiar buffers de smoothing
-            self.coherence_history = []
-            self.entropy_history = []
-            self.bands_history = {'delta': [], 'theta': [], 'alpha': [], 'beta': [], 'gamma': []}
-            self.plv_history = []
-            # Retornar info de la sesión (no el SessionPlayer)
-            return self.playlist.get_current_session_info()
-        return None
+        ctx = self.context(ctx)
+        # ya cargada (LRU / precarga)
+        return self._attach_session(ctx, self.playlist.next_session(ctx.playlist_index))
     
-    def previous_playlist_session(self):
+    def previous_playlist_session(self, ctx=None):
         """Retrocede a la sesión anterior del playlist."""
-        session_info = self.playlist.previous_session()
-        if session_info:
-            # Cargar nueva sesión
-            self.session_player = self.playlist.load_session(self.playlist.current_index)
-            self.session_player.restart()
-            # Sincronizar current_player con session_player
-            self.playlist.current_player = self.session_player
-            # Limpiar buffers
-            self.coherence_history = []
-            self.entropy_history = []
-            self.bands_history = {'delta': [], 'theta': [], 'alpha': [], 'beta': [], 'gamma': []}
-            self.plv_history = []
-            # Retornar info de la sesión (no el SessionPlayer)
-            return self.playlist.get_current_session_info()
-        return None
+        ctx = self.context(ctx)
+        return self._attach_session(ctx, self.playlist.previous_session(ctx.playlist_index))
     
-    def select_playlist_session(self, index: int):
+    def select_playlist_session(self, index: int, ctx=None):
         """Selecciona una sesión específica del playlist por índice."""
         if index < 0 or index >= len(self.playlist.sessions):
             return None
-        
-        # Cargar sesión seleccionada
-        self.session_player = self.playlist.load_session(index)
-        if self.session_player:
-            self.session_player.restart()
-            # Sincronizar current_player con session_player
-            self.playlist.current_player = self.session_player
-            # Limpiar buffers de smoothing
-            self.coherence_history = []
-            self.entropy_history = []
-            self.bands_history = {'delta': [], 'theta': [], 'alpha': [], 'beta': [], 'gamma': []}
-            self.plv_history = []
-            return self.playlist.get_current_session_info()
-        return None
+        return self._attach_session(self.context(ctx), self.playlist.open_session(index))
+    
+    def _attach_session(self, ctx: BrainContext, opened):
+        """
+        Pone en el contexto una vista nueva (fork) de la sesión abierta, desde
+        el inicio. Sin corte: si se estaba reproduciendo, sigue reproduciendo.
+        """
+        if not opened:
+            return None
+        index, player = opened
+        was_playing = ctx.session_player is not None and ctx.session_player.is_playing
+        view = player.fork()
+        if was_playing:
+            view.play()
+        # Vista lista antes de publicarla: el frame en curso no ve una a medias
+        ctx.session_player = view
+        ctx.playlist_index = index
+        # Limpiar buffers de smoothing
+        ctx.reset_smoothing()
+        # Retornar info de la sesión (no el SessionPlayer)
+        return self.playlist.get_session_info(index)
 
-    def next_state(self):
+    def next_state(self, ctx=None):
         """
         Obtiene el siguiente estado sintérgico con análisis científico completo.
         
         ACTUALIZADO: Soporta modo muse (EEG en vivo), sesión y dataset.
+        
+        Args:
+            ctx: BrainContext o token del cliente (None = contexto por defecto)
         """
+        ctx = self.context(ctx)
+        
         # --- MODO MUSE: EEG en tiempo real ---
-        if self.muse_mode_active and self.muse_connector:
-            return self._process_muse_window()
+        if ctx.muse_mode_active and ctx.muse_connector:
+            return self._process_muse_window(ctx)
         
         # --- MODO SESSION: Reproducción cronológica ---
-        if self.session_mode_active:
+        if ctx.session_mode_active:
             # Verificar si debemos auto-avanzar a la siguiente sesión del playlist
-            if self.playlist.should_auto_advance():
-                print("Auto-advancing to next playlist session...")
-                next_info = self.next_playlist_session()
+            if self.playlist.should_auto_advance(ctx.session_player):
+                print(f"Auto-advancing to next playlist session [{ctx.token}]...")
+                next_info = self.next_playlist_session(ctx)
                 if next_info:
                     print(f"   → Now playing: {next_info['name']}")
             
-            session_window = self.session_player.next_window()
+            session_player = self.session_player(ctx)
+            session_window = session_player.next_window()
             
             if session_window is None:
                 # Fallback a dataset si hay error
                 print("⚠ Session playback error, falling back to dataset mode")
-                self.session_mode_active = False
+                ctx.session_mode_active = False
             else:
                 # --- USAR MÉTRICAS PREGRABADAS SI ESTÁN DISPONIBLES ---
                 recorded_metrics = session_window.get('recorded_metrics')
                 
                 if recorded_metrics:
                     # Usar métricas exactas que se grabaron
-                    return self._use_recorded_metrics(recorded_metrics, session_window['timestamp'])
+                    return self._use_recorded_metrics(ctx, recorded_metrics, session_window['timestamp'])
                 
                 # --- FALLBACK: Recalcular desde samples (para sesiones antiguas) ---
+                # Replay array pre-convertido (64 ch @ 160 Hz, memmap): sólo un slice
+                vae_window = session_player.replay_window(session_window['timestamp'])
+                if vae_window is not None:
+                    real_eeg_input = torch.from_numpy(vae_window.reshape(1, -1)).to(self.device)
+                    return self._process_eeg_window(ctx, real_eeg_input, session_window['timestamp'])
+                
+                # Mientras se prepara: resample en vivo de la ventana
                 # Convertir ventana MNE a tensor
                 # session_window['data'] shape: (n_channels, n_timepoints)
                 window_data = session_window['data']
@@ -306,22 +407,18 @@ class SyntergicBrain:
                 real_eeg_input = torch.from_numpy(window_data).float().unsqueeze(0).to(self.device)
                 
                 # Continuar con procesamiento normal
-                return self._process_eeg_window(real_eeg_input, session_window['timestamp'])
+                return self._process_eeg_window(ctx, real_eeg_input, session_window['timestamp'])
         
-        # --- MODO DATASET: Ventanas aleatorias ---
-        try:
-            # Obtener siguiente sample EEG
-            real_eeg_input = next(self.iterators[self.current_mode])
-        except StopIteration:
-            # Reiniciar ciclo
-            self.iterators[self.current_mode] = iter(self.loaders[self.current_mode])
-            real_eeg_input = next(self.iterators[self.current_mode])
-            
-        real_eeg_input = real_eeg_input.to(self.device)
+        # --- MODO DATASET: Ventanas secuenciales (posición propia del contexto) ---
+        mode = ctx.current_mode if ctx.current_mode in DATASET_RUNS else 'focus'
+        dataset = self.datasets[mode]
+        position = ctx.dataset_positions.get(mode, 0) % len(dataset)  # reiniciar ciclo
+        ctx.dataset_positions[mode] = position + 1
+        real_eeg_input = dataset[position].unsqueeze(0).to(self.device)
         
-        return self._process_eeg_window(real_eeg_input)
+        return self._process_eeg_window(ctx, real_eeg_input)
     
-    def _process_eeg_window(self, real_eeg_input, session_timestamp=None):
+    def _process_eeg_window(self, ctx: BrainContext, real_eeg_input, session_timestamp=None):
         """
         Procesa ventana EEG de dataset PhysioNet o sesión (fallback sin métricas grabadas).
 
@@ -331,17 +428,18 @@ class SyntergicBrain:
           - NO se llama desde _process_muse_window() — ese path es independiente.
 
         Args:
+            ctx: Contexto del cliente (buffers de smoothing, sesión)
             real_eeg_input: Tensor shape (1, 10304) = 64ch × 161tp
             session_timestamp: Posición temporal en la sesión (opcional)
         """
         
         # --- PARTE 1: INFERENCIA VAE (Focal Point) ---
-        coherence_vae, focal_point = self.model.get_syntergic_state(real_eeg_input)
-        
-        # Obtener varianza para fallback
-        with torch.no_grad():
-            _, logvar = self.model.encode(real_eeg_input)
-            variance_mean = torch.mean(torch.exp(logvar)).item()
+        # Un solo encode: focal point + varianza latente (fallback de coherencia).
+        # Una lectura de _active: un swap concurrente no mezcla modelo y versión
+        active = self._active
+        vae_state = active.engine.infer(real_eeg_input)
+        focal_point = vae_state['focal_point']
+        variance_mean = vae_state['variance_mean']
         
         # --- PARTE 2: ANÁLISIS CIENTÍFICO ---
         # El tensor de entrada tiene shape (1, 64*161) = (1, 10304)
@@ -393,16 +491,16 @@ class SyntergicBrain:
         
         # --- PARTE 3: SMOOTHING TEMPORAL ---
         # Aplicar promedio móvil para transiciones suaves
-        smoothed_coherence = self._smooth_value(self.coherence_history, metrics['coherence'])
-        smoothed_entropy = self._smooth_value(self.entropy_history, metrics['entropy'])
-        smoothed_plv = self._smooth_value(self.plv_history, metrics.get('plv', metrics['coherence']))
+        smoothed_coherence = self._smooth_value(ctx.coherence_history, metrics['coherence'])
+        smoothed_entropy = self._smooth_value(ctx.entropy_history, metrics['entropy'])
+        smoothed_plv = self._smooth_value(ctx.plv_history, metrics.get('plv', metrics['coherence']))
         
         # Smooth de bandas (cada una por separado)
         smoothed_bands = {}
         smoothed_bands_display = {}
         for band_name in ['delta', 'theta', 'alpha', 'beta', 'gamma']:
             smoothed_bands[band_name] = self._smooth_value(
-                self.bands_history[band_name], 
+                ctx.bands_history[band_name], 
                 metrics['bands'][band_name]
             )
             # bands_display también se suaviza (reutilizamos el mismo history)
@@ -431,22 +529,24 @@ class SyntergicBrain:
             "state_raw": SpectralAnalyzer.get_state_from_bands(metrics['bands']),
             "plv": smoothed_plv,
             "source": "dataset",
+            "model_version": active.version,
         }
         
         # Si estamos en modo sesión, agregar metadata temporal
         if session_timestamp is not None:
             result['session_timestamp'] = session_timestamp
-            result['session_progress'] = self.session_player.get_status()['progress_percent']
+            result['session_progress'] = ctx.session_player.get_status()['progress_percent']
         
         return result
 
-    def _use_recorded_metrics(self, recorded_metrics: dict, session_timestamp: float):
+    def _use_recorded_metrics(self, ctx: BrainContext, recorded_metrics: dict, session_timestamp: float):
         """
         Usa métricas pregrabadas en lugar de recalcularlas.
         
         Esto permite reproducir exactamente lo que se grabó durante una sesión.
         
         Args:
+            ctx: Contexto del cliente (sesión en reproducción)
             recorded_metrics: Dict con métricas guardadas en InfluxDB
             session_timestamp: Posición temporal en la sesión
             
@@ -505,12 +605,12 @@ class SyntergicBrain:
             "plv": recorded_metrics.get('plv', coherence),
             "source": "recorded",  # Indicador de que son métricas pregrabadas
             "session_timestamp": session_timestamp,
-            "session_progress": self.session_player.get_status()['progress_percent']
+            "session_progress": ctx.session_player.get_status()['progress_percent']
         }
         
         return result
 
-    def _process_muse_window(self):
+    def _process_muse_window(self, ctx: BrainContext):
         """
         Procesa datos EEG en vivo desde Muse 2.
         
@@ -521,7 +621,7 @@ class SyntergicBrain:
         from hardware import MuseToSyntergicAdapter
         
         # Obtener ventana de 2 segundos
-        window = self.muse_connector.get_window(duration=2.0)
+        window = ctx.muse_connector.get_window(duration=2.0)
         
         if window is None:
             # No hay suficientes datos aún, retornar estado neutral
@@ -534,7 +634,7 @@ class SyntergicBrain:
                 "state": "waiting_data",
                 "plv": 0.5,
                 "source": "muse2",
-                "buffer_status": self.muse_connector.get_buffer_status()
+                "buffer_status": ctx.muse_connector.get_buffer_status()
             }
         
         # Preparar datos para análisis
@@ -544,15 +644,15 @@ class SyntergicBrain:
         metrics = SyntergicMetrics.compute_all(eeg_data, fs=window.fs)
         
         # --- SMOOTHING TEMPORAL ---
-        smoothed_coherence = self._smooth_value(self.coherence_history, metrics['coherence'])
-        smoothed_entropy = self._smooth_value(self.entropy_history, metrics['entropy'])
-        smoothed_plv = self._smooth_value(self.plv_history, metrics.get('plv', metrics['coherence']))
+        smoothed_coherence = self._smooth_value(ctx.coherence_history, metrics['coherence'])
+        smoothed_entropy = self._smooth_value(ctx.entropy_history, metrics['entropy'])
+        smoothed_plv = self._smooth_value(ctx.plv_history, metrics.get('plv', metrics['coherence']))
         
         # Smooth de bandas
         smoothed_bands = {}
         for band_name in ['delta', 'theta', 'alpha', 'beta', 'gamma']:
             smoothed_bands[band_name] = self._smooth_value(
-                self.bands_history[band_name], 
+                ctx.bands_history[band_name], 
                 metrics['bands'][band_name]
             )
         # bands_display ya viene 1/f-corregido de SyntergicMetrics.compute_all().
@@ -575,7 +675,7 @@ class SyntergicBrain:
         state = SpectralAnalyzer.get_state_from_bands(smoothed_bands)
         
         # Obtener calidad de señal
-        signal_quality = self.muse_connector.get_signal_quality()
+        signal_quality = ctx.muse_connector.get_signal_quality()
         avg_quality = np.mean(list(signal_quality.values())) if signal_quality else 0.5
         
         return {
@@ -593,5 +693,5 @@ class SyntergicBrain:
             "source": "muse2",
             "signal_quality": signal_quality,
             "avg_quality": avg_quality,
-            "buffer_status": self.muse_connector.get_buffer_status()
+            "buffer_status": ctx.muse_connector.get_buffer_status()
         }
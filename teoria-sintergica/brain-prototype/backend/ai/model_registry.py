@@ -0,0 +1,264 @@
+"""
+Model registry: versiones de los pesos del SyntergicVAE con metadatos,
+activación en caliente y rollback sin reiniciar la API.
+
+    <MODEL_REGISTRY_DIR>/
+        registry.json        {'active': 'v3', 'history': ['v1', 'v3'], 'versions': {...}}
+        v1/weights.pth       state_dict
+        v2/weights.pth
+        ...
+
+Metadatos por versión: sha256 y tamaño del fichero, dimensiones del VAE,
+origen, notas, métricas de entrenamiento y fecha. Registrar dos veces los
+mismos pesos devuelve la versión existente. Sólo se registran ficheros dentro
+del propio registro o de ai/ (la salida de ai/train.py); cualquier otra ruta
+→ WeightsPathNotAllowed (400 en la API). torch.load siempre con weights_only.
+
+SyntergicBrain carga la versión activa al arrancar; con el registro vacío
+registra ai/syntergic_vae.pth como v1. Activar otra versión
+(POST /models/activate/{version}) la carga y la calienta fuera del loop de
+frames y después reemplaza una única referencia (LoadedModel): el frame en
+curso termina con el modelo anterior y el siguiente usa el nuevo. Cada frame
+lleva `model_version`. POST /models/rollback vuelve a la versión activa
+anterior (history).
+
+    python scripts/model_registry.py register ai/syntergic_vae.pth --notes "50 sujetos"
+    python scripts/model_registry.py list
+
+torch se importa al cargar / registrar, no al importar el módulo.
+"""
+
+import os
+import json
+import math
+import shutil
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+MODEL_REGISTRY_DIR = Path(os.getenv(
+    'MODEL_REGISTRY_DIR', str(Path(__file__).parent.parent / 'data' / 'model_registry')
+))
+# Frames de calentamiento del modelo nuevo antes de activarlo
+MODEL_WARMUP_FRAMES = int(os.getenv('MODEL_WARMUP_FRAMES', '5'))
+
+WEIGHTS_FILE = 'weights.pth'
+# Además del propio registro, sólo se registran pesos de aquí (salida de ai/train.py)
+AI_WEIGHTS_DIR = Path(__file__).parent
+
+
+class WeightsPathNotAllowed(ValueError):
+    """Ruta de pesos fuera del registro y de ai/ (POST /models/register → 400)."""
+
+
+class LoadedModel:
+    """Modelo listo para inferir: lo que el loop de frames lee en cada ventana."""
+
+    __slots__ = ('model', 'engine', 'version')
+
+    def __init__(self, model, engine, version: str):
+        self.model = model
+        self.engine = engine
+        self.version = version
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def vae_dims(state_dict: Dict) -> Dict[str, int]:
+    """input / hidden / latent dims de un state_dict de SyntergicVAE."""
+    try:
+        hidden, input_dim = state_dict['encoder.0.weight'].shape
+        latent = state_dict['fc_mu.weight'].shape[0]
+    except KeyError as e:
+        raise ValueError(f"Not a SyntergicVAE state_dict (missing {e})")
+    return {'input_dim': int(input_dim), 'hidden_dim': int(hidden), 'latent_dim': int(latent)}
+
+
+class ModelRegistry:
+    """Versiones de pesos en disco + versión activa e historial de activaciones."""
+
+    def __init__(self, root: Path = MODEL_REGISTRY_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+
+    # ==================== STATE ====================
+
+    def _read(self) -> Dict:
+        path = self.root / 'registry.json'
+        if not path.exists():
+            return {'active': None, 'history': [], 'versions': {}}
+        with open(path) as f:
+            return json.load(f)
+
+    def _write(self, state: Dict):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / 'registry.json.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, self.root / 'registry.json')
+
+    @property
+    def active_version(self) -> Optional[str]:
+        return self._read()['active']
+
+    def versions(self) -> List[Dict]:
+        state = self._read()
+        return [
+            {**meta, 'active': version == state['active']}
+            for version, meta in sorted(state['versions'].items(), key=lambda kv: kv[1]['created_at'])
+        ]
+
+    def get(self, version: str) -> Dict:
+        meta = self._read()['versions'].get(version)
+        if meta is None:
+            raise LookupError(f"Unknown model version '{version}'")
+        return meta
+
+    def weights_path(self, version: str) -> Path:
+        return self.root / version / WEIGHTS_FILE
+
+    def allowed_weights_path(self, weights_path) -> Path:
+        """
+        Ruta resuelta (symlinks, ..) si cae dentro del registro o de ai/.
+
+        torch.load de un fichero arbitrario del servidor no es aceptable ni
+        con weights_only: la API sólo lee pesos de directorios conocidos.
+        """
+        resolved = Path(weights_path).resolve()
+        for root in (self.root, AI_WEIGHTS_DIR):
+            if resolved.is_relative_to(Path(root).resolve()):
+                return resolved
+        raise WeightsPathNotAllowed(
+            f"Weights must be inside {self.root} or {AI_WEIGHTS_DIR}: {weights_path}"
+        )
+
+    def previous_version(self) -> Optional[str]:
+        """La versión activa antes de la actual (destino de un rollback)."""
+        history = self._read()['history']
+        return history[-2] if len(history) >= 2 else None
+
+    # ==================== REGISTER ====================
+
+    def register(self, weights_path, notes: str = '', metrics: Optional[Dict] = None,
+                 source: Optional[str] = None) -> Dict:
+        """
+        Copia unos pesos al registro como versión nueva (vN).
+
+        Valida que sea un state_dict de SyntergicVAE que carga en el modelo.
+        Mismos bytes que una versión existente → devuelve esa versión.
+        """
+        weights_path = self.allowed_weights_path(weights_path)
+        if not weights_path.exists():
+            raise LookupError(f"Weights not found: {weights_path}")
+
+        import torch
+        from .model import SyntergicVAE
+
+        sha = _sha256(weights_path)
+        state_dict = torch.load(weights_path, map_location='cpu', weights_only=True)
+        dims = vae_dims(state_dict)
+        SyntergicVAE(**dims).load_state_dict(state_dict)
+
+        with self._lock:
+            state = self._read()
+            for meta in state['versions'].values():
+                if meta['sha256'] == sha:
+                    return meta
+            version = f"v{len(state['versions']) + 1}"
+            while version in state['versions'] or (self.root / version).exists():
+                version = f"v{int(version[1:]) + 1}"
+
+            target = self.weights_path(version)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_suffix('.tmp')
+            shutil.copyfile(weights_path, tmp)
+            os.replace(tmp, target)
+
+            meta = {
+                'version': version,
+                'sha256': sha,
+                'size_bytes': target.stat().st_size,
+                **dims,
+                'source': source or str(weights_path),
+                'notes': notes,
+                'metrics': metrics or {},
+                'created_at': time.time(),
+            }
+            state['versions'][version] = meta
+            self._write(state)
+        return meta
+
+    def bootstrap(self, default_weights) -> Optional[str]:
+        """Registro vacío + pesos por defecto presentes → v1 activa."""
+        if self._read()['versions'] or not Path(default_weights).exists():
+            return self.active_version
+        meta = self.register(default_weights, notes='initial weights', source='legacy')
+        self.set_active(meta['version'])
+        return meta['version']
+
+    # ==================== ACTIVATION ====================
+
+    def set_active(self, version: str):
+        with self._lock:
+            state = self._read()
+            if version not in state['versions']:
+                raise LookupError(f"Unknown model version '{version}'")
+            state['active'] = version
+            if not state['history'] or state['history'][-1] != version:
+                state['history'].append(version)
+            self._write(state)
+
+    def rollback(self) -> str:
+        """Quita la versión actual del historial y activa la anterior."""
+        with self._lock:
+            state = self._read()
+            if len(state['history']) < 2:
+                raise LookupError("No previous model version to roll back to")
+            state['history'].pop()
+            state['active'] = state['history'][-1]
+            self._write(state)
+            return state['active']
+
+    def load(self, version: str, backend: Optional[str] = None) -> LoadedModel:
+        """
+        Carga los pesos de `version`, construye el motor de inferencia y lo
+        calienta (MODEL_WARMUP_FRAMES forwards). Lento: llamar fuera del loop.
+        """
+        import torch
+        from .model import SyntergicVAE
+        from .vae_engine import VAEInferenceEngine, VAE_BACKEND
+
+        meta = self.get(version)
+        weights_path = self.allowed_weights_path(self.weights_path(version))
+        state_dict = torch.load(weights_path, map_location='cpu', weights_only=True)
+        dims = {k: meta[k] for k in ('input_dim', 'hidden_dim', 'latent_dim')}
+        model = SyntergicVAE(**dims)
+        model.load_state_dict(state_dict)
+        model.eval()
+
+        engine = VAEInferenceEngine(model, backend=backend or VAE_BACKEND)
+        x = torch.zeros(1, dims['input_dim'])
+        for _ in range(max(1, MODEL_WARMUP_FRAMES)):
+            state = engine.infer(x)
+        if not all(math.isfinite(v) for v in (state['coherence'], *state['focal_point'].values())):
+            raise ValueError(f"Model {version} produces NaN on warmup")
+        return LoadedModel(model, engine, version)
+
+
+_registry: Optional[ModelRegistry] = None
+
+
+def get_model_registry() -> ModelRegistry:
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    return _registry
@@ -17,12 +17,15 @@ Usage:
     features = MuseFeatureExtractor.extract(window_data, fs=256)
     # features.shape == (24,)
     
-    # Batch extraction from recorded session:
-    dataset = MuseFeatureExtractor.extract_session(session_windows)
-    # dataset.shape == (n_windows, 24)
+    # Batch extraction from raw windows (vectorized DSP):
+    batch = MuseFeatureExtractor.extract_batch(windows, fs=256)
+    # windows.shape == (n_windows, 4, n_samples) → batch.shape == (n_windows, 24)
+    
+    # Precomputed per-session features: ai/feature_store.py
 """
 
 import numpy as np
+from scipy import signal
 from typing import List, Dict, Optional
 
 import sys
@@ -95,7 +98,7 @@ class MuseFeatureExtractor:
         
         # ── 3. Alpha-band MSC (1 feature) ───────────────────────────────
         try:
-            msc = CoherenceAnalyzer.compute_msc(left_avg, right_avg, fs)
+            msc = CoherenceAnalyzer.compute_alpha_coherence(left_avg, right_avg, fs)
             msc = msc if np.isfinite(msc) else 0.5
         except Exception:
             msc = 0.5
@@ -116,6 +119,91 @@ class MuseFeatureExtractor:
         
         return np.array(features, dtype=np.float32)
     
+    # Ventanas por bloque en extract_batch (memoria ~ bloque × 4 × n_samples complejos)
+    BATCH_BLOCK = 512
+    
+    @staticmethod
+    def extract_batch(windows: np.ndarray, fs: int = 256) -> np.ndarray:
+        """
+        Vectorized extract() over many raw windows.
+        
+        Same features as extract() — Welch, Butterworth + Hilbert PLV and
+        Welch MSC run along the last axis of the whole batch instead of
+        once per window and channel.
+        
+        Args:
+            windows: (n_windows, 4, n_samples) raw EEG in µV
+            fs: sampling rate in Hz
+            
+        Returns:
+            np.ndarray shape (n_windows, 24) float32
+        """
+        windows = np.asarray(windows, dtype=np.float64)
+        assert windows.ndim == 3 and windows.shape[1] == 4, \
+            f"Expected (n_windows, 4, n_samples), got {windows.shape}"
+        
+        out = np.empty((len(windows), MuseFeatureExtractor.FEATURE_DIM), dtype=np.float32)
+        block = MuseFeatureExtractor.BATCH_BLOCK
+        for i in range(0, len(windows), block):
+            out[i:i + block] = MuseFeatureExtractor._extract_block(windows[i:i + block], fs)
+        return out
+    
+    @staticmethod
+    def _relative_bands(x: np.ndarray, fs: int) -> np.ndarray:
+        """compute_frequency_bands() along the last axis → (..., 5), sums to 1."""
+        n = x.shape[-1]
+        if n < 64:
+            return np.full(x.shape[:-1] + (5,), 0.2)
+        freqs, psd = signal.welch(x, fs=fs, nperseg=min(256, n), scaling='density', axis=-1)
+        powers = np.stack([
+            psd[..., (freqs >= lo) & (freqs <= hi)].mean(axis=-1)
+            if np.any((freqs >= lo) & (freqs <= hi)) else np.zeros(x.shape[:-1])
+            for lo, hi in (SpectralAnalyzer.BANDS[b] for b in MuseFeatureExtractor.BANDS)
+        ], axis=-1)
+        total = powers.sum(axis=-1, keepdims=True)
+        return np.where(total > 0, powers / np.where(total > 0, total, 1.0), 0.2)
+    
+    @staticmethod
+    def _extract_block(windows: np.ndarray, fs: int) -> np.ndarray:
+        n_win, _, n = windows.shape
+        features = np.empty((n_win, MuseFeatureExtractor.FEATURE_DIM))
+        
+        # ── 1. Band powers per channel (20) ─────────────────────────────
+        channel_bands = MuseFeatureExtractor._relative_bands(windows, fs)      # (N, 4, 5)
+        features[:, :20] = channel_bands.reshape(n_win, 20)
+        
+        left_avg = windows[:, MuseFeatureExtractor.LEFT_CH].mean(axis=1)       # (N, n)
+        right_avg = windows[:, MuseFeatureExtractor.RIGHT_CH].mean(axis=1)
+        
+        # ── 2. Inter-hemispheric PLV (alpha, Butterworth + Hilbert) ─────
+        sos = signal.butter(4, [8.0, 13.0], btype='bandpass', fs=fs, output='sos')
+        phase_l = np.angle(signal.hilbert(signal.sosfilt(sos, left_avg, axis=-1), axis=-1))
+        phase_r = np.angle(signal.hilbert(signal.sosfilt(sos, right_avg, axis=-1), axis=-1))
+        plv = np.abs(np.mean(np.exp(1j * (phase_l - phase_r)), axis=-1))
+        features[:, 20] = np.where(np.isfinite(plv), plv, 0.5)
+        
+        # ── 3. Alpha-band MSC (Welch) ───────────────────────────────────
+        if n < 64:
+            features[:, 21] = 0.5
+        else:
+            freqs, cxy = signal.coherence(left_avg, right_avg, fs=fs, nperseg=min(256, n), axis=-1)
+            idx = (freqs >= 8.0) & (freqs <= 13.0)
+            msc = np.clip(cxy[:, idx].mean(axis=-1), 0.0, 1.0) if np.any(idx) else np.full(n_win, 0.5)
+            features[:, 21] = np.where(np.isfinite(msc), msc, 0.5)
+        
+        # ── 4. Frontal alpha asymmetry log(AF8 / AF7) ───────────────────
+        alpha = MuseFeatureExtractor.BANDS.index('alpha')
+        asymmetry = np.log((channel_bands[:, 2, alpha] + 1e-8) / (channel_bands[:, 1, alpha] + 1e-8))
+        features[:, 22] = np.clip(asymmetry, -2.0, 2.0)
+        
+        # ── 5. Global theta/beta ratio ──────────────────────────────────
+        global_bands = MuseFeatureExtractor._relative_bands(windows.mean(axis=1), fs)   # (N, 5)
+        theta = global_bands[:, MuseFeatureExtractor.BANDS.index('theta')]
+        beta = global_bands[:, MuseFeatureExtractor.BANDS.index('beta')]
+        features[:, 23] = np.clip(theta / (beta + 1e-8), 0.0, 10.0)
+        
+        return features
+    
     @staticmethod
     def extract_from_brainstate(brain_state: Dict) -> Optional[np.ndarray]:
         """
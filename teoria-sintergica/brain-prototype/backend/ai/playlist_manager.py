@@ -7,10 +7,19 @@ Ahora también incluye sesiones grabadas desde PostgreSQL + InfluxDB.
 
 import os
 import asyncio
-from typing import List, Dict, Optional
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 from .session_player import SessionPlayer
 
 
+# LRU de SessionPlayers ya cargados (EDF/Raw filtrado, métricas), acotado en bytes
+PLAYLIST_CACHE_MAX_MB = float(os.getenv('PLAYLIST_CACHE_MAX_MB', '512'))
+# Precarga de la siguiente sesión del playlist en un thread de fondo
+PLAYLIST_PREFETCH = os.getenv('PLAYLIST_PREFETCH', 'true').lower() in ('1', 'true', 'yes')
+
+
 class PlaylistManager:
     """
     Gestor de playlists para sesiones EEG.
@@ -21,15 +30,27 @@ class PlaylistManager:
     - Control de playlist (next, previous, shuffle)
     - Metadata de cada sesión
     - Integración con sesiones grabadas (PostgreSQL + InfluxDB)
+    - LRU de sesiones cargadas + precarga de la siguiente (cambio sin espera)
+    
+    Es compartido por todos los contextos del cerebro (ai/brain_context.py):
+    no guarda sesión actual. Cada contexto recuerda su índice y reproduce una
+    vista propia (SessionPlayer.fork) del player cacheado.
     """
     
-    def __init__(self):
+    def __init__(self, cache_max_mb: float = PLAYLIST_CACHE_MAX_MB, prefetch: bool = PLAYLIST_PREFETCH):
         self.sessions: List[Dict] = []
-        self.current_index: int = 0
-        self.current_player: Optional[SessionPlayer] = None
         self.loop_playlist: bool = True
         self.shuffle: bool = False
         
+        # Cache de players por 'path' de la sesión (estable entre refresh)
+        self.cache_max_bytes = int(cache_max_mb * 1024 * 1024)
+        self.prefetch_enabled = prefetch
+        self._players: "OrderedDict[str, SessionPlayer]" = OrderedDict()
+        self._player_bytes: Dict[str, int] = {}
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='playlist-prefetch')
+        
         # Cargar sesiones disponibles
         self._discover_sessions()
         self._load_recorded_sessions()
@@ -73,13 +94,13 @@ class PlaylistManager:
     
     def _load_recorded_sessions(self):
         """
-        Carga sesiones grabadas desde PostgreSQL (eeg_recordings table).
+        Carga sesiones grabadas desde el storage backend (eeg_recordings).
         """
         try:
-            from database import get_postgres_client_sync
-            postgres = get_postgres_client_sync()
-            postgres.connect()
-            recordings = postgres.get_all_recordings(limit=100)
+            from database import get_storage_backend
+            storage = get_storage_backend()
+            storage.connect()
+            recordings = storage.list_recordings(limit=100)
             
             for rec in recordings:
                 self.sessions.append({
@@ -97,9 +118,9 @@ class PlaylistManager:
                 })
             
             if recordings:
-                print(f"✓ Playlist: Loaded {len(recordings)} recorded sessions from PostgreSQL")
+                print(f"✓ Playlist: Loaded {len(recordings)} recorded sessions from {storage.name} storage")
         except Exception as e:
-            print(f"⚠ Could not load recorded sessions from PostgreSQL: {e}")
+            print(f"⚠ Could not load recorded sessions from storage: {e}")
             # Fallback to SQLite
             self._load_recorded_sessions_sqlite()
     
@@ -138,10 +159,18 @@ class PlaylistManager:
         self.sessions = [s for s in self.sessions if s['type'] not in ['recorded', 'recorded_sqlite']]
         # Recargar
         self._load_recorded_sessions()
+        # Olvidar players de grabaciones que ya no están en el playlist
+        paths = {s['path'] for s in self.sessions}
+        with self._lock:
+            for key in [k for k in self._players if k not in paths]:
+                self._evict(key)
     
-    def get_playlist(self) -> List[Dict]:
+    def get_playlist(self, current_index: Optional[int] = None) -> List[Dict]:
         """
         Retorna lista de sesiones disponibles con metadata.
+        
+        Args:
+            current_index: Sesión del contexto que pregunta (marca 'is_current')
         """
         playlist = []
         for idx, session in enumerate(self.sessions):
@@ -150,7 +179,7 @@ class PlaylistManager:
                 'name': session['name'],
                 'type': session['type'],
                 'category': session['category'],
-                'is_current': idx == self.current_index
+                'is_current': idx == current_index
             }
             # Info adicional para sesiones grabadas
             if session['type'] in ['recorded', 'recorded_sqlite']:
@@ -164,75 +193,172 @@ class PlaylistManager:
             playlist.append(item)
         return playlist
     
-    def load_session(self, index: int) -> SessionPlayer:
+    def open_session(self, index: int) -> Optional[Tuple[int, SessionPlayer]]:
         """
         Carga sesión específica del playlist.
         
+        Si la sesión está en el LRU (o precargándose) se reutiliza, sin
+        releer el EDF/storage ni refiltrar. Después precarga la siguiente.
+        
         Args:
             index: Índice de la sesión en playlist
             
         Returns:
-            SessionPlayer configurado para esa sesión
+            (índice, SessionPlayer compartido) — si la sesión pedida falla se
+            salta a la siguiente. No reproducir el player compartido: usar
+            player.fork().
         """
         if index < 0 or index >= len(self.sessions):
             print(f"⚠ Invalid session index: {index}")
             return None
         
         session = self.sessions[index]
-        self.current_index = index
         
         print(f"📼 Loading session {index + 1}/{len(self.sessions)}: {session['name']}")
         
         try:
-            # Crear nuevo player
-            player = SessionPlayer(window_duration=2.0)
-            
-            # Cargar según tipo
-            if session['type'] == 'meditation':
-                # Archivo EDF directo
-                player.load_session(session['path'])
-            elif session['type'] == 'physionet':
-                # Sesiones especiales de PhysioNet
-                if session['path'] == 'physionet_run2':
-                    player.load_default_session()
-                elif session['path'] == 'physionet_runs_6-10-14':
-                    player.load_physionet_extended()
-            elif session['type'] == 'recorded':
-                # Sesiones grabadas desde PostgreSQL + InfluxDB (nuevo)
-                db_id = session.get('db_id')
-                if db_id:
-                    player.load_recorded_session_v2(db_id)
-            elif session['type'] == 'recorded_sqlite':
-                # Sesiones grabadas desde SQLite (legacy)
-                db_id = session.get('db_id')
-                if db_id:
-                    player.load_recorded_session(db_id)
-            
-            self.current_player = player
-            return player
+            player = self._get_player(session)
+            self._prefetch(self._next_index(index))
+            return index, player
             
         except (ValueError, FileNotFoundError, Exception) as e:
             print(f"⚠️  Failed to load session {index + 1}: {e}")
-            print(f"   Skipping to next session...")
+            print("   Skipping to next session...")
             
             # Intentar con siguiente sesión recursivamente
             next_index = index + 1
             if next_index < len(self.sessions):
-                return self.load_session(next_index)
+                return self.open_session(next_index)
             else:
                 # Si no hay más sesiones, loop o retornar None
                 if self.loop_playlist:
                     print("🔄 Attempting to restart from beginning after errors...")
-                    return self.load_session(0)
+                    return self.open_session(0)
                 else:
                     print("⚠️  No valid sessions available in playlist")
                     return None
     
-    def next_session(self) -> Optional[SessionPlayer]:
+    # ==================== SESSION CACHE ====================
+    
+    @staticmethod
+    def _build_player(session: Dict) -> SessionPlayer:
+        """Crea y carga un SessionPlayer para una entrada del playlist."""
+        player = SessionPlayer(window_duration=2.0, autoload=False)
+        
+        # Cargar según tipo
+        if session['type'] in ('meditation', 'custom'):
+            # Archivo EDF directo
+            player.load_session(session['path'])
+        elif session['type'] == 'physionet':
+            # Sesiones especiales de PhysioNet
+            if session['path'] == 'physionet_run2':
+                player.load_default_session()
+            elif session['path'] == 'physionet_runs_6-10-14':
+                player.load_physionet_extended()
+        elif session['type'] == 'recorded':
+            # Sesiones grabadas desde PostgreSQL + InfluxDB (nuevo)
+            db_id = session.get('db_id')
+            if db_id:
+                player.load_recorded_session_v2(db_id)
+        elif session['type'] == 'recorded_sqlite':
+            # Sesiones grabadas desde SQLite (legacy)
+            db_id = session.get('db_id')
+            if db_id:
+                player.load_recorded_session(db_id)
+        
+        if player.raw is None and player._archive is None:
+            raise ValueError(f"Session '{session['name']}' has no data")
+        return player
+    
+    def _get_player(self, session: Dict) -> SessionPlayer:
+        """Player desde el LRU, desde una precarga en curso, o cargado ahora."""
+        key = session['path']
+        with self._lock:
+            player = self._players.get(key)
+            if player is not None:
+                self._players.move_to_end(key)
+                print("  ⚡ Session cache hit")
+                return player
+            future = self._pending.get(key)
+        
+        if future is not None:
+            # Precarga en curso: esperar a que termine (siempre antes que empezar de cero)
+            player = future.result()
+            with self._lock:
+                if key in self._players:
+                    self._players.move_to_end(key)
+            return player
+        
+        player = self._build_player(session)
+        self._store(key, player)
+        return player
+    
+    def _store(self, key: str, player: SessionPlayer):
+        with self._lock:
+            self._players[key] = player
+            self._players.move_to_end(key)
+            self._player_bytes[key] = player.memory_bytes()
+            # Evict LRU (nunca el recién cargado). Las vistas (fork) que un
+            # contexto esté reproduciendo conservan sus datos igualmente
+            while sum(self._player_bytes.values()) > self.cache_max_bytes and len(self._players) > 1:
+                victim = next((k for k in self._players if k != key), None)
+                if victim is None:
+                    break
+                self._evict(victim)
+    
+    def _evict(self, key: str):
+        """Quita un player del LRU (llamar con el lock tomado)."""
+        self._players.pop(key, None)
+        self._player_bytes.pop(key, None)
+    
+    def _next_index(self, index: int) -> Optional[int]:
+        next_index = index + 1
+        if next_index >= len(self.sessions):
+            return 0 if self.loop_playlist else None
+        return next_index
+    
+    def _prefetch(self, index: Optional[int]):
+        """Carga la sesión `index` en un thread de fondo si no está en el LRU."""
+        if not self.prefetch_enabled or index is None or index >= len(self.sessions):
+            return
+        session = self.sessions[index]
+        key = session['path']
+        with self._lock:
+            if key in self._players or key in self._pending:
+                return
+            future = self._executor.submit(self._prefetch_worker, key, session)
+            self._pending[key] = future
+    
+    def _prefetch_worker(self, key: str, session: Dict) -> SessionPlayer:
+        try:
+            player = self._build_player(session)
+            # Sesiones sin métricas: dejar listo el replay array del VAE
+            player.prepare_replay()
+            self._store(key, player)
+            print(f"  ⏭ Prefetched: {session['name']}")
+            return player
+        except Exception as e:
+            print(f"⚠️  Prefetch failed for {session['name']}: {e}")
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+    
+    def cache_stats(self) -> Dict:
+        """Estado del LRU de sesiones (para diagnóstico)."""
+        with self._lock:
+            return {
+                'sessions': list(self._players.keys()),
+                'bytes': sum(self._player_bytes.values()),
+                'max_bytes': self.cache_max_bytes,
+                'prefetching': list(self._pending.keys()),
+            }
+    
+    def next_session(self, index: int) -> Optional[Tuple[int, SessionPlayer]]:
         """
-        Avanza a siguiente sesión en playlist.
+        Avanza a la sesión siguiente a `index` en playlist.
         """
-        next_index = self.current_index + 1
+        next_index = index + 1
         
         # Loop o detener
         if next_index >= len(self.sessions):
@@ -243,13 +369,13 @@ class PlaylistManager:
                 print("⏹ Playlist finished")
                 return None
         
-        return self.load_session(next_index)
+        return self.open_session(next_index)
     
-    def previous_session(self) -> Optional[SessionPlayer]:
+    def previous_session(self, index: int) -> Optional[Tuple[int, SessionPlayer]]:
         """
-        Retrocede a sesión anterior.
+        Retrocede a la sesión anterior a `index`.
         """
-        prev_index = self.current_index - 1
+        prev_index = index - 1
         
         if prev_index < 0:
             if self.loop_playlist:
@@ -258,33 +384,34 @@ class PlaylistManager:
                 print("⏹ Already at first session")
                 return None
         
-        return self.load_session(prev_index)
+        return self.open_session(prev_index)
     
-    def get_current_session_info(self) -> Dict:
+    def get_session_info(self, index: int) -> Dict:
         """
-        Retorna metadata de sesión actual.
+        Retorna metadata de la sesión `index`.
         """
-        if self.current_index < len(self.sessions):
-            session = self.sessions[self.current_index]
+        if 0 <= index < len(self.sessions):
+            session = self.sessions[index]
             return {
                 'name': session['name'],
-                'index': self.current_index + 1,
+                'index': index + 1,
                 'total': len(self.sessions),
                 'category': session['category'],
                 'type': session['type']
             }
         return {}
     
-    def should_auto_advance(self) -> bool:
+    @staticmethod
+    def should_auto_advance(player: Optional[SessionPlayer]) -> bool:
         """
         Determina si debe avanzar automáticamente a siguiente sesión.
         Llamar cuando sesión actual termina.
         """
-        if self.current_player is None:
+        if player is None:
             return False
         
         # Si llegamos al final de la sesión actual
-        if self.current_player.current_position >= self.current_player.total_duration - 1.0:
+        if player.current_position >= player.total_duration - 1.0:
             return True
         
         return False
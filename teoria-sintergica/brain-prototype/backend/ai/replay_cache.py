@@ -0,0 +1,136 @@
+"""
+Replay cache: sesiones sin métricas grabadas pre-convertidas al formato del VAE.
+
+El fallback de next_state() (sesiones antiguas / EDF sin métricas) recortaba
+cada ventana a 64 canales y hacía scipy.signal.resample canal por canal
+(p.ej. 1024 → 160 Hz) en cada frame de 200 ms. Aquí la sesión completa se
+convierte una sola vez a un array float32 (64, n) @ 160 Hz, guardado como
+.npy y abierto con mmap; en reproducción cada frame es un slice.
+
+Clave del cache: tipo de carga (preprocesado del SessionPlayer) + hash del
+contenido de los archivos fuente, o el id de la grabación.
+"""
+
+import os
+import hashlib
+import threading
+from fractions import Fraction
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.signal import resample_poly
+
+
+# Formato de entrada del VAE: 64 canales × 161 timepoints (1 s @ 160 Hz)
+VAE_FS = 160
+VAE_CHANNELS = 64
+VAE_SAMPLES = 161
+
+REPLAY_CACHE_DIR = Path(os.getenv(
+    'REPLAY_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'replay_cache')
+))
+# Subir si cambia el preprocesado (invalida los .npy existentes)
+REPLAY_FORMAT_VERSION = 2
+
+_digest_memo: Dict[Tuple[str, int, int], str] = {}
+_build_lock = threading.Lock()
+
+
+def file_digest(*paths: str) -> str:
+    """SHA-1 del contenido de los archivos (memo por path/tamaño/mtime)."""
+    h = hashlib.sha1()
+    for path in paths:
+        st = os.stat(path)
+        memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        digest = _digest_memo.get(memo_key)
+        if digest is None:
+            fh = hashlib.sha1()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    fh.update(block)
+            digest = _digest_memo[memo_key] = fh.hexdigest()
+        h.update(digest.encode())
+    return h.hexdigest()
+
+
+def source_key(kind: str, files: Sequence[str] = ()) -> str:
+    """Clave de cache: tipo de carga + hash de archivos (si los hay)."""
+    return f"{kind}-{file_digest(*files)[:16]}" if files else kind
+
+
+def replay_path(key: str) -> Path:
+    return REPLAY_CACHE_DIR / f"{key}.v{REPLAY_FORMAT_VERSION}.npy"
+
+
+def build_replay_array(data: np.ndarray, fs: float, path: Path) -> np.ndarray:
+    """
+    (n_channels, n) @ fs → (64, m) float32 @ 160 Hz en `path` (.npy).
+
+    Canales: primeros 64 (zeros si hay menos), como el fallback en vivo.
+    Resample polifásico (anti-aliasing) sobre la sesión entera, canal por
+    canal, escribiendo directo al memmap.
+    """
+    ratio = Fraction(VAE_FS) / Fraction(fs).limit_denominator(1000)
+    up, down = ratio.numerator, ratio.denominator
+    n = data.shape[1]
+    n_out = -(-n * up // down)  # ceil
+    n_ch = min(VAE_CHANNELS, data.shape[0])
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        out = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.float32, shape=(VAE_CHANNELS, n_out))
+        try:
+            for ch in range(n_ch):
+                row = data[ch] if up == down else resample_poly(data[ch], up, down)
+                out[ch] = row[:n_out]
+            out[n_ch:] = 0.0
+            out.flush()
+        finally:
+            del out  # cerrar el memmap antes de mover o borrar el .tmp
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return np.load(path, mmap_mode='r')
+
+
+class ReplayArray:
+    """Sesión @ 160 Hz × 64 canales (memmap) con slicing de ventanas del VAE."""
+
+    def __init__(self, array: np.ndarray, path: Optional[Path] = None):
+        self.array = array
+        self.path = path
+
+    @property
+    def duration(self) -> float:
+        return self.array.shape[1] / VAE_FS
+
+    def window(self, position_seconds: float) -> np.ndarray:
+        """Ventana (64, 161) float32 que empieza en la posición dada."""
+        start = max(int(round(position_seconds * VAE_FS)), 0)
+        window = self.array[:, start:start + VAE_SAMPLES]
+        if window.shape[1] < VAE_SAMPLES:
+            window = np.pad(window, ((0, 0), (0, VAE_SAMPLES - window.shape[1])))
+        return np.ascontiguousarray(window)
+
+
+def get_replay_array(key: str, loader: Callable[[], Tuple[np.ndarray, float]]) -> ReplayArray:
+    """
+    Replay array para `key`: del disco si existe, si no lo construye.
+
+    Args:
+        key: source_key() de la sesión
+        loader: devuelve (data (n_channels, n), fs); sólo se llama si falta
+    """
+    path = replay_path(key)
+    if path.exists():
+        return ReplayArray(np.load(path, mmap_mode='r'), path)
+    with _build_lock:
+        if not path.exists():
+            data, fs = loader()
+            print(f"📼 Building replay array @ {VAE_FS} Hz: {path.name}")
+            build_replay_array(data, fs, path)
+    return ReplayArray(np.load(path, mmap_mode='r'), path)
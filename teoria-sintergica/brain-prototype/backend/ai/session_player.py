@@ -9,6 +9,26 @@ import mne
 import numpy as np
 from typing import Optional, Dict, List
 import os
+import copy
+import threading
+
+from .session_timeline import MetricTimeline, MarkerTimeline
+from .replay_cache import ReplayArray, get_replay_array, source_key
+from .edf_reader import LazyEDFReader
+
+
+# EDF sin preload: lectura por ventanas bajo demanda (ai/edf_reader.py)
+SESSION_LAZY_EDF = os.getenv('SESSION_LAZY_EDF', 'true').lower() in ('1', 'true', 'yes')
+
+
+def _eegbci_name(name: str) -> str:
+    """Nombre de canal como mne.datasets.eegbci.standardize ('Fp1.' → 'Fp1', 'Cz..' → 'Cz')."""
+    name = name.strip('.').upper()
+    if name.endswith('Z'):
+        name = name[:-1] + 'z'
+    if name.startswith('FP'):
+        name = 'Fp' + name[2:]
+    return name
 
 
 class SessionPlayer:
@@ -22,11 +42,13 @@ class SessionPlayer:
     - Mantiene metadata de la sesión (protocolo, timestamps)
     """
     
-    def __init__(self, session_path: str = None, window_duration: float = 2.0):
+    def __init__(self, session_path: str = None, window_duration: float = 2.0, autoload: bool = True):
         """
         Args:
             session_path: Ruta a archivo EDF (si None, usa PhysioNet)
             window_duration: Duración de ventana de análisis en segundos
+            autoload: Si False y no hay session_path, no carga la sesión por
+                defecto (el PlaylistManager carga la sesión pedida después)
         """
         self.window_duration = window_duration
         self.current_position = 0.0  # Posición actual en segundos
@@ -39,13 +61,23 @@ class SessionPlayer:
         
         # Estado de la sesión
         self.raw: Optional[mne.io.Raw] = None
+        self._archive = None  # SessionArchive (sesiones grabadas v2) o LazyEDFReader
+        self._window_filter = True  # filtrar 1-50 Hz las ventanas del archive / EDF lazy
+        self._metric_timeline: Optional[MetricTimeline] = None  # métricas pregrabadas (columnas + searchsorted)
+        self._marker_timeline: Optional[MarkerTimeline] = None  # eventos del protocolo
+        # Sesiones sin métricas: array 64 ch @ 160 Hz para el VAE (ai/replay_cache.py)
+        self._replay_source = None  # (kind, archivos fuente) fijado por cada load_*
+        self._replay: Optional[ReplayArray] = None
+        self._replay_thread: Optional[threading.Thread] = None
         self.session_metadata: Dict = {}
         self.total_duration: float = 0.0
         self.fs: int = 160  # Se actualizará al cargar datos
+        # fork(): player cuyos datos cargados comparte esta vista
+        self._origin: Optional['SessionPlayer'] = None
         
         if session_path:
             self.load_session(session_path)
-        else:
+        elif autoload:
             # Intentar cargar sesión de meditación real
             success = self.load_meditation_session()
             if not success:
@@ -69,22 +101,27 @@ class SessionPlayer:
         
         # Subject 1, Run 2 (Eyes Closed Baseline)
         raw_fnames = eegbci.load_data(subjects=[1], runs=[2], path=data_path, update_path=False)
-        self.raw = mne.io.read_raw_edf(raw_fnames[0], preload=True, verbose=False)
-        
-        # Preprocesamiento estándar
-        eegbci.standardize(self.raw)
-        self.raw.pick_types(eeg=True, exclude='bads')
-        self.raw.filter(1., 50., fir_design='firwin', verbose=False)
+        if SESSION_LAZY_EDF:
+            n_channels = self._load_lazy_edf(raw_fnames[0], filtered=True, standardize=True)
+        else:
+            self.raw = mne.io.read_raw_edf(raw_fnames[0], preload=True, verbose=False)
+            
+            # Preprocesamiento estándar
+            eegbci.standardize(self.raw)
+            self.raw.pick_types(eeg=True, exclude='bads')
+            self.raw.filter(1., 50., fir_design='firwin', verbose=False)
+            self.fs = int(self.raw.info['sfreq'])
+            self.total_duration = self.raw.times[-1]
+            n_channels = self.raw.info['nchan']
+        self._set_replay_source('physionet', [raw_fnames[0]])
         
         # Metadata
-        self.fs = int(self.raw.info['sfreq'])
-        self.total_duration = self.raw.times[-1]
         self.session_metadata = {
             'name': 'PhysioNet Motor Imagery - Run 2 (Eyes Closed)',
             'subject': 'S001',
             'protocol': 'Resting State - Eyes Closed',
             'duration': self.total_duration,
-            'channels': self.raw.info['nchan'],
+            'channels': n_channels,
             'sampling_rate': self.fs
         }
         
@@ -122,17 +159,23 @@ class SessionPlayer:
             return False
         
         print(f"📼 Loading meditation session: {edf_path}")
-        self.raw = mne.io.read_raw_edf(edf_path, preload=True, verbose=False)
+        if SESSION_LAZY_EDF:
+            # Sin filtro, como la carga con MNE
+            n_channels = self._load_lazy_edf(edf_path, filtered=False)
+        else:
+            self.raw = mne.io.read_raw_edf(edf_path, preload=True, verbose=False)
+            self.fs = int(self.raw.info['sfreq'])
+            self.total_duration = self.raw.times[-1]
+            n_channels = self.raw.info['nchan']
+        self._set_replay_source('meditation', [edf_path])
         
         # Metadata
-        self.fs = int(self.raw.info['sfreq'])
-        self.total_duration = self.raw.times[-1]
         self.session_metadata = {
             'name': 'OpenNeuro ds003969 - Subject 001 Meditation',
             'subject': 'S001',
             'protocol': 'Breathing-focused meditation (10 minutes)',
             'duration': self.total_duration,
-            'channels': self.raw.info['nchan'],
+            'channels': n_channels,
             'sampling_rate': self.fs,
             'dataset': 'OpenNeuro ds003969'
         }
@@ -161,6 +204,7 @@ class SessionPlayer:
         # Cargar múltiples runs
         raw_fnames = eegbci.load_data(subjects=[1], runs=[6, 10, 14], path=data_path, update_path=False)
         raw_files = [mne.io.read_raw_edf(f, preload=True, verbose=False) for f in raw_fnames]
+        self._set_replay_source('physionet', list(raw_fnames))
         
         # Concatenar
         self.raw = mne.concatenate_raws(raw_files)
@@ -193,19 +237,24 @@ class SessionPlayer:
             raise FileNotFoundError(f"Session file not found: {edf_path}")
         
         print(f"📼 Loading custom session: {edf_path}")
-        self.raw = mne.io.read_raw_edf(edf_path, preload=True, verbose=False)
-        
-        # Preprocesamiento básico
-        self.raw.pick_types(eeg=True, exclude='bads')
-        self.raw.filter(1., 50., fir_design='firwin', verbose=False)
+        if SESSION_LAZY_EDF:
+            n_channels = self._load_lazy_edf(edf_path, filtered=True)
+        else:
+            self.raw = mne.io.read_raw_edf(edf_path, preload=True, verbose=False)
+            
+            # Preprocesamiento básico
+            self.raw.pick_types(eeg=True, exclude='bads')
+            self.raw.filter(1., 50., fir_design='firwin', verbose=False)
+            self.fs = int(self.raw.info['sfreq'])
+            self.total_duration = self.raw.times[-1]
+            n_channels = self.raw.info['nchan']
+        self._set_replay_source('edf', [edf_path])
         
         # Metadata
-        self.fs = int(self.raw.info['sfreq'])
-        self.total_duration = self.raw.times[-1]
         self.session_metadata = {
             'name': os.path.basename(edf_path),
             'duration': self.total_duration,
-            'channels': self.raw.info['nchan'],
+            'channels': n_channels,
             'sampling_rate': self.fs
         }
         
@@ -232,15 +281,11 @@ class SessionPlayer:
         if session_meta is None:
             raise ValueError(f"Session {session_id} not found in database")
         
-        # Obtener todos los samples EEG (numpy array: timestamp, tp9, af7, af8, tp10, aux)
-        samples = db.get_eeg_samples(session_id)
-        if samples.size == 0:
+        # Obtener todos los samples EEG: timestamps (n,), eeg_data (4, n) - tp9, af7, af8, tp10
+        timestamps, eeg_data = db.get_eeg_array(session_id)
+        if len(timestamps) == 0:
             raise ValueError(f"No EEG samples found for session {session_id}")
         
-        # samples es array de shape (n_samples, 6): [timestamp, tp9, af7, af8, tp10, aux]
-        timestamps = samples[:, 0]
-        eeg_data = samples[:, 1:5].T  # Shape: (4, n_samples) - tp9, af7, af8, tp10
-        
         # Calcular sampling rate real
         if len(timestamps) > 1:
             self.fs = int(1.0 / np.median(np.diff(timestamps)))
@@ -257,6 +302,7 @@ class SessionPlayer:
         ch_types = ['eeg'] * 4
         info = mne.create_info(ch_names=ch_names, sfreq=self.fs, ch_types=ch_types)
         self.raw = mne.io.RawArray(eeg_data, info, verbose=False)
+        self._set_replay_source(f'sqlite-{session_id}-{len(timestamps)}')
         
         # Filtrar ligeramente
         self.raw.filter(1., 50., fir_design='firwin', verbose=False)
@@ -279,6 +325,9 @@ class SessionPlayer:
         # Cargar eventos/marcadores
         events = db.get_events(session_id)
         self._recorded_events = events
+        # Timestamps del SQLite legacy ya son relativos al inicio
+        self._metric_timeline = None
+        self._marker_timeline = MarkerTimeline(events, t0=0.0)
         
         print(f"✓ Recorded session loaded: {self.total_duration:.1f}s")
         print(f"  Samples: {len(timestamps)}")
@@ -289,43 +338,127 @@ class SessionPlayer:
 
     def load_recorded_session_v2(self, recording_id: int):
         """
-        Carga sesión grabada desde PostgreSQL + InfluxDB (nueva arquitectura).
+        Carga sesión grabada desde el storage backend (PostgreSQL + InfluxDB
+        por defecto, o el backend embebido con EEG_STORAGE_BACKEND=embedded).
         
         Las sesiones grabadas tienen datos de 4 canales del Muse 2:
         TP9, AF7, AF8, TP10 @ 256 Hz
         
         Args:
-            recording_id: ID de la grabación en PostgreSQL (eeg_recordings)
+            recording_id: ID de la grabación (eeg_recordings)
         """
-        from database import get_postgres_client_sync, get_influx_client
+        from database import get_storage_backend, get_recording_cache
         
-        print(f"📼 Loading recorded session #{recording_id} from PostgreSQL + InfluxDB...")
+        storage = get_storage_backend()
+        print(f"📼 Loading recorded session #{recording_id} from {storage.name} storage...")
+        storage.connect()
         
-        # Obtener metadata desde PostgreSQL
-        postgres = get_postgres_client_sync()
-        postgres.connect()
-        recording = postgres.get_recording(recording_id)
+        # Obtener metadata
+        recording = storage.get_recording(recording_id)
         
         if recording is None:
-            raise ValueError(f"Recording {recording_id} not found in PostgreSQL")
-        
-        # Obtener samples desde InfluxDB
-        influx = get_influx_client()
-        influx.connect()
-        samples = influx.get_samples(recording_id, limit=500000)  # Max 500k samples
-        
-        if not samples:
-            raise ValueError(f"No EEG samples found for recording {recording_id} in InfluxDB")
-        
-        # Convertir a arrays numpy
-        n_samples = len(samples)
-        timestamps = np.array([s['timestamp'] for s in samples])
-        eeg_data = np.array([
-            [s['tp9'] for s in samples],
-            [s['af7'] for s in samples],
-            [s['af8'] for s in samples],
-            [s['tp10'] for s in samples]
-        ])  # Shape: (4, n_samples)
+            raise ValueError(f"Recording {recording_id} not found ({storage.name})")
+        
+        # Session archive (chunks comprimidos, mmap, seek O(1)) si existe;
+        # si no, samples completos del storage → MNE Raw en memoria
+        archive = storage.get_archive(recording_id)
+        if archive is not None and archive.n_samples > 0:
+            n_samples = self._load_archive(archive)
+        else:
+            n_samples = self._load_storage_samples(storage, recording_id, recording)
+        self._set_replay_source(f'recording-{storage.name}-{recording_id}-{n_samples}')
+        
+        # Metadata
+        self.session_metadata = {
+            'name': recording.name or f'Recording #{recording_id}',
+            'subject': 'User',
+            'protocol': 'Muse 2 Recording',
+            'duration': self.total_duration,
+            'channels': 4,
+            'sampling_rate': self.fs,
+            'device': recording.device or 'Muse 2',
+            'notes': recording.notes or '',
+            'db_id': recording_id,
+            'start_time': recording.started_at.isoformat() if recording.started_at else '',
+            'avg_alpha': recording.avg_alpha,
+            'avg_coherence': recording.avg_coherence
+        }
+        
+        # Métricas pre-calculadas → columnas NumPy sobre un eje de tiempo
+        # ordenado (relativo a la primera métrica); lookup por searchsorted
+        self._metric_timeline = None
+        self._marker_timeline = None
+        try:
+            raw_metrics, _ = get_recording_cache().read(storage, recording_id, 'metrics')
+            if raw_metrics:
+                self._metric_timeline = MetricTimeline(raw_metrics)
+                print(f"  Metrics loaded with relative times: {len(self._metric_timeline)}")
+        except Exception as e:
+            print(f"  Warning: Could not load metrics: {e}")
+        
+        # Eventos del protocolo (mismo origen temporal que las métricas)
+        try:
+            events, _ = get_recording_cache().read(storage, recording_id, 'events')
+            t0 = self._metric_timeline.t0 if self._metric_timeline is not None else (
+                recording.started_at.timestamp() if recording.started_at else 0.0
+            )
+            self._marker_timeline = MarkerTimeline(events or [], t0=t0)
+        except Exception as e:
+            print(f"  Warning: Could not load events: {e}")
+        
+        print(f"✓ Recorded session v2 loaded: {self.total_duration:.1f}s")
+        print(f"  Samples: {n_samples}")
+        print(f"  Metrics: {len(self._metric_timeline) if self._metric_timeline is not None else 0}")
+        print(f"  Sampling Rate: {self.fs} Hz")
+        
+        return True
+
+    def _load_lazy_edf(self, edf_path: str, filtered: bool, standardize: bool = False) -> int:
+        """
+        EDF/BDF como fuente de ventanas sin preload (LazyEDFReader).
+
+        Mismo preprocesado que el camino MNE: el lector ya deja sólo las
+        señales EEG (sin anotaciones / status), `standardize` renombra los
+        canales como eegbci.standardize y `filtered` aplica por ventana el
+        FIR de raw.filter(1., 50., fir_design='firwin').
+        """
+        reader = LazyEDFReader(edf_path)
+        if standardize:
+            reader.ch_names = [_eegbci_name(name) for name in reader.ch_names]
+        self.raw = None
+        self._archive = reader
+        self._archive_pad = None
+        self._window_filter = filtered
+        self.fs = int(round(reader.fs))
+        self.total_duration = reader.duration
+        print(f"  Source: lazy EDF reader ({reader.n_channels} ch, {reader.n_records} records)")
+        return reader.n_channels
+    
+    def _load_archive(self, archive) -> int:
+        """Usa un SessionArchive como fuente de ventanas (sin cargar la sesión completa)."""
+        self.raw = None
+        self._archive = archive
+        self._archive_pad = None
+        self._window_filter = True
+        self.fs = int(round(archive.fs))
+        self.total_duration = archive.duration
+        print(f"  Source: session archive ({archive.n_chunks} chunks, {archive.path})")
+        return archive.n_samples
+    
+    def _load_storage_samples(self, storage, recording_id: int, recording) -> int:
+        """Carga todos los samples del storage en un MNE Raw filtrado."""
+        from database import get_recording_cache
+        
+        self._archive = None
+        
+        # Obtener samples como arrays: timestamps (n,), eeg_data (4, n)
+        (timestamps, eeg_data), _ = get_recording_cache().read(
+            storage, recording_id, 'sample_array', limit=500000  # Max 500k samples
+        )
+        n_samples = len(timestamps)
+        
+        if not n_samples:
+            raise ValueError(f"No EEG samples found for recording {recording_id} ({storage.name})")
         
         # Normalizar timestamps (relativos al inicio)
         if len(timestamps) > 0:
@@ -354,55 +487,93 @@ class SessionPlayer:
         # Filtrar ligeramente
         self.raw.filter(1., 50., fir_design='firwin', verbose=False)
         
-        # Metadata
+        # Duración
         self.total_duration = timestamps[-1] if len(timestamps) > 0 else recording.duration_seconds
-        self.session_metadata = {
-            'name': recording.name or f'Recording #{recording_id}',
-            'subject': 'User',
-            'protocol': 'Muse 2 Recording',
-            'duration': self.total_duration,
-            'channels': 4,
-            'sampling_rate': self.fs,
-            'device': recording.device or 'Muse 2',
-            'notes': recording.notes or '',
-            'db_id': recording_id,
-            'start_time': recording.started_at.isoformat() if recording.started_at else '',
-            'avg_alpha': recording.avg_alpha,
-            'avg_coherence': recording.avg_coherence
-        }
-        
-        # Cargar métricas pre-calculadas y calcular tiempos relativos
+        return n_samples
+    
+    def fork(self) -> 'SessionPlayer':
+        """
+        Vista de esta sesión con reproducción propia (posición, play/pause,
+        velocidad), al inicio y pausada. Comparte sin copiar los datos
+        cargados (raw / archive, métricas, marcadores, replay array): cada
+        contexto del cerebro (ai/brain_context.py) reproduce su propia vista.
+        """
+        view = copy.copy(self)
+        view._origin = self._origin or self
+        view.current_position = 0.0
+        view.is_playing = False
+        view.playback_speed = 1.0
+        view._last_advance_time = None
+        view._last_returned_position = -1.0
+        return view
+    
+    # ==================== REPLAY ARRAY (VAE) ====================
+    
+    def _set_replay_source(self, kind: str, files: Optional[List[str]] = None):
+        """Identifica la sesión cargada para el replay cache (hash diferido)."""
+        if files:
+            # El mismo EDF leído por MNE o por el lector lazy no comparte array
+            kind = f"{kind}-{'mne' if self.raw is not None else 'lazy'}"
+        self._replay_source = (kind, list(files or []))
+        self._replay = None
+        self._replay_thread = None
+        self._origin = None  # cargar otra sesión en una vista la independiza
+    
+    def _replay_data(self):
+        """Sesión completa filtrada: (data (n_channels, n), fs)."""
+        if self.raw is not None:
+            return self.raw.get_data(), self.fs
+        return self._archive_window(0, self._archive.n_samples), self.fs
+    
+    def prepare_replay(self) -> bool:
+        """
+        Carga (o construye una vez) el replay array de una sesión sin
+        métricas grabadas. Bloqueante: llamar desde un thread de fondo.
+        """
+        if self._origin is not None:
+            return self._origin.prepare_replay()
+        if self._replay is not None:
+            return True
+        if self._replay_source is None or self._metric_timeline is not None:
+            return False
+        kind, files = self._replay_source
         try:
-            raw_metrics = influx.get_metrics(recording_id)
-            
-            # Calcular tiempo relativo para cada métrica
-            if raw_metrics:
-                # Ordenar por timestamp
-                raw_metrics.sort(key=lambda x: x['timestamp'])
-                
-                # El primer timestamp es el inicio
-                start_timestamp = raw_metrics[0]['timestamp']
-                
-                # Añadir relative_time a cada métrica
-                for i, metric in enumerate(raw_metrics):
-                    metric['relative_time'] = metric['timestamp'] - start_timestamp
-                    metric['index'] = i
-                
-                self._recorded_metrics = raw_metrics
-                print(f"  Metrics loaded with relative times: {len(raw_metrics)}")
-            else:
-                self._recorded_metrics = []
+            replay = get_replay_array(source_key(kind, files), self._replay_data)
         except Exception as e:
-            print(f"  Warning: Could not load metrics: {e}")
-            self._recorded_metrics = []
-        
-        print(f"✓ Recorded session v2 loaded: {self.total_duration:.1f}s")
-        print(f"  Samples: {n_samples}")
-        print(f"  Metrics: {len(self._recorded_metrics) if hasattr(self, '_recorded_metrics') else 0}")
-        print(f"  Sampling Rate: {self.fs} Hz")
-        
+            print(f"⚠️  Could not prepare replay array: {e}")
+            self._replay_source = None  # no reintentar; queda el resample en vivo
+            return False
+        self._replay = replay
         return True
-
+    
+    def replay_window(self, position_seconds: float) -> Optional[np.ndarray]:
+        """
+        Ventana (64, 161) float32 @ 160 Hz lista para el VAE.
+        
+        Si el replay array aún no está listo lo prepara en background y
+        devuelve None (el caller usa el resample en vivo mientras tanto).
+        """
+        if self._origin is not None:
+            # Un replay array por sesión cargada, compartido por sus vistas
+            return self._origin.replay_window(position_seconds)
+        if self._replay is not None:
+            return self._replay.window(position_seconds)
+        if self._replay_source is not None and self._metric_timeline is None and self._replay_thread is None:
+            self._replay_thread = threading.Thread(target=self.prepare_replay, daemon=True, name='replay-prepare')
+            self._replay_thread.start()
+        return None
+    
+    def memory_bytes(self) -> int:
+        """Memoria aproximada de la sesión cargada (para el LRU del playlist)."""
+        total = 0
+        if self.raw is not None:
+            total += len(self.raw.ch_names) * self.raw.n_times * 8  # float64
+        if self._metric_timeline is not None:
+            total += self._metric_timeline.times.nbytes * 2
+            total += sum(col.nbytes for col in self._metric_timeline.columns.values())
+        # El archive está mapeado (mmap): sólo cuenta el chunk decodificado
+        return total
+    
     def get_window_at(self, position_seconds: float) -> Optional[np.ndarray]:
         """
         Extrae ventana de EEG en posición temporal específica.
@@ -413,7 +584,7 @@ class SessionPlayer:
         Returns:
             Array (n_channels, n_timepoints) o None si fuera de rango
         """
-        if self.raw is None:
+        if self.raw is None and self._archive is None:
             return None
         
         # Validar rango
@@ -424,50 +595,55 @@ class SessionPlayer:
         start_sample = int(position_seconds * self.fs)
         end_sample = int((position_seconds + self.window_duration) * self.fs)
         
+        if self.raw is None:
+            return self._archive_window(start_sample, end_sample)
+        
         # Extraer datos
         data, _ = self.raw[:, start_sample:end_sample]
         
         return data
     
+    def _archive_window(self, start_sample: int, end_sample: int) -> np.ndarray:
+        """
+        Ventana desde el archive / EDF lazy, filtrada 1-50 Hz como el Raw de MNE.
+        
+        Mismo FIR que raw.filter(1., 50., fir_design='firwin') (3.3 s / 1 Hz
+        de transición → ~3.3 s de kernel) leyendo un kernel entero de margen
+        a cada lado: dentro de la ventana el resultado es el del Raw filtrado
+        completo, y en los bordes de la grabación filter_data aplica el mismo
+        padding que MNE.
+        """
+        if not self._window_filter:
+            _, data = self._archive.read(start_sample, end_sample)
+            return data.astype(np.float64)
+        
+        if getattr(self, '_archive_pad', None) is None:
+            kernel = mne.filter.create_filter(None, self.fs, 1., 50., fir_design='firwin', verbose=False)
+            self._archive_pad = len(kernel)
+        pad = self._archive_pad
+        i0 = max(start_sample - pad, 0)
+        _, data = self._archive.read(i0, end_sample + pad)
+        
+        filtered = mne.filter.filter_data(data.astype(np.float64), self.fs, 1., 50.,
+                                          fir_design='firwin', verbose=False)
+        a = start_sample - i0
+        return filtered[:, a:a + (end_sample - start_sample)]
+    
     def _get_metrics_at_position(self, position_seconds: float) -> Optional[Dict]:
         """
         Busca las métricas pregrabadas más cercanas a la posición actual.
         
+        Búsqueda binaria sobre el eje de tiempo (O(log n) por frame).
+        
         Args:
             position_seconds: Posición en segundos desde el inicio
             
         Returns:
-            Dict con métricas o None si no hay métricas disponibles
+            Dict con métricas o None si no hay métricas a menos de 1s
         """
-        if not hasattr(self, '_recorded_metrics') or not self._recorded_metrics:
-            return None
-        
-        # Buscar la métrica más cercana a la posición actual
-        # Las métricas se guardan cada ~0.2s
-        best_metric = None
-        min_diff = float('inf')
-        
-        for metric in self._recorded_metrics:
-            # Usar relative_time que calculamos al cargar
-            metric_time = metric.get('relative_time')
-            
-            # Si no tiene relative_time (sesiones antiguas), usar index
-            if metric_time is None:
-                if 'index' in metric:
-                    metric_time = metric['index'] * 0.2  # Aprox 0.2s por métrica
-                else:
-                    continue
-            
-            diff = abs(metric_time - position_seconds)
-            if diff < min_diff:
-                min_diff = diff
-                best_metric = metric
-        
-        # Si la diferencia es mayor a 1 segundo, no usar
-        if min_diff > 1.0:
+        if self._metric_timeline is None:
             return None
-            
-        return best_metric
+        return self._metric_timeline.at(position_seconds)
 
     def next_window(self) -> Optional[Dict]:
         """
@@ -481,7 +657,7 @@ class SessionPlayer:
         """
         import time
         
-        if self.raw is None:
+        if self.raw is None and self._archive is None:
             return None
         
         current_time = time.time()
@@ -612,31 +788,41 @@ class SessionPlayer:
             'total_duration': self.total_duration,
             'progress_percent': progress,
             'playback_speed': self.playback_speed,
-            'session_metadata': self.session_metadata
+            'session_metadata': self.session_metadata,
+            'current_marker': self._marker_timeline.last_before(self.current_position) if self._marker_timeline is not None else None
         }
     
-    def get_timeline_markers(self) -> List[Dict]:
+    def get_timeline_markers(self, start: Optional[float] = None, end: Optional[float] = None) -> List[Dict]:
         """
-        [FUTURO] Retorna marcadores de eventos en la sesión.
+        Retorna marcadores de la sesión en [start, end] (toda la sesión por defecto).
         
-        Útil para protocolos estructurados:
+        Incluye los eventos grabados del protocolo, p.ej.:
         - "0:00 - Baseline Start"
         - "5:00 - Meditation Start"
         - "25:00 - Meditation End"
         """
-        # Por ahora, solo marcadores básicos
-        markers = [
-            {'time': 0.0, 'label': 'Session Start', 'type': 'start'},
-            {'time': self.total_duration, 'label': 'Session End', 'type': 'end'}
-        ]
+        start = 0.0 if start is None else max(0.0, start)
+        end = self.total_duration if end is None else min(end, self.total_duration)
+        
+        markers = []
+        if start <= 0.0:
+            markers.append({'time': 0.0, 'label': 'Session Start', 'type': 'start'})
         
         # Si la sesión es > 10min, agregar marcadores cada minuto
         if self.total_duration > 600:
-            for minute in range(1, int(self.total_duration // 60)):
+            for minute in range(max(1, int(np.ceil(start / 60))), int(self.total_duration // 60)):
+                if minute * 60.0 > end:
+                    break
                 markers.append({
                     'time': minute * 60.0,
                     'label': f'{minute}min',
                     'type': 'marker'
                 })
         
+        if self._marker_timeline is not None:
+            markers.extend(self._marker_timeline.between(start, np.nextafter(end, np.inf)))
+        
+        if end >= self.total_duration:
+            markers.append({'time': self.total_duration, 'label': 'Session End', 'type': 'end'})
+        
         return sorted(markers, key=lambda x: x['time'])
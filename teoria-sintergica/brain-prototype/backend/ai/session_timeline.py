@@ -0,0 +1,124 @@
+"""
+Session timeline: índices temporales ordenados para reproducir sesiones.
+
+Las métricas pregrabadas (5 Hz) se guardan como columnas NumPy sobre un
+eje de tiempo ordenado; buscar la métrica más cercana a la posición del
+player es un np.searchsorted (O(log n)) en lugar de recorrer la lista de
+dicts en cada frame. Los marcadores del protocolo usan el mismo esquema.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+# Métricas a más de esto de la posición pedida se consideran ausentes
+MAX_METRIC_GAP = 1.0
+
+
+def _nearest(times: np.ndarray, t: float) -> int:
+    """Index of the value of sorted `times` closest to t (-1 if empty)."""
+    n = len(times)
+    if n == 0:
+        return -1
+    i = int(np.searchsorted(times, t))
+    if i == 0:
+        return 0
+    if i == n:
+        return n - 1
+    return i if times[i] - t < t - times[i - 1] else i - 1
+
+
+class MetricTimeline:
+    """
+    Métricas de una sesión como columnas sobre un eje de tiempo relativo.
+
+    Tiempos relativos a la primera métrica (como `relative_time` antes).
+    """
+
+    def __init__(self, metrics: List[Dict]):
+        timestamps = np.array([m['timestamp'] for m in metrics], dtype=np.float64)
+        order = np.argsort(timestamps, kind='stable')
+        self.timestamps = timestamps[order]
+        self.t0 = float(self.timestamps[0]) if len(self.timestamps) else 0.0
+        self.times = self.timestamps - self.t0
+
+        keys = []
+        for m in metrics[:1]:
+            keys = [k for k in m if k not in ('timestamp', 'relative_time', 'index')]
+        self.columns: Dict[str, np.ndarray] = {}
+        for key in keys:
+            values = [metrics[i].get(key) for i in order]
+            sample = next((v for v in values if v is not None), None)
+            if isinstance(sample, bool) and None not in values:
+                self.columns[key] = np.array(values, dtype=bool)
+            elif isinstance(sample, (int, float)):
+                self.columns[key] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+            else:
+                self.columns[key] = np.array(values, dtype=object)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def duration(self) -> float:
+        return float(self.times[-1]) if len(self.times) else 0.0
+
+    def index_at(self, position_seconds: float, max_gap: float = MAX_METRIC_GAP) -> int:
+        """Nearest metric index, or -1 if none within max_gap seconds."""
+        i = _nearest(self.times, position_seconds)
+        if i < 0 or abs(self.times[i] - position_seconds) > max_gap:
+            return -1
+        return i
+
+    def row(self, i: int) -> Dict:
+        """Metric i as the dict the player used to return."""
+        row = {'timestamp': float(self.timestamps[i])}
+        for key, column in self.columns.items():
+            value = column[i]
+            if isinstance(value, np.generic):
+                value = value.item()
+                if value != value:  # NaN ← None al construir la columna
+                    value = None
+            row[key] = value
+        row['relative_time'] = float(self.times[i])
+        row['index'] = i
+        return row
+
+    def at(self, position_seconds: float, max_gap: float = MAX_METRIC_GAP) -> Optional[Dict]:
+        """Metric closest to the position (None if farther than max_gap)."""
+        i = self.index_at(position_seconds, max_gap)
+        return self.row(i) if i >= 0 else None
+
+    def window(self, start_seconds: float, end_seconds: float) -> slice:
+        """Slice of metrics in [start, end) — usable on times / columns."""
+        a, b = np.searchsorted(self.times, [start_seconds, end_seconds])
+        return slice(int(a), int(b))
+
+
+class MarkerTimeline:
+    """Marcadores (eventos del protocolo) ordenados por tiempo relativo."""
+
+    def __init__(self, events: List[Dict], t0: float):
+        events = sorted(events, key=lambda e: e.get('timestamp', 0))
+        self.times = np.array([e.get('timestamp', 0) - t0 for e in events], dtype=np.float64)
+        self.labels = [e.get('label') or e.get('event_type', '') for e in events]
+        self.types = [e.get('event_type') or 'event' for e in events]
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def between(self, start_seconds: float, end_seconds: float) -> List[Dict]:
+        """Markers in [start, end)."""
+        a, b = np.searchsorted(self.times, [start_seconds, end_seconds])
+        return [
+            {'time': float(self.times[i]), 'label': self.labels[i], 'type': self.types[i]}
+            for i in range(int(a), int(b))
+        ]
+
+    def last_before(self, position_seconds: float) -> Optional[Dict]:
+        """Most recent marker at or before the position (fase actual del protocolo)."""
+        i = int(np.searchsorted(self.times, position_seconds, side='right')) - 1
+        if i < 0:
+            return None
+        return {'time': float(self.times[i]), 'label': self.labels[i], 'type': self.types[i]}
@@ -0,0 +1,387 @@
+"""
+Similarity index: "¿cuándo más llegué a un estado así?" sobre todas las
+ventanas de todas las sesiones grabadas.
+
+Indexa los vectores de 24 features por ventana del feature store
+(ai/feature_store.py), estandarizados (z-score con media / std globales
+guardadas en el índice), y responde k vecinos más cercanos por distancia
+euclídea con búsqueda exacta vectorizada:
+
+    ||x - q||² = ||x||² - 2·x·q + ||q||²     (||x||² precalculado)
+
+Un GEMV float32 por segmento + argpartition, limitado por ancho de banda
+de memoria: ~30 ms por millón de ventanas (≈55 h de grabación) en un core,
+~100 MB de RAM por millón, sin dependencias nuevas.
+
+En disco (SIMILARITY_INDEX_DIR), append-only:
+
+    vectors.f32   (n, 24) float32 estandarizados
+    owners.i32    (n,) recording_id
+    times.f32     (n,) fin de ventana, s desde el inicio de la sesión
+    meta.json     versión, dim, n, mean/std, sesiones indexadas
+
+Al cerrar una grabación su feature store se construye y se añade como un
+segmento nuevo (add_session), sin reescribir lo anterior. Las estadísticas
+de estandarización quedan fijas hasta un rebuild():
+
+    python scripts/build_feature_store.py --missing --index
+"""
+
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ai.feature_store import (
+    FEATURE_DIM, FEATURE_NAMES, FEATURE_STORE_VERSION, open_session_features, list_feature_sessions,
+)
+
+
+SIMILARITY_INDEX_DIR = Path(os.getenv(
+    'SIMILARITY_INDEX_DIR', str(Path(__file__).parent.parent / 'data' / 'similarity_index')
+))
+# Ventanas de la misma sesión a menos de esto de la consulta no cuentan
+SIMILARITY_EXCLUDE_SECONDS = float(os.getenv('SIMILARITY_EXCLUDE_SECONDS', '10'))
+# Dos resultados de la misma sesión deben estar al menos así de separados (un "momento")
+SIMILARITY_MIN_GAP_SECONDS = float(os.getenv('SIMILARITY_MIN_GAP_SECONDS', '5'))
+# Segmentos en memoria antes de compactarlos en uno
+SIMILARITY_MAX_SEGMENTS = int(os.getenv('SIMILARITY_MAX_SEGMENTS', '32'))
+
+INDEX_VERSION = 1
+
+
+class _Segment:
+    """Bloque contiguo de filas del índice (una o más sesiones)."""
+
+    __slots__ = ('vectors', 'sqnorms', 'owners', 'times')
+
+    def __init__(self, vectors: np.ndarray, owners: np.ndarray, times: np.ndarray):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.sqnorms = np.einsum('ij,ij->i', self.vectors, self.vectors)
+        self.owners = np.asarray(owners, dtype=np.int32)
+        self.times = np.asarray(times, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.owners)
+
+
+class SimilarityIndex:
+    """Índice k-NN exacto sobre las ventanas de todas las sesiones."""
+
+    def __init__(self, path: Path = SIMILARITY_INDEX_DIR):
+        self.path = path
+        self._lock = threading.Lock()
+        self._segments: List[_Segment] = []
+        self._sessions: Dict[int, int] = {}          # recording_id → n_windows
+        self.mean = np.zeros(FEATURE_DIM, dtype=np.float32)
+        self.std = np.ones(FEATURE_DIM, dtype=np.float32)
+        self.built_at: Optional[float] = None
+
+    # ==================== STATE ====================
+
+    @property
+    def n_windows(self) -> int:
+        return sum(len(s) for s in self._segments)
+
+    @property
+    def session_ids(self) -> List[int]:
+        return sorted(self._sessions)
+
+    def stats(self) -> Dict:
+        return {
+            'version': INDEX_VERSION,
+            'n_windows': self.n_windows,
+            'n_sessions': len(self._sessions),
+            'segments': len(self._segments),
+            'dim': FEATURE_DIM,
+            'memory_mb': round(sum(s.vectors.nbytes + s.owners.nbytes + s.times.nbytes + s.sqnorms.nbytes
+                                   for s in self._segments) / 1e6, 1),
+            'built_at': self.built_at,
+        }
+
+    def standardize(self, x: np.ndarray) -> np.ndarray:
+        return ((np.asarray(x, dtype=np.float32) - self.mean) / self.std).astype(np.float32, copy=False)
+
+    # ==================== PERSISTENCE ====================
+
+    def _meta(self) -> Dict:
+        return {
+            'version': INDEX_VERSION,
+            'feature_store_version': FEATURE_STORE_VERSION,
+            'dim': FEATURE_DIM,
+            'feature_names': FEATURE_NAMES,
+            'n': self.n_windows,
+            'mean': self.mean.tolist(),
+            'std': self.std.tolist(),
+            'sessions': {str(k): v for k, v in self._sessions.items()},
+            'built_at': self.built_at,
+        }
+
+    def _write_meta(self):
+        tmp = self.path / 'meta.json.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self._meta(), f)
+        os.replace(tmp, self.path / 'meta.json')
+
+    def load(self) -> bool:
+        """Carga el índice de disco; False si no existe o es de otra versión."""
+        meta_path = self.path / 'meta.json'
+        if not meta_path.exists():
+            return False
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('version') != INDEX_VERSION or meta.get('feature_store_version') != FEATURE_STORE_VERSION:
+            return False
+        n = meta['n']
+        # meta.json se escribe después de los datos: filas de más = append interrumpido
+        vectors = np.fromfile(self.path / 'vectors.f32', dtype=np.float32, count=n * FEATURE_DIM)
+        owners = np.fromfile(self.path / 'owners.i32', dtype=np.int32, count=n)
+        times = np.fromfile(self.path / 'times.f32', dtype=np.float32, count=n)
+        if len(owners) != n or len(times) != n or len(vectors) != n * FEATURE_DIM:
+            print(f"⚠️ [similarity] Truncated index at {self.path}, rebuild needed")
+            return False
+        with self._lock:
+            self.mean = np.asarray(meta['mean'], dtype=np.float32)
+            self.std = np.asarray(meta['std'], dtype=np.float32)
+            self._sessions = {int(k): v for k, v in meta['sessions'].items()}
+            self._segments = [_Segment(vectors.reshape(n, FEATURE_DIM), owners, times)] if n else []
+            self.built_at = meta.get('built_at')
+        return True
+
+    def _truncate_to_meta(self):
+        """Descarta bytes de un append que no llegó a meta.json."""
+        n = self.n_windows
+        for name, width in (('vectors.f32', 4 * FEATURE_DIM), ('owners.i32', 4), ('times.f32', 4)):
+            path = self.path / name
+            if path.exists() and path.stat().st_size != n * width:
+                with open(path, 'r+b') as f:
+                    f.truncate(n * width)
+
+    # ==================== BUILD ====================
+
+    def rebuild(self, recording_ids: Optional[List[int]] = None) -> Dict:
+        """
+        Reconstruye el índice desde el feature store (todas las sesiones
+        por defecto) y recalcula la estandarización.
+        """
+        t0 = time.perf_counter()
+        ids = list_feature_sessions() if recording_ids is None else recording_ids
+        blocks = []
+        for rid in ids:
+            features = open_session_features(rid)
+            if features is not None and len(features):
+                blocks.append((rid, np.asarray(features.features, dtype=np.float32), features.times))
+
+        if blocks:
+            stacked = np.concatenate([b[1] for b in blocks])
+            mean = stacked.mean(axis=0)
+            std = stacked.std(axis=0)
+            std[std < 1e-6] = 1.0
+        else:
+            mean = np.zeros(FEATURE_DIM, dtype=np.float32)
+            std = np.ones(FEATURE_DIM, dtype=np.float32)
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self.mean = mean.astype(np.float32)
+            self.std = std.astype(np.float32)
+            segment = None
+            if blocks:
+                segment = _Segment(
+                    self.standardize(stacked),
+                    np.concatenate([np.full(len(b[1]), b[0], dtype=np.int32) for b in blocks]),
+                    np.concatenate([b[2] for b in blocks]),
+                )
+            self._segments = [segment] if segment is not None else []
+            self._sessions = {rid: len(x) for rid, x, _ in blocks}
+            self.built_at = time.time()
+            self._write_all()
+        return {**self.stats(), 'seconds': round(time.perf_counter() - t0, 2)}
+
+    def _write_all(self):
+        """Reescribe los ficheros de datos (rebuild / remove / compactación)."""
+        for name, attr in (('vectors.f32', 'vectors'), ('owners.i32', 'owners'), ('times.f32', 'times')):
+            tmp = self.path / f"{name}.tmp"
+            with open(tmp, 'wb') as f:
+                for segment in self._segments:
+                    getattr(segment, attr).tofile(f)
+            os.replace(tmp, self.path / name)
+        self._write_meta()
+
+    def add_session(self, recording_id: int) -> int:
+        """
+        Añade (o reemplaza) las ventanas de una grabación desde su feature
+        store. Devuelve cuántas ventanas se indexaron.
+        """
+        features = open_session_features(recording_id)
+        if features is None:
+            raise LookupError(f"No feature store for session {recording_id}")
+        if recording_id in self._sessions:
+            self.remove_session(recording_id)
+        if not self._segments and not self._sessions:
+            # Primer contenido: las estadísticas salen de esta sesión
+            return self.rebuild([recording_id])['n_windows']
+
+        with self._lock:
+            segment = _Segment(
+                self.standardize(features.features),
+                np.full(len(features), recording_id, dtype=np.int32),
+                features.times,
+            )
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._truncate_to_meta()
+            for name, values in (('vectors.f32', segment.vectors), ('owners.i32', segment.owners),
+                                 ('times.f32', segment.times)):
+                with open(self.path / name, 'ab') as f:
+                    values.tofile(f)
+            self._segments.append(segment)
+            self._sessions[recording_id] = len(segment)
+            self._write_meta()
+            if len(self._segments) > SIMILARITY_MAX_SEGMENTS:
+                self._compact()
+        return len(segment)
+
+    def remove_session(self, recording_id: int) -> bool:
+        with self._lock:
+            if recording_id not in self._sessions:
+                return False
+            segments = []
+            for s in self._segments:
+                keep = s.owners != recording_id
+                if keep.all():
+                    segments.append(s)
+                elif keep.any():
+                    segments.append(_Segment(s.vectors[keep], s.owners[keep], s.times[keep]))
+            self._segments = segments
+            del self._sessions[recording_id]
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._write_all()
+        return True
+
+    def _compact(self):
+        """Une los segmentos en uno (bajo _lock)."""
+        self._segments = [_Segment(
+            np.concatenate([s.vectors for s in self._segments]),
+            np.concatenate([s.owners for s in self._segments]),
+            np.concatenate([s.times for s in self._segments]),
+        )]
+
+    # ==================== SEARCH ====================
+
+    def query_vector(self, recording_id: int, timestamp: Optional[float] = None,
+                     phase: Optional[str] = None) -> Tuple[np.ndarray, Optional[float]]:
+        """
+        Vector de consulta desde el feature store: la ventana más cercana a
+        `timestamp` (s desde el inicio), la media de una fase, o la media de
+        la sesión. → (features crudas (24,), timestamp de la ventana o None)
+        """
+        features = open_session_features(recording_id)
+        if features is None or not len(features):
+            raise LookupError(f"No feature store for session {recording_id}")
+        if timestamp is not None:
+            i = int(np.clip(np.searchsorted(features.times, timestamp), 0, len(features) - 1))
+            if i > 0 and abs(features.times[i - 1] - timestamp) < abs(features.times[i] - timestamp):
+                i -= 1
+            return np.asarray(features.features[i], dtype=np.float32), float(features.times[i])
+        rows = features.phase(phase) if phase else features.features
+        if not len(rows):
+            raise LookupError(f"Session {recording_id} has no windows in phase '{phase}'")
+        return np.asarray(rows, dtype=np.float64).mean(axis=0).astype(np.float32), None
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        exclude_session: Optional[int] = None,
+        exclude_around: Optional[float] = None,
+        exclude_seconds: float = SIMILARITY_EXCLUDE_SECONDS,
+        min_gap_seconds: float = SIMILARITY_MIN_GAP_SECONDS,
+        same_session: bool = True,
+    ) -> List[Dict]:
+        """
+        k momentos más parecidos a `query` (24 features crudas).
+
+        Args:
+            exclude_session / exclude_around: excluye las ventanas de esa
+                sesión a menos de `exclude_seconds` de `exclude_around`
+                (o toda la sesión si same_session=False)
+            min_gap_seconds: separación mínima entre dos resultados de la
+                misma sesión (ventanas solapadas = el mismo momento)
+
+        Returns:
+            [{session_id, timestamp, distance}] ordenados por distancia
+        """
+        q = self.standardize(query)
+        q_sq = float(q @ q)
+        with self._lock:
+            segments = list(self._segments)
+            # Las exclusiones se filtran después del argpartition: margen = ventanas de esa sesión
+            margin = self._sessions.get(exclude_session, 0) if exclude_session is not None else 0
+
+        # Candidatos de sobra para el filtro de separación
+        n_candidates = max(k * 32, 256) + margin
+        cand_d, cand_owner, cand_time = [], [], []
+        for s in segments:
+            d = s.sqnorms - 2.0 * (s.vectors @ q)
+            m = min(n_candidates, len(d))
+            idx = np.argpartition(d, m - 1)[:m] if m < len(d) else np.arange(len(d))
+            if exclude_session is not None:
+                excluded = s.owners[idx] == exclude_session
+                if same_session and exclude_around is not None:
+                    excluded &= np.abs(s.times[idx] - exclude_around) < exclude_seconds
+                idx = idx[~excluded]
+            cand_d.append(d[idx])
+            cand_owner.append(s.owners[idx])
+            cand_time.append(s.times[idx])
+        if not cand_d:
+            return []
+
+        d = np.concatenate(cand_d)
+        owners = np.concatenate(cand_owner)
+        times = np.concatenate(cand_time)
+        results: List[Dict] = []
+        picked: Dict[int, List[float]] = {}
+        for i in np.argsort(d, kind='stable'):
+            rid, t = int(owners[i]), float(times[i])
+            if any(abs(t - p) < min_gap_seconds for p in picked.get(rid, ())):
+                continue
+            picked.setdefault(rid, []).append(t)
+            results.append({
+                'session_id': rid,
+                'timestamp': round(t, 3),
+                'distance': round(float(np.sqrt(max(d[i] + q_sq, 0.0))), 4),
+            })
+            if len(results) == k:
+                break
+        return results
+
+
+# ==================== SINGLETON ====================
+
+_index: Optional[SimilarityIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index() -> SimilarityIndex:
+    """Índice cargado de disco (o construido desde el feature store la primera vez)."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            index = SimilarityIndex()
+            if not index.load():
+                index.rebuild()
+            _index = index
+        return _index
+
+
+def index_session(recording_id: int):
+    """Callback de cierre de grabación (tras construir su feature store)."""
+    try:
+        n = get_similarity_index().add_session(recording_id)
+        print(f"✓ [similarity] #{recording_id}: {n} windows indexed")
+    except Exception as e:
+        print(f"⚠️ [similarity] Session #{recording_id} not indexed: {e}")
@@ -1,59 +1,363 @@
+"""
+Entrenamiento del SyntergicVAE sobre PhysioNet EEGBCI, pensado para CPU.
+
+Datos:
+- Un cache de épocas por sujeto (dataset.py, .npy abierto con mmap): añadir
+  sujetos no re-preprocesa los anteriores. Los sujetos sin cache se
+  descargan / filtran en paralelo, un proceso por sujeto.
+- Cada batch se lee con un fancy-index por sujeto (no muestra a muestra) y
+  los DataLoader workers lo preparan por adelantado.
+- torch.set_num_threads para los GEMM del modelo; los workers no compiten.
+
+Entrenamiento:
+- Split train/val por épocas (semilla fija, reproducible al reanudar).
+- Early stopping sobre la loss de validación; los mejores pesos van a
+  syntergic_vae.pth (lo que carga inference.py).
+- Checkpoint (modelo, optimizador, early stopping, RNG) cada N épocas en
+  ai/checkpoints/last.pt; --resume continúa desde ahí.
+- Log por época: loss por muestra (train / val), samples/s y segundos.
+
+Uso:
+    cd backend/ai
+    python train.py                                         # sujetos 1-2, como antes
+    python train.py --subjects 1-50 --epochs 200 --workers 2 --threads 8
+    python train.py --subjects 1-50 --epochs 200 --resume
+"""
+
+import os
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List
+
+import numpy as np
 import torch
 import torch.optim as optim
-from torch.utils.data import DataLoader
-from dataset import EEGDataset
+from torch.utils.data import Dataset, DataLoader, BatchSampler, SubsetRandomSampler
+
+from dataset import EEGDataset, EPOCH_CACHE_DIR, EPOCH_CACHE_ENABLED, epoch_cache_key
 from model import SyntergicVAE
-import os
 
-def train():
-    # 1. Configuración
-    BATCH_SIZE = 32
-    EPOCHS = 10
-    LEARNING_RATE = 1e-3
-    MODEL_PATH = "syntergic_vae.pth"
-    
+AI_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TRAIN_SUBJECTS = os.getenv('TRAIN_SUBJECTS', '1-2')
+TRAIN_RUNS = os.getenv('TRAIN_RUNS', '6,10,14')             # Imaginar movimiento (manos vs pies)
+TRAIN_BATCH_SIZE = int(os.getenv('TRAIN_BATCH_SIZE', '64'))
+TRAIN_EPOCHS = int(os.getenv('TRAIN_EPOCHS', '100'))
+TRAIN_LEARNING_RATE = float(os.getenv('TRAIN_LEARNING_RATE', '1e-3'))
+TRAIN_VAL_FRACTION = float(os.getenv('TRAIN_VAL_FRACTION', '0.1'))
+TRAIN_PATIENCE = int(os.getenv('TRAIN_PATIENCE', '8'))       # épocas sin mejorar val antes de parar
+TRAIN_MIN_DELTA = float(os.getenv('TRAIN_MIN_DELTA', '0.0'))  # mejora mínima de val loss por muestra
+# DataLoader workers: con 1-2 cores el prefetch no compensa
+TRAIN_WORKERS = int(os.getenv('TRAIN_WORKERS', str(min(2, max(0, (os.cpu_count() or 1) - 2)))))
+# Threads intra-op de torch (0 = cores libres tras los workers)
+TRAIN_THREADS = int(os.getenv('TRAIN_THREADS', '0'))
+# Procesos para construir caches de sujetos nuevos (MNE es single-thread)
+TRAIN_PREPROCESS_WORKERS = int(os.getenv('TRAIN_PREPROCESS_WORKERS', '0')) or os.cpu_count() or 1
+TRAIN_CHECKPOINT_DIR = os.getenv('TRAIN_CHECKPOINT_DIR', os.path.join(AI_DIR, 'checkpoints'))
+TRAIN_CHECKPOINT_EVERY = int(os.getenv('TRAIN_CHECKPOINT_EVERY', '1'))
+TRAIN_SEED = int(os.getenv('TRAIN_SEED', '42'))
+
+MODEL_PATH = os.path.join(AI_DIR, "syntergic_vae.pth")
+HIDDEN_DIM = 512
+LATENT_DIM = 64
+
+# Si cambian, un checkpoint no se puede reanudar con estos argumentos
+_RESUME_KEYS = ('subjects', 'runs', 'val_fraction', 'seed', 'input_dim', 'hidden_dim', 'latent_dim')
+
+
+def parse_ids(spec: str) -> List[int]:
+    """'1-5,8,10-12' → [1, 2, 3, 4, 5, 8, 10, 11, 12]"""
+    ids = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            lo, hi = part.split('-', 1)
+            ids.extend(range(int(lo), int(hi) + 1))
+        else:
+            ids.append(int(part))
+    return sorted(set(ids))
+
+
+# ==================== DATA ====================
+
+def _subject_cache_path(subject: int, runs: List[int]) -> str:
+    return os.path.join(EPOCH_CACHE_DIR, f"{epoch_cache_key([subject], runs)}.npy")
+
+
+def _build_subject_cache(subject: int, runs: List[int]) -> int:
+    """Worker: descarga + preprocesa un sujeto y escribe su cache."""
+    EEGDataset._load_cached([subject], runs)
+    return subject
+
+
+def prepare_epoch_caches(subjects: List[int], runs: List[int], workers: int = TRAIN_PREPROCESS_WORKERS) -> List[str]:
+    """Cache por sujeto; los que faltan se construyen en paralelo. → rutas .npy"""
+    missing = [s for s in subjects if not os.path.exists(_subject_cache_path(s, runs))]
+    if missing:
+        workers = max(1, min(workers, len(missing)))
+        print(f"Preprocessing {len(missing)} subject(s) with {workers} process(es) (PhysioNet download + MNE)...")
+        t0 = time.perf_counter()
+        if workers == 1:
+            for s in missing:
+                _build_subject_cache(s, runs)
+        else:
+            ctx = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                futures = {pool.submit(_build_subject_cache, s, runs): s for s in missing}
+                for future in as_completed(futures):
+                    print(f"  ✓ subject {future.result()}")
+        print(f"✓ Epoch caches ready in {time.perf_counter() - t0:.1f}s")
+    return [_subject_cache_path(s, runs) for s in subjects]
+
+
+class EpochBatches(Dataset):
+    """
+    Épocas de varios sujetos, indexadas globalmente.
+
+    dataset[[i, j, ...]] devuelve el batch completo (B, channels * time)
+    con un fancy-index por sujeto sobre los memmaps. Los memmaps se abren
+    en cada proceso (los workers no reciben copias de los datos).
+    """
+
+    def __init__(self, sources: List):
+        # sources: rutas .npy (cache) o arrays ya en memoria (EPOCH_CACHE_ENABLED=false)
+        self.sources = sources
+        self._arrays = None
+        shapes = [a.shape for a in self.arrays]
+        self.offsets = np.cumsum([0] + [s[0] for s in shapes])
+        self.input_dim = int(shapes[0][1] * shapes[0][2])
+
+    @property
+    def arrays(self) -> List[np.ndarray]:
+        if self._arrays is None:
+            self._arrays = [np.load(s, mmap_mode='r') if isinstance(s, str) else s for s in self.sources]
+        return self._arrays
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if all(isinstance(s, str) for s in self.sources):
+            state['_arrays'] = None
+        return state
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, indices):
+        idx = np.sort(np.atleast_1d(np.asarray(indices, dtype=np.int64)))
+        owner = np.searchsorted(self.offsets, idx, side='right') - 1
+        out = np.empty((len(idx), self.input_dim), dtype=np.float32)
+        for s in np.unique(owner):
+            mask = owner == s
+            out[mask] = self.arrays[s][idx[mask] - self.offsets[s]].reshape(int(mask.sum()), -1)
+        return torch.from_numpy(out)
+
+
+def split_indices(n: int, val_fraction: float, seed: int):
+    """Permutación fija por semilla → (train_idx, val_idx)."""
+    perm = np.random.default_rng(seed).permutation(n)
+    n_val = int(round(n * val_fraction)) if n > 1 else 0
+    if val_fraction > 0:
+        n_val = min(max(n_val, 1), n - 1)
+    return perm[n_val:].tolist(), perm[:n_val].tolist()
+
+
+def make_loader(dataset: EpochBatches, indices: List[int], batch_size: int,
+                shuffle: bool, workers: int, generator: torch.Generator = None) -> DataLoader:
+    """Un elemento del sampler = lista de índices = un batch (batch_size=None)."""
+    sampler = SubsetRandomSampler(indices, generator=generator) if shuffle else indices
+    return DataLoader(
+        dataset,
+        sampler=BatchSampler(sampler, batch_size, drop_last=False),
+        batch_size=None,
+        num_workers=workers,
+        persistent_workers=workers > 0,
+        prefetch_factor=4 if workers > 0 else None,
+    )
+
+
+# ==================== TRAINING ====================
+
+def loss_function(recon_x, x, mu, logvar):
+    """VAE: reconstrucción (MSE suma) + KL divergence."""
+    mse = torch.nn.functional.mse_loss(recon_x, x, reduction='sum')
+    kld = -0.5 * torch.sum(1 + logvar - mu.pow(2) - logvar.exp())
+    return mse + kld
+
+
+def evaluate(model: SyntergicVAE, loader: DataLoader, device) -> float:
+    """Loss de validación por muestra, determinista (decodifica mu, sin muestrear z)."""
+    model.eval()
+    total, n = 0.0, 0
+    with torch.inference_mode():
+        for x in loader:
+            x = x.to(device)
+            mu, logvar = model.encode(x)
+            total += loss_function(model.decode(mu), x, mu, logvar).item()
+            n += len(x)
+    if n == 0:
+        raise ValueError("evaluate() got an empty validation loader")
+    return total / n
+
+
+def _atomic_save(obj, path: str):
+    tmp = f"{path}.tmp"
+    torch.save(obj, tmp)
+    os.replace(tmp, path)
+
+
+def save_checkpoint(path: str, epoch: int, model, optimizer, state: Dict, config: Dict, generator):
+    _atomic_save({
+        'epoch': epoch,                  # épocas completadas
+        'model': model.state_dict(),
+        'optimizer': optimizer.state_dict(),
+        'best_val': state['best_val'],
+        'bad_epochs': state['bad_epochs'],
+        'best_model': state['best_model'],
+        'config': config,
+        'torch_rng': torch.get_rng_state(),
+        'sampler_rng': generator.get_state(),
+    }, path)
+
+
+def configure_threads(threads: int, workers: int) -> int:
+    threads = threads or max(1, (os.cpu_count() or 1) - workers)
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # ya fijado (sólo se puede antes del primer op paralelo)
+    return threads
+
+
+def train(args=None):
+    args = args or parse_args([])
+    subjects = parse_ids(args.subjects)
+    runs = parse_ids(args.runs)
+
     device = torch.device("cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu")
-    print(f"Using device: {device}")
-
-    # 2. Cargar Datos
-    print("Initializing dataset (this might download data from PhysioNet)...")
-    dataset = EEGDataset(subjects=[1, 2], runs=[6, 10, 14]) # Usamos 2 sujetos para empezar
-    dataloader = DataLoader(dataset, batch_size=BATCH_SIZE, shuffle=True)
-    
-    input_dim = dataset.get_input_dim()
-    
-    # 3. Inicializar Modelo
-    model = SyntergicVAE(input_dim=input_dim, hidden_dim=512, latent_dim=64).to(device)
-    optimizer = optim.Adam(model.parameters(), lr=LEARNING_RATE)
-    
-    # Función de pérdida para VAE (Reconstruction + KL Divergence)
-    def loss_function(recon_x, x, mu, logvar):
-        BCE = torch.nn.functional.mse_loss(recon_x, x, reduction='sum')
-        # KL divergence
-        KLD = -0.5 * torch.sum(1 + logvar - mu.pow(2) - logvar.exp())
-        return BCE + KLD
-
-    # 4. Bucle de Entrenamiento
-    model.train()
-    for epoch in range(EPOCHS):
-        train_loss = 0
-        for batch_idx, data in enumerate(dataloader):
-            data = data.to(device)
-            
-            optimizer.zero_grad()
-            
-            recon_batch, mu, logvar = model(data)
-            loss = loss_function(recon_batch, data, mu, logvar)
-            
+    threads = configure_threads(args.threads, args.workers)
+    print(f"Using device: {device} | torch threads={threads} | loader workers={args.workers}")
+
+    # 1. Datos (cache por sujeto, memmap)
+    if EPOCH_CACHE_ENABLED:
+        sources = prepare_epoch_caches(subjects, runs, args.preprocess_workers)
+    else:
+        sources = [EEGDataset._preprocess([s], runs) for s in subjects]
+    dataset = EpochBatches(sources)
+    train_idx, val_idx = split_indices(len(dataset), args.val_fraction, args.seed)
+    if not train_idx:
+        raise SystemExit(f"No training epochs: dataset has {len(dataset)} epoch(s) for subjects {subjects}, "
+                         f"runs {runs} (val_fraction={args.val_fraction})")
+    print(f"Dataset: {len(dataset)} epochs from {len(subjects)} subject(s) | "
+          f"train={len(train_idx)} val={len(val_idx)} | input_dim={dataset.input_dim}")
+
+    generator = torch.Generator()
+    generator.manual_seed(args.seed)
+    train_loader = make_loader(dataset, train_idx, args.batch_size, True, args.workers, generator)
+    val_loader = make_loader(dataset, val_idx, args.batch_size * 4, False, args.workers) if val_idx else None
+
+    config = {
+        'subjects': subjects, 'runs': runs, 'val_fraction': args.val_fraction, 'seed': args.seed,
+        'input_dim': dataset.input_dim, 'hidden_dim': HIDDEN_DIM, 'latent_dim': LATENT_DIM,
+        'batch_size': args.batch_size, 'lr': args.lr,
+    }
+
+    # 2. Modelo
+    torch.manual_seed(args.seed)
+    model = SyntergicVAE(input_dim=dataset.input_dim, hidden_dim=HIDDEN_DIM, latent_dim=LATENT_DIM).to(device)
+    optimizer = optim.Adam(model.parameters(), lr=args.lr)
+    state = {'best_val': float('inf'), 'bad_epochs': 0, 'best_model': None}
+    start_epoch = 0
+
+    os.makedirs(args.checkpoint_dir, exist_ok=True)
+    checkpoint_path = os.path.join(args.checkpoint_dir, 'last.pt')
+    if args.resume and os.path.exists(checkpoint_path):
+        checkpoint = torch.load(checkpoint_path, map_location=device, weights_only=True)
+        mismatch = [k for k in _RESUME_KEYS if checkpoint['config'].get(k) != config[k]]
+        if mismatch:
+            raise SystemExit(f"Checkpoint {checkpoint_path} was trained with different {mismatch}; "
+                             f"drop --resume or match its settings")
+        model.load_state_dict(checkpoint['model'])
+        optimizer.load_state_dict(checkpoint['optimizer'])
+        state = {k: checkpoint[k] for k in ('best_val', 'bad_epochs', 'best_model')}
+        torch.set_rng_state(checkpoint['torch_rng'])
+        generator.set_state(checkpoint['sampler_rng'])
+        start_epoch = checkpoint['epoch']
+        print(f"✓ Resumed from {checkpoint_path} at epoch {start_epoch} (best val {state['best_val']:.4f})")
+    elif args.resume:
+        print(f"⚠ No checkpoint at {checkpoint_path}, starting from scratch")
+
+    # 3. Bucle de entrenamiento
+    t_total = time.perf_counter()
+    samples_total = 0
+    for epoch in range(start_epoch, args.epochs):
+        model.train()
+        t0 = time.perf_counter()
+        train_loss, n = 0.0, 0
+        for x in train_loader:
+            x = x.to(device, non_blocking=True)
+            optimizer.zero_grad(set_to_none=True)
+            recon_batch, mu, logvar = model(x)
+            loss = loss_function(recon_batch, x, mu, logvar)
             loss.backward()
-            train_loss += loss.item()
             optimizer.step()
-            
-        print(f'Epoch: {epoch+1} | Average Loss: {train_loss / len(dataloader.dataset):.4f}')
+            train_loss += loss.item()
+            n += len(x)
+        train_seconds = time.perf_counter() - t0
+        samples_total += n
+
+        val_loss = evaluate(model, val_loader, device) if val_loader else train_loss / n
+        improved = val_loss < state['best_val'] - args.min_delta
+        if improved:
+            state['best_val'] = val_loss
+            state['bad_epochs'] = 0
+            state['best_model'] = {k: v.detach().cpu().clone() for k, v in model.state_dict().items()}
+            _atomic_save(state['best_model'], args.output)
+        else:
+            state['bad_epochs'] += 1
+
+        print(f"Epoch: {epoch + 1}/{args.epochs} | train {train_loss / n:.4f} | val {val_loss:.4f}"
+              f"{' *' if improved else '  '} | {n / train_seconds:.0f} samples/s | "
+              f"{time.perf_counter() - t0:.1f}s")
+
+        stop = state['bad_epochs'] >= args.patience
+        if (epoch + 1) % args.checkpoint_every == 0 or stop or epoch + 1 == args.epochs:
+            save_checkpoint(checkpoint_path, epoch + 1, model, optimizer, state, config, generator)
+        if stop:
+            print(f"Early stopping: val loss without improvement for {args.patience} epoch(s)")
+            break
+
+    elapsed = time.perf_counter() - t_total
+    print(f"✓ Best val loss {state['best_val']:.4f} | {samples_total} samples in {elapsed:.1f}s "
+          f"({samples_total / elapsed if elapsed else 0:.0f} samples/s)")
+    print(f"Model saved to {args.output}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train SyntergicVAE on PhysioNet EEGBCI")
+    parser.add_argument('--subjects', default=TRAIN_SUBJECTS, help="e.g. '1-50,60'")
+    parser.add_argument('--runs', default=TRAIN_RUNS, help="e.g. '6,10,14'")
+    parser.add_argument('--epochs', type=int, default=TRAIN_EPOCHS)
+    parser.add_argument('--batch-size', type=int, default=TRAIN_BATCH_SIZE)
+    parser.add_argument('--lr', type=float, default=TRAIN_LEARNING_RATE)
+    parser.add_argument('--val-fraction', type=float, default=TRAIN_VAL_FRACTION)
+    parser.add_argument('--patience', type=int, default=TRAIN_PATIENCE)
+    parser.add_argument('--min-delta', type=float, default=TRAIN_MIN_DELTA)
+    parser.add_argument('--workers', type=int, default=TRAIN_WORKERS, help='DataLoader workers')
+    parser.add_argument('--threads', type=int, default=TRAIN_THREADS, help='torch intra-op threads (0 = auto)')
+    parser.add_argument('--preprocess-workers', type=int, default=TRAIN_PREPROCESS_WORKERS,
+                        help='processes to build missing subject caches')
+    parser.add_argument('--checkpoint-dir', default=TRAIN_CHECKPOINT_DIR)
+    parser.add_argument('--checkpoint-every', type=int, default=TRAIN_CHECKPOINT_EVERY, help='epochs')
+    parser.add_argument('--resume', action='store_true', help='continue from <checkpoint-dir>/last.pt')
+    parser.add_argument('--seed', type=int, default=TRAIN_SEED)
+    parser.add_argument('--output', default=MODEL_PATH, help='best weights (state_dict)')
+    return parser.parse_args(argv)
 
-    # 5. Guardar Modelo
-    torch.save(model.state_dict(), MODEL_PATH)
-    print(f"Model saved to {MODEL_PATH}")
 
 if __name__ == "__main__":
-    train()
+    train(parse_args())
@@ -0,0 +1,121 @@
+"""
+VAE inference engine: un solo encode por ventana, en lotes, sin autograd.
+
+_process_eeg_window llamaba a model.get_syntergic_state(x) (encode) y
+después a model.encode(x) otra vez para la varianza: el encoder
+10304→512 corría dos veces por frame. Aquí el encoder + las
+estadísticas sintérgicas van en un único módulo (_SyntergicEncoder):
+
+    variance_mean (N,), focal (N, 3) = encoder(x (N, 10304))
+
+ejecutado bajo torch.inference_mode, para 1 ventana (live) o N ventanas
+(reprocesado offline). Backends:
+
+    eager        PyTorch normal
+    torchscript  torch.jit.trace del encoder (sin overhead de Python)
+    int8         quantize_dynamic de las nn.Linear (CPU, qint8)
+
+El número de threads intra-op se fija (VAE_INTRAOP_THREADS) para que la
+inferencia no compita con los threads de DSP (FFT, coherencia, filtros).
+
+Benchmark: scripts/bench_vae.py
+"""
+
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+
+VAE_BACKEND = os.getenv('VAE_BACKEND', 'eager')  # eager | torchscript | int8
+VAE_INTRAOP_THREADS = int(os.getenv('VAE_INTRAOP_THREADS', '1'))
+VAE_BATCH_SIZE = int(os.getenv('VAE_BATCH_SIZE', '256'))
+
+BACKENDS = ('eager', 'torchscript', 'int8')
+
+# Escala de las 3 primeras dimensiones de mu → focal point 3D (ver SyntergicVAE)
+FOCAL_SCALE = 1.5
+
+
+class _SyntergicEncoder(nn.Module):
+    """Encoder del VAE + estadísticas sintérgicas en un solo forward."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.encoder = model.encoder
+        self.fc_mu = model.fc_mu
+        self.fc_logvar = model.fc_logvar
+
+    def forward(self, x: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        h = self.encoder(x)
+        mu = self.fc_mu(h)
+        logvar = self.fc_logvar(h)
+        variance_mean = torch.exp(logvar).mean(dim=1)
+        return variance_mean, mu[:, :3] * FOCAL_SCALE
+
+
+class VAEInferenceEngine:
+    """
+    Inferencia del SyntergicVAE para el loop en vivo y el reprocesado.
+
+    infer(x)        → dict de una ventana (coherence, focal_point, variance_mean)
+    infer_batch(X)  → arrays (N,) / (N, 3) para N ventanas
+    """
+
+    def __init__(self, model, backend: str = VAE_BACKEND, threads: Optional[int] = VAE_INTRAOP_THREADS,
+                 input_dim: Optional[int] = None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown VAE backend '{backend}' (expected one of {BACKENDS})")
+        if threads:
+            torch.set_num_threads(threads)
+        self.backend = backend
+        self.input_dim = input_dim or model.encoder[0].in_features
+
+        encoder = _SyntergicEncoder(model).eval()
+        if backend == 'int8':
+            encoder = torch.quantization.quantize_dynamic(encoder, {nn.Linear}, dtype=torch.qint8)
+        elif backend == 'torchscript':
+            with torch.inference_mode():
+                example = torch.zeros(1, self.input_dim)
+                encoder = torch.jit.freeze(torch.jit.trace(encoder, example).eval())
+        self.encoder = encoder
+
+    def _run(self, x: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        with torch.inference_mode():
+            return self.encoder(x)
+
+    def infer(self, x) -> Dict:
+        """Una ventana (1, input_dim) o (input_dim,) → estado sintérgico."""
+        x = torch.as_tensor(x, dtype=torch.float32).reshape(1, -1)
+        variance_mean, focal = self._run(x)
+        variance = variance_mean.item()
+        fx, fy, fz = focal[0].tolist()
+        return {
+            # Coherencia estimada como la "pureza" del estado (baja varianza)
+            'coherence': 1.0 / (1.0 + variance),
+            'focal_point': {'x': fx, 'y': fy, 'z': fz},
+            'variance_mean': variance,
+        }
+
+    def infer_batch(self, windows, batch_size: int = VAE_BATCH_SIZE) -> Dict[str, np.ndarray]:
+        """
+        N ventanas (N, input_dim) o (N, 64, 161) → arrays por ventana.
+
+        Returns:
+            {'coherence': (N,), 'variance_mean': (N,), 'focal_point': (N, 3)}
+        """
+        windows = np.asarray(windows, dtype=np.float32).reshape(len(windows), -1)
+        variance = np.empty(len(windows), dtype=np.float32)
+        focal = np.empty((len(windows), 3), dtype=np.float32)
+        for i in range(0, len(windows), batch_size):
+            x = torch.from_numpy(windows[i:i + batch_size])
+            v, f = self._run(x)
+            variance[i:i + len(x)] = v.numpy()
+            focal[i:i + len(x)] = f.numpy()
+        return {
+            'coherence': 1.0 / (1.0 + variance),
+            'variance_mean': variance,
+            'focal_point': focal,
+        }
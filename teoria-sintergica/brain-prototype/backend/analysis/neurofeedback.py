@@ -0,0 +1,238 @@
+"""
+Neurofeedback de baja latencia: envolventes de banda con IIR causales.
+
+El pipeline en vivo (Welch de 2 s a 5 Hz + promedio de 5 frames) tiene
+~1-2 s de latencia efectiva. Aquí cada chunk nuevo del Muse pasa por un
+Butterworth pasabanda por banda (sosfilt con estado, sin ventana) y la
+potencia instantánea y² se suaviza con un filtro de un polo
+(constante de tiempo `envelope_ms`). El valor de feedback es la potencia
+relativa de la banda objetivo (envolvente de la banda / suma de las cinco,
+promedio de canales), comparado con un umbral con histéresis.
+
+Presupuesto de latencia (muestra → frame), ver `latency_budget()`:
+    retardo de grupo del pasabanda en el centro de la banda
+  + retardo del suavizado (~envelope_ms)
+  + pipeline: espera hasta el próximo tick (≤ intervalo, 50 ms) + procesado
+    + envío, medido en cada frame desde la llegada de la última muestra
+`python scripts/bench_neurofeedback.py` mide además, sobre señal sintética,
+del inicio de un burst alpha al primer frame con recompensa.
+"""
+
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+from scipy import signal
+
+from .spectral import SpectralAnalyzer
+
+
+NEUROFEEDBACK_INTERVAL_MS = float(os.getenv('NEUROFEEDBACK_INTERVAL_MS', '50'))
+NEUROFEEDBACK_BAND = os.getenv('NEUROFEEDBACK_BAND', 'alpha')
+NEUROFEEDBACK_THRESHOLD = float(os.getenv('NEUROFEEDBACK_THRESHOLD', '0.35'))
+NEUROFEEDBACK_HYSTERESIS = float(os.getenv('NEUROFEEDBACK_HYSTERESIS', '0.02'))
+NEUROFEEDBACK_ENVELOPE_MS = float(os.getenv('NEUROFEEDBACK_ENVELOPE_MS', '50'))
+# Orden del Butterworth por banda (pasabanda: 2 × orden polos)
+NEUROFEEDBACK_FILTER_ORDER = int(os.getenv('NEUROFEEDBACK_FILTER_ORDER', '2'))
+
+BAND_NAMES = tuple(SpectralAnalyzer.BANDS)
+
+
+def default_config() -> Dict:
+    """Configuración por defecto (variables de entorno NEUROFEEDBACK_*)."""
+    return {
+        'band': NEUROFEEDBACK_BAND,
+        'threshold': NEUROFEEDBACK_THRESHOLD,
+        'hysteresis': NEUROFEEDBACK_HYSTERESIS,
+        'envelope_ms': NEUROFEEDBACK_ENVELOPE_MS,
+    }
+
+
+class NeurofeedbackProcessor:
+    """
+    Estado de filtros de un stream (un consumidor: no compartir entre
+    conexiones). `process(chunk)` con las muestras nuevas de cada tick.
+    """
+
+    def __init__(self, fs: float = 256, n_channels: int = 4, band: str = NEUROFEEDBACK_BAND,
+                 threshold: float = NEUROFEEDBACK_THRESHOLD, hysteresis: float = NEUROFEEDBACK_HYSTERESIS,
+                 envelope_ms: float = NEUROFEEDBACK_ENVELOPE_MS, order: int = NEUROFEEDBACK_FILTER_ORDER):
+        if band not in SpectralAnalyzer.BANDS:
+            raise ValueError(f"Unknown band '{band}'. Use one of {', '.join(BAND_NAMES)}")
+        if envelope_ms <= 0:
+            raise ValueError("envelope_ms must be > 0")
+        self.fs = float(fs)
+        self.n_channels = n_channels
+        self.order = order
+        self.band = band
+        self.band_index = BAND_NAMES.index(band)
+        self.threshold = float(threshold)
+        self.hysteresis = float(hysteresis)
+        self.envelope_ms = float(envelope_ms)
+
+        nyquist = self.fs / 2
+        self._sos = [
+            signal.butter(order, [lo, min(hi, nyquist * 0.99)], btype='bandpass', fs=self.fs, output='sos')
+            for lo, hi in SpectralAnalyzer.BANDS.values()
+        ]
+        self._sos_zi = [signal.sosfilt_zi(sos) for sos in self._sos]  # (n_sections, 2)
+        self._band_zi: Optional[List[np.ndarray]] = None  # por banda (n_sections, n_channels, 2)
+        # Suavizado de un polo sobre y²: env += a · (y² − env)
+        self._env_a = 1.0 - np.exp(-1000.0 / (self.fs * self.envelope_ms))
+        self._env_zi = np.zeros((len(BAND_NAMES), n_channels, 1))
+
+        self.samples_seen = 0
+        self.settle_samples = int(self.fs * 0.5)  # transitorio de los filtros
+        self.reward = False
+        self._pipeline_ms = deque(maxlen=1200)  # ~1 min de frames a 20 Hz
+
+    # ==================== CONFIG ====================
+
+    def configure(self, threshold: Optional[float] = None, hysteresis: Optional[float] = None):
+        """Umbrales en caliente (no tocan el estado de los filtros)."""
+        if threshold is not None:
+            self.threshold = float(threshold)
+        if hysteresis is not None:
+            self.hysteresis = float(hysteresis)
+
+    # ==================== PROCESSING ====================
+
+    def process(self, chunk: np.ndarray) -> Optional[Dict]:
+        """
+        Args:
+            chunk: (n_channels, n) muestras nuevas desde el último tick
+
+        Returns:
+            {'value', 'reward', 'bands', 'settled'} o None si el chunk está vacío
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if chunk.ndim != 2 or chunk.shape[1] == 0:
+            return None
+        if self._band_zi is None:
+            # Arrancar en estado estacionario para el primer valor (sin escalón de DC)
+            first = chunk[:, 0][None, :, None]
+            self._band_zi = [zi[:, None, :] * first for zi in self._sos_zi]
+
+        power = np.empty((len(BAND_NAMES),) + chunk.shape)
+        for i, sos in enumerate(self._sos):
+            y, self._band_zi[i] = signal.sosfilt(sos, chunk, axis=-1, zi=self._band_zi[i])
+            np.square(y, out=power[i])
+        a = self._env_a
+        env, self._env_zi = signal.lfilter([a], [1.0, a - 1.0], power, axis=-1, zi=self._env_zi)
+        self.samples_seen += chunk.shape[1]
+
+        band_env = env[:, :, -1].mean(axis=1)  # (n_bands,) última muestra, promedio de canales
+        total = float(band_env.sum())
+        relative = band_env / total if total > 0 else np.full(len(BAND_NAMES), 1.0 / len(BAND_NAMES))
+        value = float(relative[self.band_index])
+
+        settled = self.samples_seen >= self.settle_samples
+        if not settled:
+            self.reward = False
+        elif self.reward:
+            self.reward = value >= self.threshold - self.hysteresis
+        else:
+            self.reward = value >= self.threshold
+
+        return {
+            'value': value,
+            'reward': self.reward,
+            'bands': relative,
+            'settled': settled,
+        }
+
+    # ==================== LATENCY ====================
+
+    def record_pipeline_latency(self, ms: float):
+        """Llegada de la última muestra del chunk → frame enviado."""
+        self._pipeline_ms.append(ms)
+
+    def filter_delay_ms(self) -> float:
+        """Retardo de grupo del pasabanda objetivo en el centro de la banda."""
+        lo, hi = SpectralAnalyzer.BANDS[self.band]
+        centre = np.sqrt(lo * hi)
+        freqs = np.array([centre * 0.99, centre * 1.01])
+        _, h = signal.sosfreqz(self._sos[self.band_index], worN=freqs, fs=self.fs)
+        phase = np.unwrap(np.angle(h))
+        delay_s = -(phase[1] - phase[0]) / (2 * np.pi * (freqs[1] - freqs[0]))
+        return float(delay_s * 1000)
+
+    def envelope_delay_ms(self) -> float:
+        """Retardo del suavizado de un polo a baja frecuencia: (1 − a) / a muestras."""
+        return float((1 - self._env_a) / self._env_a / self.fs * 1000)
+
+    def latency_budget(self, interval_ms: float = NEUROFEEDBACK_INTERVAL_MS) -> Dict:
+        """
+        Latencia muestra → frame: filtros (analítico) + pipeline medido (p95,
+        incluye la espera del tick); sin medidas, el intervalo como cota.
+        """
+        measured = np.array(self._pipeline_ms) if self._pipeline_ms else None
+        pipeline_p95 = float(np.percentile(measured, 95)) if measured is not None else None
+        filter_ms = self.filter_delay_ms()
+        envelope_ms = self.envelope_delay_ms()
+        total = filter_ms + envelope_ms + (pipeline_p95 if pipeline_p95 is not None else interval_ms)
+        return {
+            'filter_delay_ms': round(filter_ms, 1),
+            'envelope_delay_ms': round(envelope_ms, 1),
+            'tick_wait_max_ms': interval_ms,
+            'pipeline_p50_ms': round(float(np.percentile(measured, 50)), 2) if measured is not None else None,
+            'pipeline_p95_ms': round(pipeline_p95, 2) if pipeline_p95 is not None else None,
+            'frames_measured': len(self._pipeline_ms),
+            'total_ms': round(total, 1),
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            'band': self.band,
+            'threshold': self.threshold,
+            'hysteresis': self.hysteresis,
+            'envelope_ms': self.envelope_ms,
+            'filter_order': self.order,
+            'fs': self.fs,
+        }
+
+
+def benchmark_onset_latency(fs: float = 256, interval_ms: float = NEUROFEEDBACK_INTERVAL_MS,
+                            seconds: float = 6.0, onset: float = 4.0, seed: int = 0,
+                            **config) -> Dict:
+    """
+    Señal sintética (ruido 1/f + burst alpha de 10 Hz desde `onset`),
+    procesada en chunks de `interval_ms` como en el WebSocket. Mide:
+      - onset_to_reward_ms: tiempo de señal desde el inicio del burst hasta
+        la última muestra del primer chunk con recompensa
+      - false_reward_frames: frames con recompensa antes del burst
+      - process_p50_us / process_p95_us: coste de process() por chunk
+    """
+    rng = np.random.default_rng(seed)
+    n = int(fs * seconds)
+    # Fondo 1/f (EEG-like): ruido blanco integrado con fuga
+    background = signal.lfilter([1.0], [1.0, -0.95], rng.standard_normal((4, n)), axis=-1) * 5.0
+    t = np.arange(n) / fs
+    burst = np.where(t >= onset, 40.0 * np.sin(2 * np.pi * 10.0 * t), 0.0)
+    data = background + burst[None, :]
+
+    processor = NeurofeedbackProcessor(fs=fs, n_channels=4, **config)
+    step = interval_ms / 1000 * fs
+    costs, reward_at, false_rewards, pos, edge = [], None, 0, 0, 0.0
+    while pos < n:
+        edge += step
+        end = min(n, int(round(edge)))
+        t0 = time.perf_counter()
+        frame = processor.process(data[:, pos:end])
+        costs.append((time.perf_counter() - t0) * 1e6)
+        pos = end
+        if frame and frame['reward']:
+            if t[end - 1] < onset:
+                false_rewards += 1
+            elif reward_at is None:
+                reward_at = t[end - 1]
+    return {
+        'config': processor.to_dict(),
+        'onset_to_reward_ms': round((reward_at - onset) * 1000, 1) if reward_at is not None else None,
+        'false_reward_frames': false_rewards,
+        'process_p50_us': round(float(np.percentile(costs, 50)), 1),
+        'process_p95_us': round(float(np.percentile(costs, 95)), 1),
+        'budget': processor.latency_budget(interval_ms),
+    }
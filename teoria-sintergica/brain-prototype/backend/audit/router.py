@@ -15,10 +15,11 @@ Endpoints:
 """
 import asyncio
 import logging
+import threading
 from typing import Optional
 from urllib.parse import urlparse
 
-from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from pydantic import BaseModel, validator
 
 from .domain.entities import AuditRun, AuditReport
@@ -32,10 +33,22 @@ from .infrastructure.repository import (
 
 logger = logging.getLogger(__name__)
 
-# Ensure tables exist on import
-init_audit_db()
+_db_ready = False
+_db_lock = threading.Lock()
 
-router = APIRouter(prefix="/audit", tags=["audit"])
+
+def ensure_audit_db() -> None:
+    """Ensure tables exist — once, on first audit request (or app warm-up)."""
+    global _db_ready
+    if _db_ready:
+        return
+    with _db_lock:
+        if not _db_ready:
+            init_audit_db()
+            _db_ready = True
+
+
+router = APIRouter(prefix="/audit", tags=["audit"], dependencies=[Depends(ensure_audit_db)])
 
 
 # ── Pydantic schemas ───────────────────────────────────────────────────────────
@@ -0,0 +1,170 @@
+"""
+compression.py — Negotiated gzip / brotli response compression (ASGI middleware).
+
+- Accept-Encoding negociado: br (si el paquete `brotli` está instalado) > gzip
+- Sólo tipos comprimibles (JSON, NDJSON, texto) y cuerpos >= COMPRESSION_MIN_BYTES
+- Respuestas en streaming (StreamingResponse NDJSON) se comprimen por chunk
+  con flush, así el cliente sigue recibiendo cada bloque al momento
+- Cuerpos grandes se comprimen en un thread para no bloquear el event loop
+
+gzip -1 por defecto: en /sessions/{id}/metrics de 60 min (15 MB) comprime
+~5x más rápido que -6 con ~10% más de bytes (scripts/bench_serialization.py).
+"""
+
+import os
+import zlib
+import asyncio
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '1'))
+BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
+# A partir de aquí la compresión corre en un thread (asyncio.to_thread)
+COMPRESSION_THREAD_BYTES = 256 * 1024
+
+_COMPRESSIBLE = (
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'image/svg+xml',
+    'text/',
+)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """'br', 'gzip' or None from an Accept-Encoding header (honours q=0)."""
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        token, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            accepted[token] = q
+    wildcard = accepted.get('*', 0.0)
+    if brotli is not None and accepted.get('br', wildcard) > 0:
+        return 'br'
+    if accepted.get('gzip', wildcard) > 0:
+        return 'gzip'
+    return None
+
+
+class _Compressor:
+    """Incremental gzip/brotli encoder with per-chunk flush."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._br = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._gz = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31 = gzip container
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == 'br':
+            return self._br.process(data) + self._br.flush()
+        return self._gz.compress(data) + self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b'') -> bytes:
+        if self.encoding == 'br':
+            return self._br.process(data) + self._br.finish()
+        return self._gz.compress(data) + self._gz.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware buffering)."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressionResponder(self.app, encoding, self.minimum_size)(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, app, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send = None
+        self.start_message = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self._send)
+
+    def _compressible(self, headers: Headers) -> bool:
+        if 'content-encoding' in headers:
+            return False
+        content_type = headers.get('content-type', '').lower()
+        return content_type.startswith(_COMPRESSIBLE)
+
+    async def _send(self, message):
+        kind = message['type']
+        if kind == 'http.response.start':
+            self.start_message = message
+            status = message['status']
+            self.passthrough = (
+                status < 200 or status in (204, 304)
+                or not self._compressible(Headers(raw=message['headers']))
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if kind != 'http.response.body' or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+
+        if self.compressor is None:
+            headers = MutableHeaders(raw=self.start_message['headers'])
+            if not more_body and len(body) < self.minimum_size:
+                # Respuesta pequeña: tal cual
+                await self.send(self.start_message)
+                await self.send(message)
+                self.passthrough = True
+                return
+            self.compressor = _Compressor(self.encoding)
+            headers['Content-Encoding'] = self.encoding
+            headers.add_vary_header('Accept-Encoding')
+            if not more_body:
+                if len(body) >= COMPRESSION_THREAD_BYTES:
+                    compressed = await asyncio.to_thread(self.compressor.finish, body)
+                else:
+                    compressed = self.compressor.finish(body)
+                headers['Content-Length'] = str(len(compressed))
+                await self.send(self.start_message)
+                await self.send({'type': 'http.response.body', 'body': compressed})
+                return
+            if 'content-length' in headers:
+                del headers['Content-Length']
+            await self.send(self.start_message)
+
+        if more_body:
+            await self.send({'type': 'http.response.body', 'body': self.compressor.chunk(body), 'more_body': True})
+        else:
+            await self.send({'type': 'http.response.body', 'body': self.compressor.finish(body)})
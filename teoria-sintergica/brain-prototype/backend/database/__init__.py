@@ -5,7 +5,15 @@ Architecture:
 - SQLite (legacy): models.py, recorder.py - old local storage
 - PostgreSQL: postgres_client.py - session metadata (eeg_recordings)
 - InfluxDB: influx_client.py - time-series (samples, metrics)
+- influx_rollups.py: downsampled buckets (1s/10s/1m) + Influx tasks
 - recorder_v2.py: New recorder using PostgreSQL + InfluxDB
+- session_aggregator.py: incremental session aggregates fed by the recorder
+- session_archive.py: chunked compressed binary archive of raw samples
+- session_summary.py: catalog summary columns materialized at close
+- recording_cache.py: read cache (memory LRU + disk) for closed recordings
+- reprocess.py: offline recomputation of per-window metrics from raw samples
+- streaming.py: NDJSON / length-prefixed binary encoders for streamed reads
+- storage/: StorageBackend interface (Influx+Postgres, embedded SQLite+files)
 """
 
 # Legacy SQLite (for backward compatibility)
@@ -26,6 +34,20 @@ from .influx_client import (
     MetricSnapshot as InfluxMetricSnapshot,
     get_influx_client
 )
+from .influx_rollups import RollupSpec, ROLLUPS, select_rollup, ensure_rollups
+from .session_aggregator import SessionAggregator
+from .session_archive import SessionArchive, SessionArchiveWriter, write_archive
+from .session_summary import compute_session_summary, materialize_session_summary
+from .recording_cache import RecordingCache, get_recording_cache
+from .storage import (
+    StorageBackend,
+    InfluxPostgresBackend,
+    EmbeddedBackend,
+    create_storage_backend,
+    get_storage_backend,
+    encode_catalog_cursor,
+    decode_catalog_cursor
+)
 from .recorder_v2 import SessionRecorderV2, get_recorder_v2
 
 __all__ = [
@@ -49,8 +71,35 @@ __all__ = [
     'EEGSample',
     'InfluxMetricSnapshot',
     'get_influx_client',
+    'RollupSpec',
+    'ROLLUPS',
+    'select_rollup',
+    'ensure_rollups',
+    
+    # Storage backends
+    'StorageBackend',
+    'InfluxPostgresBackend',
+    'EmbeddedBackend',
+    'create_storage_backend',
+    'get_storage_backend',
+    'encode_catalog_cursor',
+    'decode_catalog_cursor',
+    
+    # Session archive
+    'SessionArchive',
+    'SessionArchiveWriter',
+    'write_archive',
+    
+    # Session catalog
+    'compute_session_summary',
+    'materialize_session_summary',
+    
+    # Read cache
+    'RecordingCache',
+    'get_recording_cache',
     
     # New Recorder
+    'SessionAggregator',
     'SessionRecorderV2',
     'get_recorder_v2'
 ]
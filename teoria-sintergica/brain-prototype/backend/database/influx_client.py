@@ -8,8 +8,9 @@ Handles high-frequency data:
 """
 
 import os
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+import math
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 from dataclasses import dataclass
 import numpy as np
 
@@ -175,28 +176,67 @@ class InfluxDBEEGClient:
             timestamps: Array of relative timestamps (seconds)
             data: Array of shape (n_samples, 4) with channel data
         """
+        self.write_sample_block(recording_id, timestamps, np.asarray(data).T, base_timestamp)
+    
+    def write_sample_block(
+        self,
+        recording_id: int,
+        timestamps: np.ndarray,
+        data: np.ndarray,
+        base_timestamp: datetime = None
+    ):
+        """
+        Write a columnar block of samples as line protocol.
+        
+        No Point objects: nanosecond timestamps are computed in one NumPy
+        operation and each line is a single f-string.
+        
+        Args:
+            recording_id: Recording ID
+            timestamps: (n,) relative timestamps (seconds)
+            data: (channels, n) — tp9, af7, af8, tp10 [, aux]
+        """
         if not self._connected:
             self.connect()
+        if len(timestamps) == 0:
+            return
         
         base_timestamp = base_timestamp or datetime.utcnow()
-        base_ts = base_timestamp.timestamp()
-        points = []
+        ts_ns = ((base_timestamp.timestamp() + np.asarray(timestamps, dtype=np.float64)) * 1e9).astype(np.int64)
+        ts = ts_ns.tolist()
+        data = np.asarray(data, dtype=np.float64)
+        finite = np.isfinite(data)
+        prefix = f"eeg_sample,recording_id={recording_id} "
+        tp9, af7, af8, tp10 = (data[c].tolist() for c in range(4))
         
-        for i in range(len(timestamps)):
-            ts = base_ts + timestamps[i]
-            
-            point = (
-                Point("eeg_sample")
-                .tag("recording_id", str(recording_id))
-                .field("tp9", float(data[i, 0]))
-                .field("af7", float(data[i, 1]))
-                .field("af8", float(data[i, 2]))
-                .field("tp10", float(data[i, 3]))
-                .time(int(ts * 1e9), WritePrecision.NS)
-            )
-            points.append(point)
+        if finite[:4].all():
+            lines = [
+                f"{prefix}tp9={a!r},af7={b!r},af8={c!r},tp10={d!r} {t}"
+                for a, b, c, d, t in zip(tp9, af7, af8, tp10, ts)
+            ]
+        else:
+            # nan/inf no son válidos en line protocol (Influx rechaza el batch
+            # entero): se omite el campo, y la fila si no le queda ninguno
+            lines = []
+            for row, t in zip(zip(tp9, af7, af8, tp10), ts):
+                fields = ','.join(
+                    f"{name}={v!r}" for name, v in zip(('tp9', 'af7', 'af8', 'tp10'), row) if math.isfinite(v)
+                )
+                lines.append(f"{prefix}{fields} {t}" if fields else None)
+        if data.shape[0] > 4 and np.any(data[4]):
+            # aux solo cuando es distinto de 0 (igual que write_samples)
+            for i in np.flatnonzero(finite[4] & (data[4] != 0)).tolist():
+                aux = f"aux={float(data[4, i])!r}"
+                if lines[i] is None:
+                    lines[i] = f"{prefix}{aux} {ts[i]}"
+                else:
+                    head, _, t = lines[i].rpartition(' ')
+                    lines[i] = f"{head},{aux} {t}"
+        lines = [line for line in lines if line is not None]
+        if not lines:
+            return
         
-        self.write_api.write(bucket=INFLUX_BUCKET, org=INFLUX_ORG, record=points)
+        self.write_api.write(bucket=INFLUX_BUCKET, org=INFLUX_ORG, record=lines, write_precision=WritePrecision.NS)
     
     def write_metrics(
         self,
@@ -337,11 +377,27 @@ class InfluxDBEEGClient:
         self,
         recording_id: int,
         start: float = 0,
-        end: float = None
+        end: float = None,
+        max_points: Optional[int] = None,
+        duration_seconds: Optional[float] = None
     ) -> List[Dict]:
-        """Get metrics for a recording."""
+        """
+        Get metrics for a recording.
+
+        With `max_points` + `duration_seconds` the coarsest rollup bucket that
+        still returns ~max_points rows is used (see influx_rollups). Falls back
+        to the raw bucket when the rollup has no data yet (task lag) or the
+        budget needs full resolution.
+        """
         if not self._connected:
             self.connect()
+
+        from .influx_rollups import select_rollup
+        spec = select_rollup(duration_seconds, max_points)
+        if spec is not None:
+            rolled = self._get_metrics_rollup(recording_id, spec)
+            if rolled:
+                return rolled
         
         query = f'''
         from(bucket: "{INFLUX_BUCKET}")
@@ -356,29 +412,198 @@ class InfluxDBEEGClient:
         metrics = []
         for table in tables:
             for record in table.records:
-                metrics.append({
-                    'timestamp': record.get_time().timestamp(),
-                    'coherence': record.values.get('coherence', 0),
-                    'entropy': record.values.get('entropy', 0),
-                    'plv': record.values.get('plv', 0),
-                    'delta': record.values.get('delta', 0),
-                    'theta': record.values.get('theta', 0),
-                    'alpha': record.values.get('alpha', 0),
-                    'beta': record.values.get('beta', 0),
-                    'gamma': record.values.get('gamma', 0),
-                    'state': record.values.get('state', ''),
-                    'signal_quality': record.values.get('signal_quality', 0),
-                    'dominant_frequency': record.values.get('dominant_frequency', 0),
-                    'delta_raw': record.values.get('delta_raw', 0),
-                    'theta_raw': record.values.get('theta_raw', 0),
-                    'alpha_raw': record.values.get('alpha_raw', 0),
-                    'beta_raw': record.values.get('beta_raw', 0),
-                    'gamma_raw': record.values.get('gamma_raw', 0),
-                    'blink_contaminated': bool(record.values.get('blink_contaminated', False)),
-                })
+                metrics.append(self._metric_record(record))
         
         return metrics
+
+    @staticmethod
+    def _metric_record(record) -> Dict:
+        """Pivoted eeg_metrics record → metric dict."""
+        return {
+            'timestamp': record.get_time().timestamp(),
+            'coherence': record.values.get('coherence', 0),
+            'entropy': record.values.get('entropy', 0),
+            'plv': record.values.get('plv', 0),
+            'delta': record.values.get('delta', 0),
+            'theta': record.values.get('theta', 0),
+            'alpha': record.values.get('alpha', 0),
+            'beta': record.values.get('beta', 0),
+            'gamma': record.values.get('gamma', 0),
+            'state': record.values.get('state', ''),
+            'signal_quality': record.values.get('signal_quality', 0),
+            'dominant_frequency': record.values.get('dominant_frequency', 0),
+            'delta_raw': record.values.get('delta_raw', 0),
+            'theta_raw': record.values.get('theta_raw', 0),
+            'alpha_raw': record.values.get('alpha_raw', 0),
+            'beta_raw': record.values.get('beta_raw', 0),
+            'gamma_raw': record.values.get('gamma_raw', 0),
+            'blink_contaminated': bool(record.values.get('blink_contaminated', False)),
+        }
+
+    # ==================== STREAMING ====================
+
+    def _window_range(self, recording_id: int, measurement: str, field: str, start: float, end: Optional[float]) -> Optional[str]:
+        """Flux range() for [start, end) seconds from the recording's first point."""
+        query = f'''
+        from(bucket: "{INFLUX_BUCKET}")
+            |> range(start: -30d)
+            |> filter(fn: (r) => r["_measurement"] == "{measurement}")
+            |> filter(fn: (r) => r["recording_id"] == "{recording_id}")
+            |> filter(fn: (r) => r["_field"] == "{field}")
+            |> first()
+        '''
+        times = [
+            record.get_time()
+            for table in self.query_api.query(query, org=INFLUX_ORG)
+            for record in table.records
+        ]
+        if not times:
+            return None
+        t0 = min(times)
+        window = f'range(start: time(v: "{(t0 + timedelta(seconds=start or 0)).isoformat()}")'
+        if end is not None:
+            window += f', stop: time(v: "{(t0 + timedelta(seconds=end)).isoformat()}")'
+        return window + ')'
+
+    def iter_samples(
+        self,
+        recording_id: int,
+        start: float = 0,
+        end: float = None,
+        block_size: int = 2560
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Stream EEG samples as (timestamps (n,), data float32 (4, n)) blocks.
+
+        Records come from query_stream() (no full result in memory); only
+        [start, end) seconds from the first sample are queried.
+        """
+        if not self._connected:
+            self.connect()
+
+        window = self._window_range(recording_id, 'eeg_sample', 'tp9', start, end)
+        if window is None:
+            return
+        query = f'''
+        from(bucket: "{INFLUX_BUCKET}")
+            |> {window}
+            |> filter(fn: (r) => r["_measurement"] == "eeg_sample")
+            |> filter(fn: (r) => r["recording_id"] == "{recording_id}")
+            |> filter(fn: (r) => r["_field"] != "aux")
+            |> pivot(rowKey:["_time"], columnKey: ["_field"], valueColumn: "_value")
+        '''
+
+        timestamps = np.empty(block_size, dtype=np.float64)
+        data = np.empty((4, block_size), dtype=np.float32)
+        n = 0
+        for record in self.query_api.query_stream(query, org=INFLUX_ORG):
+            values = record.values
+            timestamps[n] = record.get_time().timestamp()
+            data[:, n] = (values.get('tp9', 0), values.get('af7', 0), values.get('af8', 0), values.get('tp10', 0))
+            n += 1
+            if n == block_size:
+                yield timestamps.copy(), data.copy()
+                n = 0
+        if n:
+            yield timestamps[:n].copy(), data[:, :n].copy()
+
+    def iter_metrics(self, recording_id: int, start: float = 0, end: float = None) -> Iterator[Dict]:
+        """Stream metric dicts for [start, end) seconds from the first metric."""
+        if not self._connected:
+            self.connect()
+
+        window = self._window_range(recording_id, 'eeg_metrics', 'coherence', start, end)
+        if window is None:
+            return
+        query = f'''
+        from(bucket: "{INFLUX_BUCKET}")
+            |> {window}
+            |> filter(fn: (r) => r["_measurement"] == "eeg_metrics")
+            |> filter(fn: (r) => r["recording_id"] == "{recording_id}")
+            |> pivot(rowKey:["_time"], columnKey: ["_field"], valueColumn: "_value")
+        '''
+        for record in self.query_api.query_stream(query, org=INFLUX_ORG):
+            yield self._metric_record(record)
     
+    def _get_metrics_rollup(self, recording_id: int, spec) -> List[Dict]:
+        """Read eeg_metrics from a rollup bucket, mapped to the raw row shape."""
+        query = f'''
+        from(bucket: "{spec.bucket}")
+            |> range(start: 0)
+            |> filter(fn: (r) => r["_measurement"] == "eeg_metrics")
+            |> filter(fn: (r) => r["recording_id"] == "{recording_id}")
+            |> pivot(rowKey:["_time"], columnKey: ["_field"], valueColumn: "_value")
+        '''
+
+        tables = self.query_api.query(query, org=INFLUX_ORG)
+
+        metrics = []
+        for table in tables:
+            for record in table.records:
+                values = record.values
+                row = {
+                    # aggregateWindow estampa el fin de la ventana; usamos el inicio
+                    'timestamp': record.get_time().timestamp() - spec.resolution_seconds,
+                    'state': values.get('state', ''),
+                    'resolution_seconds': spec.resolution_seconds,
+                    'count': int(values.get('coherence_count') or 0),
+                }
+                for key, val in values.items():
+                    if not isinstance(key, str) or val is None:
+                        continue
+                    if key.endswith('_mean'):
+                        row[key[:-5]] = float(val)
+                    elif key.endswith('_min') or key.endswith('_max'):
+                        row[key] = float(val)
+                blink_fraction = float(values.get('blink_contaminated_mean') or 0.0)
+                row['blink_fraction'] = blink_fraction
+                row['blink_contaminated'] = blink_fraction >= 0.5
+                metrics.append(row)
+
+        metrics.sort(key=lambda m: m['timestamp'])
+        return metrics
+
+    def compare_recordings(self, recording_ids: List[int], fields: Optional[List[str]] = None) -> Dict[int, Dict]:
+        """
+        Session-level means for several recordings in a single query.
+
+        Reads the 1 min rollup, so the cost is independent of recording length
+        and still works after the raw bucket has expired.
+        Returns {recording_id: {field: mean, ...}}.
+        """
+        if not recording_ids:
+            return {}
+        if not self._connected:
+            self.connect()
+
+        from .influx_rollups import ROLLUPS
+        spec = ROLLUPS[-1]
+        fields = fields or ['coherence', 'entropy', 'plv', 'alpha', 'theta',
+                            'alpha_raw', 'theta_raw', 'signal_quality', 'blink_contaminated']
+        id_set = '|'.join(str(int(rid)) for rid in recording_ids)
+        field_set = '|'.join(f'{f}_mean' for f in fields)
+
+        query = f'''
+        from(bucket: "{spec.bucket}")
+            |> range(start: 0)
+            |> filter(fn: (r) => r["_measurement"] == "eeg_metrics")
+            |> filter(fn: (r) => r["recording_id"] =~ /^({id_set})$/)
+            |> filter(fn: (r) => r["_field"] =~ /^({field_set})$/)
+            |> group(columns: ["recording_id", "_field"])
+            |> mean()
+        '''
+
+        tables = self.query_api.query(query, org=INFLUX_ORG)
+
+        result: Dict[int, Dict] = {}
+        for table in tables:
+            for record in table.records:
+                rid = int(record.values.get('recording_id'))
+                field = record.get_field()[:-5]
+                if record.get_value() is not None:
+                    result.setdefault(rid, {})[field] = float(record.get_value())
+        return result
+
     def get_events(
         self,
         recording_id: int,
@@ -525,15 +750,40 @@ class InfluxDBEEGClient:
         if not self._connected:
             self.connect()
 
-        CHANNELS = ['tp9', 'af7', 'af8', 'tp10']
+        points = self._band_power_points(recording_id, ts_ns, channel_bands, state)
+        if points:
+            self.write_api.write(bucket=INFLUX_BUCKET, org=INFLUX_ORG, record=points)
+
+    def write_band_power_batch(
+        self,
+        recording_id: int,
+        windows: List[Tuple[int, Dict[str, Dict[str, float]], str]],
+    ):
+        """
+        Several per-channel band power windows in one write (offline reprocessing).
+
+        Args:
+            windows: [(ts_ns, channel_bands, state), ...] — same fields as
+                     write_band_power_per_channel().
+        """
+        if not self._connected:
+            self.connect()
+
         points = []
+        for ts_ns, channel_bands, state in windows:
+            points.extend(self._band_power_points(recording_id, ts_ns, channel_bands, state))
+        if points:
+            self.write_api.write(bucket=INFLUX_BUCKET, org=INFLUX_ORG, record=points)
 
-        for band_name, ch_raw in channel_bands.items():
-            # Normalize per-channel: each channel's band powers sum to 1 across all bands.
-            # We need total power for each channel across ALL bands.
-            # ch_raw only has one band, so normalization must happen at write time using
-            # total across all available bands for this channel.
-            pass  # total computed below per-channel (see loop after collection)
+    @staticmethod
+    def _band_power_points(
+        recording_id: int,
+        ts_ns: int,
+        channel_bands: Dict[str, Dict[str, float]],
+        state: str = "",
+    ) -> List[Point]:
+        """eeg_band_power points of one window (normalized per channel across bands)."""
+        points = []
 
         # Collect all raw values per channel {channel: {band: raw}}
         channel_all_bands: Dict[str, Dict[str, float]] = {}
@@ -560,10 +810,14 @@ class InfluxDBEEGClient:
                     point = point.tag("state", state)
                 points.append(point)
 
-        if points:
-            self.write_api.write(bucket=INFLUX_BUCKET, org=INFLUX_ORG, record=points)
+        return points
 
-    def get_per_channel_metrics(self, recording_id: int) -> Optional[Dict]:
+    def get_per_channel_metrics(
+        self,
+        recording_id: int,
+        max_points: Optional[int] = None,
+        duration_seconds: Optional[float] = None,
+    ) -> Optional[Dict]:
         """
         Query per-channel band power time series from eeg_band_power.
 
@@ -575,15 +829,26 @@ class InfluxDBEEGClient:
             ...same for delta, theta, beta, gamma...
         }
         Returns None if no per-channel data exists for this recording.
+
+        `max_points` / `duration_seconds` select a rollup bucket as in get_metrics
+        (values are the window means of `value` / `value_raw`).
         """
         if not self._connected:
             self.connect()
 
+        from .influx_rollups import select_rollup
+        spec = select_rollup(duration_seconds, max_points)
+        bucket, time_range, suffix, shift = INFLUX_BUCKET, '-30d', '', 0
+
+        if spec is not None:
+            bucket, time_range, suffix, shift = spec.bucket, '0', '_mean', spec.resolution_seconds
+
         query = f'''
-        from(bucket: "{INFLUX_BUCKET}")
-            |> range(start: -30d)
+        from(bucket: "{bucket}")
+            |> range(start: {time_range})
             |> filter(fn: (r) => r["_measurement"] == "eeg_band_power")
             |> filter(fn: (r) => r["recording_id"] == "{recording_id}")
+            |> filter(fn: (r) => r["_field"] == "value{suffix}" or r["_field"] == "value_raw{suffix}")
             |> sort(columns: ["_time"])
         '''
 
@@ -594,10 +859,12 @@ class InfluxDBEEGClient:
 
         for table in tables:
             for record in table.records:
-                ts = record.get_time().timestamp()
+                ts = record.get_time().timestamp() - shift
                 band = record.values.get('band', '')
                 channel = record.values.get('channel', '')
                 field = record.get_field()  # 'value' or 'value_raw'
+                if suffix:
+                    field = field[:-len(suffix)]
                 val = record.get_value()
 
                 if not band or not channel:
@@ -614,6 +881,9 @@ class InfluxDBEEGClient:
                     time_points[ts][band][channel][field] = float(val)
 
         if not time_points:
+            if spec is not None:
+                # Rollup aún vacío (task pendiente): resolución completa
+                return self.get_per_channel_metrics(recording_id)
             return None
 
         sorted_ts = sorted(time_points.keys())
@@ -621,6 +891,8 @@ class InfluxDBEEGClient:
         bands = ['delta', 'theta', 'alpha', 'beta', 'gamma']
 
         per_channel: Dict[str, Any] = {"timestamps": sorted_ts}
+        if spec is not None:
+            per_channel["resolution_seconds"] = spec.resolution_seconds
 
         for band in bands:
             per_channel[band] = {ch: [] for ch in channels}
@@ -839,14 +1111,49 @@ class InfluxDBEEGClient:
         
         delete_api = self.client.delete_api()
         
-        # Delete samples
-        delete_api.delete(
-            start="1970-01-01T00:00:00Z",
-            stop="2100-01-01T00:00:00Z",
-            predicate=f'recording_id="{recording_id}"',
-            bucket=INFLUX_BUCKET,
-            org=INFLUX_ORG
-        )
+        from .influx_rollups import ROLLUPS
+
+        # Delete samples (raw bucket + rollups)
+        for bucket in [INFLUX_BUCKET] + [spec.bucket for spec in ROLLUPS]:
+            try:
+                delete_api.delete(
+                    start="1970-01-01T00:00:00Z",
+                    stop="2100-01-01T00:00:00Z",
+                    predicate=f'recording_id="{recording_id}"',
+                    bucket=bucket,
+                    org=INFLUX_ORG
+                )
+            except Exception as e:
+                if bucket == INFLUX_BUCKET:
+                    raise
+                print(f"⚠️  Rollup delete skipped ({bucket}): {e}")
+
+    def delete_derived_data(self, recording_id: int):
+        """
+        Delete the computed points of a recording (eeg_metrics, eeg_band_power)
+        from the raw and rollup buckets. Samples and events are kept.
+        """
+        if not self._connected:
+            self.connect()
+
+        delete_api = self.client.delete_api()
+
+        from .influx_rollups import ROLLUPS, ROLLUP_MEASUREMENTS
+
+        for bucket in [INFLUX_BUCKET] + [spec.bucket for spec in ROLLUPS]:
+            for measurement in ROLLUP_MEASUREMENTS:
+                try:
+                    delete_api.delete(
+                        start="1970-01-01T00:00:00Z",
+                        stop="2100-01-01T00:00:00Z",
+                        predicate=f'_measurement="{measurement}" AND recording_id="{recording_id}"',
+                        bucket=bucket,
+                        org=INFLUX_ORG
+                    )
+                except Exception as e:
+                    if bucket == INFLUX_BUCKET:
+                        raise
+                    print(f"⚠️  Rollup delete skipped ({bucket}/{measurement}): {e}")
 
 
 # Singleton instance
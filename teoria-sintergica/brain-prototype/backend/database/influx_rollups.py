@@ -0,0 +1,277 @@
+"""
+InfluxDB rollups (downsampling) for EEG metrics.
+
+El bucket crudo (INFLUX_BUCKET, 30 d) guarda `eeg_metrics` y `eeg_band_power`
+a resolución completa (~5 Hz). Para vistas largas y comparaciones entre
+sesiones se mantienen tres buckets agregados, alimentados por tasks de Influx:
+
+    eeg-data-1s   → ventanas de 1 s   (retención 180 d)
+    eeg-data-10s  → ventanas de 10 s  (retención 2 años)
+    eeg-data-1m   → ventanas de 1 min (sin expiración)
+
+Cada campo numérico se escribe como `{field}_mean`, `{field}_min`,
+`{field}_max` y `{field}_count`, conservando los tags (recording_id, state,
+band, channel). `blink_contaminated` se convierte a float, así que su
+`_mean` es la fracción de ventanas contaminadas.
+
+Las APIs de lectura usan `select_rollup()` para elegir el bucket más grueso
+que todavía entrega `max_points` puntos para la duración pedida.
+
+Provisioning:
+    python scripts/provision_influx_rollups.py [--backfill-days 30]
+"""
+
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from influxdb_client import BucketRetentionRules, TaskCreateRequest, TaskUpdateRequest
+
+from .influx_client import INFLUX_BUCKET, INFLUX_ORG, InfluxDBEEGClient
+
+
+# Measurements que se agregan (eeg_sample crudo y eeg_event no se agregan)
+ROLLUP_MEASUREMENTS = ('eeg_metrics', 'eeg_band_power')
+
+ROLLUP_AGGREGATES = ('mean', 'min', 'max', 'count')
+
+_DAY = 86400
+
+
+@dataclass(frozen=True)
+class RollupSpec:
+    """One downsampled bucket and the task that feeds it."""
+    name: str                # '1s', '10s', '1m'
+    resolution_seconds: int  # ancho de la ventana de agregación
+    bucket: str
+    retention_seconds: int   # 0 = sin expiración
+    task_every: str          # frecuencia de ejecución del task
+    task_lookback: str       # ventana re-agregada en cada ejecución
+
+    @property
+    def task_name(self) -> str:
+        return f"eeg_rollup_{self.name}"
+
+
+ROLLUPS: List[RollupSpec] = [
+    RollupSpec(
+        name='1s',
+        resolution_seconds=1,
+        bucket=os.getenv('INFLUX_ROLLUP_BUCKET_1S', f'{INFLUX_BUCKET}-1s'),
+        retention_seconds=int(os.getenv('INFLUX_ROLLUP_RETENTION_1S', str(180 * _DAY))),
+        task_every='10s',
+        task_lookback='1m',
+    ),
+    RollupSpec(
+        name='10s',
+        resolution_seconds=10,
+        bucket=os.getenv('INFLUX_ROLLUP_BUCKET_10S', f'{INFLUX_BUCKET}-10s'),
+        retention_seconds=int(os.getenv('INFLUX_ROLLUP_RETENTION_10S', str(730 * _DAY))),
+        task_every='1m',
+        task_lookback='5m',
+    ),
+    RollupSpec(
+        name='1m',
+        resolution_seconds=60,
+        bucket=os.getenv('INFLUX_ROLLUP_BUCKET_1M', f'{INFLUX_BUCKET}-1m'),
+        retention_seconds=int(os.getenv('INFLUX_ROLLUP_RETENTION_1M', '0')),
+        task_every='5m',
+        task_lookback='15m',
+    ),
+]
+
+# Pequeño retraso para que el task no agregue ventanas cuyo flush aún no llegó
+ROLLUP_TASK_OFFSET = os.getenv('INFLUX_ROLLUP_TASK_OFFSET', '5s')
+
+
+def select_rollup(duration_seconds: Optional[float], max_points: Optional[int]) -> Optional[RollupSpec]:
+    """
+    Pick the coarsest rollup whose resolution still yields `max_points`.
+
+    Returns None when the raw bucket should be used (no budget given, unknown
+    duration, or the budget exceeds what even the 1 s rollup can provide).
+    """
+    if not max_points or not duration_seconds or max_points <= 0:
+        return None
+
+    needed_resolution = duration_seconds / max_points
+    chosen = None
+    for spec in ROLLUPS:
+        if spec.resolution_seconds <= needed_resolution:
+            chosen = spec  # ROLLUPS está ordenado de fino a grueso
+    return chosen
+
+
+def get_rollup(name: str) -> Optional[RollupSpec]:
+    """Look up a rollup spec by name ('1s', '10s', '1m')."""
+    for spec in ROLLUPS:
+        if spec.name == name:
+            return spec
+    return None
+
+
+def build_rollup_flux(spec: RollupSpec, start: str, stop: Optional[str] = None, header: str = '') -> str:
+    """
+    Build the Flux pipeline that aggregates raw metrics into `spec.bucket`.
+
+    `start` / `stop` are Flux time expressions (relative durations like `-1m`
+    or RFC3339 timestamps). The start is truncated to the window width so a
+    re-run never overwrites a complete window with a partial one. `header` is
+    inserted after the imports (Flux requires imports before `option`).
+    """
+    measurements = ' or '.join(f'r["_measurement"] == "{m}"' for m in ROLLUP_MEASUREMENTS)
+    stop_arg = f', stop: {stop}' if stop else ''
+    every = f'{spec.resolution_seconds}s'
+    aggregates = ',\n        '.join(
+        f'rollup(fn: {agg}, suffix: "_{agg}")' for agg in ROLLUP_AGGREGATES
+    )
+
+    return f'''import "date"
+
+{header}data = from(bucket: "{INFLUX_BUCKET}")
+    |> range(start: date.truncate(t: {start}, unit: {every}){stop_arg})
+    |> filter(fn: (r) => {measurements})
+    |> toFloat()
+
+rollup = (fn, suffix) => data
+    |> aggregateWindow(every: {every}, fn: fn, createEmpty: false)
+    |> map(fn: (r) => ({{r with _field: r._field + suffix}}))
+
+union(tables: [
+        {aggregates},
+    ])
+    |> to(bucket: "{spec.bucket}", org: "{INFLUX_ORG}")
+'''
+
+
+def build_task_flux(spec: RollupSpec) -> str:
+    """Flux source for the Influx task that keeps `spec.bucket` up to date."""
+    header = (
+        f'option task = {{name: "{spec.task_name}", '
+        f'every: {spec.task_every}, offset: {ROLLUP_TASK_OFFSET}}}\n\n'
+    )
+    # Re-agregar `task_lookback` en cada corrida absorbe flushes tardíos del recorder;
+    # los puntos se sobrescriben (misma serie + mismo _time), así que es idempotente.
+    return build_rollup_flux(spec, start=f'-{spec.task_lookback}', header=header)
+
+
+# ==================== PROVISIONING ====================
+
+def ensure_rollup_buckets(client: InfluxDBEEGClient) -> Dict[str, str]:
+    """Create missing rollup buckets. Returns {bucket_name: 'created'|'exists'}."""
+    if not client._connected:
+        client.connect()
+
+    buckets_api = client.client.buckets_api()
+    result = {}
+    for spec in ROLLUPS:
+        if buckets_api.find_bucket_by_name(spec.bucket):
+            result[spec.bucket] = 'exists'
+            continue
+        rules = BucketRetentionRules(type="expire", every_seconds=spec.retention_seconds)
+        buckets_api.create_bucket(
+            bucket_name=spec.bucket,
+            retention_rules=rules,
+            org=INFLUX_ORG,
+            description=f"EEG metrics rollup ({spec.name} windows)",
+        )
+        result[spec.bucket] = 'created'
+        print(f"✓ Influx rollup bucket created: {spec.bucket}")
+    return result
+
+
+def ensure_rollup_tasks(client: InfluxDBEEGClient) -> Dict[str, str]:
+    """Create or update the rollup tasks. Returns {task_name: 'created'|'updated'}."""
+    if not client._connected:
+        client.connect()
+
+    tasks_api = client.client.tasks_api()
+    result = {}
+    for spec in ROLLUPS:
+        flux = build_task_flux(spec)
+        existing = tasks_api.find_tasks(name=spec.task_name)
+        if existing:
+            tasks_api.update_task_request(
+                existing[0].id,
+                TaskUpdateRequest(flux=flux, status="active"),
+            )
+            result[spec.task_name] = 'updated'
+        else:
+            tasks_api.create_task(task_create_request=TaskCreateRequest(
+                org=INFLUX_ORG,
+                flux=flux,
+                status="active",
+                description=f"Downsample eeg_metrics/eeg_band_power into {spec.bucket}",
+            ))
+            result[spec.task_name] = 'created'
+            print(f"✓ Influx rollup task created: {spec.task_name}")
+    return result
+
+
+def ensure_rollups(client: InfluxDBEEGClient) -> Dict[str, Dict[str, str]]:
+    """Provision buckets and tasks (idempotent)."""
+    return {
+        'buckets': ensure_rollup_buckets(client),
+        'tasks': ensure_rollup_tasks(client),
+    }
+
+
+def backfill_rollups(
+    client: InfluxDBEEGClient,
+    days: int = 30,
+    chunk_hours: int = 6,
+    specs: Optional[List[RollupSpec]] = None,
+):
+    """
+    Aggregate existing raw data into the rollup buckets.
+
+    Tasks only cover data written after they exist, so history is replayed
+    here in `chunk_hours` slices (aligned to the hour to keep windows whole).
+    """
+    if not client._connected:
+        client.connect()
+
+    stop = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    cursor = stop - timedelta(days=days)
+    chunk = timedelta(hours=chunk_hours)
+
+    for spec in specs or ROLLUPS:
+        t = cursor
+        while t < stop:
+            t_end = min(t + chunk, stop)
+            flux = build_rollup_flux(
+                spec,
+                start=t.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                stop=t_end.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            )
+            client.query_api.query(flux, org=INFLUX_ORG)
+            t = t_end
+        print(f"✓ Backfilled rollup {spec.name} ({days} d) → {spec.bucket}")
+
+
+def rollup_range(
+    client: InfluxDBEEGClient,
+    start: float,
+    stop: float,
+    specs: Optional[List[RollupSpec]] = None,
+):
+    """
+    Re-aggregate the raw data in [start, stop] (epoch seconds) into the rollups.
+
+    Used after rewriting the metrics of one recording (offline reprocessing):
+    the tasks only look back a few minutes. The range is widened to whole
+    minutes so no window is overwritten with a partial one.
+    """
+    if not client._connected:
+        client.connect()
+
+    t0 = datetime.fromtimestamp(start // 60 * 60, tz=timezone.utc)
+    t1 = datetime.fromtimestamp((stop // 60 + 1) * 60, tz=timezone.utc)
+    for spec in specs or ROLLUPS:
+        flux = build_rollup_flux(
+            spec,
+            start=t0.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            stop=t1.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        )
+        client.query_api.query(flux, org=INFLUX_ORG)
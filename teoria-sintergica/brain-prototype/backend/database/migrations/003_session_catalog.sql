@@ -0,0 +1,50 @@
+-- Migration 003: Session catalog — summary columns + keyset pagination indexes
+-- Materializes the per-session summary on eeg_recordings when a recording is
+-- closed (SessionRecorderV2.stop / POST /sessions/{id}/reclose), so listing
+-- and the documentation dashboard never re-run validation or read JSON files.
+--
+-- Sessions closed before this migration have summary_version = 0 and NULL
+-- summary columns until they are backfilled:
+--   python scripts/backfill_session_catalog.py --all
+--
+-- To apply:
+--   psql -h <host> -U brain_user -d brain_prototype -f 003_session_catalog.sql
+-- Or via tunnel:
+--   psql -h localhost -p 5433 -U brain_user -d brain_prototype -f 003_session_catalog.sql
+
+ALTER TABLE eeg_recordings
+  ADD COLUMN IF NOT EXISTS quality_score       DOUBLE PRECISION,
+  ADD COLUMN IF NOT EXISTS quality_grade       VARCHAR(2),
+  ADD COLUMN IF NOT EXISTS validation_status   VARCHAR(20),   -- excellent | good | acceptable | marginal | failed
+  ADD COLUMN IF NOT EXISTS validation_passed   INTEGER,       -- tests passed (0-3)
+  ADD COLUMN IF NOT EXISTS usable_for_training BOOLEAN,
+  ADD COLUMN IF NOT EXISTS alpha_by_phase      JSONB,         -- {"baseline_closed": {"tp9": ..., "mean": ...}, ...}
+  ADD COLUMN IF NOT EXISTS summary_version     INTEGER DEFAULT 0;
+
+UPDATE eeg_recordings
+SET summary_version = 0
+WHERE summary_version IS NULL;
+
+-- Keyset pagination: ORDER BY started_at DESC, id DESC  +  WHERE (started_at, id) < (...)
+CREATE INDEX IF NOT EXISTS idx_eeg_recordings_catalog
+  ON eeg_recordings (started_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_eeg_recordings_type_catalog
+  ON eeg_recordings (recording_type, started_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_eeg_recordings_tags
+  ON eeg_recordings USING GIN (tags);
+
+-- Verify
+SELECT
+  column_name,
+  data_type,
+  is_nullable,
+  column_default
+FROM information_schema.columns
+WHERE table_name = 'eeg_recordings'
+  AND column_name IN (
+    'quality_score', 'quality_grade', 'validation_status', 'validation_passed',
+    'usable_for_training', 'alpha_by_phase', 'summary_version'
+  )
+ORDER BY ordinal_position;
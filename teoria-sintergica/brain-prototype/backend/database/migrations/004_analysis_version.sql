@@ -0,0 +1,29 @@
+-- Migration 004: Analysis version of the stored per-window metrics
+-- Records which version of the analysis code (analysis/, EOG detector,
+-- per-channel Welch) produced the eeg_metrics / eeg_band_power points of a
+-- session, so recordings can be recomputed offline from their raw samples
+-- when the analysis changes:
+--   python scripts/reprocess_sessions.py --stale
+--
+-- analysis_version = 0 means "recorded before versioning" (unknown).
+--
+-- To apply:
+--   psql -h <host> -U brain_user -d brain_prototype -f 004_analysis_version.sql
+-- Or via tunnel:
+--   psql -h localhost -p 5433 -U brain_user -d brain_prototype -f 004_analysis_version.sql
+
+ALTER TABLE eeg_recordings
+  ADD COLUMN IF NOT EXISTS analysis_version INTEGER DEFAULT 0;
+
+UPDATE eeg_recordings
+SET analysis_version = 0
+WHERE analysis_version IS NULL;
+
+-- Verify
+SELECT
+  column_name,
+  data_type,
+  column_default
+FROM information_schema.columns
+WHERE table_name = 'eeg_recordings'
+  AND column_name = 'analysis_version';
@@ -20,6 +20,19 @@ import threading
 # Database path
 DB_PATH = Path(__file__).parent / "sessions.db"
 
+# Pragmas de cada conexión (WAL: lectores no bloquean al writer del recorder)
+_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-65536',      # 64 MB
+    'PRAGMA mmap_size=268435456',    # 256 MB
+    'PRAGMA busy_timeout=5000',
+)
+
+# Filas por fetchmany() en lecturas de samples
+_FETCH_ROWS = 65536
+
 
 @dataclass
 class SessionMetadata:
@@ -60,18 +73,37 @@ class SessionDatabase:
     """
     SQLite database manager for EEG sessions.
     
-    Thread-safe for concurrent writes during recording.
+    Thread-safe for concurrent writes during recording: one persistent
+    connection per thread (WAL), writes serialized by _lock.
     """
     
     def __init__(self, db_path: Path = DB_PATH):
         self.db_path = db_path
         self._lock = threading.Lock()
+        self._local = threading.local()
         self._init_db()
     
+    def _conn(self) -> sqlite3.Connection:
+        """Persistent connection of the calling thread."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            for pragma in _PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+        return conn
+    
+    def close(self):
+        """Close the calling thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+    
     def _init_db(self):
         """Create tables if they don't exist."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conn()
             cursor = conn.cursor()
             
             # Sessions table
@@ -108,11 +140,12 @@ class SessionDatabase:
                 )
             ''')
             
-            # Create index for faster queries
+            # Covering index: range reads by (session, time) never touch the table
             cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_eeg_session 
-                ON eeg_samples(session_id, timestamp)
+                CREATE INDEX IF NOT EXISTS idx_eeg_session_cover
+                ON eeg_samples(session_id, timestamp, tp9, af7, af8, tp10, aux)
             ''')
+            cursor.execute('DROP INDEX IF EXISTS idx_eeg_session')  # prefijo del covering
             
             # Metrics snapshots table (lower volume, computed every 200ms)
             cursor.execute('''
@@ -153,8 +186,12 @@ class SessionDatabase:
                 )
             ''')
             
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_events_session
+                ON events(session_id, timestamp)
+            ''')
+            
             conn.commit()
-            conn.close()
             
             print(f"✓ Session database initialized: {self.db_path}")
     
@@ -163,7 +200,7 @@ class SessionDatabase:
     def create_session(self, name: str = "", notes: str = "", tags: str = "") -> int:
         """Create a new recording session. Returns session ID."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conn()
             cursor = conn.cursor()
             
             start_time = datetime.now().isoformat()
@@ -177,7 +214,6 @@ class SessionDatabase:
             
             session_id = cursor.lastrowid
             conn.commit()
-            conn.close()
             
             print(f"🔴 Created recording session #{session_id}: {name}")
             return session_id
@@ -187,7 +223,7 @@ class SessionDatabase:
                     avg_signal_quality: float = 0.0) -> None:
         """Mark session as ended and update duration."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conn()
             cursor = conn.cursor()
             
             # Get start time
@@ -209,17 +245,15 @@ class SessionDatabase:
                 conn.commit()
                 print(f"⏹️ Ended session #{session_id} (duration: {duration:.1f}s)")
             
-            conn.close()
     
     def get_session(self, session_id: int) -> Optional[SessionMetadata]:
         """Get session metadata by ID."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._conn()
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
         
         cursor.execute('SELECT * FROM sessions WHERE id = ?', (session_id,))
         row = cursor.fetchone()
-        conn.close()
         
         if row:
             return SessionMetadata(
@@ -240,9 +274,9 @@ class SessionDatabase:
     
     def list_sessions(self, limit: int = 50, offset: int = 0) -> List[Dict]:
         """List recent sessions with aggregated metrics."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._conn()
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
 
         cursor.execute('''
             SELECT
@@ -271,13 +305,12 @@ class SessionDatabase:
         ''', (limit, offset))
 
         sessions = [dict(row) for row in cursor.fetchall()]
-        conn.close()
         return sessions
     
     def delete_session(self, session_id: int) -> bool:
         """Delete session and all related data."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conn()
             cursor = conn.cursor()
             
             cursor.execute('DELETE FROM eeg_samples WHERE session_id = ?', (session_id,))
@@ -287,7 +320,6 @@ class SessionDatabase:
             
             deleted = cursor.rowcount > 0
             conn.commit()
-            conn.close()
             
             if deleted:
                 print(f"🗑️ Deleted session #{session_id}")
@@ -307,7 +339,7 @@ class SessionDatabase:
             return
             
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conn()
             cursor = conn.cursor()
             
             cursor.executemany('''
@@ -316,7 +348,6 @@ class SessionDatabase:
             ''', [(session_id,) + s for s in samples])
             
             conn.commit()
-            conn.close()
     
     def get_eeg_samples(self, session_id: int, 
                         start_time: float = 0, 
@@ -327,8 +358,24 @@ class SessionDatabase:
         Returns:
             Array of shape (n_samples, 6) - [timestamp, tp9, af7, af8, tp10, aux]
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        block = self._read_eeg_block(session_id, start_time, end_time)
+        return block if len(block) else np.array([])
+    
+    def get_eeg_array(self, session_id: int,
+                      start_time: float = 0,
+                      end_time: float = None):
+        """
+        Get EEG samples as arrays (same layout as StorageBackend.get_sample_array).
+        
+        Returns:
+            (timestamps (n,), data (4, n)) - tp9, af7, af8, tp10
+        """
+        block = self._read_eeg_block(session_id, start_time, end_time)
+        return block[:, 0], block[:, 1:5].T
+    
+    def _read_eeg_block(self, session_id: int, start_time: float, end_time: float) -> np.ndarray:
+        """Range read over the covering index, streamed with fetchmany()."""
+        cursor = self._conn().cursor()
         
         if end_time:
             cursor.execute('''
@@ -345,17 +392,23 @@ class SessionDatabase:
                 ORDER BY timestamp
             ''', (session_id, start_time))
         
-        rows = cursor.fetchall()
-        conn.close()
+        # Bloques float64 por lote (NULL → nan) en lugar de una lista gigante de tuplas
+        chunks = []
+        while True:
+            rows = cursor.fetchmany(_FETCH_ROWS)
+            if not rows:
+                break
+            chunks.append(np.array(rows, dtype=np.float64))
+        cursor.close()
         
-        return np.array(rows) if rows else np.array([])
+        return np.concatenate(chunks) if chunks else np.empty((0, 6))
     
     # ==================== METRICS ====================
     
     def add_metric(self, session_id: int, timestamp: float, metrics: Dict) -> None:
         """Add a metrics snapshot."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conn()
             cursor = conn.cursor()
             
             bands = metrics.get('bands', {})
@@ -383,22 +436,35 @@ class SessionDatabase:
             ))
             
             conn.commit()
-            conn.close()
     
-    def get_metrics(self, session_id: int) -> List[Dict]:
-        """Get all metrics for a session."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+    def get_metrics(self, session_id: int, start: float = 0, end: float = None) -> List[Dict]:
+        """
+        Get the metrics of a session.
+        
+        start/end: [start, end) seconds from the first metric, as in
+        StorageBackend.iter_metrics (default: all of them).
+        """
+        conn = self._conn()
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
         
-        cursor.execute('''
-            SELECT * FROM metrics 
-            WHERE session_id = ? 
-            ORDER BY timestamp
-        ''', (session_id,))
+        query = 'SELECT * FROM metrics WHERE session_id = ?'
+        params = [session_id]
+        if start or end is not None:
+            t0 = conn.execute(
+                'SELECT MIN(timestamp) FROM metrics WHERE session_id = ?', (session_id,)
+            ).fetchone()[0]
+            if t0 is None:
+                return []
+            query += ' AND timestamp >= ?'
+            params.append(t0 + (start or 0))
+            if end is not None:
+                query += ' AND timestamp < ?'
+                params.append(t0 + end)
+        
+        cursor.execute(query + ' ORDER BY timestamp', params)
         
         metrics = [dict(row) for row in cursor.fetchall()]
-        conn.close()
         return metrics
     
     # ==================== EVENTS ====================
@@ -407,7 +473,7 @@ class SessionDatabase:
                   event_type: str, label: str = "", data: Dict = None) -> None:
         """Add an event/marker to the session."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conn()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -417,13 +483,12 @@ class SessionDatabase:
                   json.dumps(data) if data else None))
             
             conn.commit()
-            conn.close()
     
     def get_events(self, session_id: int) -> List[Dict]:
         """Get all events for a session."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._conn()
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
         
         cursor.execute('''
             SELECT * FROM events 
@@ -438,7 +503,6 @@ class SessionDatabase:
                 event['data'] = json.loads(event['data'])
             events.append(event)
         
-        conn.close()
         return events
     
     # ==================== ANALYSIS HELPERS ====================
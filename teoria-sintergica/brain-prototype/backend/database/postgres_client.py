@@ -9,16 +9,21 @@ Handles:
 
 import os
 import asyncio
+import threading
+from contextlib import contextmanager
 import asyncpg
 try:
     import psycopg2
-    from psycopg2.extras import RealDictCursor
+    from psycopg2.extras import RealDictCursor, Json
+    from psycopg2.pool import ThreadedConnectionPool
 except ImportError:
     psycopg2 = None  # type: ignore
     RealDictCursor = None  # type: ignore
-from typing import Optional, Dict, List
+    Json = None  # type: ignore
+    ThreadedConnectionPool = None  # type: ignore
+from typing import Optional, Dict, List, Tuple
 from datetime import datetime
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 
 
 # Connection settings
@@ -28,6 +33,13 @@ POSTGRES_DB = os.getenv('POSTGRES_DB', 'brain_prototype')
 POSTGRES_USER = os.getenv('POSTGRES_USER', 'brain_user')
 POSTGRES_PASSWORD = os.getenv('POSTGRES_PASSWORD', 'sintergic2024')
 
+# Pool settings (sync psycopg2 pool and async asyncpg pool)
+POSTGRES_POOL_MIN = int(os.getenv('POSTGRES_POOL_MIN', 1))
+POSTGRES_POOL_MAX = int(os.getenv('POSTGRES_POOL_MAX', 10))
+POSTGRES_STATEMENT_TIMEOUT_MS = int(os.getenv('POSTGRES_STATEMENT_TIMEOUT_MS', 15000))  # 0 = sin límite
+# asyncpg statement cache (prepared statements); 0 detrás de pgbouncer en modo transaction
+POSTGRES_STATEMENT_CACHE_SIZE = int(os.getenv('POSTGRES_STATEMENT_CACHE_SIZE', 100))
+
 
 @dataclass
 class EEGRecording:
@@ -72,6 +84,35 @@ class EEGRecording:
     # 0 = no per-channel data (pre-migration), 1 = current schema
     per_channel_version: int = 0
 
+    # Session summary materialized at close (migration 003)
+    quality_score: float = None
+    quality_grade: str = None
+    validation_status: str = None
+    validation_passed: int = None
+    usable_for_training: bool = None
+    alpha_by_phase: Dict[str, Dict[str, float]] = None
+    # 0 = not computed yet, 1 = current schema
+    summary_version: int = 0
+
+    # Analysis code version of the stored metrics (migration 004):
+    # 0 = unknown (recorded before versioning), N = database.reprocess.ANALYSIS_VERSION
+    analysis_version: int = 0
+
+    def to_dict(self) -> Dict:
+        """JSON-ready dict (ISO datetimes) without asdict()'s deep copies."""
+        d = {f.name: getattr(self, f.name) for f in fields(self)}
+        for k in ('started_at', 'ended_at'):
+            if d[k] is not None and hasattr(d[k], 'isoformat'):
+                d[k] = d[k].isoformat()
+        return d
+
+
+# Columnas del resumen de sesión (migration 003), en el orden de update_summary()
+SUMMARY_COLUMNS = (
+    'quality_score', 'quality_grade', 'validation_status', 'validation_passed',
+    'usable_for_training', 'alpha_by_phase', 'summary_version',
+)
+
 
 class PostgresClient:
     """
@@ -106,8 +147,10 @@ class PostgresClient:
                 database=POSTGRES_DB,
                 user=POSTGRES_USER,
                 password=POSTGRES_PASSWORD,
-                min_size=2,
-                max_size=10
+                min_size=min(POSTGRES_POOL_MIN, POSTGRES_POOL_MAX),
+                max_size=POSTGRES_POOL_MAX,
+                statement_cache_size=POSTGRES_STATEMENT_CACHE_SIZE,
+                server_settings={'statement_timeout': str(POSTGRES_STATEMENT_TIMEOUT_MS)}
             )
             self._connected = True
             print(f"✓ PostgreSQL connected: {POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}")
@@ -298,11 +341,18 @@ class PostgresClient:
 class PostgresClientSync:
     """
     Sync (psycopg2) PostgreSQL client for brain prototype.
-    Used in threads and non-async contexts (RecorderV2, scripts).
+    Used in threads and non-async contexts (RecorderV2, scripts,
+    endpoints via asyncio.to_thread).
+    
+    Thread-safe: every call checks out its own connection from a
+    ThreadedConnectionPool (POSTGRES_POOL_MIN/MAX). When the pool is
+    exhausted callers wait instead of failing.
     """
 
     def __init__(self):
-        self._conn = None
+        self._pool: Optional[ThreadedConnectionPool] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._pool_lock = threading.Lock()
         self._connected = False
 
     def _row_to_recording(self, row) -> EEGRecording:
@@ -344,29 +394,72 @@ class PostgresClientSync:
         )
     
     def connect(self):
-        """Connect to PostgreSQL synchronously."""
+        """Create the connection pool (idempotent)."""
         if self._connected:
             return
-        try:
-            self._conn = psycopg2.connect(
-                host=POSTGRES_HOST,
-                port=POSTGRES_PORT,
-                database=POSTGRES_DB,
-                user=POSTGRES_USER,
-                password=POSTGRES_PASSWORD
-            )
-            self._connected = True
-            print(f"✓ PostgreSQL connected (sync): {POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}")
-        except Exception as e:
-            print(f"⚠️ PostgreSQL sync connection failed: {e}")
-            raise
+        with self._pool_lock:
+            if self._connected:
+                return
+            try:
+                options = f'-c statement_timeout={POSTGRES_STATEMENT_TIMEOUT_MS}' if POSTGRES_STATEMENT_TIMEOUT_MS else None
+                self._pool = ThreadedConnectionPool(
+                    min(POSTGRES_POOL_MIN, POSTGRES_POOL_MAX),
+                    POSTGRES_POOL_MAX,
+                    host=POSTGRES_HOST,
+                    port=POSTGRES_PORT,
+                    database=POSTGRES_DB,
+                    user=POSTGRES_USER,
+                    password=POSTGRES_PASSWORD,
+                    options=options
+                )
+                self._slots = threading.BoundedSemaphore(POSTGRES_POOL_MAX)
+                self._connected = True
+                print(f"✓ PostgreSQL connected (sync): {POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB} "
+                      f"(pool {POSTGRES_POOL_MIN}-{POSTGRES_POOL_MAX})")
+            except Exception as e:
+                print(f"⚠️ PostgreSQL sync connection failed: {e}")
+                raise
     
     def close(self):
-        """Close connection."""
-        if self._conn:
-            self._conn.close()
+        """Close every pooled connection."""
+        with self._pool_lock:
+            if self._pool:
+                self._pool.closeall()
+                self._pool = None
             self._connected = False
     
+    @contextmanager
+    def _cursor(self, dict_rows: bool = False):
+        """
+        Check out a pooled connection for one unit of work.
+        
+        Commits on success, rolls back on error, always returns the
+        connection (discarding it if the server closed it).
+        """
+        if not self._connected:
+            self.connect()
+        
+        self._slots.acquire()
+        conn = None
+        broken = False
+        try:
+            conn = self._pool.getconn()
+            cursor_factory = RealDictCursor if dict_rows else None
+            with conn.cursor(cursor_factory=cursor_factory) as cur:
+                yield cur
+            conn.commit()
+        except Exception:
+            if conn is not None:
+                if conn.closed:
+                    broken = True
+                else:
+                    conn.rollback()
+            raise
+        finally:
+            if conn is not None:
+                self._pool.putconn(conn, close=broken or bool(conn.closed))
+            self._slots.release()
+    
     def create_recording(
         self, 
         name: str = "",
@@ -378,20 +471,16 @@ class PostgresClientSync:
         recording_type: str = "session"
     ) -> int:
         """Create a new recording entry."""
-        if not self._connected:
-            self.connect()
-        
         if not name:
             name = f"Recording {datetime.now().strftime('%Y-%m-%d %H:%M')}"
         
-        with self._conn.cursor() as cur:
+        with self._cursor() as cur:
             cur.execute("""
                 INSERT INTO eeg_recordings 
                 (name, notes, tags, device, device_address, sampling_rate, recording_type, started_at)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
                 RETURNING id
             """, (name, notes, tags or [], device, device_address, sampling_rate, recording_type))
-            self._conn.commit()
             recording_id = cur.fetchone()[0]
         
         print(f"📝 Recording created: #{recording_id} - {name}")
@@ -415,9 +504,6 @@ class PostgresClientSync:
         aggregated_metrics: dict = None
     ) -> Optional[EEGRecording]:
         """End a recording and update metadata."""
-        if not self._connected:
-            self.connect()
-        
         # Extract values from aggregated_metrics if provided
         if aggregated_metrics:
             avg_coherence = aggregated_metrics.get('avg_coherence', avg_coherence)
@@ -457,7 +543,7 @@ class PostgresClientSync:
         posterior_asymmetry_mean = to_native(aggregated_metrics.get('posterior_asymmetry_mean')) if aggregated_metrics else None
         per_channel_version = int(aggregated_metrics.get('per_channel_version', 0)) if aggregated_metrics else 0
 
-        with self._conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with self._cursor(dict_rows=True) as cur:
             cur.execute("""
                 UPDATE eeg_recordings SET
                     ended_at = NOW(),
@@ -491,7 +577,6 @@ class PostgresClientSync:
                 faa_mean, faa_baseline_closed, posterior_asymmetry_mean, per_channel_version,
                 recording_id
             ))
-            self._conn.commit()
             row = cur.fetchone()
         
         if row:
@@ -501,10 +586,7 @@ class PostgresClientSync:
     
     def get_recording(self, recording_id: int) -> Optional[EEGRecording]:
         """Get a recording by ID."""
-        if not self._connected:
-            self.connect()
-        
-        with self._conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with self._cursor(dict_rows=True) as cur:
             cur.execute("SELECT * FROM eeg_recordings WHERE id = %s", (recording_id,))
             row = cur.fetchone()
         
@@ -512,10 +594,7 @@ class PostgresClientSync:
     
     def get_all_recordings(self, limit: int = 50, offset: int = 0) -> List[EEGRecording]:
         """Get all recordings with pagination."""
-        if not self._connected:
-            self.connect()
-        
-        with self._conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with self._cursor(dict_rows=True) as cur:
             cur.execute("""
                 SELECT * FROM eeg_recordings 
                 ORDER BY started_at DESC 
@@ -525,6 +604,76 @@ class PostgresClientSync:
         
         return [self._row_to_recording(row) for row in rows]
     
+    def list_recordings_catalog(
+        self,
+        limit: int = 50,
+        after: Optional[Tuple[datetime, int]] = None,
+        tag: Optional[str] = None,
+        recording_type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> List[EEGRecording]:
+        """
+        Keyset-paginated listing (started_at DESC, id DESC) with filters.
+        
+        `after` is the (started_at, id) of the last row of the previous page.
+        Served by idx_eeg_recordings_catalog / _tags (migration 003).
+        """
+        where, params = [], []
+        if after is not None:
+            where.append("(started_at, id) < (%s, %s)")
+            params.extend(after)
+        if tag:
+            where.append("tags @> ARRAY[%s]::TEXT[]")
+            params.append(tag)
+        if recording_type:
+            where.append("recording_type = %s")
+            params.append(recording_type)
+        if since:
+            where.append("started_at >= %s")
+            params.append(since)
+        if until:
+            where.append("started_at < %s")
+            params.append(until)
+        
+        query = "SELECT * FROM eeg_recordings"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY started_at DESC, id DESC LIMIT %s"
+        params.append(limit)
+        
+        with self._cursor(dict_rows=True) as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+        
+        return [self._row_to_recording(row) for row in rows]
+    
+    def update_summary(self, recording_id: int, summary: Dict) -> bool:
+        """Persist the session summary columns (migration 003)."""
+        values = [summary.get(col) for col in SUMMARY_COLUMNS]
+        alpha_idx = SUMMARY_COLUMNS.index('alpha_by_phase')
+        if values[alpha_idx] is not None:
+            values[alpha_idx] = Json(values[alpha_idx])
+        
+        assignments = ', '.join(f'{col} = %s' for col in SUMMARY_COLUMNS)
+        with self._cursor() as cur:
+            cur.execute(f"UPDATE eeg_recordings SET {assignments} WHERE id = %s", (*values, recording_id))
+            return cur.rowcount > 0
+    
+    def set_analysis_version(self, recording_id: int, version: int) -> bool:
+        """Stamp the analysis version of the stored metrics (migration 004)."""
+        with self._cursor() as cur:
+            cur.execute("UPDATE eeg_recordings SET analysis_version = %s WHERE id = %s", (version, recording_id))
+            return cur.rowcount > 0
+    
+    def delete_recording(self, recording_id: int) -> bool:
+        """Delete a recording row."""
+        with self._cursor() as cur:
+            cur.execute("DELETE FROM eeg_recordings WHERE id = %s", (recording_id,))
+            deleted = cur.rowcount > 0
+        
+        return deleted
+    
     def _row_to_recording(self, row: dict) -> EEGRecording:
         """Convert database row to EEGRecording."""
         return EEGRecording(
@@ -561,6 +710,14 @@ class PostgresClientSync:
             faa_baseline_closed=row.get('faa_baseline_closed'),
             posterior_asymmetry_mean=row.get('posterior_asymmetry_mean'),
             per_channel_version=row.get('per_channel_version', 0) or 0,
+            quality_score=row.get('quality_score'),
+            quality_grade=row.get('quality_grade'),
+            validation_status=row.get('validation_status'),
+            validation_passed=row.get('validation_passed'),
+            usable_for_training=row.get('usable_for_training'),
+            alpha_by_phase=row.get('alpha_by_phase'),
+            summary_version=row.get('summary_version', 0) or 0,
+            analysis_version=row.get('analysis_version', 0) or 0,
         )
 
 
@@ -1,9 +1,11 @@
 """
-Session Recorder v2 - Records EEG data using PostgreSQL + InfluxDB.
+Session Recorder v2 - Records EEG data through a StorageBackend.
 
-Architecture:
+Architecture (default backend, EEG_STORAGE_BACKEND=influx):
 - PostgreSQL: Session metadata (eeg_recordings table)
 - InfluxDB: Time-series data (samples, metrics, events)
+
+With EEG_STORAGE_BACKEND=embedded everything goes to SQLite + local files.
 """
 
 import time
@@ -12,13 +14,79 @@ import numpy as np
 from typing import Optional, Dict, Callable, List
 from datetime import datetime
 
-from .postgres_client import get_postgres_client_sync, PostgresClientSync, EEGRecording
-from .influx_client import get_influx_client, InfluxDBEEGClient, EEGSample, MetricSnapshot
+from .influx_client import MetricSnapshot
+from .storage import StorageBackend, get_storage_backend
+from .session_aggregator import SessionAggregator
+from .session_archive import SessionArchiveWriter, ARCHIVE_ENABLED
+from .session_summary import compute_session_summary
+from .recording_cache import get_recording_cache
+from .reprocess import ANALYSIS_VERSION
+
+
+def _finalize_closed_recording(storage: StorageBackend, recording_id: int, per_channel_by_phase: Optional[Dict]):
+    """
+    Post-stop en background: precarga el read cache y calcula el summary del
+    catálogo con las métricas/eventos ya cacheados (una sola lectura completa).
+    """
+    cache = get_recording_cache()
+    cache.warm(storage, recording_id)
+    try:
+        metrics, _ = cache.read(storage, recording_id, 'metrics')
+        events, _ = cache.read(storage, recording_id, 'events')
+        summary = compute_session_summary(metrics, events, per_channel_by_phase)
+        storage.update_summary(recording_id, summary)
+        print(f"  🎯 #{recording_id} summary: {summary.get('quality_grade')} / {summary.get('validation_status')}")
+    except Exception as e:
+        print(f"⚠️ Session summary not materialized (run migration 003?): {e}")
+
+
+class SampleBlockBuffer:
+    """
+    Growable columnar buffer: timestamps (n,) + channel matrix (channels, n).
+    
+    Preallocated NumPy storage; appending a window is two slice copies.
+    Not thread-safe (the recorder guards it with _buffer_lock).
+    """
+    
+    CHANNELS = 5  # tp9, af7, af8, tp10, aux
+    
+    def __init__(self, capacity: int = 1024):
+        self._timestamps = np.empty(capacity, dtype=np.float64)
+        self._data = np.zeros((self.CHANNELS, capacity), dtype=np.float64)
+        self._n = 0
+    
+    def __len__(self) -> int:
+        return self._n
+    
+    def append(self, timestamps: np.ndarray, data: np.ndarray):
+        """Append a (channels, k) window; missing channels stay at 0."""
+        k = len(timestamps)
+        needed = self._n + k
+        if needed > len(self._timestamps):
+            capacity = max(needed, 2 * len(self._timestamps))
+            timestamps_new = np.empty(capacity, dtype=np.float64)
+            data_new = np.zeros((self.CHANNELS, capacity), dtype=np.float64)
+            timestamps_new[:self._n] = self._timestamps[:self._n]
+            data_new[:, :self._n] = self._data[:, :self._n]
+            self._timestamps, self._data = timestamps_new, data_new
+        
+        rows = min(data.shape[0], self.CHANNELS)
+        self._timestamps[self._n:needed] = timestamps
+        self._data[:rows, self._n:needed] = data[:rows]
+        self._data[rows:, self._n:needed] = 0.0
+        self._n = needed
+    
+    def view(self):
+        """(timestamps, data) views of the filled part — valid until clear()."""
+        return self._timestamps[:self._n], self._data[:, :self._n]
+    
+    def clear(self):
+        self._n = 0
 
 
 class SessionRecorderV2:
     """
-    Records Muse EEG sessions to PostgreSQL + InfluxDB.
+    Records Muse EEG sessions through a StorageBackend (PostgreSQL + InfluxDB by default).
     
     Usage:
         recorder = SessionRecorderV2(muse_connector)
@@ -31,14 +99,14 @@ class SessionRecorderV2:
         summary = recorder.stop()
     """
     
-    def __init__(self, muse_connector):
+    def __init__(self, muse_connector, storage: StorageBackend = None):
         """
         Args:
             muse_connector: MuseConnector instance for getting EEG data
+            storage: Storage backend (default: get_storage_backend())
         """
         self.muse_connector = muse_connector
-        self.postgres: PostgresClientSync = get_postgres_client_sync()
-        self.influx: InfluxDBEEGClient = get_influx_client()
+        self.storage: StorageBackend = storage or get_storage_backend()
         
         self._recording = False
         self._recording_id: Optional[int] = None
@@ -49,11 +117,17 @@ class SessionRecorderV2:
         self._stop_event = threading.Event()
         
         # Buffers for batch inserts
-        self._sample_buffer: List[EEGSample] = []
+        self._sample_buffer = SampleBlockBuffer(capacity=512)
         self._metrics_buffer: List[MetricSnapshot] = []
         self._buffer_lock = threading.Lock()
         self._flush_interval = 1.0  # seconds
         
+        # Agregados incrementales (stop() no re-consulta el storage)
+        self._aggregator = SessionAggregator()
+        
+        # Session archive (chunked binary copy of raw samples for playback)
+        self._archive_writer: Optional[SessionArchiveWriter] = None
+        
         # Callbacks
         self._on_metrics: Optional[Callable] = None
         
@@ -67,16 +141,11 @@ class SessionRecorderV2:
         self._connect()
     
     def _connect(self):
-        """Connect to databases."""
-        try:
-            self.postgres.connect()
-        except Exception as e:
-            print(f"⚠️ PostgreSQL connection failed: {e}")
-        
+        """Connect to storage."""
         try:
-            self.influx.connect()
+            self.storage.connect()
         except Exception as e:
-            print(f"⚠️ InfluxDB connection failed: {e}")
+            print(f"⚠️ Storage ({self.storage.name}) connection failed: {e}")
     
     @property
     def is_recording(self) -> bool:
@@ -127,13 +196,11 @@ class SessionRecorderV2:
         if not self.muse_connector.is_streaming:
             raise RuntimeError("Muse not streaming. Start stream first.")
         
-        # Verify InfluxDB is reachable before starting — fail loudly
+        # Verify storage is reachable before starting — fail loudly
         try:
-            self.influx.connect()
-            if not self.influx._connected:
-                raise RuntimeError("InfluxDB is not reachable. Cannot start recording without time-series storage.")
+            self.storage.connect()
         except Exception as e:
-            raise RuntimeError(f"InfluxDB connection failed: {e}. Cannot start recording.")
+            raise RuntimeError(f"Storage ({self.storage.name}) connection failed: {e}. Cannot start recording.")
 
         # Get device info
         device_address = ""
@@ -143,8 +210,8 @@ class SessionRecorderV2:
         # Parse tags
         tags_list = [t.strip() for t in tags.split(',') if t.strip()] if tags else []
         
-        # Create recording in PostgreSQL
-        self._recording_id = self.postgres.create_recording(
+        # Create recording (PostgreSQL / embedded catalog)
+        self._recording_id = self.storage.create_recording(
             name=name,
             notes=notes,
             tags=tags_list,
@@ -160,15 +227,17 @@ class SessionRecorderV2:
         self._samples_recorded = 0
         self._metrics_recorded = 0
         self._influx_failures = 0
+        self._aggregator = SessionAggregator()
+        self._archive_writer = self._open_archive_writer(name)
         self._stop_event.clear()
         
         print(f"""\n{'='*60}
 🔴 RECORDING STARTED
-   PostgreSQL ID : #{self._recording_id}
+   Recording ID  : #{self._recording_id}
    Name          : {name or '(auto)'}
    Tags          : {tags or '(none)'}
    Base timestamp: {self._base_timestamp.isoformat()}Z
-   InfluxDB bucket: eeg-data  measurement: eeg_samples + eeg_metrics
+   Storage       : {self.storage.name}
 {'='*60}""")
         
         # Start sample collection thread
@@ -202,6 +271,7 @@ class SessionRecorderV2:
         
         # Flush remaining buffers
         self._flush_buffers()
+        self._close_archive_writer()
         
         # Calculate average signal quality
         avg_quality = 0.5
@@ -210,37 +280,27 @@ class SessionRecorderV2:
             if quality:
                 avg_quality = float(sum(quality.values()) / len(quality))
         
-        # Get aggregated metrics from InfluxDB
-        aggregated_metrics = {}
-        try:
-            aggregated_metrics = self.influx.get_aggregated_metrics(self._recording_id)
-            # Convert numpy types to native Python types
-            for key, value in aggregated_metrics.items():
-                if hasattr(value, 'item'):  # numpy scalar
-                    aggregated_metrics[key] = value.item()
-                elif value is not None:
-                    aggregated_metrics[key] = float(value)
-        except Exception as e:
-            print(f"⚠️ Failed to get aggregated metrics: {e}")
-
-        # Get per-channel aggregates (FAA, per-channel alpha averages, etc.)
-        try:
-            per_channel_agg = self.influx.get_per_channel_aggregates(self._recording_id)
-            aggregated_metrics.update(per_channel_agg)
-            if per_channel_agg.get('per_channel_version', 0) == 1:
-                print(f"  📊 [per-channel] α_tp9={per_channel_agg.get('alpha_tp9_avg', 'n/a'):.3f}  "
-                      f"α_af7={per_channel_agg.get('alpha_af7_avg', 'n/a'):.3f}  "
-                      f"α_af8={per_channel_agg.get('alpha_af8_avg', 'n/a'):.3f}  "
-                      f"α_tp10={per_channel_agg.get('alpha_tp10_avg', 'n/a'):.3f}  "
-                      f"FAA={per_channel_agg.get('faa_mean', 'n/a')}")
-        except Exception as e:
-            print(f"⚠️ Failed to get per-channel aggregates: {e}")
+        # Session aggregates: in-memory accumulators (O(1)), storage as fallback
+        if self._aggregator.metrics_count > 0:
+            aggregated_metrics = self._aggregator.finalize()
+        else:
+            aggregated_metrics = self._aggregate_from_storage()
+        
+        if aggregated_metrics.get('per_channel_version', 0) == 1:
+            try:
+                print(f"  📊 [per-channel] α_tp9={aggregated_metrics.get('alpha_tp9_avg', 'n/a'):.3f}  "
+                      f"α_af7={aggregated_metrics.get('alpha_af7_avg', 'n/a'):.3f}  "
+                      f"α_af8={aggregated_metrics.get('alpha_af8_avg', 'n/a'):.3f}  "
+                      f"α_tp10={aggregated_metrics.get('alpha_tp10_avg', 'n/a'):.3f}  "
+                      f"FAA={aggregated_metrics.get('faa_mean', 'n/a')}")
+            except (TypeError, ValueError):
+                pass  # algún canal sin datos (None)
         
         # Calculate duration
         duration = float(time.time() - self._start_time)
         
-        # End recording in PostgreSQL
-        recording = self.postgres.end_recording(
+        # End recording (PostgreSQL / embedded catalog)
+        recording = self.storage.end_recording(
             self._recording_id,
             duration_seconds=duration,
             calibration_passed=calibration_passed,
@@ -250,6 +310,31 @@ class SessionRecorderV2:
             aggregated_metrics=aggregated_metrics
         )
         
+        # Métricas calculadas en vivo con el análisis actual (--stale las salta)
+        try:
+            self.storage.set_analysis_version(self._recording_id, ANALYSIS_VERSION)
+        except Exception as e:
+            print(f"⚠️ Analysis version not stamped (run migration 004?): {e}")
+        
+        # La grabación ya es inmutable: precargar el read cache y materializar el
+        # summary del catálogo (quality grade, validation, alpha por fase) sin bloquear stop()
+        per_channel_by_phase = self._aggregator.by_phase()
+        threading.Thread(
+            target=_finalize_closed_recording,
+            args=(self.storage, self._recording_id, per_channel_by_phase),
+            daemon=True
+        ).start()
+        
+        # Features por ventana (ai/feature_store.py) desde las muestras crudas, en background,
+        # y luego al índice de momentos similares (ai/similarity_index.py)
+        try:
+            from ai.feature_store import FEATURE_STORE_ON_STOP, build_in_background
+            from ai.similarity_index import index_session
+            if FEATURE_STORE_ON_STOP:
+                build_in_background(self.storage, self._recording_id, on_built=index_session)
+        except ImportError as e:
+            print(f"⚠️ Feature store unavailable: {e}")
+        
         # Build summary
         summary = {
             'recording_id': self._recording_id,
@@ -259,7 +344,11 @@ class SessionRecorderV2:
             'metrics_count': self._metrics_recorded,
             'calibration_passed': calibration_passed,
             'avg_signal_quality': avg_quality,
-            'aggregated_metrics': aggregated_metrics
+            'aggregated_metrics': aggregated_metrics,
+            'per_channel_by_phase': per_channel_by_phase,
+            # Se materializan en background: GET /sessions/{id} cuando estén
+            'quality_grade': None,
+            'validation_status': None
         }
         
         influx_summary = aggregated_metrics
@@ -267,22 +356,31 @@ class SessionRecorderV2:
 ⏹️  RECORDING STOPPED  #{summary['recording_id']}
    Duration       : {duration:.1f}s
 ───────────────────────────────────────────────────────────
-   PostgreSQL     : ID #{summary['recording_id']} updated ✓
+   Catalog        : ID #{summary['recording_id']} updated ✓ ({self.storage.name})
      duration_seconds : {duration:.1f}
      sample_count     : {self._samples_recorded}
      metrics_count    : {self._metrics_recorded}
 ───────────────────────────────────────────────────────────
-   InfluxDB       : eeg-data bucket
+   Aggregates
      avg_coherence    : {influx_summary.get('avg_coherence', 'n/a')}
      avg_alpha        : {influx_summary.get('avg_alpha', 'n/a')}
      avg_theta        : {influx_summary.get('avg_theta', 'n/a')}
      avg_signal_qual  : {avg_quality:.2f}
+     quality / valid. : pending (background)
 {'='*60}\n""")
         
         self._recording_id = None
         
         return summary
     
+    def _aggregate_from_storage(self) -> Dict:
+        """Fallback: recompute session aggregates from stored data."""
+        try:
+            return self.storage.compute_aggregates(self._recording_id)
+        except Exception as e:
+            print(f"⚠️ Failed to get aggregated metrics: {e}")
+            return {}
+    
     def add_marker(self, label: str, event_type: str = "marker", data: Dict = None):
         """
         Add an event marker to the recording.
@@ -298,9 +396,10 @@ class SessionRecorderV2:
             return
         
         timestamp = time.time() - self._start_time
+        self._aggregator.add_marker(label, timestamp)
         
         try:
-            self.influx.write_event(
+            self.storage.write_event(
                 recording_id=self._recording_id,
                 timestamp=timestamp,
                 event_type=event_type,
@@ -335,25 +434,18 @@ class SessionRecorderV2:
                     # Calculate timestamps for each sample
                     current_time = time.time() - self._start_time
                     sample_duration = n_samples / window.fs
+                    timestamps = current_time - sample_duration + np.arange(n_samples) / window.fs
                     
                     with self._buffer_lock:
-                        for i in range(n_samples):
-                            t = current_time - sample_duration + (i / window.fs)
-                            sample = EEGSample(
-                                timestamp=t,
-                                tp9=float(data[0, i]) if data.shape[0] > 0 else 0,
-                                af7=float(data[1, i]) if data.shape[0] > 1 else 0,
-                                af8=float(data[2, i]) if data.shape[0] > 2 else 0,
-                                tp10=float(data[3, i]) if data.shape[0] > 3 else 0,
-                                aux=float(data[4, i]) if data.shape[0] > 4 else 0
-                            )
-                            self._sample_buffer.append(sample)
-                            self._samples_recorded += 1
+                        self._sample_buffer.append(timestamps, data)
+                        self._samples_recorded += n_samples
                 
-                # Flush buffer periodically
+                # Flush buffers periodically (metrics too: the Influx rollup
+                # tasks only re-aggregate the last minutes of data)
                 now = time.time()
                 if now - last_flush >= self._flush_interval:
                     self._flush_samples()
+                    self._flush_metrics()
                     last_flush = now
                 
                 # Heartbeat every 10s
@@ -434,6 +526,7 @@ class SessionRecorderV2:
                     with self._buffer_lock:
                         self._metrics_buffer.append(snapshot)
                         self._metrics_recorded += 1
+                    self._aggregator.add_metrics(snapshot)
                     
                     # Callback if set
                     if self._on_metrics:
@@ -457,8 +550,9 @@ class SessionRecorderV2:
                                     bands_per_channel[band_name] = {}
                                 bands_per_channel[band_name][ch_name] = raw_val
 
+                        self._aggregator.add_band_power(timestamp, bands_per_channel)
                         ts_ns = int((self._base_timestamp.timestamp() + timestamp) * 1e9)
-                        self.influx.write_band_power_per_channel(
+                        self.storage.write_band_power(
                             recording_id=self._recording_id,
                             ts_ns=ts_ns,
                             channel_bands=bands_per_channel,
@@ -478,19 +572,22 @@ class SessionRecorderV2:
         self._flush_metrics()
     
     def _flush_samples(self):
-        """Flush sample buffer to InfluxDB. Does NOT clear the buffer on failure."""
+        """Flush sample buffer to storage. Does NOT clear the buffer on failure."""
         with self._buffer_lock:
-            if self._sample_buffer and self._recording_id:
+            if len(self._sample_buffer) and self._recording_id:
                 n = len(self._sample_buffer)
+                timestamps, data = self._sample_buffer.view()
                 try:
-                    self.influx.write_samples(
+                    self.storage.write_sample_block(
                         recording_id=self._recording_id,
-                        samples=self._sample_buffer,
+                        timestamps=timestamps,
+                        data=data,
                         base_timestamp=self._base_timestamp
                     )
-                    self._sample_buffer = []  # Only clear on success
+                    self._archive_samples(timestamps, data)
+                    self._sample_buffer.clear()  # Only clear on success
                     self._influx_failures = 0
-                    print(f"  📥 [InfluxDB] #{self._recording_id}: wrote {n} samples (total: {self._samples_recorded})")
+                    print(f"  📥 [{self.storage.name}] #{self._recording_id}: wrote {n} samples (total: {self._samples_recorded})")
                 except Exception as e:
                     self._influx_failures += 1
                     print(f"❌ CRITICAL: InfluxDB sample write failed (attempt {self._influx_failures}): {e}")
@@ -500,19 +597,59 @@ class SessionRecorderV2:
                         self._recording = False
                         self._stop_event.set()
     
+    # ==================== SESSION ARCHIVE ====================
+    
+    def _open_archive_writer(self, name: str) -> Optional[SessionArchiveWriter]:
+        """Archive writer for backends that don't write one natively (best-effort)."""
+        if not ARCHIVE_ENABLED or self.storage.native_archive:
+            return None
+        try:
+            return SessionArchiveWriter(
+                self.storage.archive_dir(self._recording_id),
+                fs=256,
+                metadata={
+                    'recording_id': self._recording_id,
+                    'name': name,
+                    'base_timestamp': self._base_timestamp.isoformat() + 'Z',
+                }
+            )
+        except Exception as e:
+            print(f"⚠️ Session archive disabled for #{self._recording_id}: {e}")
+            return None
+    
+    def _archive_samples(self, timestamps: np.ndarray, data: np.ndarray):
+        """Append flushed samples to the archive. Never blocks the recording."""
+        if self._archive_writer is None:
+            return
+        try:
+            self._archive_writer.append(self._base_timestamp.timestamp() + timestamps, data[:4])
+        except Exception as e:
+            print(f"⚠️ Session archive write failed, disabling archive: {e}")
+            self._archive_writer = None
+    
+    def _close_archive_writer(self):
+        if self._archive_writer is None:
+            return
+        try:
+            self._archive_writer.close()
+            print(f"  📼 Session archive: {self._archive_writer.n_samples} samples → {self._archive_writer.path}")
+        except Exception as e:
+            print(f"⚠️ Session archive close failed: {e}")
+        self._archive_writer = None
+    
     def _flush_metrics(self):
-        """Flush metrics buffer to InfluxDB. Does NOT clear the buffer on failure."""
+        """Flush metrics buffer to storage. Does NOT clear the buffer on failure."""
         with self._buffer_lock:
             if self._metrics_buffer and self._recording_id:
                 n = len(self._metrics_buffer)
                 try:
-                    self.influx.write_metrics(
+                    self.storage.write_metrics(
                         recording_id=self._recording_id,
                         metrics=self._metrics_buffer,
                         base_timestamp=self._base_timestamp
                     )
                     self._metrics_buffer = []  # Only clear on success
-                    print(f"  📊 [InfluxDB] #{self._recording_id}: wrote {n} metric snapshots (total: {self._metrics_recorded})")
+                    print(f"  📊 [{self.storage.name}] #{self._recording_id}: wrote {n} metric snapshots (total: {self._metrics_recorded})")
                 except Exception as e:
                     print(f"❌ CRITICAL: InfluxDB metrics write failed: {e}")
                     print(f"   {n} metric snapshots retained in buffer for retry.")
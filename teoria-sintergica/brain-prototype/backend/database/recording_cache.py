@@ -0,0 +1,263 @@
+"""
+Read cache for completed recordings.
+
+Una grabación cerrada (ended_at != NULL) no cambia: samples, métricas,
+eventos y series por canal son inmutables hasta un reclose o delete. Las
+lecturas se guardan por (recording_id, view, params) como pickle:
+
+- memoria: LRU con presupuesto en bytes (RECORDING_CACHE_MAX_MB)
+- disco (opcional): RECORDING_CACHE_DIR/<id>/<view>-<hash>.pkl, sobrevive reinicios
+
+Cada entrada lleva un ETag (hash del contenido) para responder 304 sin
+volver a leer nada. Sólo reclose / delete invalidan (invalidate()).
+
+Uso:
+    cache = get_recording_cache()
+    metrics, etag = cache.read(storage, 26, 'metrics')
+    value, etag = cache.read(storage, 26, 'validation', loader=lambda: run(...))
+"""
+
+import os
+import pickle
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+
+RECORDING_CACHE_ENABLED = os.getenv('RECORDING_CACHE_ENABLED', 'true').lower() == 'true'
+RECORDING_CACHE_MAX_MB = float(os.getenv('RECORDING_CACHE_MAX_MB', '256'))
+RECORDING_CACHE_DIR = os.getenv('RECORDING_CACHE_DIR', '')  # vacío = sin tier en disco
+
+# view → método del StorageBackend (loader por defecto)
+STORAGE_VIEWS = {
+    'metrics': 'get_metrics',
+    'events': 'get_events',
+    'per_channel': 'get_per_channel_metrics',
+    'per_channel_by_phase': 'get_per_channel_by_phase',
+    'sample_array': 'get_sample_array',
+}
+
+# Vistas que se precargan al cerrar una grabación (recorder.stop)
+WARM_VIEWS = ('metrics', 'events', 'per_channel_by_phase')
+
+
+def _is_empty(value: Any) -> bool:
+    """Resultados vacíos no se cachean (fallback legacy / datos aún no escritos)."""
+    if value is None:
+        return True
+    if isinstance(value, tuple) and value and hasattr(value[0], '__len__'):
+        return len(value[0]) == 0  # (timestamps, data)
+    return hasattr(value, '__len__') and len(value) == 0
+
+
+class RecordingCache:
+    """LRU por bytes (+ disco opcional) de lecturas de grabaciones cerradas."""
+
+    def __init__(self, max_bytes: int, disk_dir: Optional[str] = None, enabled: bool = True):
+        self.enabled = enabled
+        self.max_bytes = int(max_bytes)
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._entries: 'OrderedDict[Tuple, Tuple[bytes, str]]' = OrderedDict()
+        self._bytes = 0
+        self._closed = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ==================== Keys ====================
+
+    @staticmethod
+    def _key(recording_id: int, view: str, params: Optional[Dict]) -> Tuple:
+        items = tuple(sorted((k, v) for k, v in (params or {}).items() if v is not None))
+        return (int(recording_id), view, items)
+
+    def _disk_path(self, key: Tuple) -> Optional[Path]:
+        if self.disk_dir is None:
+            return None
+        digest = hashlib.sha1(repr(key[2]).encode()).hexdigest()[:12]
+        return self.disk_dir / str(key[0]) / f"{key[1]}-{digest}.pkl"
+
+    @staticmethod
+    def _etag(payload: bytes) -> str:
+        return '"' + hashlib.sha1(payload).hexdigest()[:20] + '"'
+
+    # ==================== Memory / disk tiers ====================
+
+    def _remember(self, key: Tuple, payload: bytes, etag: str):
+        """Inserta en el LRU de memoria (lock tomado)."""
+        if len(payload) > self.max_bytes // 4:
+            return  # una sola sesión no puede vaciar el cache entero
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old[0])
+        self._entries[key] = (payload, etag)
+        self._bytes += len(payload)
+        while self._bytes > self.max_bytes and self._entries:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def _lookup(self, key: Tuple) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        path = self._disk_path(key)
+        if path is None or not path.exists():
+            return None
+        try:
+            payload = path.read_bytes()
+        except OSError:
+            return None
+        entry = (payload, self._etag(payload))
+        with self._lock:
+            self._remember(key, *entry)
+        return entry
+
+    # ==================== Public API ====================
+
+    def get(self, recording_id: int, view: str, params: Optional[Dict] = None) -> Optional[Tuple[Any, str]]:
+        """(value, etag) si está cacheado. value es siempre una copia nueva."""
+        if not self.enabled:
+            return None
+        entry = self._lookup(self._key(recording_id, view, params))
+        if entry is None:
+            return None
+        return pickle.loads(entry[0]), entry[1]
+
+    def etag(self, recording_id: int, view: str, params: Optional[Dict] = None) -> Optional[str]:
+        """ETag de la entrada sin deserializarla (para 304)."""
+        if not self.enabled:
+            return None
+        entry = self._lookup(self._key(recording_id, view, params))
+        return entry[1] if entry else None
+
+    def put(self, recording_id: int, view: str, value: Any, params: Optional[Dict] = None) -> str:
+        key = self._key(recording_id, view, params)
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        etag = self._etag(payload)
+        if not self.enabled:
+            return etag
+        with self._lock:
+            self._remember(key, payload, etag)
+
+        path = self._disk_path(key)
+        if path is not None:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix('.tmp')
+                tmp.write_bytes(payload)
+                os.replace(tmp, path)
+            except OSError as e:
+                print(f"⚠️ Recording cache: disk write failed ({path}): {e}")
+        return etag
+
+    def invalidate(self, recording_id: int):
+        """Descarta todo lo cacheado de una grabación (reclose / delete)."""
+        recording_id = int(recording_id)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == recording_id]:
+                self._bytes -= len(self._entries.pop(key)[0])
+            self._closed.discard(recording_id)
+        if self.disk_dir is not None:
+            shutil.rmtree(self.disk_dir / str(recording_id), ignore_errors=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._closed.clear()
+        if self.disk_dir is not None:
+            shutil.rmtree(self.disk_dir, ignore_errors=True)
+
+    def mark_closed(self, recording_id: int):
+        with self._lock:
+            self._closed.add(int(recording_id))
+
+    def is_closed(self, storage, recording_id: int) -> bool:
+        """True si la grabación terminó. Sólo se recuerdan los positivos."""
+        if int(recording_id) in self._closed:
+            return True
+        try:
+            recording = storage.get_recording(recording_id)
+        except Exception:
+            return False
+        if recording is None or recording.ended_at is None:
+            return False
+        self.mark_closed(recording_id)
+        return True
+
+    def read(
+        self,
+        storage,
+        recording_id: int,
+        view: str,
+        loader: Optional[Callable[[], Any]] = None,
+        **params
+    ) -> Tuple[Any, Optional[str]]:
+        """
+        Lectura cacheada: (value, etag). etag es None si no se cacheó
+        (grabación abierta, cache deshabilitado o resultado vacío).
+
+        Sin `loader`, la vista se lee con el método del storage en STORAGE_VIEWS.
+        """
+        if loader is None:
+            method = getattr(storage, STORAGE_VIEWS[view])
+            loader = lambda: method(recording_id, **params)
+
+        if not self.enabled or not self.is_closed(storage, recording_id):
+            return loader(), None
+
+        cached = self.get(recording_id, view, params)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        value = loader()
+        if _is_empty(value):
+            return value, None
+        return value, self.put(recording_id, view, value, params)
+
+    def warm(self, storage, recording_id: int, views: Iterable[str] = WARM_VIEWS):
+        """Precarga vistas de una grabación recién cerrada."""
+        if not self.enabled:
+            return
+        self.mark_closed(recording_id)
+        for view in views:
+            try:
+                self.read(storage, recording_id, view)
+            except Exception as e:
+                print(f"⚠️ Recording cache: warm {view} #{recording_id} failed: {e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'disk_dir': str(self.disk_dir) if self.disk_dir else None,
+            }
+
+
+# Singleton instance
+_recording_cache: Optional[RecordingCache] = None
+
+
+def get_recording_cache() -> RecordingCache:
+    """Get singleton RecordingCache (RECORDING_CACHE_MAX_MB / RECORDING_CACHE_DIR)."""
+    global _recording_cache
+    if _recording_cache is None:
+        _recording_cache = RecordingCache(
+            max_bytes=int(RECORDING_CACHE_MAX_MB * 1024 * 1024),
+            disk_dir=RECORDING_CACHE_DIR or None,
+            enabled=RECORDING_CACHE_ENABLED
+        )
+    return _recording_cache
@@ -0,0 +1,431 @@
+"""
+Offline reprocessing: recompute the per-window data of recorded sessions
+from their raw samples.
+
+El único camino que produce métricas es el _metrics_loop del recorder en
+vivo (ventana de 2 s cada 200 ms); /sessions/{id}/reclose sólo re-agrega lo
+ya escrito. Cuando cambia el código de análisis las grabaciones viejas se
+quedan con métricas obsoletas. Aquí cada sesión se lee completa (archive o
+Influx), se corta en las mismas ventanas 2 s / 200 ms y se calculan
+
+    eeg_metrics      SyntergicMetrics.compute_all + EOG + calidad (EMA)
+    eeg_band_power   Welch por canal (tp9, af7, af8, tp10)
+
+en un ProcessPoolExecutor: cada tarea es un tramo contiguo de ventanas
+(REPROCESS_CHUNK_WINDOWS), y los tramos de varias sesiones comparten el pool.
+Los resultados reemplazan a los anteriores (delete_derived + escritura en
+lote), se recalculan los agregados y el resumen del catálogo, y la grabación
+queda marcada con ANALYSIS_VERSION (migration 004).
+
+    python scripts/reprocess_sessions.py --stale
+    POST /sessions/{id}/reprocess
+"""
+
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .influx_client import MetricSnapshot
+from .session_aggregator import SessionAggregator
+from .session_summary import materialize_session_summary
+from .recording_cache import get_recording_cache
+
+
+# Subir cuando cambie el análisis por ventana (analysis/, EOGDetector,
+# SignalQualityChecker, Welch por canal) → --stale recalcula todo lo anterior.
+ANALYSIS_VERSION = 1
+
+REPROCESS_WORKERS = int(os.getenv('REPROCESS_WORKERS', '0')) or os.cpu_count() or 1
+# Ventanas por tarea del pool (300 = 60 s de sesión)
+REPROCESS_CHUNK_WINDOWS = int(os.getenv('REPROCESS_CHUNK_WINDOWS', '300'))
+# Ventanas por escritura al storage
+REPROCESS_WRITE_WINDOWS = int(os.getenv('REPROCESS_WRITE_WINDOWS', '1000'))
+
+# Mismas ventanas que SessionRecorderV2._metrics_loop / MuseConnector
+WINDOW_SECONDS = 2.0
+STEP_SECONDS = 0.2
+QUALITY_SECONDS = 1.0      # get_signal_quality() mira el último segundo
+QUALITY_EMA_ALPHA = 0.3    # MuseConnector._quality_ema_alpha
+CHANNEL_NAMES = ['tp9', 'af7', 'af8', 'tp10']
+
+_METRIC_KEYS = ('coherence', 'entropy', 'plv', 'bands', 'bands_raw', 'dominant_frequency', 'state')
+
+
+# ==================== WORKER (subprocess) ====================
+
+def compute_windows(data: np.ndarray, fs: float, ends: List[int]) -> List[Dict]:
+    """
+    Métricas de las ventanas que terminan en `ends` (índices de muestra de `data`).
+
+    Corre en los procesos del pool: sólo recibe el tramo (4, n) que cubre
+    sus ventanas y devuelve dicts pequeños (nada de arrays por ventana).
+    """
+    from hardware import MuseToSyntergicAdapter, EOGDetector, SignalQualityChecker
+    from hardware.base import EEGWindow
+    from analysis.metrics import SyntergicMetrics
+    from analysis.spectral import SpectralAnalyzer
+
+    n = int(round(WINDOW_SECONDS * fs))
+    nq = int(round(QUALITY_SECONDS * fs))
+    channels = [ch.upper() for ch in CHANNEL_NAMES]
+    results = []
+    for end in ends:
+        x = data[:, end - n:end]
+        window = EEGWindow(data=x, fs=fs, timestamp=0.0, channels=channels, duration=WINDOW_SECONDS)
+        metrics = SyntergicMetrics.compute_all(MuseToSyntergicAdapter.prepare_for_analysis(window), fs=fs)
+
+        bands_per_channel: Dict[str, Dict[str, float]] = {}
+        for ch_idx, ch_name in enumerate(CHANNEL_NAMES[:x.shape[0]]):
+            for band, raw in SpectralAnalyzer.compute_frequency_bands_raw(x[ch_idx], fs).items():
+                bands_per_channel.setdefault(band, {})[ch_name] = float(raw)
+
+        results.append({
+            'metrics': {k: metrics[k] for k in _METRIC_KEYS if k in metrics},
+            'blink': EOGDetector.detect(x, fs),
+            'quality': [SignalQualityChecker.compute_quality_score(x[c, -nq:], fs) for c in range(x.shape[0])],
+            'bands_per_channel': bands_per_channel,
+        })
+    return results
+
+
+# ==================== SESSION I/O ====================
+
+def load_session_samples(storage, recording_id: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Raw samples of a recording: (timestamps (n,) epoch s, data (4, n) float64)."""
+    ts_parts, data_parts = [], []
+    for timestamps, data in storage.iter_sample_blocks(recording_id):
+        ts_parts.append(np.asarray(timestamps, dtype=np.float64))
+        data_parts.append(np.asarray(data[:4], dtype=np.float64))
+    if not ts_parts:
+        return np.empty(0), np.empty((4, 0))
+    return np.concatenate(ts_parts), np.concatenate(data_parts, axis=1)
+
+
+def session_sampling_rate(recording, timestamps: np.ndarray) -> float:
+    """fs del catálogo, o estimado de los timestamps si falta (int si es entero)."""
+    fs = float(recording.sampling_rate or 0)
+    if fs <= 0 and len(timestamps) > 1:
+        fs = float(round(1.0 / np.median(np.diff(timestamps))))
+    if fs.is_integer():
+        fs = int(fs)
+    return fs
+
+
+def window_ends(n_samples: int, fs: float) -> np.ndarray:
+    """Índice (exclusivo) de la última muestra de cada ventana 2 s / 200 ms."""
+    n = int(round(WINDOW_SECONDS * fs))
+    step = max(1, int(round(STEP_SECONDS * fs)))
+    if n_samples < n:
+        return np.empty(0, dtype=np.int64)
+    return np.arange(n, n_samples + 1, step, dtype=np.int64)
+
+
+class _SessionJob:
+    """Ventanas de una sesión repartidas en tareas del pool."""
+
+    def __init__(self, recording, timestamps: np.ndarray, data: np.ndarray, fs: float):
+        self.recording = recording
+        self.timestamps = timestamps
+        self.data = data
+        self.fs = fs
+        self.ends = window_ends(len(timestamps), fs)
+        self.parts: Dict[int, List[Dict]] = {}
+        self.n_tasks = 0
+        self.error: Optional[str] = None
+        self.t_start = time.perf_counter()
+
+    def submit(self, pool: ProcessPoolExecutor, chunk_windows: int) -> Dict:
+        """Una tarea por tramo de `chunk_windows` ventanas → {future: (job, part)}."""
+        n = int(round(WINDOW_SECONDS * self.fs))
+        futures = {}
+        for i, k in enumerate(range(0, len(self.ends), chunk_windows)):
+            ends = self.ends[k:k + chunk_windows]
+            a = int(ends[0]) - n
+            segment = np.ascontiguousarray(self.data[:, a:int(ends[-1])])
+            futures[pool.submit(compute_windows, segment, self.fs, (ends - a).tolist())] = (self, i)
+        self.n_tasks = len(futures)
+        return futures
+
+    @property
+    def complete(self) -> bool:
+        return len(self.parts) == self.n_tasks
+
+    def results(self) -> List[Dict]:
+        return [r for i in range(self.n_tasks) for r in self.parts[i]]
+
+
+def _build_outputs(job: _SessionJob, results: List[Dict]):
+    """Resultados por ventana → (MetricSnapshot[], band power windows, t_origin)."""
+    t_origin = float(job.timestamps[0])
+    snapshots: List[MetricSnapshot] = []
+    band_windows: List[Tuple[int, Dict, str]] = []
+    ema: Optional[np.ndarray] = None
+
+    for end, r in zip(job.ends.tolist(), results):
+        quality = np.asarray(r['quality'], dtype=np.float64)
+        ema = quality if ema is None else QUALITY_EMA_ALPHA * quality + (1 - QUALITY_EMA_ALPHA) * ema
+        m = r['metrics']
+        bands = m.get('bands') or {}
+        bands_raw = m.get('bands_raw') or {}
+        timestamp = float(job.timestamps[end - 1]) - t_origin
+        snapshot = MetricSnapshot(
+            timestamp=timestamp,
+            coherence=m.get('coherence', 0),
+            entropy=m.get('entropy', 0),
+            plv=m.get('plv', 0),
+            delta=bands.get('delta', 0),
+            theta=bands.get('theta', 0),
+            alpha=bands.get('alpha', 0),
+            beta=bands.get('beta', 0),
+            gamma=bands.get('gamma', 0),
+            dominant_frequency=m.get('dominant_frequency', 0),
+            state=m.get('state', ''),
+            signal_quality=float(np.round(ema, 4).mean()),
+            delta_raw=bands_raw.get('delta', 0),
+            theta_raw=bands_raw.get('theta', 0),
+            alpha_raw=bands_raw.get('alpha', 0),
+            beta_raw=bands_raw.get('beta', 0),
+            gamma_raw=bands_raw.get('gamma', 0),
+            blink_contaminated=r['blink'],
+        )
+        snapshots.append(snapshot)
+        band_windows.append((int((t_origin + timestamp) * 1e9), r['bands_per_channel'], snapshot.state))
+    return snapshots, band_windows, t_origin
+
+
+def _aggregate(snapshots, band_windows, events) -> SessionAggregator:
+    """Agregados con el mismo orden que el replay: *_start, datos, *_end."""
+    agg = SessionAggregator()
+    for s in snapshots:
+        agg.add_metrics(s)
+    stream = []
+    for ev in events:
+        order = 2 if ev.get('label', '').endswith('_end') else 0
+        stream.append((ev['timestamp'], order, 'marker', ev.get('label', '')))
+    for ts_ns, bands, _ in band_windows:
+        stream.append((ts_ns / 1e9, 1, 'bands', bands))
+    for ts, _, kind, payload in sorted(stream, key=lambda x: (x[0], x[1])):
+        if kind == 'marker':
+            agg.add_marker(payload, ts)
+        else:
+            agg.add_band_power(ts, payload)
+    return agg
+
+
+def _write_results(storage, job: _SessionJob, results: List[Dict]) -> Dict:
+    """Reemplaza métricas + band power, re-agrega y marca ANALYSIS_VERSION."""
+    recording = job.recording
+    rid = recording.id
+    snapshots, band_windows, t_origin = _build_outputs(job, results)
+    base_timestamp = datetime.fromtimestamp(t_origin)
+
+    storage.delete_derived(rid)
+    for k in range(0, len(snapshots), REPROCESS_WRITE_WINDOWS):
+        storage.write_metrics(rid, snapshots[k:k + REPROCESS_WRITE_WINDOWS], base_timestamp=base_timestamp)
+        storage.write_band_power_batch(rid, band_windows[k:k + REPROCESS_WRITE_WINDOWS])
+    _refresh_rollups(storage, t_origin, float(job.timestamps[-1]))
+
+    agg = _aggregate(snapshots, band_windows, storage.get_events(rid))
+    aggregated_metrics = agg.finalize()
+    storage.end_recording(
+        rid,
+        duration_seconds=recording.duration_seconds or 0,
+        sample_count=recording.sample_count or len(job.timestamps),
+        metrics_count=len(snapshots),
+        calibration_passed=recording.calibration_passed or False,
+        avg_signal_quality=float(np.mean([s.signal_quality for s in snapshots])) if snapshots else 0,
+        aggregated_metrics=aggregated_metrics,
+    )
+    storage.set_analysis_version(rid, ANALYSIS_VERSION)
+    get_recording_cache().invalidate(rid)
+
+    catalog_summary = {}
+    try:
+        catalog_summary = materialize_session_summary(storage, rid, per_channel_by_phase=agg.by_phase())
+    except Exception as e:
+        print(f"⚠️ [reprocess] Session summary not materialized for #{rid}: {e}")
+
+    return {
+        'session_id': rid,
+        'analysis_version': ANALYSIS_VERSION,
+        'windows': len(snapshots),
+        'samples': len(job.timestamps),
+        'duration_seconds': round(float(job.timestamps[-1] - job.timestamps[0]), 1),
+        'seconds': round(time.perf_counter() - job.t_start, 2),
+        'avg_coherence': aggregated_metrics.get('avg_coherence'),
+        'avg_alpha': aggregated_metrics.get('avg_alpha'),
+        'faa_mean': aggregated_metrics.get('faa_mean'),
+        'quality_grade': catalog_summary.get('quality_grade'),
+        'validation_status': catalog_summary.get('validation_status'),
+    }
+
+
+def _refresh_rollups(storage, start: float, stop: float):
+    """Influx: re-agregar los buckets de rollup del rango reescrito."""
+    influx = getattr(storage, 'influx', None)
+    if influx is None:
+        return
+    try:
+        from .influx_rollups import rollup_range
+        rollup_range(influx, start, stop)
+    except Exception as e:
+        print(f"⚠️ [reprocess] Rollups not refreshed ({start:.0f}-{stop:.0f}): {e}")
+
+
+# ==================== DRIVER ====================
+
+def stale_recording_ids(storage, limit: int = 10000) -> List[int]:
+    """Grabaciones cuyas métricas son de una versión de análisis anterior."""
+    return [
+        r.id for r in storage.list_recordings(limit=limit)
+        if (r.analysis_version or 0) < ANALYSIS_VERSION and r.ended_at is not None
+    ]
+
+
+def reprocess_sessions(
+    storage,
+    recording_ids: Iterable[int],
+    workers: int = REPROCESS_WORKERS,
+    chunk_windows: int = REPROCESS_CHUNK_WINDOWS,
+    progress=None,
+) -> List[Dict]:
+    """
+    Recalcula las sesiones dadas usando `workers` procesos.
+
+    Las sesiones se leen en este thread mientras el pool procesa las
+    anteriores (como máximo dos sesiones en memoria por delante del pool).
+
+    Args:
+        progress: callback(result_dict) por sesión terminada (o con 'error')
+    Returns:
+        Un dict por sesión (ver _write_results) o {'session_id', 'error'}.
+    """
+    storage.connect()
+    ids = list(recording_ids)
+    results: List[Dict] = []
+
+    def report(result: Dict):
+        results.append(result)
+        if progress:
+            progress(result)
+        if 'error' in result:
+            print(f"  ⚠️ #{result['session_id']}: {result['error']}")
+        else:
+            print(f"  ✓ #{result['session_id']}: {result['windows']} windows "
+                  f"({result['duration_seconds']:.0f} s of signal) in {result['seconds']:.1f}s")
+
+    # spawn: el servidor tiene threads (fork podría heredar locks tomados)
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max(1, workers), mp_context=context) as pool:
+        pending: Dict = {}
+        queue = list(ids)
+
+        def feed():
+            """Lee y encola sesiones hasta tener dos en el pool."""
+            while queue and len({job for job, _ in pending.values()}) < 2:
+                rid = queue.pop(0)
+                try:
+                    job = _load_job(storage, rid)
+                except Exception as e:
+                    report({'session_id': rid, 'error': str(e)})
+                    continue
+                futures = job.submit(pool, chunk_windows)
+                if not futures:
+                    report({'session_id': rid, 'error': 'not enough samples for one window'})
+                pending.update(futures)
+
+        feed()
+        while pending:
+            future = next(as_completed(pending))
+            job, part = pending.pop(future)
+            try:
+                job.parts[part] = future.result()
+            except Exception as e:
+                job.parts[part] = []
+                job.error = f"{type(e).__name__}: {e}"
+            if job.complete:
+                if job.error:
+                    report({'session_id': job.recording.id, 'error': job.error})
+                else:
+                    try:
+                        report(_write_results(storage, job, job.results()))
+                    except Exception as e:
+                        report({'session_id': job.recording.id, 'error': f"write failed: {e}"})
+            feed()
+    return results
+
+
+def _load_job(storage, recording_id: int) -> _SessionJob:
+    recording = storage.get_recording(recording_id)
+    if recording is None:
+        raise LookupError(f"Session {recording_id} not found ({storage.name})")
+    timestamps, data = load_session_samples(storage, recording_id)
+    if len(timestamps) == 0:
+        raise LookupError(f"Session {recording_id} has no raw samples ({storage.name})")
+    return _SessionJob(recording, timestamps, data, session_sampling_rate(recording, timestamps))
+
+
+# ==================== BACKGROUND JOB (API) ====================
+
+class ReprocessJob:
+    """Un reprocesado por lotes en background (un solo job a la vez)."""
+
+    def __init__(self, ids: List[int], workers: int):
+        self.ids = ids
+        self.workers = workers
+        self.results: List[Dict] = []
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self.finished_at is None
+
+    def run(self, storage):
+        try:
+            reprocess_sessions(storage, self.ids, workers=self.workers, progress=self.results.append)
+        except Exception as e:
+            self.error = str(e)
+            print(f"⚠️ [reprocess] Job failed: {e}")
+        finally:
+            self.finished_at = time.time()
+
+    def status(self) -> Dict:
+        done = len(self.results)
+        return {
+            'running': self.running,
+            'analysis_version': ANALYSIS_VERSION,
+            'workers': self.workers,
+            'total': len(self.ids),
+            'done': done,
+            'failed': sum(1 for r in self.results if 'error' in r),
+            'elapsed_seconds': round((self.finished_at or time.time()) - self.started_at, 1),
+            'error': self.error,
+            'results': self.results,
+        }
+
+
+_job: Optional[ReprocessJob] = None
+_job_lock = threading.Lock()
+
+
+def start_reprocess_job(storage, ids: List[int], workers: int = REPROCESS_WORKERS) -> ReprocessJob:
+    """Lanza el job en un thread; RuntimeError si ya hay uno corriendo."""
+    global _job
+    with _job_lock:
+        if _job is not None and _job.running:
+            raise RuntimeError("A reprocess job is already running")
+        _job = ReprocessJob(ids, workers)
+        threading.Thread(target=_job.run, args=(storage,), name='reprocess', daemon=True).start()
+        return _job
+
+
+def get_reprocess_job() -> Optional[ReprocessJob]:
+    return _job
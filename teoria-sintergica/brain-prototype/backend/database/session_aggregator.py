@@ -0,0 +1,186 @@
+"""
+Session Aggregator - incremental session aggregates computed while recording.
+
+SessionRecorderV2 feeds every metric snapshot, per-channel band power window
+and marker as it writes them to InfluxDB, so `stop()` no longer has to
+re-read the whole session with Flux. `finalize()` returns the same keys as
+`get_aggregated_metrics()` + `get_per_channel_aggregates()` and
+`by_phase()` the same shape as `get_per_channel_by_phase()`.
+
+The Influx queries remain the source of truth for `/sessions/{id}/reclose`.
+"""
+
+import math
+import threading
+from typing import Dict, Optional
+
+from .influx_client import MetricSnapshot
+
+
+# Campos de eeg_metrics que terminan en eeg_recordings.avg_*
+_AVG_FIELDS = ('coherence', 'alpha', 'theta', 'beta', 'gamma', 'delta')
+
+
+class SessionAggregator:
+    """
+    Running sums / maxima for one recording.
+
+    All timestamps are relative to the recording start (seconds), the same
+    clock used by the recorder for metrics, band power and markers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+        # eeg_metrics → avg_* / peak_coherence
+        self._metric_sums: Dict[str, float] = {f: 0.0 for f in _AVG_FIELDS}
+        self._metric_count = 0
+        self._peak_coherence: Optional[float] = None
+
+        # eeg_band_power (alpha raw) → alpha_*_avg, FAA, asimetría posterior
+        self._alpha_sums: Dict[str, float] = {}
+        self._alpha_counts: Dict[str, int] = {}
+        self._faa_sum = 0.0
+        self._faa_count = 0
+        self._posterior_sum = 0.0
+        self._posterior_count = 0
+        self._baseline_faa_sum = 0.0
+        self._baseline_faa_count = 0
+
+        # Fases de protocolo (*_start / *_end)
+        self._open_phases: Dict[str, float] = {}          # phase → t_start
+        self._phase_acc: Dict[str, Dict] = {}             # phase → {band: {ch: [sum, n]}}
+        self._closed_phases: Dict[str, tuple] = {}        # phase → (t_start, t_end)
+
+    @property
+    def metrics_count(self) -> int:
+        return self._metric_count
+
+    # ==================== FEED ====================
+
+    def add_metrics(self, snapshot: MetricSnapshot):
+        """Accumulate one eeg_metrics snapshot."""
+        with self._lock:
+            for field in _AVG_FIELDS:
+                value = getattr(snapshot, field, None)
+                if value is not None and math.isfinite(value):
+                    self._metric_sums[field] += float(value)
+            self._metric_count += 1
+
+            coherence = snapshot.coherence
+            if coherence is not None and math.isfinite(coherence):
+                if self._peak_coherence is None or coherence > self._peak_coherence:
+                    self._peak_coherence = float(coherence)
+
+    def add_band_power(self, timestamp: float, channel_bands: Dict[str, Dict[str, float]]):
+        """
+        Accumulate one per-channel band power window.
+
+        Args:
+            timestamp:     Relative time of the window (seconds).
+            channel_bands: {band: {channel: raw_µV²/Hz}} — same payload as
+                           InfluxDBEEGClient.write_band_power_per_channel.
+        """
+        with self._lock:
+            alpha = channel_bands.get('alpha', {})
+            for ch, raw in alpha.items():
+                self._alpha_sums[ch] = self._alpha_sums.get(ch, 0.0) + float(raw)
+                self._alpha_counts[ch] = self._alpha_counts.get(ch, 0) + 1
+
+            af7 = alpha.get('af7', 0.0)
+            af8 = alpha.get('af8', 0.0)
+            tp9 = alpha.get('tp9', 0.0)
+            tp10 = alpha.get('tp10', 0.0)
+
+            faa = None
+            if af7 > 0 and af8 > 0:
+                faa = math.log(af8) - math.log(af7)
+                self._faa_sum += faa
+                self._faa_count += 1
+            if tp9 > 0 and tp10 > 0:
+                self._posterior_sum += tp10 - tp9
+                self._posterior_count += 1
+
+            if faa is not None and 'baseline_closed' in self._open_phases:
+                self._baseline_faa_sum += faa
+                self._baseline_faa_count += 1
+
+            # Igual que get_per_channel_by_phase: cada ventana cuenta en una sola fase
+            for phase in self._open_phases:
+                bands = self._phase_acc[phase]
+                for band, chans in channel_bands.items():
+                    b = bands.setdefault(band, {})
+                    for ch, raw in chans.items():
+                        s = b.setdefault(ch, [0.0, 0])
+                        s[0] += float(raw)
+                        s[1] += 1
+                break
+
+    def add_marker(self, label: str, timestamp: float):
+        """Open/close protocol phases from `<phase>_start` / `<phase>_end` markers."""
+        with self._lock:
+            if label.endswith('_start'):
+                phase = label[:-6]
+                if phase == 'protocol':
+                    return  # ventana envolvente, no es una fase
+                # Una fase repetida reemplaza a la anterior (mismo criterio que Influx)
+                if phase == 'baseline_closed':
+                    self._baseline_faa_sum = 0.0
+                    self._baseline_faa_count = 0
+                self._open_phases[phase] = timestamp
+                self._phase_acc[phase] = {}
+                self._closed_phases.pop(phase, None)
+            elif label.endswith('_end'):
+                phase = label[:-4]
+                if phase in self._open_phases:
+                    self._closed_phases[phase] = (self._open_phases.pop(phase), timestamp)
+
+    # ==================== RESULTS ====================
+
+    def finalize(self) -> Dict:
+        """
+        Session aggregates ready for `PostgresClientSync.end_recording`.
+
+        Keys match get_aggregated_metrics() + get_per_channel_aggregates().
+        """
+        with self._lock:
+            n = self._metric_count
+            result = {
+                f'avg_{field}': (self._metric_sums[field] / n if n else None)
+                for field in _AVG_FIELDS
+            }
+            result['peak_coherence'] = self._peak_coherence
+
+            if not self._alpha_counts:
+                result['per_channel_version'] = 0
+                return result
+
+            for ch in ('tp9', 'af7', 'af8', 'tp10'):
+                cnt = self._alpha_counts.get(ch, 0)
+                result[f'alpha_{ch}_avg'] = self._alpha_sums[ch] / cnt if cnt else None
+
+            result['faa_mean'] = self._faa_sum / self._faa_count if self._faa_count else None
+            result['faa_baseline_closed'] = (
+                self._baseline_faa_sum / self._baseline_faa_count
+                if self._baseline_faa_count and 'baseline_closed' in self._closed_phases
+                else None
+            )
+            result['posterior_asymmetry_mean'] = (
+                self._posterior_sum / self._posterior_count if self._posterior_count else None
+            )
+            result['per_channel_version'] = 1
+            return result
+
+    def by_phase(self) -> Optional[Dict]:
+        """Per-phase raw band power averages, shaped like get_per_channel_by_phase()."""
+        with self._lock:
+            result: Dict = {}
+            for phase in self._closed_phases:
+                bands = self._phase_acc.get(phase)
+                if not bands:
+                    continue
+                result[phase] = {
+                    band: {ch: (s[0] / s[1] if s[1] else 0.0) for ch, s in chans.items()}
+                    for band, chans in bands.items()
+                }
+            return result or None
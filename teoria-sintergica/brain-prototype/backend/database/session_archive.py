@@ -0,0 +1,369 @@
+"""
+Session archive: formato binario nativo para samples EEG crudos.
+
+Una sesión = un directorio:
+    meta.json    fs, canales, duración de chunk, totales, metadata libre
+    chunks.bin   chunks comprimidos concatenados
+    index.npy    una fila por chunk (INDEX_DTYPE); durante la grabación
+                 se va agregando a index.part y se consolida en close()
+
+Cada chunk cubre `chunk_seconds` (default 10 s = 2560 samples @ 256 Hz):
+    timestamps float64 (n,)   → bits int64, delta, byte-shuffle, zlib
+    data       float32 (C, n) → bits int32, delta por canal, byte-shuffle, zlib
+
+Delta sobre los bits es exacto (aritmética entera con wraparound), así que
+el formato es sin pérdida respecto a float32. El lector mapea chunks.bin en
+memoria y descomprime sólo los chunks que tocan la ventana pedida, con una
+LRU pequeña: seek O(1), carga limitada por I/O.
+"""
+
+import os
+import json
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+ARCHIVE_DIR = Path(os.getenv(
+    'SESSION_ARCHIVE_DIR',
+    str(Path(__file__).resolve().parent.parent / 'data' / 'archives')
+))
+ARCHIVE_CHUNK_SECONDS = float(os.getenv('SESSION_ARCHIVE_CHUNK_SECONDS', '10'))
+ARCHIVE_ENABLED = os.getenv('SESSION_ARCHIVE_ENABLED', '1') == '1'
+
+ARCHIVE_VERSION = 1
+DEFAULT_CHANNELS = ['tp9', 'af7', 'af8', 'tp10']
+
+INDEX_DTYPE = np.dtype([
+    ('t_start', '<f8'),       # timestamp absoluto del primer sample
+    ('t_end', '<f8'),         # timestamp absoluto del último sample
+    ('sample_start', '<i8'),  # índice global del primer sample
+    ('n', '<i8'),             # samples en el chunk
+    ('offset', '<i8'),        # byte offset en chunks.bin
+    ('ts_nbytes', '<i8'),     # bytes comprimidos de timestamps
+    ('data_nbytes', '<i8'),   # bytes comprimidos de data
+])
+
+_META_FILE = 'meta.json'
+_CHUNKS_FILE = 'chunks.bin'
+_INDEX_FILE = 'index.npy'
+_INDEX_PART_FILE = 'index.part'
+
+
+def archive_path(recording_id: int) -> Path:
+    """Default archive directory for a recording."""
+    return ARCHIVE_DIR / str(recording_id)
+
+
+def has_archive(path: Path) -> bool:
+    path = Path(path)
+    return (path / _META_FILE).exists() and (path / _CHUNKS_FILE).exists()
+
+
+# ==================== CODEC ====================
+
+def _encode(values: np.ndarray, int_dtype: str, level: int) -> bytes:
+    """Delta over the last axis of the bit pattern + byte shuffle + zlib."""
+    bits = np.ascontiguousarray(values).view(int_dtype)
+    delta = np.empty_like(bits)
+    delta[..., :1] = bits[..., :1]
+    delta[..., 1:] = np.diff(bits, axis=-1)  # wraparound intencional
+    width = bits.dtype.itemsize
+    shuffled = delta.reshape(-1).view(np.uint8).reshape(-1, width).T
+    return zlib.compress(np.ascontiguousarray(shuffled).tobytes(), level)
+
+
+def _decode(blob, int_dtype: str, float_dtype: str, shape: Tuple[int, ...]) -> np.ndarray:
+    width = np.dtype(int_dtype).itemsize
+    raw = np.frombuffer(zlib.decompress(blob), dtype=np.uint8)
+    delta = np.ascontiguousarray(raw.reshape(width, -1).T).view(int_dtype).reshape(shape)
+    bits = np.cumsum(delta, axis=-1, dtype=np.dtype(int_dtype))
+    return bits.view(float_dtype)
+
+
+# ==================== WRITER ====================
+
+class SessionArchiveWriter:
+    """
+    Append-only writer. Buffers samples until a chunk is full.
+
+    Usage:
+        writer = SessionArchiveWriter(archive_path(42), fs=256)
+        writer.append(timestamps, data)   # (n,), (C, n)
+        ...
+        writer.close()
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        fs: float,
+        channels: List[str] = None,
+        chunk_seconds: float = ARCHIVE_CHUNK_SECONDS,
+        metadata: Dict = None,
+        level: int = 6
+    ):
+        self.path = Path(path)
+        self.fs = float(fs)
+        self.channels = list(channels or DEFAULT_CHANNELS)
+        self.chunk_samples = max(1, int(round(chunk_seconds * self.fs)))
+        self.metadata = metadata or {}
+        self.level = level
+
+        self._pending_ts: List[np.ndarray] = []
+        self._pending_data: List[np.ndarray] = []
+        self._pending_n = 0
+        self._n_samples = 0
+        self._offset = 0
+        self._closed = False
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        # Empezar de cero (una grabación = un archive)
+        for name in (_CHUNKS_FILE, _INDEX_FILE, _INDEX_PART_FILE):
+            (self.path / name).unlink(missing_ok=True)
+        self._chunks = open(self.path / _CHUNKS_FILE, 'ab')
+        self._index = open(self.path / _INDEX_PART_FILE, 'ab')
+        self._write_meta(complete=False)
+
+    @property
+    def n_samples(self) -> int:
+        return self._n_samples + self._pending_n
+
+    def append(self, timestamps: np.ndarray, data: np.ndarray):
+        """Append samples: timestamps (n,) absolute seconds, data (C, n)."""
+        if self._closed:
+            raise RuntimeError("SessionArchiveWriter is closed")
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        data = np.asarray(data, dtype=np.float32)
+        if data.shape != (len(self.channels), len(timestamps)):
+            raise ValueError(f"Expected data shape ({len(self.channels)}, {len(timestamps)}), got {data.shape}")
+        if len(timestamps) == 0:
+            return
+
+        self._pending_ts.append(timestamps)
+        self._pending_data.append(data)
+        self._pending_n += len(timestamps)
+
+        while self._pending_n >= self.chunk_samples:
+            ts = np.concatenate(self._pending_ts)
+            block = np.concatenate(self._pending_data, axis=1)
+            self._write_chunk(ts[:self.chunk_samples], block[:, :self.chunk_samples])
+            rest = self._pending_n - self.chunk_samples
+            self._pending_ts = [ts[self.chunk_samples:]] if rest else []
+            self._pending_data = [block[:, self.chunk_samples:]] if rest else []
+            self._pending_n = rest
+
+    def flush(self):
+        """Write pending samples as a (short) chunk so readers can see them."""
+        if self._pending_n:
+            self._write_chunk(np.concatenate(self._pending_ts), np.concatenate(self._pending_data, axis=1))
+            self._pending_ts, self._pending_data, self._pending_n = [], [], 0
+
+    def close(self):
+        """Flush, consolidate index.npy and finalize meta.json."""
+        if self._closed:
+            return
+        self.flush()
+        self._chunks.close()
+        self._index.close()
+
+        part = self.path / _INDEX_PART_FILE
+        np.save(self.path / _INDEX_FILE, np.fromfile(part, dtype=INDEX_DTYPE))
+        part.unlink(missing_ok=True)
+        self._write_meta(complete=True)
+        self._closed = True
+
+    def _write_chunk(self, ts: np.ndarray, block: np.ndarray):
+        ts_blob = _encode(ts, '<i8', self.level)
+        data_blob = _encode(block, '<i4', self.level)
+        self._chunks.write(ts_blob)
+        self._chunks.write(data_blob)
+
+        row = np.zeros(1, dtype=INDEX_DTYPE)
+        row[0] = (ts[0], ts[-1], self._n_samples, len(ts), self._offset, len(ts_blob), len(data_blob))
+        # data antes que índice: un lector nunca ve una fila sin sus bytes
+        self._chunks.flush()
+        self._index.write(row.tobytes())
+        self._index.flush()
+
+        self._offset += len(ts_blob) + len(data_blob)
+        self._n_samples += len(ts)
+
+    def _write_meta(self, complete: bool):
+        meta = {
+            'version': ARCHIVE_VERSION,
+            'fs': self.fs,
+            'channels': self.channels,
+            'chunk_samples': self.chunk_samples,
+            'n_samples': self._n_samples,
+            'bytes': self._offset,
+            'complete': complete,
+            'metadata': self.metadata,
+        }
+        tmp = self.path / (_META_FILE + '.tmp')
+        tmp.write_text(json.dumps(meta, indent=2))
+        tmp.replace(self.path / _META_FILE)
+
+
+def write_archive(
+    path: Path,
+    timestamps: np.ndarray,
+    data: np.ndarray,
+    fs: float,
+    channels: List[str] = None,
+    metadata: Dict = None
+) -> Path:
+    """Write a whole session in one call (scripts, sync, conversions)."""
+    writer = SessionArchiveWriter(path, fs=fs, channels=channels, metadata=metadata)
+    writer.append(timestamps, data)
+    writer.close()
+    return Path(path)
+
+
+# ==================== READER ====================
+
+class SessionArchive:
+    """
+    Memory-mapped reader.
+
+    Sample-index and time lookups go through the chunk index
+    (np.searchsorted), and only the touched chunks are decompressed.
+    """
+
+    def __init__(self, path: Path, cache_chunks: int = 8):
+        self.path = Path(path)
+        meta = json.loads((self.path / _META_FILE).read_text())
+        self.fs: float = float(meta['fs'])
+        self.channels: List[str] = meta['channels']
+        self.metadata: Dict = meta.get('metadata', {})
+        self.complete: bool = meta.get('complete', False)
+
+        index_file = self.path / _INDEX_FILE
+        if index_file.exists():
+            self.index = np.load(index_file, mmap_mode='r')
+        else:
+            # Grabación en curso (o interrumpida): índice parcial
+            part = self.path / _INDEX_PART_FILE
+            self.index = np.fromfile(part, dtype=INDEX_DTYPE) if part.exists() else np.zeros(0, INDEX_DTYPE)
+
+        chunks_file = self.path / _CHUNKS_FILE
+        self._data = (
+            np.memmap(chunks_file, dtype=np.uint8, mode='r')
+            if chunks_file.exists() and chunks_file.stat().st_size > 0 else None
+        )
+
+        self._cache: 'OrderedDict[int, Tuple[np.ndarray, np.ndarray]]' = OrderedDict()
+        self._cache_size = cache_chunks
+
+    @property
+    def n_chunks(self) -> int:
+        return len(self.index)
+
+    @property
+    def n_samples(self) -> int:
+        if not self.n_chunks:
+            return 0
+        last = self.index[-1]
+        return int(last['sample_start'] + last['n'])
+
+    @property
+    def t0(self) -> float:
+        return float(self.index[0]['t_start']) if self.n_chunks else 0.0
+
+    @property
+    def duration(self) -> float:
+        return float(self.index[-1]['t_end'] - self.index[0]['t_start']) if self.n_chunks else 0.0
+
+    def read_chunk(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Decoded chunk i: (timestamps (n,), data float32 (C, n))."""
+        if i in self._cache:
+            self._cache.move_to_end(i)
+            return self._cache[i]
+
+        ts, data = self._decode_chunk(i)
+        self._cache[i] = (ts, data)
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return ts, data
+
+    def _decode_chunk(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        row = self.index[i]
+        n, off = int(row['n']), int(row['offset'])
+        ts_end = off + int(row['ts_nbytes'])
+        data_end = ts_end + int(row['data_nbytes'])
+        ts = _decode(self._data[off:ts_end], '<i8', '<f8', (n,))
+        data = _decode(self._data[ts_end:data_end], '<i4', '<f4', (len(self.channels), n))
+        return ts, data
+
+    def read(self, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Samples [start, stop) by global sample index."""
+        start = max(0, int(start))
+        stop = min(self.n_samples, int(stop))
+        if stop <= start:
+            return np.empty(0), np.empty((len(self.channels), 0), dtype=np.float32)
+
+        starts = self.index['sample_start']
+        first = int(np.searchsorted(starts, start, side='right')) - 1
+        last = int(np.searchsorted(starts, stop - 1, side='right')) - 1
+
+        ts_parts, data_parts = [], []
+        for i in range(first, last + 1):
+            ts, data = self.read_chunk(i)
+            base = int(starts[i])
+            a = max(start - base, 0)
+            b = min(stop - base, len(ts))
+            ts_parts.append(ts[a:b])
+            data_parts.append(data[:, a:b])
+
+        if len(ts_parts) == 1:
+            return ts_parts[0], data_parts[0]
+        return np.concatenate(ts_parts), np.concatenate(data_parts, axis=1)
+
+    def sample_at(self, seconds: float) -> int:
+        """Global sample index at `seconds` from the first sample."""
+        if not self.n_chunks:
+            return 0
+        t = self.t0 + seconds
+        i = max(int(np.searchsorted(self.index['t_start'], t, side='right')) - 1, 0)
+        ts, _ = self.read_chunk(i)
+        return int(self.index[i]['sample_start']) + int(np.searchsorted(ts, t))
+
+    def read_time(self, start_seconds: float, end_seconds: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Samples between two offsets (seconds from the first sample)."""
+        return self.read(self.sample_at(start_seconds), self.sample_at(end_seconds))
+
+    def read_all(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.read(0, self.n_samples)
+
+    def iter_blocks(
+        self,
+        start_seconds: float = 0,
+        end_seconds: Optional[float] = None,
+        max_samples: int = 0
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Samples between two offsets, one chunk at a time (bounded memory).
+
+        Blocks are split further when `max_samples` > 0. Chunks are decoded
+        on demand and not kept in the LRU.
+        """
+        start = self.sample_at(start_seconds or 0)
+        stop = self.sample_at(end_seconds) if end_seconds is not None else self.n_samples
+        if stop <= start:
+            return
+        starts = self.index['sample_start']
+        first = int(np.searchsorted(starts, start, side='right')) - 1
+        last = int(np.searchsorted(starts, stop - 1, side='right')) - 1
+
+        for i in range(first, last + 1):
+            ts, data = self._cache[i] if i in self._cache else self._decode_chunk(i)
+            base = int(starts[i])
+            a = max(start - base, 0)
+            b = min(stop - base, len(ts))
+            step = max_samples if max_samples > 0 else b - a
+            for j in range(a, b, step):
+                k = min(j + step, b)
+                yield ts[j:k], data[:, j:k]
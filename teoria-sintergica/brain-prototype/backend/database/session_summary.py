@@ -0,0 +1,88 @@
+"""
+Session summary materialized on the recording catalog at close.
+
+Corre la validación científica (run_all_tests + SessionQualityScore) y
+reduce el band power por fase a alpha por canal, una sola vez por sesión.
+El listado de /sessions y el dashboard leen estas columnas en lugar de
+recalcular o parsear validation_logs/*.json en cada request.
+"""
+
+from typing import Dict, List, Optional
+
+
+SUMMARY_VERSION = 1
+
+_CHANNELS = ('tp9', 'af7', 'af8', 'tp10')
+
+
+def alpha_by_phase(per_channel_by_phase: Optional[Dict]) -> Optional[Dict]:
+    """{phase: {band: {ch: raw}}} → {phase: {ch: alpha_raw, 'mean': ...}}."""
+    if not per_channel_by_phase:
+        return None
+    result = {}
+    for phase, bands in per_channel_by_phase.items():
+        alpha = (bands or {}).get('alpha') or {}
+        values = {ch: float(alpha[ch]) for ch in _CHANNELS if alpha.get(ch) is not None}
+        if values:
+            values['mean'] = sum(values.values()) / len(values)
+            result[phase] = values
+    return result or None
+
+
+def compute_session_summary(
+    metrics: List[Dict],
+    events: List[Dict],
+    per_channel_by_phase: Optional[Dict] = None
+) -> Dict:
+    """
+    Summary columns for one session (keys = SUMMARY_COLUMNS).
+
+    Args:
+        metrics: storage.get_metrics() rows
+        events: storage.get_events() rows ({label, timestamp})
+        per_channel_by_phase: SessionAggregator.by_phase() / storage.get_per_channel_by_phase()
+    """
+    from recording.validation import run_all_tests, SessionQualityScore
+
+    summary = {
+        'quality_score': None,
+        'quality_grade': None,
+        'validation_status': None,
+        'validation_passed': None,
+        'usable_for_training': None,
+        'alpha_by_phase': alpha_by_phase(per_channel_by_phase),
+        'summary_version': SUMMARY_VERSION,
+    }
+    if not metrics:
+        return summary
+
+    markers = [{'label': e.get('label', ''), 'timestamp': e.get('timestamp', 0)} for e in (events or [])]
+    quality = SessionQualityScore.compute(metrics, markers)
+    validation = run_all_tests(metrics, markers)['summary']
+
+    summary.update({
+        'quality_score': quality.get('total_score'),
+        'quality_grade': quality.get('grade'),
+        'validation_status': validation.get('overall'),
+        'validation_passed': validation.get('passed'),
+        'usable_for_training': validation.get('usable_for_training'),
+    })
+    return summary
+
+
+def materialize_session_summary(storage, recording_id: int, per_channel_by_phase: Optional[Dict] = None) -> Dict:
+    """
+    Compute the summary from stored metrics/events and write it to the catalog.
+
+    Args:
+        storage: StorageBackend
+        per_channel_by_phase: already known phases (recorder); read from storage if None
+    """
+    metrics = storage.get_metrics(recording_id)
+    events = storage.get_events(recording_id)
+    if per_channel_by_phase is None:
+        per_channel_by_phase = storage.get_per_channel_by_phase(recording_id)
+
+    summary = compute_session_summary(metrics, events, per_channel_by_phase)
+    storage.update_summary(recording_id, summary)
+    return summary
@@ -0,0 +1,56 @@
+"""
+Pluggable storage backends for recorded EEG sessions.
+
+- influx_postgres.py: PostgreSQL + InfluxDB (default, servidores)
+- embedded.py:        SQLite + archivos locales (offline / Raspberry Pi / tests)
+
+Selección con EEG_STORAGE_BACKEND=influx|embedded.
+"""
+
+import os
+from typing import Optional
+
+from .base import StorageBackend, encode_catalog_cursor, decode_catalog_cursor
+from .influx_postgres import InfluxPostgresBackend
+from .embedded import EmbeddedBackend, EMBEDDED_DIR
+
+
+STORAGE_BACKEND = os.getenv('EEG_STORAGE_BACKEND', 'influx').lower()
+
+_BACKENDS = {
+    'influx': InfluxPostgresBackend,
+    'embedded': EmbeddedBackend,
+}
+
+
+# Singleton instance
+_storage_backend: Optional[StorageBackend] = None
+
+
+def create_storage_backend(kind: str = None) -> StorageBackend:
+    """Build a new backend instance ('influx' or 'embedded')."""
+    kind = (kind or STORAGE_BACKEND).lower()
+    if kind not in _BACKENDS:
+        raise ValueError(f"Unknown EEG_STORAGE_BACKEND '{kind}' (expected: {', '.join(_BACKENDS)})")
+    return _BACKENDS[kind]()
+
+
+def get_storage_backend() -> StorageBackend:
+    """Get the singleton storage backend selected by EEG_STORAGE_BACKEND."""
+    global _storage_backend
+    if _storage_backend is None:
+        _storage_backend = create_storage_backend()
+    return _storage_backend
+
+
+__all__ = [
+    'StorageBackend',
+    'InfluxPostgresBackend',
+    'EmbeddedBackend',
+    'EMBEDDED_DIR',
+    'STORAGE_BACKEND',
+    'create_storage_backend',
+    'get_storage_backend',
+    'encode_catalog_cursor',
+    'decode_catalog_cursor',
+]
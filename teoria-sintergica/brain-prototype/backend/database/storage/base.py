@@ -0,0 +1,337 @@
+"""
+Abstract storage backend for recorded EEG sessions.
+
+Un backend cubre todo lo que el recorder, el SessionPlayer y los endpoints
+/sessions/* necesitan: metadata de la grabación, samples crudos, métricas,
+eventos y band power por canal.
+
+Timestamps:
+- Escrituras: relativos al inicio de la grabación + `base_timestamp`
+  (igual que InfluxDBEEGClient).
+- Lecturas: absolutos (Unix seconds), igual que las queries de InfluxDB.
+"""
+
+import base64
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from ..influx_client import EEGSample, MetricSnapshot
+from ..postgres_client import EEGRecording
+from ..session_archive import SessionArchive, archive_path, has_archive
+
+
+# Samples por bloque en las lecturas en streaming (10 s @ 256 Hz)
+STREAM_BLOCK_SAMPLES = 2560
+
+
+def encode_catalog_cursor(recording: EEGRecording) -> str:
+    """Opaque keyset cursor for the row after `recording` (started_at DESC, id DESC)."""
+    raw = f"{recording.started_at.isoformat()}|{recording.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_catalog_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_catalog_cursor(). Raises ValueError on garbage."""
+    try:
+        started_at, _, recording_id = base64.urlsafe_b64decode(cursor.encode()).decode().partition('|')
+        return datetime.fromisoformat(started_at), int(recording_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+class StorageBackend(ABC):
+    """Interface implemented by every EEG storage backend."""
+
+    name: str = "base"
+    # True si write_samples() ya escribe el session archive (el recorder
+    # no necesita escribir uno aparte)
+    native_archive: bool = False
+
+    @abstractmethod
+    def connect(self):
+        """Open connections / create files. Must be idempotent."""
+        pass
+
+    @abstractmethod
+    def close(self):
+        """Release connections."""
+        pass
+
+    # ==================== RECORDING METADATA ====================
+
+    @abstractmethod
+    def create_recording(
+        self,
+        name: str = "",
+        notes: str = "",
+        tags: List[str] = None,
+        device: str = "muse2",
+        device_address: str = "",
+        sampling_rate: int = 256,
+        recording_type: str = "session"
+    ) -> int:
+        """Create a recording and return its id."""
+        pass
+
+    @abstractmethod
+    def end_recording(
+        self,
+        recording_id: int,
+        duration_seconds: float = 0,
+        sample_count: int = 0,
+        metrics_count: int = 0,
+        calibration_passed: bool = False,
+        avg_signal_quality: float = 0,
+        aggregated_metrics: dict = None
+    ) -> Optional[EEGRecording]:
+        """Close a recording and persist its aggregates."""
+        pass
+
+    @abstractmethod
+    def get_recording(self, recording_id: int) -> Optional[EEGRecording]:
+        pass
+
+    @abstractmethod
+    def list_recordings(self, limit: int = 50, offset: int = 0) -> List[EEGRecording]:
+        """Recordings ordered by started_at DESC."""
+        pass
+
+    @abstractmethod
+    def list_recordings_catalog(
+        self,
+        limit: int = 50,
+        after: Optional[Tuple[datetime, int]] = None,
+        tag: Optional[str] = None,
+        recording_type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> List[EEGRecording]:
+        """
+        Keyset page ordered by (started_at, id) DESC.
+
+        `after` = (started_at, id) of the previous page's last row
+        (see decode_catalog_cursor).
+        """
+        pass
+
+    @abstractmethod
+    def update_summary(self, recording_id: int, summary: Dict) -> bool:
+        """Persist compute_session_summary() columns on the catalog row."""
+        pass
+
+    @abstractmethod
+    def delete_recording(self, recording_id: int) -> bool:
+        """Delete metadata and every time-series point of a recording."""
+        pass
+
+    # ==================== TIME-SERIES WRITES ====================
+
+    @abstractmethod
+    def write_samples(self, recording_id: int, samples: List[EEGSample], base_timestamp: datetime = None):
+        pass
+
+    def write_sample_block(
+        self,
+        recording_id: int,
+        timestamps: np.ndarray,
+        data: np.ndarray,
+        base_timestamp: datetime = None
+    ):
+        """
+        Columnar write: timestamps (n,) relative seconds, data (channels, n)
+        with rows tp9, af7, af8, tp10 [, aux].
+
+        Default implementation goes through write_samples(); backends
+        override it to skip the per-sample dataclasses.
+        """
+        aux = data[4] if data.shape[0] > 4 else np.zeros(len(timestamps))
+        samples = [
+            EEGSample(timestamp=t, tp9=a, af7=b, af8=c, tp10=d, aux=x)
+            for t, a, b, c, d, x in zip(
+                np.asarray(timestamps).tolist(), *(data[ch].tolist() for ch in range(4)), aux.tolist()
+            )
+        ]
+        self.write_samples(recording_id, samples, base_timestamp=base_timestamp)
+
+    @abstractmethod
+    def write_metrics(self, recording_id: int, metrics: List[MetricSnapshot], base_timestamp: datetime = None):
+        pass
+
+    @abstractmethod
+    def write_event(
+        self,
+        recording_id: int,
+        timestamp: float,
+        event_type: str,
+        label: str,
+        data: Dict = None,
+        base_timestamp: datetime = None
+    ):
+        pass
+
+    @abstractmethod
+    def write_band_power(
+        self,
+        recording_id: int,
+        ts_ns: int,
+        channel_bands: Dict[str, Dict[str, float]],
+        state: str = ""
+    ):
+        """Per-channel band power window: {band: {channel: raw_µV²/Hz}}."""
+        pass
+
+    def write_band_power_batch(
+        self,
+        recording_id: int,
+        windows: List[Tuple[int, Dict[str, Dict[str, float]], str]]
+    ):
+        """
+        Several band power windows at once: [(ts_ns, channel_bands, state), ...].
+
+        Default implementation calls write_band_power() per window; backends
+        override it to write one batch (offline reprocessing).
+        """
+        for ts_ns, channel_bands, state in windows:
+            self.write_band_power(recording_id, ts_ns, channel_bands, state=state)
+
+    @abstractmethod
+    def delete_derived(self, recording_id: int):
+        """Delete computed metrics + band power of a recording (samples/events are kept)."""
+        pass
+
+    @abstractmethod
+    def set_analysis_version(self, recording_id: int, version: int) -> bool:
+        """Stamp the analysis version of the stored metrics (migration 004)."""
+        pass
+
+    # ==================== TIME-SERIES READS ====================
+
+    @abstractmethod
+    def get_samples(
+        self,
+        recording_id: int,
+        start: float = 0,
+        end: float = None,
+        limit: int = None
+    ) -> List[Dict]:
+        """List of {timestamp, tp9, af7, af8, tp10}."""
+        pass
+
+    def get_sample_array(self, recording_id: int, limit: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Samples as arrays: (timestamps (n,), data (4, n)).
+
+        Default implementation goes through get_samples(); backends with a
+        columnar layout override it.
+        """
+        samples = self.get_samples(recording_id, limit=limit)
+        timestamps = np.array([s['timestamp'] for s in samples], dtype=np.float64)
+        data = np.array([
+            [s['tp9'] for s in samples],
+            [s['af7'] for s in samples],
+            [s['af8'] for s in samples],
+            [s['tp10'] for s in samples]
+        ], dtype=np.float64).reshape(4, len(samples))
+        return timestamps, data
+
+    # ==================== STREAMING ====================
+
+    def iter_sample_blocks(
+        self,
+        recording_id: int,
+        start: float = 0,
+        end: float = None,
+        block_samples: int = STREAM_BLOCK_SAMPLES
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        (timestamps (n,), data (4, n)) blocks for [start, end) seconds from
+        the first sample, with memory bounded by one block.
+
+        Reads the session archive when there is one, else _stream_samples().
+        """
+        archive = self.get_archive(recording_id)
+        if archive is not None and archive.n_samples > 0:
+            yield from archive.iter_blocks(start, end, max_samples=block_samples)
+            return
+        yield from self._stream_samples(recording_id, start, end, block_samples)
+
+    def _stream_samples(
+        self,
+        recording_id: int,
+        start: float,
+        end: Optional[float],
+        block_samples: int
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Fallback: one get_samples() call split into blocks (not bounded)."""
+        samples = self.get_samples(recording_id, start=start, end=end)
+        for i in range(0, len(samples), block_samples):
+            part = samples[i:i + block_samples]
+            timestamps = np.array([s['timestamp'] for s in part], dtype=np.float64)
+            data = np.array([[s[ch] for s in part] for ch in ('tp9', 'af7', 'af8', 'tp10')], dtype=np.float32)
+            yield timestamps, data
+
+    def iter_metrics(self, recording_id: int, start: float = 0, end: float = None) -> Iterator[Dict]:
+        """Metric dicts for [start, end) seconds from the first metric."""
+        metrics = self.get_metrics(recording_id)
+        if not metrics:
+            return
+        t0 = metrics[0]['timestamp']
+        for m in metrics:
+            offset = m['timestamp'] - t0
+            if offset < (start or 0):
+                continue
+            if end is not None and offset >= end:
+                break
+            yield m
+
+    # ==================== SESSION ARCHIVE ====================
+
+    def archive_dir(self, recording_id: int) -> Path:
+        """Directory of the chunked binary archive of a recording."""
+        return archive_path(recording_id)
+
+    def get_archive(self, recording_id: int) -> Optional[SessionArchive]:
+        """Memory-mapped raw-sample archive, or None if not written."""
+        path = self.archive_dir(recording_id)
+        return SessionArchive(path) if has_archive(path) else None
+
+    @abstractmethod
+    def get_metrics(
+        self,
+        recording_id: int,
+        max_points: Optional[int] = None,
+        duration_seconds: Optional[float] = None
+    ) -> List[Dict]:
+        pass
+
+    @abstractmethod
+    def get_events(self, recording_id: int) -> List[Dict]:
+        """List of {timestamp, label, event_type} sorted by time."""
+        pass
+
+    @abstractmethod
+    def get_per_channel_metrics(
+        self,
+        recording_id: int,
+        max_points: Optional[int] = None,
+        duration_seconds: Optional[float] = None
+    ) -> Optional[Dict]:
+        """`per_channel` object of /sessions/{id}/metrics, or None."""
+        pass
+
+    @abstractmethod
+    def get_per_channel_by_phase(self, recording_id: int) -> Optional[Dict]:
+        pass
+
+    @abstractmethod
+    def compute_aggregates(self, recording_id: int) -> Dict:
+        """
+        Recompute session aggregates from stored data (reclose / fallback).
+
+        Same keys as SessionAggregator.finalize().
+        """
+        pass
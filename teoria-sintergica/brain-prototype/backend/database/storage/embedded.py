@@ -0,0 +1,605 @@
+"""
+Embedded storage backend: SQLite catalog + chunked sample files.
+
+Para grabar sin servidores (laptop offline, Raspberry Pi) y como backend
+hermético para tests y benchmarks.
+
+Layout (EEG_EMBEDDED_DIR, default backend/data/local_store):
+    catalog.db              recordings, metrics, events, band_power
+    recordings/<id>/archive session archive (chunked, compressed raw samples,
+                            see database/session_archive.py)
+"""
+
+import os
+import json
+import shutil
+import sqlite3
+import threading
+from dataclasses import fields
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from ..influx_client import EEGSample, MetricSnapshot
+from ..models import _PRAGMAS
+from ..postgres_client import EEGRecording
+from ..session_aggregator import SessionAggregator
+from ..session_archive import SessionArchive, SessionArchiveWriter
+from .base import StorageBackend
+
+
+EMBEDDED_DIR = Path(os.getenv(
+    'EEG_EMBEDDED_DIR',
+    str(Path(__file__).resolve().parent.parent.parent / 'data' / 'local_store')
+))
+
+CHANNELS = ['tp9', 'af7', 'af8', 'tp10']
+BANDS = ['delta', 'theta', 'alpha', 'beta', 'gamma']
+
+# Campos numéricos de MetricSnapshot → columnas REAL de la tabla metrics
+_METRIC_FIELDS = [
+    f.name for f in fields(MetricSnapshot)
+    if f.name not in ('timestamp', 'state', 'blink_contaminated')
+]
+
+
+def _sql_type(py_type) -> str:
+    if py_type is bool or py_type is int:
+        return 'INTEGER'
+    if py_type is float:
+        return 'REAL'
+    return 'TEXT'  # str, datetime (ISO), List[str] (JSON)
+
+
+class EmbeddedBackend(StorageBackend):
+    """SQLite + session archive, no external services."""
+
+    name = "embedded"
+    native_archive = True
+
+    def __init__(self, root: Path = None):
+        self.root = Path(root or EMBEDDED_DIR)
+        self.db_path = self.root / 'catalog.db'
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._initialized = False
+        # Writers abiertos de grabaciones en curso (se cierran en end_recording)
+        self._writers: Dict[int, SessionArchiveWriter] = {}
+
+    # ==================== CONNECTION ====================
+
+    def _conn(self) -> sqlite3.Connection:
+        """Conexión persistente del hilo que llama (como SessionDatabase)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            for pragma in _PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+        return conn
+
+    def connect(self):
+        if self._initialized:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        recording_cols = ',\n'.join(
+            f'    {f.name} {_sql_type(f.type)}'
+            for f in fields(EEGRecording) if f.name != 'id'
+        )
+        metric_cols = ',\n'.join(f'    {name} REAL' for name in _METRIC_FIELDS)
+
+        with self._lock:
+            conn = self._conn()
+            conn.executescript(f'''
+                CREATE TABLE IF NOT EXISTS recordings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                {recording_cols}
+                );
+                CREATE TABLE IF NOT EXISTS metrics (
+                    recording_id INTEGER NOT NULL,
+                    timestamp REAL NOT NULL,
+                    state TEXT,
+                    blink_contaminated INTEGER,
+                {metric_cols}
+                );
+                CREATE INDEX IF NOT EXISTS idx_metrics_rec ON metrics(recording_id, timestamp);
+                CREATE TABLE IF NOT EXISTS events (
+                    recording_id INTEGER NOT NULL,
+                    timestamp REAL NOT NULL,
+                    event_type TEXT,
+                    label TEXT,
+                    data TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_events_rec ON events(recording_id, timestamp);
+                CREATE TABLE IF NOT EXISTS band_power (
+                    recording_id INTEGER NOT NULL,
+                    timestamp REAL NOT NULL,
+                    band TEXT NOT NULL,
+                    channel TEXT NOT NULL,
+                    state TEXT,
+                    value REAL,
+                    value_raw REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_band_power_rec ON band_power(recording_id, timestamp);
+            ''')
+            # Catálogos creados antes de columnas nuevas de EEGRecording
+            existing = {row['name'] for row in conn.execute('PRAGMA table_info(recordings)')}
+            for f in fields(EEGRecording):
+                if f.name not in existing:
+                    conn.execute(f'ALTER TABLE recordings ADD COLUMN {f.name} {_sql_type(f.type)}')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_recordings_catalog ON recordings(started_at DESC, id DESC)')
+            conn.commit()
+        self._initialized = True
+        print(f"✓ Embedded storage ready: {self.root}")
+
+    def close(self):
+        """Cierra la conexión del hilo que llama (los demás hilos conservan la suya)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _recording_dir(self, recording_id: int) -> Path:
+        return self.root / 'recordings' / str(recording_id)
+
+    # ==================== RECORDING METADATA ====================
+
+    def _row_to_recording(self, row: sqlite3.Row) -> EEGRecording:
+        kwargs = {}
+        for f in fields(EEGRecording):
+            value = row[f.name]
+            if value is None:
+                continue
+            if f.name in ('channels', 'tags', 'alpha_by_phase'):
+                value = json.loads(value)
+            elif f.name in ('started_at', 'ended_at'):
+                value = datetime.fromisoformat(value)
+            elif f.type is bool:
+                value = bool(value)
+            kwargs[f.name] = value
+        return EEGRecording(**kwargs)
+
+    def create_recording(
+        self,
+        name: str = "",
+        notes: str = "",
+        tags: List[str] = None,
+        device: str = "muse2",
+        device_address: str = "",
+        sampling_rate: int = 256,
+        recording_type: str = "session"
+    ) -> int:
+        self.connect()
+        if not name:
+            name = f"Recording {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+
+        with self._lock:
+            conn = self._conn()
+            cur = conn.execute('''
+                INSERT INTO recordings
+                (name, notes, tags, channels, device, device_address, sampling_rate,
+                 recording_type, started_at, sample_count, metrics_count,
+                 calibration_passed, per_channel_version)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, 0, 0, 0)
+            ''', (
+                name, notes, json.dumps(tags or []), json.dumps(['TP9', 'AF7', 'AF8', 'TP10']),
+                device, device_address, sampling_rate, recording_type,
+                datetime.utcnow().isoformat()
+            ))
+            recording_id = cur.lastrowid
+            conn.commit()
+
+        print(f"📝 Recording created (embedded): #{recording_id} - {name}")
+        return recording_id
+
+    def end_recording(
+        self,
+        recording_id: int,
+        duration_seconds: float = 0,
+        sample_count: int = 0,
+        metrics_count: int = 0,
+        calibration_passed: bool = False,
+        avg_signal_quality: float = 0,
+        aggregated_metrics: dict = None
+    ) -> Optional[EEGRecording]:
+        self.connect()
+        with self._lock:
+            writer = self._writers.pop(recording_id, None)
+            if writer is not None:
+                writer.close()
+
+        values = {
+            'ended_at': datetime.utcnow().isoformat(),
+            'duration_seconds': float(duration_seconds or 0),
+            'sample_count': int(sample_count),
+            'metrics_count': int(metrics_count),
+            'calibration_passed': int(bool(calibration_passed)),
+            'avg_signal_quality': float(avg_signal_quality or 0),
+        }
+        columns = {f.name for f in fields(EEGRecording)}
+        for key, value in (aggregated_metrics or {}).items():
+            if key in columns:
+                values[key] = value.item() if hasattr(value, 'item') else value
+
+        assignments = ', '.join(f'{k} = ?' for k in values)
+        with self._lock:
+            conn = self._conn()
+            conn.execute(
+                f'UPDATE recordings SET {assignments} WHERE id = ?',
+                (*values.values(), recording_id)
+            )
+            conn.commit()
+
+        print(f"✅ Recording #{recording_id} ended (embedded): {values['duration_seconds']:.1f}s, {sample_count} samples")
+        return self.get_recording(recording_id)
+
+    def get_recording(self, recording_id: int) -> Optional[EEGRecording]:
+        self.connect()
+        conn = self._conn()
+        row = conn.execute('SELECT * FROM recordings WHERE id = ?', (recording_id,)).fetchone()
+        return self._row_to_recording(row) if row else None
+
+    def list_recordings(self, limit: int = 50, offset: int = 0) -> List[EEGRecording]:
+        self.connect()
+        conn = self._conn()
+        rows = conn.execute(
+            'SELECT * FROM recordings ORDER BY started_at DESC LIMIT ? OFFSET ?',
+            (limit, offset)
+        ).fetchall()
+        return [self._row_to_recording(row) for row in rows]
+
+    def list_recordings_catalog(
+        self,
+        limit: int = 50,
+        after: Optional[Tuple[datetime, int]] = None,
+        tag: Optional[str] = None,
+        recording_type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> List[EEGRecording]:
+        self.connect()
+        # started_at es ISO-8601 → el orden de texto coincide con el cronológico
+        where, params = [], []
+        if after is not None:
+            where.append('(started_at, id) < (?, ?)')
+            params.extend([after[0].isoformat(), after[1]])
+        if tag:
+            where.append('EXISTS (SELECT 1 FROM json_each(recordings.tags) WHERE value = ?)')
+            params.append(tag)
+        if recording_type:
+            where.append('recording_type = ?')
+            params.append(recording_type)
+        if since:
+            where.append('started_at >= ?')
+            params.append(since.isoformat())
+        if until:
+            where.append('started_at < ?')
+            params.append(until.isoformat())
+
+        query = 'SELECT * FROM recordings'
+        if where:
+            query += ' WHERE ' + ' AND '.join(where)
+        query += ' ORDER BY started_at DESC, id DESC LIMIT ?'
+        params.append(limit)
+
+        conn = self._conn()
+        rows = conn.execute(query, params).fetchall()
+        return [self._row_to_recording(row) for row in rows]
+
+    def update_summary(self, recording_id: int, summary: Dict) -> bool:
+        self.connect()
+        columns = {f.name for f in fields(EEGRecording)}
+        values = {
+            k: (json.dumps(v) if isinstance(v, dict) else v)
+            for k, v in summary.items() if k in columns
+        }
+        if not values:
+            return False
+        assignments = ', '.join(f'{k} = ?' for k in values)
+        with self._lock:
+            conn = self._conn()
+            cur = conn.execute(f'UPDATE recordings SET {assignments} WHERE id = ?', (*values.values(), recording_id))
+            updated = cur.rowcount > 0
+            conn.commit()
+        return updated
+
+    def delete_recording(self, recording_id: int) -> bool:
+        self.connect()
+        with self._lock:
+            writer = self._writers.pop(recording_id, None)
+            if writer is not None:
+                writer.close()
+            conn = self._conn()
+            for table in ('metrics', 'events', 'band_power'):
+                conn.execute(f'DELETE FROM {table} WHERE recording_id = ?', (recording_id,))
+            cur = conn.execute('DELETE FROM recordings WHERE id = ?', (recording_id,))
+            deleted = cur.rowcount > 0
+            conn.commit()
+        shutil.rmtree(self._recording_dir(recording_id), ignore_errors=True)
+        return deleted
+
+    def delete_derived(self, recording_id: int):
+        self.connect()
+        with self._lock:
+            conn = self._conn()
+            for table in ('metrics', 'band_power'):
+                conn.execute(f'DELETE FROM {table} WHERE recording_id = ?', (recording_id,))
+            conn.commit()
+
+    def set_analysis_version(self, recording_id: int, version: int) -> bool:
+        return self.update_summary(recording_id, {'analysis_version': int(version)})
+
+    # ==================== TIME-SERIES WRITES ====================
+
+    def write_samples(self, recording_id: int, samples: List[EEGSample], base_timestamp: datetime = None):
+        if not samples:
+            return
+        timestamps = np.array([s.timestamp for s in samples], dtype=np.float64)
+        data = np.array([[s.tp9, s.af7, s.af8, s.tp10] for s in samples], dtype=np.float32).T
+        self.write_sample_block(recording_id, timestamps, data, base_timestamp=base_timestamp)
+
+    def write_sample_block(
+        self,
+        recording_id: int,
+        timestamps: np.ndarray,
+        data: np.ndarray,
+        base_timestamp: datetime = None
+    ):
+        if len(timestamps) == 0:
+            return
+        self.connect()
+        base_ts = (base_timestamp or datetime.utcnow()).timestamp()
+
+        with self._lock:
+            writer = self._writers.get(recording_id)
+            if writer is None:
+                recording = self.get_recording(recording_id)
+                fs = recording.sampling_rate if recording else 256
+                writer = SessionArchiveWriter(self.archive_dir(recording_id), fs=fs, channels=CHANNELS)
+                self._writers[recording_id] = writer
+            writer.append(base_ts + np.asarray(timestamps, dtype=np.float64), data[:len(CHANNELS)])
+
+    def write_metrics(self, recording_id: int, metrics: List[MetricSnapshot], base_timestamp: datetime = None):
+        if not metrics:
+            return
+        self.connect()
+        base_ts = (base_timestamp or datetime.utcnow()).timestamp()
+        columns = ['recording_id', 'timestamp', 'state', 'blink_contaminated'] + _METRIC_FIELDS
+        rows = [
+            (recording_id, base_ts + m.timestamp, m.state, int(bool(m.blink_contaminated)),
+             *[float(getattr(m, name)) for name in _METRIC_FIELDS])
+            for m in metrics
+        ]
+        with self._lock:
+            conn = self._conn()
+            conn.executemany(
+                f'INSERT INTO metrics ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})',
+                rows
+            )
+            conn.commit()
+
+    def write_event(
+        self,
+        recording_id: int,
+        timestamp: float,
+        event_type: str,
+        label: str,
+        data: Dict = None,
+        base_timestamp: datetime = None
+    ):
+        self.connect()
+        ts = (base_timestamp or datetime.utcnow()).timestamp() + timestamp
+        with self._lock:
+            conn = self._conn()
+            conn.execute(
+                'INSERT INTO events (recording_id, timestamp, event_type, label, data) VALUES (?, ?, ?, ?, ?)',
+                (recording_id, ts, event_type, label, json.dumps(data) if data else None)
+            )
+            conn.commit()
+
+    def write_band_power(
+        self,
+        recording_id: int,
+        ts_ns: int,
+        channel_bands: Dict[str, Dict[str, float]],
+        state: str = ""
+    ):
+        self._insert_band_power(self._band_power_insert_rows(recording_id, ts_ns, channel_bands, state))
+
+    def write_band_power_batch(
+        self,
+        recording_id: int,
+        windows: List[Tuple[int, Dict[str, Dict[str, float]], str]]
+    ):
+        rows = []
+        for ts_ns, channel_bands, state in windows:
+            rows.extend(self._band_power_insert_rows(recording_id, ts_ns, channel_bands, state))
+        if rows:
+            self._insert_band_power(rows)
+
+    @staticmethod
+    def _band_power_insert_rows(recording_id: int, ts_ns: int, channel_bands: Dict, state: str) -> List[tuple]:
+        ts = ts_ns / 1e9
+
+        # Misma normalización que InfluxDBEEGClient: por canal, sobre todas las bandas
+        totals: Dict[str, float] = {}
+        for ch_raw in channel_bands.values():
+            for ch, raw in ch_raw.items():
+                totals[ch] = totals.get(ch, 0.0) + float(raw)
+
+        return [
+            (recording_id, ts, band, ch, state, float(raw) / (totals[ch] or 1.0), float(raw))
+            for band, ch_raw in channel_bands.items()
+            for ch, raw in ch_raw.items()
+        ]
+
+    def _insert_band_power(self, rows: List[tuple]):
+        self.connect()
+        with self._lock:
+            conn = self._conn()
+            conn.executemany(
+                'INSERT INTO band_power (recording_id, timestamp, band, channel, state, value, value_raw) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            conn.commit()
+
+    # ==================== TIME-SERIES READS ====================
+
+    def archive_dir(self, recording_id: int) -> Path:
+        return self._recording_dir(recording_id) / 'archive'
+
+    def get_archive(self, recording_id: int) -> Optional[SessionArchive]:
+        with self._lock:
+            writer = self._writers.get(recording_id)
+            if writer is not None:
+                # Grabación en curso: volcar el chunk parcial para que sea visible
+                writer.flush()
+        return super().get_archive(recording_id)
+
+    def get_sample_array(self, recording_id: int, limit: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        archive = self.get_archive(recording_id)
+        if archive is None:
+            return np.empty(0), np.empty((4, 0))
+        return archive.read(0, min(limit, archive.n_samples) if limit else archive.n_samples)
+
+    def get_samples(self, recording_id: int, start: float = 0, end: float = None, limit: int = None) -> List[Dict]:
+        archive = self.get_archive(recording_id)
+        if archive is None:
+            return []
+        i0 = archive.sample_at(start or 0)
+        i1 = archive.sample_at(end) + 1 if end is not None else archive.n_samples
+        if limit:
+            i1 = min(i1, i0 + limit)
+        timestamps, data = archive.read(i0, i1)
+        return [
+            {'timestamp': float(timestamps[i]), 'tp9': float(data[0, i]), 'af7': float(data[1, i]),
+             'af8': float(data[2, i]), 'tp10': float(data[3, i])}
+            for i in range(len(timestamps))
+        ]
+
+    def get_metrics(
+        self,
+        recording_id: int,
+        max_points: Optional[int] = None,
+        duration_seconds: Optional[float] = None
+    ) -> List[Dict]:
+        # Sin rollups: siempre resolución completa
+        self.connect()
+        conn = self._conn()
+        rows = conn.execute(
+            'SELECT * FROM metrics WHERE recording_id = ? ORDER BY timestamp', (recording_id,)
+        ).fetchall()
+
+        return [self._metric_row(row) for row in rows]
+
+    @staticmethod
+    def _metric_row(row) -> Dict:
+        m = {'timestamp': row['timestamp'], 'state': row['state'] or ''}
+        for name in _METRIC_FIELDS:
+            m[name] = row[name] or 0
+        m['blink_contaminated'] = bool(row['blink_contaminated'])
+        return m
+
+    def iter_metrics(self, recording_id: int, start: float = 0, end: float = None) -> Iterator[Dict]:
+        # Cursor de SQLite: las filas se leen a medida que se consumen
+        self.connect()
+        conn = self._conn()
+        t0 = conn.execute(
+            'SELECT MIN(timestamp) FROM metrics WHERE recording_id = ?', (recording_id,)
+        ).fetchone()[0]
+        if t0 is None:
+            return
+        query = 'SELECT * FROM metrics WHERE recording_id = ? AND timestamp >= ?'
+        params = [recording_id, t0 + (start or 0)]
+        if end is not None:
+            query += ' AND timestamp < ?'
+            params.append(t0 + end)
+        for row in conn.execute(query + ' ORDER BY timestamp', params):
+            yield self._metric_row(row)
+
+    def get_events(self, recording_id: int) -> List[Dict]:
+        self.connect()
+        conn = self._conn()
+        rows = conn.execute(
+            'SELECT timestamp, label, event_type FROM events WHERE recording_id = ? ORDER BY timestamp',
+            (recording_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _band_power_rows(self, recording_id: int) -> List[sqlite3.Row]:
+        self.connect()
+        conn = self._conn()
+        rows = conn.execute(
+            'SELECT timestamp, band, channel, value, value_raw FROM band_power '
+            'WHERE recording_id = ? ORDER BY timestamp',
+            (recording_id,)
+        ).fetchall()
+        return rows
+
+    def get_per_channel_metrics(
+        self,
+        recording_id: int,
+        max_points: Optional[int] = None,
+        duration_seconds: Optional[float] = None
+    ) -> Optional[Dict]:
+        rows = self._band_power_rows(recording_id)
+        if not rows:
+            return None
+
+        time_points: Dict[float, Dict] = {}
+        for row in rows:
+            pt = time_points.setdefault(row['timestamp'], {})
+            pt.setdefault(row['band'], {})[row['channel']] = (row['value'], row['value_raw'])
+
+        sorted_ts = sorted(time_points)
+        per_channel: Dict = {"timestamps": sorted_ts}
+        for band in BANDS:
+            per_channel[band] = {ch: [] for ch in CHANNELS}
+            per_channel[f"{band}_raw"] = {ch: [] for ch in CHANNELS}
+            for ts in sorted_ts:
+                for ch in CHANNELS:
+                    value, value_raw = time_points[ts].get(band, {}).get(ch, (0.0, 0.0))
+                    per_channel[band][ch].append(value)
+                    per_channel[f"{band}_raw"][ch].append(value_raw)
+        return per_channel
+
+    def _replay_aggregator(self, recording_id: int) -> SessionAggregator:
+        """Rebuild aggregates by replaying stored rows through SessionAggregator."""
+        agg = SessionAggregator()
+        for m in self.get_metrics(recording_id):
+            agg.add_metrics(MetricSnapshot(
+                timestamp=m['timestamp'],
+                **{name: m[name] for name in _METRIC_FIELDS},
+                state=m['state'],
+                blink_contaminated=m['blink_contaminated'],
+            ))
+
+        # Eventos y band power en orden temporal; con igual timestamp:
+        # *_start antes de los datos y *_end después (ventanas inclusivas).
+        stream = []
+        for ev in self.get_events(recording_id):
+            order = 2 if ev['label'].endswith('_end') else 0
+            stream.append((ev['timestamp'], order, 'marker', ev['label']))
+        windows: Dict[float, Dict] = {}
+        for row in self._band_power_rows(recording_id):
+            windows.setdefault(row['timestamp'], {}).setdefault(row['band'], {})[row['channel']] = row['value_raw']
+        for ts, bands in windows.items():
+            stream.append((ts, 1, 'bands', bands))
+
+        for ts, _, kind, payload in sorted(stream, key=lambda x: (x[0], x[1])):
+            if kind == 'marker':
+                agg.add_marker(payload, ts)
+            else:
+                agg.add_band_power(ts, payload)
+        return agg
+
+    def get_per_channel_by_phase(self, recording_id: int) -> Optional[Dict]:
+        return self._replay_aggregator(recording_id).by_phase()
+
+    def compute_aggregates(self, recording_id: int) -> Dict:
+        return self._replay_aggregator(recording_id).finalize()
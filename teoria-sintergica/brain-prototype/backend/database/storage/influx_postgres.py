@@ -0,0 +1,219 @@
+"""
+Storage backend: PostgreSQL (metadata) + InfluxDB (time-series).
+
+Thin adapter over PostgresClientSync and InfluxDBEEGClient — the default
+deployment (docker-compose / DigitalOcean).
+"""
+
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from ..influx_client import EEGSample, MetricSnapshot, InfluxDBEEGClient, get_influx_client
+from ..postgres_client import EEGRecording, PostgresClientSync, get_postgres_client_sync
+from .base import StorageBackend
+
+
+class InfluxPostgresBackend(StorageBackend):
+    """PostgreSQL eeg_recordings + InfluxDB eeg-data bucket."""
+
+    name = "influx"
+
+    def __init__(
+        self,
+        postgres: PostgresClientSync = None,
+        influx: InfluxDBEEGClient = None
+    ):
+        self.postgres = postgres or get_postgres_client_sync()
+        self.influx = influx or get_influx_client()
+
+    def connect(self):
+        self.postgres.connect()
+        self.influx.connect()
+
+    def close(self):
+        self.postgres.close()
+        self.influx.close()
+
+    # ==================== RECORDING METADATA ====================
+
+    def create_recording(
+        self,
+        name: str = "",
+        notes: str = "",
+        tags: List[str] = None,
+        device: str = "muse2",
+        device_address: str = "",
+        sampling_rate: int = 256,
+        recording_type: str = "session"
+    ) -> int:
+        return self.postgres.create_recording(
+            name=name,
+            notes=notes,
+            tags=tags,
+            device=device,
+            device_address=device_address,
+            sampling_rate=sampling_rate,
+            recording_type=recording_type
+        )
+
+    def end_recording(
+        self,
+        recording_id: int,
+        duration_seconds: float = 0,
+        sample_count: int = 0,
+        metrics_count: int = 0,
+        calibration_passed: bool = False,
+        avg_signal_quality: float = 0,
+        aggregated_metrics: dict = None
+    ) -> Optional[EEGRecording]:
+        return self.postgres.end_recording(
+            recording_id,
+            duration_seconds=duration_seconds,
+            sample_count=sample_count,
+            metrics_count=metrics_count,
+            calibration_passed=calibration_passed,
+            avg_signal_quality=avg_signal_quality,
+            aggregated_metrics=aggregated_metrics
+        )
+
+    def get_recording(self, recording_id: int) -> Optional[EEGRecording]:
+        return self.postgres.get_recording(recording_id)
+
+    def list_recordings(self, limit: int = 50, offset: int = 0) -> List[EEGRecording]:
+        return self.postgres.get_all_recordings(limit=limit, offset=offset)
+
+    def list_recordings_catalog(
+        self,
+        limit: int = 50,
+        after: Optional[Tuple[datetime, int]] = None,
+        tag: Optional[str] = None,
+        recording_type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> List[EEGRecording]:
+        return self.postgres.list_recordings_catalog(
+            limit=limit, after=after, tag=tag, recording_type=recording_type, since=since, until=until
+        )
+
+    def update_summary(self, recording_id: int, summary: Dict) -> bool:
+        return self.postgres.update_summary(recording_id, summary)
+
+    def delete_recording(self, recording_id: int) -> bool:
+        self.influx.delete_recording_data(recording_id)
+        return self.postgres.delete_recording(recording_id)
+
+    # ==================== TIME-SERIES WRITES ====================
+
+    def write_samples(self, recording_id: int, samples: List[EEGSample], base_timestamp: datetime = None):
+        self.influx.write_samples(recording_id=recording_id, samples=samples, base_timestamp=base_timestamp)
+
+    def write_sample_block(
+        self,
+        recording_id: int,
+        timestamps: np.ndarray,
+        data: np.ndarray,
+        base_timestamp: datetime = None
+    ):
+        self.influx.write_sample_block(recording_id, timestamps, data, base_timestamp=base_timestamp)
+
+    def write_metrics(self, recording_id: int, metrics: List[MetricSnapshot], base_timestamp: datetime = None):
+        self.influx.write_metrics(recording_id=recording_id, metrics=metrics, base_timestamp=base_timestamp)
+
+    def write_event(
+        self,
+        recording_id: int,
+        timestamp: float,
+        event_type: str,
+        label: str,
+        data: Dict = None,
+        base_timestamp: datetime = None
+    ):
+        self.influx.write_event(
+            recording_id=recording_id,
+            timestamp=timestamp,
+            event_type=event_type,
+            label=label,
+            data=data,
+            base_timestamp=base_timestamp
+        )
+
+    def write_band_power(
+        self,
+        recording_id: int,
+        ts_ns: int,
+        channel_bands: Dict[str, Dict[str, float]],
+        state: str = ""
+    ):
+        self.influx.write_band_power_per_channel(
+            recording_id=recording_id,
+            ts_ns=ts_ns,
+            channel_bands=channel_bands,
+            state=state
+        )
+
+    def write_band_power_batch(
+        self,
+        recording_id: int,
+        windows: List[Tuple[int, Dict[str, Dict[str, float]], str]]
+    ):
+        self.influx.write_band_power_batch(recording_id, windows)
+
+    def delete_derived(self, recording_id: int):
+        self.influx.delete_derived_data(recording_id)
+
+    def set_analysis_version(self, recording_id: int, version: int) -> bool:
+        return self.postgres.set_analysis_version(recording_id, version)
+
+    # ==================== TIME-SERIES READS ====================
+
+    def get_samples(self, recording_id: int, start: float = 0, end: float = None, limit: int = None) -> List[Dict]:
+        return self.influx.get_samples(recording_id, start=start, end=end, limit=limit)
+
+    def _stream_samples(
+        self,
+        recording_id: int,
+        start: float,
+        end: Optional[float],
+        block_samples: int
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        return self.influx.iter_samples(recording_id, start=start, end=end, block_size=block_samples)
+
+    def iter_metrics(self, recording_id: int, start: float = 0, end: float = None) -> Iterator[Dict]:
+        return self.influx.iter_metrics(recording_id, start=start, end=end)
+
+    def get_metrics(
+        self,
+        recording_id: int,
+        max_points: Optional[int] = None,
+        duration_seconds: Optional[float] = None
+    ) -> List[Dict]:
+        return self.influx.get_metrics(recording_id, max_points=max_points, duration_seconds=duration_seconds)
+
+    def get_events(self, recording_id: int) -> List[Dict]:
+        return self.influx.get_events(recording_id)
+
+    def get_per_channel_metrics(
+        self,
+        recording_id: int,
+        max_points: Optional[int] = None,
+        duration_seconds: Optional[float] = None
+    ) -> Optional[Dict]:
+        return self.influx.get_per_channel_metrics(
+            recording_id, max_points=max_points, duration_seconds=duration_seconds
+        )
+
+    def get_per_channel_by_phase(self, recording_id: int) -> Optional[Dict]:
+        return self.influx.get_per_channel_by_phase(recording_id)
+
+    def compute_aggregates(self, recording_id: int) -> Dict:
+        aggregated = self.influx.get_aggregated_metrics(recording_id)
+        # Convert numpy types to native Python types
+        for key, value in aggregated.items():
+            if hasattr(value, 'item'):
+                aggregated[key] = value.item()
+            elif value is not None:
+                aggregated[key] = float(value)
+        aggregated.update(self.influx.get_per_channel_aggregates(recording_id))
+        return aggregated
@@ -0,0 +1,72 @@
+"""
+Encoders for streamed session payloads (StreamingResponse bodies).
+
+Consumen los iteradores del storage (iter_sample_blocks / iter_metrics),
+así que la memoria queda acotada a un bloque y el cliente empieza a
+renderizar antes de que llegue la sesión completa.
+
+NDJSON (application/x-ndjson):
+    samples: una línea por bloque, columnar
+        {"timestamps": [...], "tp9": [...], "af7": [...], "af8": [...], "tp10": [...]}
+    métricas / eventos: una línea por fila
+
+Binario (application/octet-stream), little-endian:
+    header: b"EEGB" | uint16 version | uint16 n_channels
+    bloque: uint32 n | float64 timestamps[n] | float32 data[n_channels][n]
+"""
+
+import json
+import struct
+from typing import BinaryIO, Dict, Iterable, Iterator, Tuple
+
+import numpy as np
+
+
+CHANNELS = ('tp9', 'af7', 'af8', 'tp10')
+
+BINARY_MAGIC = b'EEGB'
+BINARY_VERSION = 1
+BINARY_MEDIA_TYPE = 'application/octet-stream'
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+_HEADER = struct.Struct('<4sHH')
+_BLOCK = struct.Struct('<I')
+
+
+def ndjson_sample_blocks(blocks: Iterable[Tuple[np.ndarray, np.ndarray]]) -> Iterator[bytes]:
+    """(timestamps, data (4, n)) blocks → one columnar NDJSON line per block."""
+    for timestamps, data in blocks:
+        line = {'timestamps': np.asarray(timestamps, dtype=np.float64).tolist()}
+        for ch, row in zip(CHANNELS, np.asarray(data, dtype=np.float64)):
+            line[ch] = row.tolist()
+        yield (json.dumps(line, separators=(',', ':')) + '\n').encode()
+
+
+def ndjson_rows(rows: Iterable[Dict]) -> Iterator[bytes]:
+    """Dicts (metrics, events) → one NDJSON line each."""
+    for row in rows:
+        yield (json.dumps(row, separators=(',', ':'), default=str) + '\n').encode()
+
+
+def binary_sample_blocks(blocks: Iterable[Tuple[np.ndarray, np.ndarray]]) -> Iterator[bytes]:
+    """(timestamps, data (4, n)) blocks → length-prefixed binary blocks."""
+    yield _HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(CHANNELS))
+    for timestamps, data in blocks:
+        ts = np.ascontiguousarray(timestamps, dtype='<f8')
+        values = np.ascontiguousarray(data[:len(CHANNELS)], dtype='<f4')
+        yield _BLOCK.pack(len(ts)) + ts.tobytes() + values.tobytes()
+
+
+def read_binary_blocks(stream: BinaryIO) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Decoder for binary_sample_blocks() (clients, scripts, tests)."""
+    magic, version, n_channels = _HEADER.unpack(stream.read(_HEADER.size))
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError(f"Not an EEGB v{BINARY_VERSION} stream")
+    while True:
+        prefix = stream.read(_BLOCK.size)
+        if len(prefix) < _BLOCK.size:
+            return
+        (n,) = _BLOCK.unpack(prefix)
+        timestamps = np.frombuffer(stream.read(8 * n), dtype='<f8')
+        data = np.frombuffer(stream.read(4 * n * n_channels), dtype='<f4').reshape(n_channels, n)
+        yield timestamps, data
@@ -17,8 +17,9 @@ Dependencies:
 
 import numpy as np
 from collections import deque
+from itertools import islice
 from threading import Thread, Lock, Event
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 import time
 import subprocess
 import sys
@@ -74,6 +75,8 @@ class MuseConnector(EEGDevice):
         # Buffer circular para cada canal
         self._buffer = {ch: deque(maxlen=self._buffer_size) for ch in self.CHANNELS}
         self._timestamps = deque(maxlen=self._buffer_size)
+        # Muestras recibidas desde el inicio (cursor de read_since)
+        self._sample_count = 0
         
         # Thread de streaming
         self._stream_thread: Optional[Thread] = None
@@ -515,6 +518,7 @@ class MuseConnector(EEGDevice):
                             if i < len(sample):
                                 self._buffer[ch].append(sample[i])
                         self._timestamps.append(timestamp)
+                        self._sample_count += 1
                         self._last_sample_time = time.time()
                 else:
                     # pull_sample retornó None — no hay datos
@@ -626,6 +630,34 @@ class MuseConnector(EEGDevice):
             duration=duration
         )
     
+    @property
+    def sample_count(self) -> int:
+        """Muestras recibidas desde que se creó el conector."""
+        return self._sample_count
+    
+    def read_since(self, cursor: int) -> Tuple[np.ndarray, int, Optional[float], float]:
+        """
+        Muestras llegadas después de `cursor` (un sample_count anterior), para
+        consumidores incrementales (neurofeedback). Si el consumidor se atrasó
+        más que el buffer, devuelve lo que queda en el buffer.
+        
+        Returns:
+            (data (n_channels, n), nuevo cursor, timestamp LSL de la última
+            muestra o None, hora local de llegada de la última muestra)
+        """
+        with self._buffer_lock:
+            total = self._sample_count
+            n = min(total - cursor, len(self._timestamps))
+            if n <= 0:
+                return np.empty((len(self.CHANNELS), 0)), total, None, self._last_sample_time
+            data = np.empty((len(self.CHANNELS), n))
+            for i, ch in enumerate(self.CHANNELS):
+                # Desde el final del deque: O(n) en las muestras nuevas, no en el buffer
+                data[i, ::-1] = list(islice(reversed(self._buffer[ch]), n))
+            last_timestamp = self._timestamps[-1]
+            arrival = self._last_sample_time
+        return data, total, last_timestamp, arrival
+    
     def get_signal_quality(self) -> Dict[str, float]:
         """
         Calcula calidad de señal para cada canal con EMA smoothing.
@@ -1,10 +1,12 @@
 from fastapi import FastAPI, WebSocket, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from pydantic import BaseModel
 from typing import Optional, List, Any
 import time
 import asyncio
+import itertools
 import asyncpg
 import os
 import json
@@ -12,39 +14,59 @@ import random
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
+from subsystems import (
+    register, warm, readiness, profile_import, LazyProxy, SubsystemNotReady,
+)
 from security import SecurityMiddleware
+from compression import CompressionMiddleware
+from serialization import FastJSONResponse, dumps_str
 
 # Load environment variables
 load_dotenv()
 
-from models import SyntergicState, FrequencyBands, Vector3
-from ai.inference import SyntergicBrain
-from hardware import MuseConnector, MuseToSyntergicAdapter, EOGDetector
-# Legacy SQLite (for backward compatibility)
-from database import get_database, get_recorder, SessionRecorder
-# New PostgreSQL + InfluxDB
-from database import get_recorder_v2, SessionRecorderV2, get_postgres_client_sync, get_influx_client
-from dataclasses import asdict
-# Analytics
-from analytics.router import router as analytics_router
-from analytics.service import AnalyticsService
+# torch / MNE / el cerebro se importan en su subsistema (ver _create_brain)
+with profile_import('hardware'):
+    from hardware import MuseConnector, MuseToSyntergicAdapter, EOGDetector
+with profile_import('database'):
+    # Legacy SQLite (for backward compatibility)
+    from database import get_database, get_recorder, SessionRecorder
+    # New PostgreSQL + InfluxDB
+    from database import get_recorder_v2, SessionRecorderV2, get_influx_client
+    from database import get_storage_backend, encode_catalog_cursor, decode_catalog_cursor
+    from database import materialize_session_summary, get_recording_cache
+    from database.reprocess import (
+        ANALYSIS_VERSION, reprocess_sessions, stale_recording_ids,
+        start_reprocess_job, get_reprocess_job,
+    )
+    from database import streaming
+    from ai.feature_store import open_session_features, delete_session_features
+    from ai.similarity_index import get_similarity_index
+    from ai.model_registry import get_model_registry, WeightsPathNotAllowed
+    from ai.brain_context import InvalidBrainContext, UnknownBrainContext, validate_token as validate_brain_token
+    from analysis.neurofeedback import (
+        NeurofeedbackProcessor, NEUROFEEDBACK_INTERVAL_MS, default_config as neurofeedback_defaults,
+    )
+with profile_import('analytics + automation'):
+    # Analytics
+    from analytics.router import router as analytics_router
+    from analytics.service import AnalyticsService
 
-from automation import router as automation_router
-from automation.service import AutomationService
+    from automation import router as automation_router
+    from automation.service import AutomationService
 
-# AI Copilot
-from ai.copilot_labs_service import CopilotLabsService
-from ai.sanji_copilot_service import SanjiCopilotService
-from recording.validation_protocol import ValidationProtocol
-from recording.validation import run_all_tests, SessionQualityScore
-from prospecting_router import router as prospecting_router
+with profile_import('recording'):
+    from recording.validation_protocol import ValidationProtocol
+    from recording.validation import run_all_tests, SessionQualityScore
+with profile_import('prospecting routers'):
+    from prospecting_router import router as prospecting_router
 
-from prospecting_analysis import router as analysis_router
-from prospecting_pitch import router as pitch_router
-from prospecting_groups import router as groups_router
-from audit.router import router as audit_router
+    from prospecting_analysis import router as analysis_router
+    from prospecting_pitch import router as pitch_router
+    from prospecting_groups import router as groups_router
+with profile_import('audit router'):
+    from audit.router import router as audit_router, ensure_audit_db
 
-app = FastAPI(title="Syntergic Brain API v0.4")
+app = FastAPI(title="Syntergic Brain API v0.4", default_response_class=FastJSONResponse)
 
 
 # Pydantic models for requests
@@ -83,6 +105,11 @@ class MarkerRequest(BaseModel):
     label: str
     event_type: Optional[str] = "marker"
 
+class ReprocessRequest(BaseModel):
+    ids: Optional[List[int]] = None   # None + stale=False → every closed recording
+    stale: bool = False               # only analysis_version < ANALYSIS_VERSION
+    workers: Optional[int] = None
+
 # ── Copilot Pydantic models ───────────────────────────────────────────────────
 class CopilotChatRequest(BaseModel):
     message: str
@@ -95,11 +122,38 @@ class CopilotChatResponse(BaseModel):
     complexity: str
     widgets: List[Any] = []
 
-# Inicializar el Cerebro Digital (Carga modelo y datos)
+# ==================== SUBSYSTEMS (lazy) ====================
+# Todo lo pesado se construye en background tras arrancar (o bajo demanda);
+# mientras tanto los endpoints que lo usan responden 503 "warming".
 print("=" * 60)
 print("SYNTERGIC BRAIN API - Initializing...")
 print("=" * 60)
-brain = SyntergicBrain()
+
+def _create_brain():
+    """Cerebro Digital: VAE + subsistemas propios (datasets, session player, playlist)."""
+    with profile_import('ai.inference (torch, mne)'):
+        from ai.inference import SyntergicBrain
+    brain = SyntergicBrain(lazy=True)
+    for part in brain.parts.values():
+        register(part)
+    warm(brain.parts)
+    return brain
+
+def _create_copilot_labs():
+    with profile_import('ai.copilot_labs_service'):
+        from ai.copilot_labs_service import CopilotLabsService
+    return CopilotLabsService()
+
+def _create_sanji_copilot():
+    with profile_import('ai.sanji_copilot_service'):
+        from ai.sanji_copilot_service import SanjiCopilotService
+    return SanjiCopilotService()
+
+brain_subsystem = register('brain', _create_brain)
+brain = LazyProxy(brain_subsystem)
+copilot_labs = register('copilot_labs', _create_copilot_labs)
+sanji_copilot = register('sanji_copilot', _create_sanji_copilot)
+register('audit', ensure_audit_db)
 
 # Inicializar conector Muse 2 (hardware)
 print("✓ Initializing Muse 2 connector...")
@@ -108,9 +162,8 @@ muse_connector = MuseConnector()
 # Inicializar recorder v2 (PostgreSQL + InfluxDB)
 session_recorder: Optional[SessionRecorderV2] = None
 
-# Legacy SQLite database (for old sessions)
-print("✓ Initializing session database...")
-session_db = get_database()
+# Legacy SQLite database (for old sessions): se abre al primer uso
+session_db = LazyProxy(register('legacy_db', get_database), wait=True)
 
 # Validation protocol (scientific recording)
 print("✓ Initializing validation protocol...")
@@ -151,12 +204,18 @@ app.add_middleware(
     ],
 )
 
+# gzip / brotli negociado para respuestas grandes (outermost: comprime también los errores)
+app.add_middleware(CompressionMiddleware)
+
 # ============================================
 # Analytics Integration
 # ============================================
 @app.on_event("startup")
 async def startup():
     """Initialize analytics database connection pool"""
+    # Cerebro, playlist, copilots, audit, SQLite: warm-up en background
+    warm()
+
     analytics_pool = await asyncpg.create_pool(
         host=os.getenv("ANALYTICS_DB_HOST", "localhost"),
         port=int(os.getenv("ANALYTICS_DB_PORT", "5432")),
@@ -174,12 +233,6 @@ async def startup():
     app.state.automation_service = AutomationService(app.state.db_pool)
     print("Automation service initialized")
 
-    app.state.copilot_service = CopilotLabsService()
-    print("✅ Copilot Labs service initialized")
-
-    app.state.sanji_copilot = SanjiCopilotService()
-    print("✅ Sanji Copilot service initialized")
-
 
 @app.on_event("shutdown")
 async def shutdown():
@@ -188,11 +241,42 @@ async def shutdown():
         await app.state.analytics_pool.close()
         print("✓ Analytics database pool closed")
 
-    if hasattr(app.state, "copilot_service"):
-        await app.state.copilot_service.aclose()
+    if copilot_labs.ready:
+        await copilot_labs.get().aclose()
+
+    if sanji_copilot.ready:
+        await sanji_copilot.get().aclose()
+
+@app.exception_handler(InvalidBrainContext)
+async def invalid_brain_context(request: Request, exc: InvalidBrainContext):
+    """Token ?ctx= con formato inválido → 400."""
+    return FastJSONResponse(status_code=400, content={"status": "error", "message": str(exc)})
+
+@app.exception_handler(UnknownBrainContext)
+async def unknown_brain_context(request: Request, exc: UnknownBrainContext):
+    """Token ?ctx= no emitido por POST /brain/contexts, expirado o desalojado → 404."""
+    return FastJSONResponse(status_code=404, content={"status": "error", "message": str(exc)})
+
+@app.exception_handler(SubsystemNotReady)
+async def subsystem_not_ready(request: Request, exc: SubsystemNotReady):
+    """Subsistema todavía inicializándose (o fallido) → 503 + Retry-After."""
+    return FastJSONResponse(
+        status_code=503,
+        content={
+            "status": "warming" if exc.state != "failed" else "error",
+            "subsystem": exc.name,
+            "state": exc.state,
+            "message": str(exc),
+        },
+        headers={"Retry-After": "2"},
+    )
+
 
-    if hasattr(app.state, "sanji_copilot"):
-        await app.state.sanji_copilot.aclose()
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness por subsistema + perfil de imports de main.py."""
+    report = readiness()
+    return FastJSONResponse(status_code=200 if report["ready"] else 503, content=report)
 
 # Include analytics router
 app.include_router(analytics_router)
@@ -228,7 +312,7 @@ async def copilot_labs_chat(request: CopilotChatRequest):
         session_context: Dict con 'analysis', 'name', 'duration_seconds', etc.
         user_tier:       'free' | 'premium'.
     """
-    service: CopilotLabsService = app.state.copilot_service
+    service = await asyncio.to_thread(copilot_labs.get)
     try:
         result = await service.process_message(
             message=request.message,
@@ -258,7 +342,7 @@ async def sanji_copilot_chat(request: Request):
     Body: { message, history_context, conversation_history }
     """
     body = await request.json()
-    service: SanjiCopilotService = app.state.sanji_copilot
+    service = await asyncio.to_thread(sanji_copilot.get)
     result = await service.chat(
         message=body.get("message", ""),
         history_context=body.get("history_context"),
@@ -332,7 +416,7 @@ def read_root():
     return {"status": "active", "message": "Syntergic VAE Online"}
 
 @app.post("/set-mode/{mode}")
-async def set_mode(mode: str):
+async def set_mode(mode: str, ctx: Optional[str] = None):
     """
     Cambia el estado cognitivo del cerebro digital.
     
@@ -341,130 +425,152 @@ async def set_mode(mode: str):
     - 'focus': Dataset de motor imagery (concentración)
     - 'session': Reproducción cronológica de sesión completa
     - 'muse': Hardware Muse 2 en vivo (requiere conexión activa)
+    - 'neurofeedback': Muse 2 + envolventes IIR cada 50 ms en /ws/neurofeedback
+    
+    `ctx`: token del contexto del cliente emitido por POST /brain/contexts
+    (ai/brain_context.py; desconocido → 404); sin él, el contexto por
+    defecto. Lo mismo en /session/*, /playlist* y el WebSocket.
     """
-    # Muse mode requires passing the connector
-    if mode == 'muse':
+    context = brain.context(ctx)
+    # Muse / neurofeedback modes require passing the connector
+    if mode in ('muse', 'neurofeedback'):
         if not muse_connector.is_streaming:
             return {"status": "error", "message": "Muse 2 not streaming. Connect and start stream first."}
-        success = brain.set_mode('muse', muse_connector=muse_connector)
+        success = brain.set_mode(mode, muse_connector=muse_connector, ctx=context)
         if success:
-            return {"status": "success", "mode": "muse", "message": "Now using LIVE EEG from Muse 2"}
-        return {"status": "error", "message": "Failed to switch to Muse mode"}
+            return {"status": "success", "mode": mode, "context": context.token, "message": "Now using LIVE EEG from Muse 2"}
+        return {"status": "error", "message": f"Failed to switch to {mode} mode"}
     
-    success = brain.set_mode(mode)
+    success = brain.set_mode(mode, ctx=context)
     if success:
-        return {"status": "success", "mode": mode, "message": f"Brain switched to {mode} mode"}
-    return {"status": "error", "message": "Invalid mode. Use 'relax', 'focus', 'session', or 'muse'"}
+        return {"status": "success", "mode": mode, "context": context.token, "message": f"Brain switched to {mode} mode"}
+    return {"status": "error", "message": "Invalid mode. Use 'relax', 'focus', 'session', 'muse' or 'neurofeedback'"}
 
 @app.get("/session/status")
-async def get_session_status():
+async def get_session_status(ctx: Optional[str] = None):
     """
     Obtiene estado actual del reproductor de sesiones.
     """
-    if brain.session_mode_active:
-        status = brain.session_player.get_status()
+    context = brain.context(ctx)
+    if context.session_mode_active:
+        status = brain.session_player(context).get_status()
         return {
             "status": "success",
             "session_active": True,
+            "context": context.token,
             **status
         }
     return {
         "status": "success",
         "session_active": False,
+        "context": context.token,
         "message": "Session player not active. Use /set-mode/session to activate."
     }
 
 @app.post("/session/seek/{position}")
-async def seek_session(position: float):
+async def seek_session(position: float, ctx: Optional[str] = None):
     """
     Salta a posición específica en la sesión (segundos).
     """
-    if not brain.session_mode_active:
+    context = brain.context(ctx)
+    if not context.session_mode_active:
         return {"status": "error", "message": "Session mode not active"}
     
-    brain.session_player.seek(position)
+    player = brain.session_player(context)
+    player.seek(position)
     return {
         "status": "success",
         "message": f"Seeked to {position}s",
-        "new_position": brain.session_player.current_position
+        "new_position": player.current_position
     }
 
 @app.post("/session/speed/{speed}")
-async def set_session_speed(speed: float):
+async def set_session_speed(speed: float, ctx: Optional[str] = None):
     """
     Ajusta velocidad de reproducción (0.5 = mitad, 1.0 = normal, 2.0 = doble).
     """
-    if not brain.session_mode_active:
+    context = brain.context(ctx)
+    if not context.session_mode_active:
         return {"status": "error", "message": "Session mode not active"}
     
-    brain.session_player.set_speed(speed)
+    player = brain.session_player(context)
+    player.set_speed(speed)
     return {
         "status": "success",
-        "playback_speed": brain.session_player.playback_speed
+        "playback_speed": player.playback_speed
     }
 
 @app.post("/session/play")
-async def play_session():
+async def play_session(ctx: Optional[str] = None):
     """
     Inicia/reanuda reproducción de la sesión.
     """
-    if not brain.session_mode_active:
+    context = brain.context(ctx)
+    if not context.session_mode_active:
         return {"status": "error", "message": "Session mode not active"}
     
-    brain.session_player.play()
+    player = brain.session_player(context)
+    player.play()
     return {
         "status": "success",
         "message": "Session playing",
-        "is_playing": brain.session_player.is_playing
+        "is_playing": player.is_playing
     }
 
 @app.post("/session/pause")
-async def pause_session():
+async def pause_session(ctx: Optional[str] = None):
     """
     Pausa reproducción de la sesión.
     """
-    if not brain.session_mode_active:
+    context = brain.context(ctx)
+    if not context.session_mode_active:
         return {"status": "error", "message": "Session mode not active"}
     
-    brain.session_player.pause()
+    player = brain.session_player(context)
+    player.pause()
     return {
         "status": "success",
         "message": "Session paused",
-        "is_playing": brain.session_player.is_playing
+        "is_playing": player.is_playing
     }
 
 @app.get("/session/timeline")
-async def get_session_timeline():
+async def get_session_timeline(start: Optional[float] = None, end: Optional[float] = None,
+                               ctx: Optional[str] = None):
     """
-    Obtiene marcadores temporales de la sesión.
+    Obtiene marcadores temporales de la sesión (opcionalmente en [start, end] segundos).
     """
-    if not brain.session_mode_active:
+    context = brain.context(ctx)
+    if not context.session_mode_active:
         return {"status": "error", "message": "Session mode not active"}
     
-    markers = brain.session_player.get_timeline_markers()
+    player = brain.session_player(context)
+    markers = player.get_timeline_markers(start, end)
     return {
         "status": "success",
         "markers": markers,
-        "total_duration": brain.session_player.total_duration
+        "total_duration": player.total_duration
     }
 
 # --- PLAYLIST ENDPOINTS ---
 
 @app.get("/playlist")
-async def get_playlist():
+async def get_playlist(ctx: Optional[str] = None):
     """Lista todas las sesiones disponibles en el playlist."""
-    playlist = brain.get_playlist()
-    current_info = brain.get_current_playlist_info()
+    context = brain.context(ctx)
+    playlist = brain.get_playlist(context)
+    current_info = brain.get_current_playlist_info(context)
     return {
         "status": "success",
         "playlist": playlist,
-        "current": current_info
+        "current": current_info,
+        "cache": brain.playlist.cache_stats()
     }
 
 @app.post("/playlist/next")
-async def playlist_next():
+async def playlist_next(ctx: Optional[str] = None):
     """Avanza a la siguiente sesión del playlist."""
-    session_info = brain.next_playlist_session()
+    session_info = await asyncio.to_thread(brain.next_playlist_session, brain.context(ctx))
     if session_info:
         return {
             "status": "success",
@@ -477,9 +583,9 @@ async def playlist_next():
     }
 
 @app.post("/playlist/previous")
-async def playlist_previous():
+async def playlist_previous(ctx: Optional[str] = None):
     """Retrocede a la sesión anterior del playlist."""
-    session_info = brain.previous_playlist_session()
+    session_info = await asyncio.to_thread(brain.previous_playlist_session, brain.context(ctx))
     if session_info:
         return {
             "status": "success",
@@ -492,9 +598,9 @@ async def playlist_previous():
     }
 
 @app.post("/playlist/select/{index}")
-async def playlist_select(index: int):
+async def playlist_select(index: int, ctx: Optional[str] = None):
     """Selecciona una sesión específica del playlist por índice."""
-    session_info = brain.select_playlist_session(index)
+    session_info = await asyncio.to_thread(brain.select_playlist_session, index, brain.context(ctx))
     if session_info:
         return {
             "status": "success",
@@ -507,10 +613,10 @@ async def playlist_select(index: int):
     }
 
 @app.post("/playlist/refresh")
-async def refresh_playlist():
+async def refresh_playlist(ctx: Optional[str] = None):
     """Recarga las sesiones grabadas en el playlist."""
     brain.playlist.refresh_recorded_sessions()
-    playlist = brain.get_playlist()
+    playlist = brain.get_playlist(brain.context(ctx))
     return {
         "status": "success",
         "message": "Playlist refreshed",
@@ -518,6 +624,132 @@ async def refresh_playlist():
         "count": len(playlist)
     }
 
+# --- NEUROFEEDBACK ENDPOINTS ---
+
+class NeurofeedbackConfigRequest(BaseModel):
+    band: Optional[str] = None           # delta / theta / alpha / beta / gamma
+    threshold: Optional[float] = None    # potencia relativa de la banda (0-1)
+    hysteresis: Optional[float] = None
+    envelope_ms: Optional[float] = None  # constante de tiempo del suavizado
+
+@app.post("/neurofeedback/config")
+async def configure_neurofeedback(request: NeurofeedbackConfigRequest, ctx: Optional[str] = None):
+    """Banda y umbrales del modo neurofeedback del contexto (en caliente)."""
+    try:
+        config = brain.configure_neurofeedback(brain.context(ctx), **request.model_dump(exclude_none=True))
+    except (TypeError, ValueError) as e:
+        return {"status": "error", "message": str(e)}
+    return {"status": "success", "config": config}
+
+@app.get("/neurofeedback/status")
+async def neurofeedback_status(ctx: Optional[str] = None):
+    """
+    Configuración y presupuesto de latencia muestra → frame: retardo de los
+    filtros + espera del tick + pipeline medido (p50/p95) en /ws/neurofeedback.
+    """
+    context = brain.context(ctx)
+    processor = context.neurofeedback
+    if processor is None:
+        # Sin WebSocket conectado: sólo la parte analítica del presupuesto
+        processor = NeurofeedbackProcessor(**(context.neurofeedback_config or neurofeedback_defaults()))
+    return {
+        "status": "success",
+        "active": context.current_mode == 'neurofeedback',
+        "streaming": context.neurofeedback is not None,
+        "interval_ms": NEUROFEEDBACK_INTERVAL_MS,
+        "config": processor.to_dict(),
+        "latency": processor.latency_budget(),
+    }
+
+# --- BRAIN CONTEXT ENDPOINTS ---
+
+@app.post("/brain/contexts")
+async def create_brain_context():
+    """
+    Emite un contexto (token) con modo, reproducción y smoothing propios.
+    Sólo estos tokens valen en ?ctx=; con BRAIN_MAX_CONTEXTS ocupados se
+    desaloja el menos usado.
+    """
+    context = brain.contexts.create()
+    return {"status": "success", "context": context.to_dict()}
+
+@app.get("/brain/contexts")
+async def list_brain_contexts():
+    """Contextos activos (el 'default' siempre existe)."""
+    contexts = [c.to_dict() for c in brain.contexts.all()]
+    return {
+        "status": "success",
+        "contexts": contexts,
+        "count": len(contexts),
+        "max_contexts": brain.contexts.max_contexts,
+        "ttl_seconds": brain.contexts.ttl_seconds,
+    }
+
+@app.delete("/brain/contexts/{token}")
+async def delete_brain_context(token: str):
+    """Descarta un contexto (el 'default' no se puede borrar)."""
+    if not brain.contexts.drop(token):
+        return {"status": "error", "message": f"Unknown or default brain context '{token}'"}
+    return {"status": "success", "message": f"Brain context '{token}' deleted"}
+
+# --- MODEL REGISTRY ENDPOINTS ---
+
+class ModelRegisterRequest(BaseModel):
+    path: str                       # pesos en el servidor (p. ej. salida de ai/train.py)
+    notes: str = ""
+    metrics: Optional[dict] = None
+    activate: bool = False
+
+@app.get("/models")
+async def list_models():
+    """Versiones del VAE registradas, la activa y la que sirve frames ahora."""
+    registry = get_model_registry()
+    versions = await asyncio.to_thread(registry.versions)
+    return {
+        "status": "success",
+        "active": await asyncio.to_thread(lambda: registry.active_version),
+        "serving": brain.model_version if brain_subsystem.ready else None,
+        "rollback_to": await asyncio.to_thread(registry.previous_version),
+        "versions": versions,
+    }
+
+@app.post("/models/register")
+async def register_model(req: ModelRegisterRequest):
+    """Registra unos pesos como versión nueva (y opcionalmente la activa en caliente)."""
+    try:
+        meta = await asyncio.to_thread(
+            get_model_registry().register, req.path, req.notes, req.metrics
+        )
+    except WeightsPathNotAllowed as e:
+        return FastJSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+    except (LookupError, ValueError, RuntimeError) as e:
+        return {"status": "error", "message": str(e)}
+    result = {"status": "success", "model": meta}
+    if req.activate:
+        result["swap"] = await asyncio.to_thread(brain.activate_model, meta["version"])
+    return result
+
+@app.post("/models/activate/{version}")
+async def activate_model(version: str):
+    """
+    Carga y calienta la versión fuera del loop de frames y la activa entre
+    dos frames: WebSockets y grabaciones siguen abiertos.
+    """
+    try:
+        swap = await asyncio.to_thread(brain.activate_model, version)
+    except (LookupError, ValueError, RuntimeError) as e:
+        return {"status": "error", "message": str(e)}
+    return {"status": "success", **swap}
+
+@app.post("/models/rollback")
+async def rollback_model():
+    """Vuelve a la versión activa anterior."""
+    try:
+        swap = await asyncio.to_thread(brain.rollback_model)
+    except (LookupError, ValueError, RuntimeError) as e:
+        return {"status": "error", "message": str(e)}
+    return {"status": "success", **swap}
+
 # =============================================================================
 # HARDWARE ENDPOINTS (Muse 2)
 # =============================================================================
@@ -632,8 +864,8 @@ async def disconnect_hardware():
     """Desconecta del Muse 2 actual."""
     muse_connector.disconnect()
     # Si estaba en modo muse, volver a modo dataset
-    if brain.current_mode == 'muse':
-        brain.set_mode('focus')
+    if brain_subsystem.ready:
+        brain.release_muse()
     return {
         "status": "success",
         "message": "Disconnected from Muse 2"
@@ -702,7 +934,7 @@ async def stop_hardware_stream():
     }
 
 @app.post("/set-mode/muse")
-async def set_mode_muse():
+async def set_mode_muse(ctx: Optional[str] = None):
     """
     Activa modo hardware Muse 2.
     
@@ -715,7 +947,7 @@ async def set_mode_muse():
             "message": "Muse 2 not streaming. Connect and start stream first."
         }
     
-    success = brain.set_mode('muse', muse_connector=muse_connector)
+    success = brain.set_mode('muse', muse_connector=muse_connector, ctx=ctx)
     if success:
         return {
             "status": "success",
@@ -1126,10 +1358,11 @@ async def stop_recording():
             "message": "Not recording"
         }
     
-    summary = session_recorder.stop()
+    # join de threads + flush: fuera del event loop
+    summary = await asyncio.to_thread(session_recorder.stop)
     
     # Refrescar playlist para incluir la nueva sesión
-    brain.playlist.refresh_recorded_sessions()
+    await asyncio.to_thread(brain.playlist.refresh_recorded_sessions)
     
     return {
         "status": "success",
@@ -1186,42 +1419,61 @@ async def add_recording_marker(request: MarkerRequest):
 # DOCUMENTATION DASHBOARD ENDPOINT
 # =============================================================================
 
+# validation_logs/*.json parseados, por path → (mtime_ns, data). Sólo se re-leen si cambian.
+_validation_file_cache: dict = {}
+
+
+def _read_validation_file(path: Path):
+    """json.loads(path) memoizado por mtime; None si no se puede leer."""
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        _validation_file_cache.pop(path, None)
+        return None
+    cached = _validation_file_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    try:
+        data = json.loads(path.read_text())
+    except Exception:
+        data = None
+    _validation_file_cache[path] = (mtime, data)
+    return data
+
+
 @app.get("/doc/dashboard")
 async def doc_dashboard():
     """
     Aggregated data for the ADA documentation dashboard.
-    Returns sessions list, validation results, and project stats.
-    Auto-computes validation for sessions that don't have a file yet.
+    Returns sessions list (with catalog summary columns), validation results, and project stats.
+    Auto-computes validation only for sessions with neither a file nor a materialized summary.
     """
     try:
-        # 1. Sessions from PostgreSQL
-        pg = get_postgres_client_sync()
+        # 1. Sessions from the storage backend catalog (PostgreSQL by default)
+        storage = get_storage_backend()
         sessions = []
-        if pg:
-            recordings = pg.get_all_recordings(limit=200)
-            for r in recordings:
-                d = asdict(r)
-                for k in ('started_at', 'ended_at'):
-                    if d.get(k) and hasattr(d[k], 'isoformat'):
-                        d[k] = d[k].isoformat()
-                sessions.append(d)
-
-        # 2. Validation logs from disk
+        if storage:
+            recordings = await asyncio.to_thread(storage.list_recordings_catalog, limit=200)
+            sessions = [r.to_dict() for r in recordings]
+
+        # 2. Validation logs from disk (parse cache by mtime)
         logs_dir = Path(__file__).parent / "validation_logs"
         logs_dir.mkdir(exist_ok=True)
         validations = []
         validated_ids = set()
         for f in sorted(logs_dir.glob("validate-*.json")):
-            try:
-                data = json.loads(f.read_text())
-                validations.append(data)
-                validated_ids.add(data.get("session_id"))
-            except Exception:
-                pass
-
-        # 3. Auto-compute validation for sessions without files (up to 20 most recent)
-        influx_bulk = get_influx_client()
-        missing = [s for s in sessions if s.get("id") not in validated_ids][-20:]
+            data = _read_validation_file(f)
+            if data is None:
+                continue
+            validations.append(data)
+            validated_ids.add(data.get("session_id"))
+
+        # 3. Auto-compute validation for sessions without file nor summary (up to 20 most recent)
+        influx_bulk = get_storage_backend()
+        missing = [
+            s for s in sessions
+            if s.get("id") not in validated_ids and not s.get("summary_version")
+        ][-20:]
         for s in missing:
             sid = s.get("id")
             if not sid:
@@ -1249,6 +1501,10 @@ async def doc_dashboard():
                 }
                 (logs_dir / f"validate-{sid}.json").write_text(json.dumps(val_result, default=str))
                 validations.append(val_result)
+                try:
+                    await asyncio.to_thread(materialize_session_summary, influx_bulk, sid)
+                except Exception:
+                    pass  # catalog sin migration 003
                 print(f"✅ [dashboard] Auto-validated session #{sid}")
             except Exception as ve:
                 print(f"⚠️ [dashboard] Auto-validation failed for #{sid}: {ve}")
@@ -1260,8 +1516,8 @@ async def doc_dashboard():
         protocol_logs = []
         for f in sorted(logs_dir.glob("validation_*.json")):
             try:
-                data = json.loads(f.read_text())
-                if data.get("phases_completed", 0) != data.get("total_phases", 8):
+                data = _read_validation_file(f)
+                if data is None or data.get("phases_completed", 0) != data.get("total_phases", 8):
                     continue
                 protocol_logs.append({
                     "filename": f.name,
@@ -1274,14 +1530,14 @@ async def doc_dashboard():
             except Exception:
                 pass
 
-        return {
+        return FastJSONResponse({
             "status": "success",
             "sessions": sessions,
             "validations": validations,
             "protocol_logs": protocol_logs,
             "total_sessions": len(sessions),
             "total_validations": len(validations),
-        }
+        })
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -1296,27 +1552,24 @@ async def doc_session_detail(session_id: int):
     try:
         result = {"status": "success", "session_id": session_id}
 
-        # 1. Recording from PostgreSQL
-        pg = get_postgres_client_sync()
-        if pg:
-            recording = pg.get_recording(session_id)
+        # 1. Recording from the storage backend (PostgreSQL by default)
+        storage = get_storage_backend()
+        if storage:
+            recording = await asyncio.to_thread(storage.get_recording, session_id)
             if recording:
-                d = asdict(recording)
-                for k in ('started_at', 'ended_at'):
-                    if d.get(k) and hasattr(d[k], 'isoformat'):
-                        d[k] = d[k].isoformat()
-                result["recording"] = d
+                result["recording"] = recording.to_dict()
 
         # 2. Validation result — from disk, or compute on-the-fly and save
         logs_dir = Path(__file__).parent / "validation_logs"
         logs_dir.mkdir(exist_ok=True)
         val_file = logs_dir / f"validate-{session_id}.json"
-        if val_file.exists():
-            result["validation"] = json.loads(val_file.read_text())
+        cached_validation = _read_validation_file(val_file) if val_file.exists() else None
+        if cached_validation is not None:
+            result["validation"] = cached_validation
         else:
             # Run validation on-the-fly and persist so the dashboard picks it up
             try:
-                influx_v = get_influx_client()
+                influx_v = get_storage_backend()
                 metrics_v = influx_v.get_metrics(session_id) or session_db.get_metrics(session_id)
                 if metrics_v:
                     markers_v = []
@@ -1350,7 +1603,9 @@ async def doc_session_detail(session_id: int):
             best_delta = None
             for f in sorted(logs_dir.glob("validation_*_COMPLETE.json")):
                 try:
-                    data = json.loads(f.read_text())
+                    data = _read_validation_file(f)
+                    if data is None:
+                        continue
                     proto_iso = data.get("protocol_start_iso", "")
                     # Try to match by timestamp proximity (within 2 hours)
                     if rec_start_iso and proto_iso:
@@ -1382,10 +1637,11 @@ async def doc_session_detail(session_id: int):
                     "events": data.get("events", []),
                 }
 
-        # 4. Metrics summary from InfluxDB
+        # 4. Metrics summary from storage (InfluxDB by default)
         try:
-            influx = get_influx_client()
-            metrics = influx.get_metrics(session_id)
+            metrics, _ = await asyncio.to_thread(
+                get_recording_cache().read, get_storage_backend(), session_id, "metrics"
+            )
             if metrics:
                 n = len(metrics)
                 bands_avg = {}
@@ -1417,43 +1673,165 @@ async def doc_session_detail(session_id: int):
 # SESSIONS ENDPOINTS (Session Management & Playback)
 # =============================================================================
 
+def _not_modified(request: Request, session_id: int, view: str, params: dict = None):
+    """304 si el If-None-Match coincide con la entrada cacheada (grabación cerrada)."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    etag = get_recording_cache().etag(session_id, view, params)
+    if etag and etag in if_none_match:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+def _with_etag(payload: dict, etag: Optional[str]):
+    """Respuesta orjson directa (sin jsonable_encoder), con ETag si viene del read cache."""
+    if etag is None:
+        return FastJSONResponse(payload)
+    return FastJSONResponse(
+        content=payload,
+        headers={"ETag": etag, "Cache-Control": "private, no-cache"}
+    )
+
+
 @app.get("/sessions")
-async def list_sessions(limit: int = 200, offset: int = 0):
-    """
-    Lista todas las sesiones grabadas (PostgreSQL).
+async def list_sessions(
+    limit: int = 200,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    tag: Optional[str] = None,
+    type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """
+    Lista las sesiones grabadas (storage backend: PostgreSQL o embebido).
+
+    Paginación keyset: pasar el `next_cursor` de la respuesta anterior como
+    `cursor`. Filtros server-side: `tag`, `type` (recording_type), `since`/`until`
+    (ISO, sobre started_at). `offset` se mantiene por compatibilidad.
     """
     try:
-        pg = get_postgres_client_sync()
-        recordings = pg.get_all_recordings(limit=limit, offset=offset)
-        sessions = []
-        for r in recordings:
-            d = asdict(r)
-            # convert datetime to ISO strings for JSON serialisation
-            for k in ('started_at', 'ended_at'):
-                if d.get(k) and hasattr(d[k], 'isoformat'):
-                    d[k] = d[k].isoformat()
-            sessions.append(d)
-        return {"status": "success", "sessions": sessions, "count": len(sessions)}
+        after = decode_catalog_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
+    try:
+        storage = get_storage_backend()
+        if offset and after is None and not (tag or type or since or until):
+            recordings = await asyncio.to_thread(storage.list_recordings, limit=limit, offset=offset)
+        else:
+            recordings = await asyncio.to_thread(
+                storage.list_recordings_catalog,
+                limit=limit, after=after, tag=tag, recording_type=type, since=since, until=until
+            )
+        sessions = [r.to_dict() for r in recordings]
+        next_cursor = encode_catalog_cursor(recordings[-1]) if len(recordings) == limit else None
+        return {"status": "success", "sessions": sessions, "count": len(sessions), "next_cursor": next_cursor}
     except Exception as e:
         # Fallback to legacy SQLite
         sessions = session_db.list_sessions(limit, offset)
         return {"status": "success", "sessions": sessions, "count": len(sessions), "source": "sqlite"}
 
+@app.get("/sessions/compare")
+async def compare_sessions(ids: str):
+    """
+    Compara métricas medias de varias sesiones (rollup de 1 min en InfluxDB).
+
+    Query: ?ids=12,15,18
+    """
+    try:
+        recording_ids = [int(x) for x in ids.split(',') if x.strip()]
+    except ValueError:
+        return {"status": "error", "message": "ids must be a comma-separated list of integers"}
+
+    try:
+        influx = get_influx_client()
+        summary = await asyncio.to_thread(influx.compare_recordings, recording_ids)
+        return {
+            "status": "success",
+            "sessions": {str(rid): summary.get(rid) for rid in recording_ids},
+            "resolution_seconds": 60,
+        }
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+@app.post("/sessions/reprocess")
+async def start_sessions_reprocess(req: ReprocessRequest):
+    """
+    Recalcula offline (todos los cores) métricas, band power por canal y
+    flags EOG de varias sesiones desde sus muestras crudas. Corre en
+    background; el progreso se consulta con GET /sessions/reprocess.
+    """
+    storage = get_storage_backend()
+    try:
+        if req.ids:
+            ids = req.ids
+        elif req.stale:
+            ids = await asyncio.to_thread(stale_recording_ids, storage)
+        else:
+            recordings = await asyncio.to_thread(storage.list_recordings, 10000)
+            ids = [r.id for r in recordings if r.ended_at is not None]
+        kwargs = {'workers': req.workers} if req.workers else {}
+        job = start_reprocess_job(storage, ids, **kwargs)
+    except RuntimeError as e:
+        return {"status": "error", "message": str(e), "job": get_reprocess_job().status()}
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+    return {"status": "started", "job": job.status()}
+
+@app.get("/sessions/reprocess")
+async def get_sessions_reprocess():
+    """Estado del último reprocesado por lotes."""
+    job = get_reprocess_job()
+    if job is None:
+        return {"status": "idle", "analysis_version": ANALYSIS_VERSION}
+    return {"status": "running" if job.running else "finished", "job": job.status()}
+
+@app.get("/sessions/similar")
+async def find_similar_moments(
+    session_id: int,
+    t: Optional[float] = None,
+    phase: Optional[str] = None,
+    k: int = 10,
+    same_session: bool = True,
+):
+    """
+    "¿Cuándo más llegué a un estado así?": k ventanas de todas las sesiones
+    más cercanas (24 features estandarizadas, búsqueda exacta) a la ventana
+    de `session_id` en el segundo `t`, o a la media de una fase / la sesión.
+
+    Query: ?session_id=12&t=84.2&k=10   |   ?session_id=12&phase=meditation
+    """
+    t0 = time.perf_counter()
+    try:
+        index = await asyncio.to_thread(get_similarity_index)
+        query, anchor = await asyncio.to_thread(index.query_vector, session_id, t, phase)
+        matches = await asyncio.to_thread(
+            index.search, query, max(1, min(k, 100)),
+            exclude_session=session_id, exclude_around=anchor, same_session=same_session,
+        )
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+    return {
+        "status": "success",
+        "query": {"session_id": session_id, "timestamp": anchor, "phase": phase},
+        "matches": matches,
+        "searched_windows": index.n_windows,
+        "took_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+
 @app.get("/sessions/{session_id}")
 async def get_session(session_id: int):
     """
-    Obtiene detalles de una sesión específica (PostgreSQL).
+    Obtiene detalles de una sesión específica (storage backend).
     """
     try:
-        pg = get_postgres_client_sync()
-        recording = pg.get_recording(session_id)
+        storage = get_storage_backend()
+        recording = await asyncio.to_thread(storage.get_recording, session_id)
         if recording is None:
             return {"status": "error", "message": f"Session {session_id} not found"}
-        d = asdict(recording)
-        for k in ('started_at', 'ended_at'):
-            if d.get(k) and hasattr(d[k], 'isoformat'):
-                d[k] = d[k].isoformat()
-        return {"status": "success", "session": d}
+        return {"status": "success", "session": recording.to_dict()}
     except Exception as e:
         session = session_db.get_session(session_id)
         if session is None:
@@ -1470,8 +1848,18 @@ async def get_session_eeg(session_id: int, start: float = 0, end: float = None):
         start: Tiempo inicio en segundos
         end: Tiempo fin en segundos (None = hasta el final)
     """
-    samples = session_db.get_eeg_samples(session_id, start, end)
+    samples = []
+    try:
+        samples = await asyncio.to_thread(get_storage_backend().get_samples, session_id, start=start, end=end)
+    except Exception:
+        pass  # legacy SQLite abajo
     if not samples:
+        timestamps, data = await asyncio.to_thread(session_db.get_eeg_array, session_id, start, end)
+        samples = [
+            {'timestamp': t, 'tp9': a, 'af7': b, 'af8': c, 'tp10': d}
+            for t, a, b, c, d in zip(timestamps.tolist(), *data.tolist())
+        ]
+    if len(samples) == 0:
         return {
             "status": "error",
             "message": "No EEG data found"
@@ -1483,47 +1871,88 @@ async def get_session_eeg(session_id: int, start: float = 0, end: float = None):
         "count": len(samples)
     }
 
+@app.get("/sessions/{session_id}/eeg/stream")
+async def stream_session_eeg(session_id: int, start: float = 0, end: float = None, format: str = "ndjson"):
+    """
+    Datos EEG en streaming (memoria acotada a un bloque de ~10 s).
+
+    Args:
+        start / end: ventana en segundos desde el primer sample
+        format: "ndjson" (una línea columnar por bloque) o "binary"
+                (bloques con prefijo de longitud, ver database/streaming.py)
+    """
+    if format not in ("ndjson", "binary"):
+        return {"status": "error", "message": "format must be 'ndjson' or 'binary'"}
+
+    blocks = iter(())
+    first = None
+    try:
+        blocks = get_storage_backend().iter_sample_blocks(session_id, start=start, end=end)
+        first = await asyncio.to_thread(next, blocks, None)
+    except Exception as e:
+        print(f"⚠️ EEG stream #{session_id}: storage failed ({e}), trying SQLite")
+    if first is None:
+        # legacy SQLite: un solo bloque
+        first = await asyncio.to_thread(session_db.get_eeg_array, session_id, start, end)
+        blocks = iter(())
+        if len(first[0]) == 0:
+            return {"status": "error", "message": "No EEG data found"}
+
+    body = itertools.chain([first], blocks)
+    if format == "binary":
+        return StreamingResponse(streaming.binary_sample_blocks(body), media_type=streaming.BINARY_MEDIA_TYPE)
+    return StreamingResponse(streaming.ndjson_sample_blocks(body), media_type=streaming.NDJSON_MEDIA_TYPE)
+
+@app.get("/sessions/{session_id}/metrics/stream")
+async def stream_session_metrics(session_id: int, start: float = 0, end: float = None):
+    """Métricas en NDJSON (una por línea), ventana start/end en segundos."""
+    rows = iter(())
+    first = None
+    try:
+        rows = get_storage_backend().iter_metrics(session_id, start=start, end=end)
+        first = await asyncio.to_thread(next, rows, None)
+    except Exception as e:
+        print(f"⚠️ Metrics stream #{session_id}: storage failed ({e}), trying SQLite")
+    if first is None:
+        # Misma ventana [start, end) desde la primera métrica que el storage
+        legacy = await asyncio.to_thread(session_db.get_metrics, session_id, start, end)
+        if not legacy:
+            return {"status": "error", "message": "No metrics found for session"}
+        first, rows = legacy[0], iter(legacy[1:])
+
+    return StreamingResponse(
+        streaming.ndjson_rows(itertools.chain([first], rows)),
+        media_type=streaming.NDJSON_MEDIA_TYPE
+    )
+
 @app.post("/sessions/{session_id}/reclose")
 async def reclose_session(session_id: int):
     """
     Re-runs end_recording for a session whose recorder stopped before persisting
-    per-channel aggregates to PostgreSQL. Raw and per-window data must already
-    exist in InfluxDB.
+    per-channel aggregates. Raw and per-window data must already exist in the
+    storage backend (InfluxDB by default).
 
-    Safe to call multiple times — always overwrites with fresh InfluxDB aggregates.
+    Safe to call multiple times — always overwrites with freshly recomputed aggregates.
     """
     try:
-        pg = get_postgres_client_sync()
-        influx = get_influx_client()
+        storage = get_storage_backend()
 
-        recording = pg.get_recording(session_id)
+        recording = await asyncio.to_thread(storage.get_recording, session_id)
         if recording is None:
-            return {"status": "error", "message": f"Session {session_id} not found in PostgreSQL"}
+            return {"status": "error", "message": f"Session {session_id} not found ({storage.name})"}
 
-        # Recompute aggregated metrics from InfluxDB
-        aggregated_metrics = {}
+        # Recompute aggregated + per-channel metrics (FAA, alpha_*_avg) from stored data
         try:
-            aggregated_metrics = influx.get_aggregated_metrics(session_id)
-            for k, v in aggregated_metrics.items():
-                if hasattr(v, 'item'):
-                    aggregated_metrics[k] = v.item()
-                elif v is not None:
-                    aggregated_metrics[k] = float(v)
+            aggregated_metrics = await asyncio.to_thread(storage.compute_aggregates, session_id)
         except Exception as e:
             return {"status": "error", "message": f"Failed to get aggregated metrics: {e}"}
-
-        # Recompute per-channel aggregates (FAA, alpha_*_avg)
-        per_channel_agg = {}
-        try:
-            per_channel_agg = influx.get_per_channel_aggregates(session_id)
-            aggregated_metrics.update(per_channel_agg)
-        except Exception as e:
-            return {"status": "error", "message": f"Failed to get per-channel aggregates: {e}"}
+        per_channel_agg = aggregated_metrics
 
         if per_channel_agg.get('per_channel_version', 0) == 0:
-            return {"status": "error", "message": "No per-channel data found in InfluxDB for this session"}
+            return {"status": "error", "message": f"No per-channel data found ({storage.name}) for this session"}
 
-        updated = pg.end_recording(
+        updated = await asyncio.to_thread(
+            storage.end_recording,
             session_id,
             duration_seconds=recording.duration_seconds or 0,
             sample_count=recording.sample_count or 0,
@@ -1536,6 +1965,14 @@ async def reclose_session(session_id: int):
         if updated is None:
             return {"status": "error", "message": f"UPDATE returned no row for session {session_id}"}
 
+        get_recording_cache().invalidate(session_id)
+
+        catalog_summary = {}
+        try:
+            catalog_summary = await asyncio.to_thread(materialize_session_summary, storage, session_id)
+        except Exception as e:
+            print(f"⚠️ [reclose] Session summary not materialized for #{session_id}: {e}")
+
         return {
             "status": "success",
             "session_id": session_id,
@@ -1547,32 +1984,83 @@ async def reclose_session(session_id: int):
             "faa_mean": per_channel_agg.get('faa_mean'),
             "faa_baseline_closed": per_channel_agg.get('faa_baseline_closed'),
             "posterior_asymmetry_mean": per_channel_agg.get('posterior_asymmetry_mean'),
+            "quality_grade": catalog_summary.get('quality_grade'),
+            "validation_status": catalog_summary.get('validation_status'),
         }
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+@app.post("/sessions/{session_id}/reprocess")
+async def reprocess_session(session_id: int):
+    """
+    Recalcula las métricas por ventana (2 s / 200 ms) de una sesión desde sus
+    muestras crudas con el análisis actual y reemplaza las guardadas.
+    A diferencia de /reclose, no re-agrega lo existente: lo regenera.
+    """
+    try:
+        storage = get_storage_backend()
+        results = await asyncio.to_thread(reprocess_sessions, storage, [session_id])
+        result = results[0]
+        if 'error' in result:
+            return {"status": "error", "message": result['error']}
+        return {"status": "success", **result}
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+@app.get("/sessions/{session_id}/features")
+async def get_session_features(session_id: int, phase_means: bool = True):
+    """
+    Features MuseFeatureExtractor (24-dim) precalculadas por ventana
+    (ai/feature_store.py): metadatos, ventanas por fase y medias por fase.
+    """
+    features = await asyncio.to_thread(open_session_features, session_id)
+    if features is None:
+        return {"status": "error", "message": f"No feature store for session {session_id}"}
+    result = {"status": "success", **features.to_dict()}
+    if phase_means:
+        result["phase_means"] = await asyncio.to_thread(features.phase_means)
+    return result
+
 @app.get("/sessions/{session_id}/metrics")
-async def get_session_metrics(session_id: int):
+async def get_session_metrics(request: Request, session_id: int, max_points: Optional[int] = None):
     """
     Obtiene todas las métricas de una sesión (InfluxDB).
 
+    `max_points` (opcional) limita la resolución: se lee el bucket de rollup
+    más grueso (1 s / 10 s / 1 min) que aún entrega ~max_points puntos.
+
     Response includes:
     - metrics: existing time-series array (unchanged, backward compat)
     - per_channel: per-channel band power object or null if not available
     - per_channel_version: 0 = no per-channel data, 1 = current schema
+
+    Sesiones cerradas se sirven del read cache con ETag (If-None-Match → 304).
     """
-    try:
-        influx = get_influx_client()
-        metrics = influx.get_metrics(session_id)
+    params = {"max_points": max_points}
+    not_modified = _not_modified(request, session_id, "metrics_response", params)
+    if not_modified is not None:
+        return not_modified
+
+    def load():
+        duration_seconds = None
+        if max_points:
+            try:
+                recording = storage.get_recording(session_id)
+                duration_seconds = recording.duration_seconds if recording else None
+            except Exception:
+                pass  # sin duración → resolución completa
+
+        metrics = storage.get_metrics(session_id, max_points=max_points, duration_seconds=duration_seconds)
         if not metrics:
-            # fallback to SQLite for legacy sessions
-            metrics = session_db.get_metrics(session_id)
+            return None  # legacy SQLite abajo, sin cachear
 
         # Attempt to load per-channel band power time series
         per_channel = None
         per_channel_version = 0
         try:
-            per_channel = influx.get_per_channel_metrics(session_id)
+            per_channel = storage.get_per_channel_metrics(
+                session_id, max_points=max_points, duration_seconds=duration_seconds
+            )
             if per_channel is not None:
                 per_channel_version = 1
         except Exception as e_pc:
@@ -1580,7 +2068,7 @@ async def get_session_metrics(session_id: int):
 
         per_channel_by_phase = None
         try:
-            per_channel_by_phase = influx.get_per_channel_by_phase(session_id)
+            per_channel_by_phase = storage.get_per_channel_by_phase(session_id)
         except Exception:
             pass  # non-fatal
 
@@ -1592,6 +2080,24 @@ async def get_session_metrics(session_id: int):
             "per_channel_by_phase": per_channel_by_phase,
             "per_channel_version": per_channel_version,
         }
+
+    try:
+        storage = get_storage_backend()
+        payload, etag = await asyncio.to_thread(
+            get_recording_cache().read, storage, session_id, "metrics_response", load, **params
+        )
+        if payload is None:
+            # fallback to SQLite for legacy sessions
+            metrics = session_db.get_metrics(session_id)
+            payload = {
+                "status": "success",
+                "metrics": metrics,
+                "count": len(metrics),
+                "per_channel": None,
+                "per_channel_by_phase": None,
+                "per_channel_version": 0,
+            }
+        return _with_etag(payload, etag)
     except Exception as e:
         metrics = session_db.get_metrics(session_id)
         return {
@@ -1605,23 +2111,47 @@ async def get_session_metrics(session_id: int):
         }
 
 @app.get("/sessions/{session_id}/events")
-async def get_session_events(session_id: int):
+async def get_session_events(request: Request, session_id: int):
     """
     Obtiene todos los eventos/marcadores de una sesión.
     """
-    events = session_db.get_events(session_id)
-    return {
+    not_modified = _not_modified(request, session_id, "events")
+    if not_modified is not None:
+        return not_modified
+
+    events, etag = [], None
+    try:
+        events, etag = await asyncio.to_thread(
+            get_recording_cache().read, get_storage_backend(), session_id, "events"
+        )
+    except Exception:
+        pass  # legacy SQLite abajo
+    if not events:
+        events = session_db.get_events(session_id)
+    return _with_etag({
         "status": "success",
         "events": events,
         "count": len(events)
-    }
+    }, etag)
 
 @app.delete("/sessions/{session_id}")
 async def delete_session(session_id: int):
     """
-    Elimina una sesión y todos sus datos asociados.
+    Elimina una sesión y todos sus datos asociados (storage backend, luego SQLite legacy).
     """
-    success = session_db.delete_session(session_id)
+    success = False
+    get_recording_cache().invalidate(session_id)
+    delete_session_features(session_id)
+    try:
+        await asyncio.to_thread(lambda: get_similarity_index().remove_session(session_id))
+    except Exception as e:
+        print(f"⚠️ Similarity index not updated for session {session_id}: {e}")
+    try:
+        success = await asyncio.to_thread(get_storage_backend().delete_recording, session_id)
+    except Exception as e:
+        print(f"⚠️ Storage delete failed for session {session_id}: {e}")
+    if not success:
+        success = session_db.delete_session(session_id)
     if success:
         return {
             "status": "success",
@@ -1700,13 +2230,17 @@ async def protocol_validate(session_id: int):
     Ejecuta tests de validación científica sobre una sesión grabada.
     
     Retorna: Berger effect, cognitive reactivity, coherence stability,
-    y SessionQualityScore compuesto.
+    y SessionQualityScore compuesto. Sesiones cerradas: resultado del read cache.
     """
     try:
-        influx = get_influx_client()
+        influx = get_storage_backend()
+        cache = get_recording_cache()
+        cached = await asyncio.to_thread(cache.get, session_id, "validation")
+        if cached is not None:
+            return cached[0]
         
-        # 1. Obtener métricas desde InfluxDB
-        metrics = influx.get_metrics(session_id)
+        # 1. Obtener métricas desde el storage (InfluxDB por defecto)
+        metrics, _ = await asyncio.to_thread(cache.read, influx, session_id, "metrics")
         if not metrics:
             metrics = session_db.get_metrics(session_id)
         
@@ -1717,7 +2251,7 @@ async def protocol_validate(session_id: int):
         #    luego fallback a SQLite legacy
         markers = []
         try:
-            influx_events = influx.get_events(session_id)
+            influx_events, _ = await asyncio.to_thread(cache.read, influx, session_id, "events")
             markers = [
                 {"label": e.get("label", ""), "timestamp": e.get("timestamp", 0)}
                 for e in (influx_events or [])
@@ -1763,6 +2297,9 @@ async def protocol_validate(session_id: int):
         except Exception as save_err:
             print(f"⚠️ [validate] No se pudo guardar a disco: {save_err}")
 
+        if await asyncio.to_thread(cache.is_closed, influx, session_id):
+            cache.put(session_id, "validation", result)
+
         return result
     except Exception as e:
         import traceback
@@ -1770,30 +2307,121 @@ async def protocol_validate(session_id: int):
         return {"status": "error", "message": str(e)}
 
 
+@app.websocket("/ws/neurofeedback")
+async def neurofeedback_websocket(websocket: WebSocket, ctx: Optional[str] = None):
+    """
+    Frames compactos de neurofeedback cada NEUROFEEDBACK_INTERVAL_MS (50 ms)
+    mientras el contexto está en modo 'neurofeedback' (/set-mode/neurofeedback):
+    
+        {"seq": 412, "t": 8123.41, "v": 0.4123, "r": 1, "th": 0.35,
+         "b": [0.21, 0.18, 0.41, 0.15, 0.05], "lat": 2.4}
+    
+    t = timestamp LSL de la última muestra, v = potencia relativa de la banda
+    objetivo, r = recompensa (umbral con histéresis; 0 mientras se asientan
+    los filtros), b = potencias relativas δ θ α β γ, lat = ms desde la llegada
+    de la última muestra hasta el frame. Sin muestras nuevas no hay frame;
+    fuera del modo, {"status": "inactive"} cada segundo.
+    """
+    try:
+        token = validate_brain_token(ctx)
+    except InvalidBrainContext as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    await websocket.accept()
+    print(f"→ Neurofeedback WebSocket connected (context '{token}')")
+    
+    loop = asyncio.get_running_loop()
+    interval = NEUROFEEDBACK_INTERVAL_MS / 1000
+    context = processor = config = None
+    cursor = seq = 0
+    last_inactive = 0.0
+    next_tick = loop.time()
+    try:
+        while True:
+            # Ticks a intervalo fijo (sin deriva); si nos atrasamos, re-sincronizar
+            next_tick = max(next_tick + interval, loop.time())
+            try:
+                context = brain.context(token)
+            except SubsystemNotReady:
+                context = None
+            
+            if context is None or context.current_mode != 'neurofeedback' or context.muse_connector is None:
+                if processor is not None:
+                    processor = None
+                    if context is not None:
+                        context.neurofeedback = None
+                if loop.time() - last_inactive >= 1.0:
+                    await websocket.send_text(dumps_str({"status": "inactive", "context": token}))
+                    last_inactive = loop.time()
+                await asyncio.sleep(max(0.0, next_tick - loop.time()))
+                continue
+            
+            if processor is None or context.neurofeedback_config is not config:
+                config = context.neurofeedback_config
+                same_filters = processor is not None and (processor.band, processor.envelope_ms) == (config['band'], config['envelope_ms'])
+                if same_filters:
+                    processor.configure(config['threshold'], config['hysteresis'])
+                else:
+                    connector = context.muse_connector
+                    processor = NeurofeedbackProcessor(
+                        fs=connector.SAMPLING_RATE, n_channels=len(connector.CHANNELS), **config
+                    )
+                    cursor = connector.sample_count  # sólo muestras nuevas
+                    context.neurofeedback = processor
+            
+            chunk, cursor, last_timestamp, arrival = context.muse_connector.read_since(cursor)
+            result = processor.process(chunk)
+            if result is not None:
+                seq += 1
+                await websocket.send_text(dumps_str({
+                    "seq": seq,
+                    "t": last_timestamp,
+                    "v": round(result['value'], 4),
+                    "r": int(result['reward']),
+                    "th": processor.threshold,
+                    "b": [round(float(x), 4) for x in result['bands']],
+                    "lat": round((time.time() - arrival) * 1000, 2),
+                }))
+                processor.record_pipeline_latency((time.time() - arrival) * 1000)
+            
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+    except UnknownBrainContext as e:
+        await websocket.close(code=1008, reason=str(e))
+    except Exception as e:
+        print(f"✗ Neurofeedback WebSocket closed: {e}")
+    finally:
+        if context is not None and processor is not None and context.neurofeedback is processor:
+            context.neurofeedback = None
+
 @app.websocket("/ws/brain-state")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, ctx: Optional[str] = None):
     import math
     
     def sanitize_value(v, default=0.0):
-        """Replace NaN/Infinity with default value."""
+        """Replace None/NaN/Infinity with the field's default (the frontend expects numbers)."""
         if v is None:
             return default
-        if isinstance(v, float) and (math.isnan(v) or math.isinf(v)):
+        if isinstance(v, float) and not math.isfinite(v):
             return default
         return v
     
-    def sanitize_dict(d, default=0.0):
-        """Recursively sanitize all values in a dict."""
-        if d is None:
+    def band_dict(b):
+        if not b:
             return None
-        return {k: sanitize_value(v, default) if not isinstance(v, dict) else sanitize_dict(v, default) 
-                for k, v in d.items()}
+        return {k: sanitize_value(b.get(k, 0), 0) for k in ("delta", "theta", "alpha", "beta", "gamma")}
     
+    try:
+        # Contexto del cliente (?ctx=); se resuelve en cada frame: mantiene
+        # vivo el contexto y sobrevive a que el cerebro aún esté calentando
+        token = validate_brain_token(ctx)
+    except InvalidBrainContext as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
     await websocket.accept()
     start_time = time.time()
     ws_frame_count = 0
     
-    print(f"→ New WebSocket connection established")
+    print(f"→ New WebSocket connection established (context '{token}')")
     
     try:
         while True:
@@ -1803,7 +2431,11 @@ async def websocket_endpoint(websocket: WebSocket):
             
             # --- INFERENCIA SINTÉRGICA ---
             # Obtener estado con TODAS las métricas científicas
-            ai_state = brain.next_state()
+            try:
+                ai_state = brain.next_state(token)
+            except SubsystemNotReady as e:
+                # Cerebro / datasets / playlist aún calentando: frame neutro
+                ai_state = {"source": "warming"}
             
             # Log cada 25 frames (5s a 5Hz) para ver si los valores cambian
             if ws_frame_count == 1 or ws_frame_count % 25 == 0:
@@ -1817,60 +2449,37 @@ async def websocket_endpoint(websocket: WebSocket):
                     f"state={ai_state.get('state','?')}"
                 )
             
-            # Sanitizar valores para evitar NaN/Infinity en JSON
-            coherence = sanitize_value(ai_state.get("coherence", 0.5), 0.5)
-            entropy = sanitize_value(ai_state.get("entropy", 0.5), 0.5)
-            frequency = sanitize_value(ai_state.get("dominant_frequency", 10.0), 10.0)
-            plv = sanitize_value(ai_state.get("plv"), None)
-            
-            focal_point = ai_state.get("focal_point", {"x": 0, "y": 0, "z": 0})
-            focal_point = {
-                "x": sanitize_value(focal_point.get("x", 0), 0),
-                "y": sanitize_value(focal_point.get("y", 0), 0),
-                "z": sanitize_value(focal_point.get("z", 0), 0)
+            # Payload plano (mismo esquema que SyntergicState) → orjson, sin Pydantic.
+            # NaN/Infinity en campos opcionales salen como null.
+            focal_point = ai_state.get("focal_point") or {}
+            state = {
+                "timestamp": current_t,
+                "coherence": sanitize_value(ai_state.get("coherence", 0.5), 0.5),
+                "entropy": sanitize_value(ai_state.get("entropy", 0.5), 0.5),
+                "focal_point": {
+                    "x": sanitize_value(focal_point.get("x", 0), 0),
+                    "y": sanitize_value(focal_point.get("y", 0), 0),
+                    "z": sanitize_value(focal_point.get("z", 0), 0)
+                },
+                "frequency": sanitize_value(ai_state.get("dominant_frequency", 10.0), 10.0),
+                "bands": band_dict(ai_state.get("bands")),
+                "bands_display": band_dict(ai_state.get("bands_display")),
+                "state": ai_state.get("state", "neutral"),
+                "plv": ai_state.get("plv"),
+                "source": ai_state.get("source"),
+                "session_progress": ai_state.get("session_progress"),
+                "session_timestamp": ai_state.get("session_timestamp"),
+                "model_version": ai_state.get("model_version"),
             }
             
-            bands = ai_state.get("bands")
-            if bands:
-                bands = {
-                    "delta": sanitize_value(bands.get("delta", 0), 0),
-                    "theta": sanitize_value(bands.get("theta", 0), 0),
-                    "alpha": sanitize_value(bands.get("alpha", 0), 0),
-                    "beta": sanitize_value(bands.get("beta", 0), 0),
-                    "gamma": sanitize_value(bands.get("gamma", 0), 0)
-                }
-            
-            bands_display = ai_state.get("bands_display")
-            if bands_display:
-                bands_display = {
-                    "delta": sanitize_value(bands_display.get("delta", 0), 0),
-                    "theta": sanitize_value(bands_display.get("theta", 0), 0),
-                    "alpha": sanitize_value(bands_display.get("alpha", 0), 0),
-                    "beta": sanitize_value(bands_display.get("beta", 0), 0),
-                    "gamma": sanitize_value(bands_display.get("gamma", 0), 0)
-                }
-            
-            # Construir objeto Pydantic con nuevos campos
-            state = SyntergicState(
-                timestamp=current_t,
-                coherence=coherence,
-                entropy=entropy,
-                focal_point=Vector3(**focal_point),
-                frequency=frequency,
-                bands=FrequencyBands(**bands) if bands else None,
-                bands_display=FrequencyBands(**bands_display) if bands_display else None,
-                state=ai_state.get("state", "neutral"),
-                plv=plv,
-                source=ai_state.get("source"),
-                session_progress=ai_state.get("session_progress"),
-                session_timestamp=ai_state.get("session_timestamp")
-            )
-            
             # Enviar al frontend
-            await websocket.send_json(state.dict())
+            await websocket.send_text(dumps_str(state))
             
             # Tasa de refresco: 5Hz (0.2s)
             await asyncio.sleep(0.2)
             
+    except UnknownBrainContext as e:
+        # Token no emitido o contexto descartado: el cliente pide otro (POST /brain/contexts)
+        await websocket.close(code=1008, reason=str(e))
     except Exception as e:
         print(f"✗ WebSocket connection closed: {e}")
@@ -53,6 +53,9 @@ class SyntergicState(BaseModel):
     session_progress: Optional[float] = None
     session_timestamp: Optional[float] = None
     
+    # Versión del VAE que produjo el frame (ai/model_registry.py); None sin VAE
+    model_version: Optional[str] = None
+    
     @staticmethod
     def simulate_next(t: float):
         """
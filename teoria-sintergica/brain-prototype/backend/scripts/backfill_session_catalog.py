@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Materializa las columnas de resumen del catálogo (migration 003) para
+grabaciones cerradas antes de que el recorder las calculara al parar.
+
+Uso:
+    python scripts/backfill_session_catalog.py --id 26
+    python scripts/backfill_session_catalog.py --all
+    python scripts/backfill_session_catalog.py --all --force   # recalcular todas
+"""
+
+import sys
+import argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import get_storage_backend
+from database.session_summary import SUMMARY_VERSION, materialize_session_summary
+
+
+def backfill(storage, recording_id: int) -> bool:
+    try:
+        summary = materialize_session_summary(storage, recording_id)
+    except Exception as e:
+        print(f"  ⚠️ #{recording_id}: {e}")
+        return False
+    print(f"  ✓ #{recording_id}: grade={summary['quality_grade']} "
+          f"validation={summary['validation_status']} "
+          f"phases={len(summary['alpha_by_phase'] or {})}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill session catalog summary columns")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--id', type=int, help='Recording ID')
+    group.add_argument('--all', action='store_true', help='Every recording in the catalog')
+    parser.add_argument('--force', action='store_true', help='Recompute current summaries too')
+    args = parser.parse_args()
+
+    storage = get_storage_backend()
+    storage.connect()
+
+    if args.id:
+        ids = [args.id]
+    else:
+        ids = [
+            r.id for r in storage.list_recordings(limit=10000)
+            if args.force or (r.summary_version or 0) < SUMMARY_VERSION
+        ]
+
+    print(f"📇 Backfilling session catalog ({storage.name}) for {len(ids)} recording(s)...")
+    done = sum(backfill(storage, rid) for rid in ids)
+    print(f"✅ {done} summary(ies) written")
+
+
+if __name__ == '__main__':
+    main()
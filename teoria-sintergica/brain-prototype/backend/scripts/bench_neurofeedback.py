@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Benchmark del modo neurofeedback (analysis/neurofeedback.py): latencia de
+inicio de un burst alpha al primer frame con recompensa, coste de process()
+por chunk y presupuesto de latencia de los filtros, sobre señal sintética
+procesada en chunks de NEUROFEEDBACK_INTERVAL_MS como en /ws/neurofeedback.
+
+El pipeline real (llegada de muestra → frame enviado) se mide en vivo:
+GET /neurofeedback/status.
+
+Uso:
+    python scripts/bench_neurofeedback.py
+    python scripts/bench_neurofeedback.py --envelope-ms 25 50 100 --order 1 2 3
+    python scripts/bench_neurofeedback.py --seeds 20
+"""
+
+import sys
+import argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from analysis.neurofeedback import (
+    benchmark_onset_latency, NEUROFEEDBACK_INTERVAL_MS, NEUROFEEDBACK_ENVELOPE_MS,
+    NEUROFEEDBACK_FILTER_ORDER, NEUROFEEDBACK_THRESHOLD,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Neurofeedback latency benchmark")
+    parser.add_argument('--envelope-ms', type=float, nargs='+', default=[NEUROFEEDBACK_ENVELOPE_MS])
+    parser.add_argument('--order', type=int, nargs='+', default=[NEUROFEEDBACK_FILTER_ORDER])
+    parser.add_argument('--threshold', type=float, default=NEUROFEEDBACK_THRESHOLD)
+    parser.add_argument('--interval-ms', type=float, default=NEUROFEEDBACK_INTERVAL_MS)
+    parser.add_argument('--seeds', type=int, default=5, help='Synthetic signals per configuration')
+    args = parser.parse_args()
+
+    print(f"Interval {args.interval_ms:.0f} ms, threshold {args.threshold}, alpha burst at 4.0 s\n")
+    print(f"{'order':>5} {'env ms':>7} {'filter':>7} {'smooth':>7} {'budget':>7} "
+          f"{'onset→reward p50/max':>22} {'false':>6} {'process p50/p95':>17}")
+    for order in args.order:
+        for envelope_ms in args.envelope_ms:
+            runs = [
+                benchmark_onset_latency(interval_ms=args.interval_ms, seed=seed, order=order,
+                                        envelope_ms=envelope_ms, threshold=args.threshold)
+                for seed in range(args.seeds)
+            ]
+            onsets = [r['onset_to_reward_ms'] for r in runs if r['onset_to_reward_ms'] is not None]
+            budget = runs[0]['budget']
+            onset_txt = f"{np.median(onsets):.0f} / {max(onsets):.0f} ms" if onsets else "no reward"
+            print(f"{order:>5} {envelope_ms:>7.0f} {budget['filter_delay_ms']:>5.0f}ms "
+                  f"{budget['envelope_delay_ms']:>5.0f}ms {budget['total_ms']:>5.0f}ms "
+                  f"{onset_txt:>22} {sum(r['false_reward_frames'] for r in runs):>6} "
+                  f"{np.median([r['process_p50_us'] for r in runs]):>6.0f} / "
+                  f"{np.median([r['process_p95_us'] for r in runs]):.0f} µs")
+    print("\nbudget = filter + smoothing + interval (the live pipeline p95 replaces the interval "
+          "in GET /neurofeedback/status)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark de serialización JSON + compresión sobre los payloads más grandes.
+
+Compara el camino por defecto de FastAPI (jsonable_encoder + json.dumps)
+con serialization.dumps (orjson) y mide tamaño / tiempo de gzip y brotli.
+
+Uso:
+    python scripts/bench_serialization.py                 # payloads sintéticos (sesión de 60 min)
+    python scripts/bench_serialization.py --id 26         # /sessions/26/metrics real (storage backend)
+    python scripts/bench_serialization.py --minutes 120
+"""
+
+import sys
+import json
+import time
+import zlib
+import random
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+
+from serialization import dumps, ORJSON_AVAILABLE
+from compression import brotli, GZIP_LEVEL, BROTLI_QUALITY
+
+BANDS = ['delta', 'theta', 'alpha', 'beta', 'gamma']
+CHANNELS = ['tp9', 'af7', 'af8', 'tp10']
+
+
+def synthetic_metrics_response(minutes: float) -> dict:
+    """Same shape as GET /sessions/{id}/metrics: metrics @ 5 Hz + per-channel @ 2 Hz."""
+    t0 = time.time()
+    n = int(minutes * 60 * 5)
+    metrics = []
+    for i in range(n):
+        m = {'timestamp': t0 + i / 5, 'state': 'relaxed', 'blink_contaminated': False}
+        for name in ['coherence', 'entropy', 'plv', 'signal_quality', 'dominant_frequency'] + BANDS:
+            m[name] = random.random()
+        for band in BANDS:
+            m[f'{band}_raw'] = random.random() * 50
+        metrics.append(m)
+
+    k = int(minutes * 60 * 2)
+    per_channel = {'timestamps': [t0 + i / 2 for i in range(k)]}
+    for band in BANDS:
+        per_channel[band] = {ch: [random.random() for _ in range(k)] for ch in CHANNELS}
+        per_channel[f'{band}_raw'] = {ch: [random.random() * 50 for _ in range(k)] for ch in CHANNELS}
+
+    return {
+        'status': 'success', 'metrics': metrics, 'count': n,
+        'per_channel': per_channel, 'per_channel_by_phase': None, 'per_channel_version': 1,
+    }
+
+
+def synthetic_dashboard(n_sessions: int = 200) -> dict:
+    """Same shape as GET /doc/dashboard (sessions + validation summaries)."""
+    start = datetime.utcnow()
+    sessions = [{
+        'id': i, 'name': f'Recording {i}', 'started_at': start - timedelta(days=i),
+        'ended_at': start - timedelta(days=i) + timedelta(minutes=20), 'duration_seconds': 1200.0,
+        'tags': ['protocol'], 'channels': ['TP9', 'AF7', 'AF8', 'TP10'], 'sample_count': 307200,
+        'quality_grade': 'B', 'validation_status': 'good',
+        'alpha_by_phase': {p: {ch: random.random() for ch in CHANNELS} for p in ('baseline_open', 'baseline_closed')},
+    } for i in range(n_sessions)]
+    validations = [{
+        'session_id': i,
+        'validation': {f'test_{j}': {'passed': True, 'value': random.random(), 'details': list(range(20))} for j in range(3)},
+    } for i in range(n_sessions)]
+    return {'status': 'success', 'sessions': sessions, 'validations': validations}
+
+
+def storage_metrics_response(recording_id: int) -> dict:
+    from database import get_storage_backend
+    storage = get_storage_backend()
+    storage.connect()
+    metrics = storage.get_metrics(recording_id)
+    return {
+        'status': 'success', 'metrics': metrics, 'count': len(metrics),
+        'per_channel': storage.get_per_channel_metrics(recording_id),
+        'per_channel_by_phase': storage.get_per_channel_by_phase(recording_id),
+        'per_channel_version': 1,
+    }
+
+
+def _time(fn, repeat: int = 5):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t)
+    return best * 1000, result
+
+
+def bench(name: str, payload: dict):
+    print(f"\n📦 {name}")
+    ms_std, body = _time(lambda: json.dumps(jsonable_encoder(payload)).encode())
+    ms_fast, fast_body = _time(lambda: dumps(payload))
+    print(f"  jsonable_encoder + json : {ms_std:8.1f} ms  {len(body) / 1e6:7.2f} MB")
+    print(f"  serialization.dumps     : {ms_fast:8.1f} ms  {len(fast_body) / 1e6:7.2f} MB"
+          f"  ({ms_std / max(ms_fast, 1e-6):.1f}x, orjson={'yes' if ORJSON_AVAILABLE else 'no'})")
+
+    for level in sorted({1, GZIP_LEVEL}):
+        ms, out = _time(lambda: zlib.compress(fast_body, level), repeat=3)
+        print(f"  gzip -{level:<2}                : {ms:8.1f} ms  {len(out) / 1e6:7.2f} MB  ({len(fast_body) / len(out):.1f}x)")
+    if brotli is not None:
+        ms, out = _time(lambda: brotli.compress(fast_body, quality=BROTLI_QUALITY), repeat=3)
+        print(f"  brotli q{BROTLI_QUALITY:<2}              : {ms:8.1f} ms  {len(out) / 1e6:7.2f} MB  ({len(fast_body) / len(out):.1f}x)")
+    else:
+        print("  brotli                  : (pip install brotli)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON serialization + compression")
+    parser.add_argument('--id', type=int, help='Recording ID (real /sessions/{id}/metrics payload)')
+    parser.add_argument('--minutes', type=float, default=60, help='Synthetic session length')
+    args = parser.parse_args()
+
+    random.seed(0)
+    if args.id:
+        bench(f"/sessions/{args.id}/metrics", storage_metrics_response(args.id))
+    else:
+        bench(f"/sessions/{{id}}/metrics ({args.minutes:.0f} min, synthetic)", synthetic_metrics_response(args.minutes))
+    bench("/doc/dashboard (200 sessions, synthetic)", synthetic_dashboard())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark de inferencia del VAE: latencia por frame y throughput en lote.
+
+Compara el camino anterior de _process_eeg_window (get_syntergic_state +
+segundo model.encode para la varianza, bajo no_grad) con VAEInferenceEngine
+en cada backend (eager / torchscript / int8), y reporta la desviación
+máxima de coherencia / focal point respecto de eager.
+
+Uso:
+    python scripts/bench_vae.py                        # pesos de ai/syntergic_vae.pth (o aleatorios)
+    python scripts/bench_vae.py --frames 500 --batch 1024
+    python scripts/bench_vae.py --threads 4
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import torch
+
+from ai.model import SyntergicVAE
+from ai.vae_engine import VAEInferenceEngine, BACKENDS
+
+INPUT_DIM = 64 * 161
+
+
+def load_model() -> SyntergicVAE:
+    model = SyntergicVAE(input_dim=INPUT_DIM, hidden_dim=512, latent_dim=64)
+    weights = Path(__file__).parent.parent / 'ai' / 'syntergic_vae.pth'
+    if weights.exists():
+        model.load_state_dict(torch.load(weights, map_location='cpu', weights_only=True))
+    else:
+        print(f"⚠ {weights} not found, using random weights")
+    return model.eval()
+
+
+def legacy_frame(model: SyntergicVAE, x: torch.Tensor):
+    """Camino previo: dos encodes por frame."""
+    coherence, focal = model.get_syntergic_state(x)
+    with torch.no_grad():
+        _, logvar = model.encode(x)
+        variance = torch.mean(torch.exp(logvar)).item()
+    return coherence, focal, variance
+
+
+def per_frame_ms(fn, frames: np.ndarray, warmup: int = 10) -> np.ndarray:
+    for x in frames[:warmup]:
+        fn(x)
+    times = np.empty(len(frames))
+    for i, x in enumerate(frames):
+        t0 = time.perf_counter()
+        fn(x)
+        times[i] = (time.perf_counter() - t0) * 1000
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=300, help='frames para latencia por frame')
+    parser.add_argument('--batch', type=int, default=512, help='ventanas para throughput en lote')
+    parser.add_argument('--threads', type=int, default=1, help='threads intra-op de torch')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = [torch.from_numpy(rng.standard_normal((1, INPUT_DIM), dtype=np.float32)) for _ in range(args.frames)]
+    batch = rng.standard_normal((args.batch, INPUT_DIM), dtype=np.float32)
+
+    model = load_model()
+    torch.set_num_threads(args.threads)
+    print(f"torch {torch.__version__} | threads={args.threads} | frames={args.frames} | batch={args.batch}\n")
+    print(f"{'variant':<14} {'p50 ms':>8} {'p95 ms':>8} {'batch win/s':>12} {'max |Δcoh|':>11} {'max |Δfocal|':>13}")
+
+    t = per_frame_ms(lambda x: legacy_frame(model, x), frames)
+    print(f"{'legacy (2x)':<14} {np.median(t):>8.3f} {np.percentile(t, 95):>8.3f} {'-':>12} {'-':>11} {'-':>13}")
+
+    reference = None
+    for backend in BACKENDS:
+        engine = VAEInferenceEngine(model, backend=backend, threads=args.threads)
+        t = per_frame_ms(engine.infer, frames)
+
+        engine.infer_batch(batch[:64])  # warmup
+        t0 = time.perf_counter()
+        out = engine.infer_batch(batch)
+        throughput = len(batch) / (time.perf_counter() - t0)
+
+        if reference is None:
+            reference = out
+        d_coh = np.abs(out['coherence'] - reference['coherence']).max()
+        d_focal = np.abs(out['focal_point'] - reference['focal_point']).max()
+        print(f"{backend:<14} {np.median(t):>8.3f} {np.percentile(t, 95):>8.3f} "
+              f"{throughput:>12.0f} {d_coh:>11.2e} {d_focal:>13.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Construye el feature store (ai/feature_store.py) de sesiones grabadas:
+features MuseFeatureExtractor por ventana 2 s / 200 ms, desde las muestras
+crudas, con índices de tiempo y fase.
+
+Las grabaciones nuevas se procesan solas al cerrarse; esto cubre las viejas.
+
+Uso:
+    python scripts/build_feature_store.py --id 26
+    python scripts/build_feature_store.py --missing       # sin features de la versión actual
+    python scripts/build_feature_store.py --all           # reconstruye todas
+    python scripts/build_feature_store.py --missing --index   # + rebuild del índice de similares
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import get_storage_backend
+from ai.similarity_index import SimilarityIndex
+from ai.feature_store import (
+    FEATURE_STORE_DIR, FEATURE_STORE_VERSION, build_session_features, missing_feature_ids,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-window feature store for recorded sessions")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--id', type=int, action='append', help='Recording ID (repeatable)')
+    group.add_argument('--missing', action='store_true', help='Recordings without a current feature store')
+    group.add_argument('--all', action='store_true', help='Every closed recording in the catalog')
+    parser.add_argument('--index', action='store_true', help='Rebuild the similarity index afterwards')
+    args = parser.parse_args()
+
+    storage = get_storage_backend()
+    storage.connect()
+
+    if args.id:
+        ids = args.id
+    elif args.missing:
+        ids = missing_feature_ids(storage)
+    else:
+        ids = [r.id for r in storage.list_recordings(limit=10000) if r.ended_at is not None]
+
+    print(f"📼 Building features v{FEATURE_STORE_VERSION} for {len(ids)} recording(s) "
+          f"({storage.name}) → {FEATURE_STORE_DIR}")
+    t0 = time.perf_counter()
+    windows = ok = 0
+    for rid in ids:
+        try:
+            result = build_session_features(storage, rid, overwrite=True)
+        except Exception as e:
+            print(f"  ⚠️ #{rid}: {e}")
+            continue
+        ok += 1
+        windows += result['windows']
+        print(f"  ✓ #{rid}: {result['windows']} windows, phases={result['phases']} ({result['seconds']}s)")
+    elapsed = time.perf_counter() - t0
+    print(f"✅ {ok}/{len(ids)} session(s), {windows} windows in {elapsed:.1f}s "
+          f"({windows / elapsed if elapsed else 0:.0f} windows/s)")
+
+    if args.index:
+        stats = SimilarityIndex().rebuild()
+        print(f"🔎 Similarity index: {stats['n_windows']} windows from {stats['n_sessions']} session(s) "
+              f"({stats['memory_mb']} MB) in {stats['seconds']}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Genera session archives (chunks comprimidos) para grabaciones existentes.
+
+Las grabaciones nuevas ya escriben su archive mientras graban; esto cubre
+las anteriores, leyendo los samples del storage backend una sola vez.
+
+Uso:
+    python scripts/build_session_archives.py --id 26
+    python scripts/build_session_archives.py --all
+    python scripts/build_session_archives.py --all --force   # reescribir
+"""
+
+import sys
+import argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import get_storage_backend
+from database.session_archive import SessionArchive, has_archive, write_archive
+
+
+def build_archive(storage, recording_id: int, force: bool = False) -> bool:
+    path = storage.archive_dir(recording_id)
+    if has_archive(path) and not force:
+        print(f"  #{recording_id}: archive ya existe ({path})")
+        return False
+
+    recording = storage.get_recording(recording_id)
+    timestamps, data = storage.get_sample_array(recording_id)
+    if len(timestamps) == 0:
+        print(f"  ⚠️ #{recording_id}: sin samples")
+        return False
+
+    write_archive(
+        path, timestamps, data,
+        fs=(recording.sampling_rate if recording else 256) or 256,
+        metadata={'recording_id': recording_id, 'source': storage.name}
+    )
+    archive = SessionArchive(path)
+    size = (path / 'chunks.bin').stat().st_size
+    raw = len(timestamps) * (8 + 4 * data.shape[0])
+    print(f"  ✓ #{recording_id}: {archive.n_samples} samples, {archive.n_chunks} chunks, "
+          f"{size / 1e6:.2f} MB ({raw / max(size, 1):.1f}x)")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build session archives for existing recordings")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--id', type=int, help='Recording ID')
+    group.add_argument('--all', action='store_true', help='Every recording in the catalog')
+    parser.add_argument('--force', action='store_true', help='Rewrite existing archives')
+    args = parser.parse_args()
+
+    storage = get_storage_backend()
+    storage.connect()
+
+    if args.id:
+        ids = [args.id]
+    else:
+        ids = [r.id for r in storage.list_recordings(limit=10000)]
+
+    print(f"📼 Building session archives ({storage.name}) for {len(ids)} recording(s)...")
+    built = sum(build_archive(storage, rid, force=args.force) for rid in ids)
+    print(f"✅ {built} archive(s) written")
+
+
+if __name__ == '__main__':
+    main()
@@ -95,9 +95,7 @@ def clean_empty_recordings(dry_run=True, recording_ids=None):
     for rec in empty_recordings:
         try:
             # Delete from PostgreSQL
-            with postgres._conn.cursor() as cur:
-                cur.execute('DELETE FROM eeg_recordings WHERE id = %s', (rec.id,))
-                postgres._conn.commit()
+            postgres.delete_recording(rec.id)
             print(f"   ✅ Eliminado: #{rec.id} - {rec.name}")
             deleted_count += 1
         except Exception as e:
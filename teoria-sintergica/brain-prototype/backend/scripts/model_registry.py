@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Registro de versiones del SyntergicVAE (ai/model_registry.py).
+
+activate / rollback aquí sólo cambian la versión activa en registry.json
+(la que carga la API al arrancar). Con la API corriendo usar
+POST /models/activate/{version} y POST /models/rollback: cambian el modelo
+en caliente, sin cortar WebSockets ni grabaciones.
+
+Uso:
+    python scripts/model_registry.py list
+    python scripts/model_registry.py register ai/syntergic_vae.pth --notes "50 sujetos, val 812.4"
+    python scripts/model_registry.py activate v3
+    python scripts/model_registry.py rollback
+"""
+
+import sys
+import json
+import argparse
+from datetime import datetime
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ai.model_registry import get_model_registry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SyntergicVAE model registry")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help='Registered versions')
+    register = sub.add_parser('register', help='Add a weights file as a new version')
+    register.add_argument('path', help='state_dict .pth (e.g. ai/train.py output)')
+    register.add_argument('--notes', default='')
+    register.add_argument('--metrics', default=None, help='JSON, e.g. \'{"val_loss": 812.4}\'')
+    register.add_argument('--activate', action='store_true', help='Make it the active version')
+    activate = sub.add_parser('activate', help='Active version for the next API start')
+    activate.add_argument('version')
+    sub.add_parser('rollback', help='Previous active version for the next API start')
+    args = parser.parse_args()
+
+    registry = get_model_registry()
+
+    if args.command == 'list':
+        versions = registry.versions()
+        if not versions:
+            print(f"(empty registry at {registry.root})")
+        for meta in versions:
+            created = datetime.fromtimestamp(meta['created_at']).strftime('%Y-%m-%d %H:%M')
+            print(f"{'*' if meta['active'] else ' '} {meta['version']:<5} {created}  "
+                  f"{meta['size_bytes'] / 1e6:6.1f} MB  sha256={meta['sha256'][:12]}  {meta['notes']}")
+    elif args.command == 'register':
+        metrics = json.loads(args.metrics) if args.metrics else None
+        meta = registry.register(args.path, notes=args.notes, metrics=metrics)
+        print(f"✓ Registered {meta['version']} ({meta['sha256'][:12]})")
+        if args.activate:
+            registry.set_active(meta['version'])
+            print(f"✓ Active: {meta['version']}")
+    elif args.command == 'activate':
+        registry.set_active(args.version)
+        print(f"✓ Active: {args.version} (running API: POST /models/activate/{args.version})")
+    elif args.command == 'rollback':
+        version = registry.rollback()
+        print(f"✓ Active: {version} (running API: POST /models/rollback)")
+
+
+if __name__ == '__main__':
+    main()
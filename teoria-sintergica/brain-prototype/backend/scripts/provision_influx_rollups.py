@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Crea/actualiza los buckets y tasks de rollup de InfluxDB (1 s, 10 s, 1 min).
+
+Uso:
+    python scripts/provision_influx_rollups.py                  # buckets + tasks
+    python scripts/provision_influx_rollups.py --backfill-days 30
+    python scripts/provision_influx_rollups.py --print-flux     # solo mostrar Flux
+"""
+
+import sys
+import argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.influx_client import get_influx_client
+from database.influx_rollups import (
+    ROLLUPS,
+    build_task_flux,
+    ensure_rollups,
+    backfill_rollups,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provision InfluxDB rollup buckets and tasks")
+    parser.add_argument('--backfill-days', type=int, default=0,
+                        help='Re-aggregate the last N days of raw data (default: 0 = skip)')
+    parser.add_argument('--print-flux', action='store_true',
+                        help='Print the task Flux without touching InfluxDB')
+    args = parser.parse_args()
+
+    if args.print_flux:
+        for spec in ROLLUPS:
+            print(f"# ---- {spec.task_name} → {spec.bucket} ----")
+            print(build_task_flux(spec))
+        return
+
+    influx = get_influx_client()
+    influx.connect()
+
+    result = ensure_rollups(influx)
+    print('📦 Buckets:')
+    for name, status in result['buckets'].items():
+        print(f'  - {name}: {status}')
+    print('⏱  Tasks:')
+    for name, status in result['tasks'].items():
+        print(f'  - {name}: {status}')
+
+    if args.backfill_days > 0:
+        print(f'\n📊 Backfilling {args.backfill_days} days...')
+        backfill_rollups(influx, days=args.backfill_days)
+
+    influx.close()
+
+
+if __name__ == '__main__':
+    main()
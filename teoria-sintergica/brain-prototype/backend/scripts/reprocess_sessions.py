@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Recalcula métricas, band power por canal y flags EOG de sesiones grabadas
+desde sus muestras crudas (database/reprocess.py), en paralelo con todos
+los cores, y las marca con ANALYSIS_VERSION.
+
+Uso:
+    python scripts/reprocess_sessions.py --id 26
+    python scripts/reprocess_sessions.py --id 26 --id 27 --workers 8
+    python scripts/reprocess_sessions.py --stale          # analysis_version < ANALYSIS_VERSION
+    python scripts/reprocess_sessions.py --all
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import get_storage_backend
+from database.reprocess import (
+    ANALYSIS_VERSION, REPROCESS_WORKERS, REPROCESS_CHUNK_WINDOWS,
+    reprocess_sessions, stale_recording_ids,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline reprocessing of recorded sessions")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--id', type=int, action='append', help='Recording ID (repeatable)')
+    group.add_argument('--stale', action='store_true', help=f'Recordings with analysis_version < {ANALYSIS_VERSION}')
+    group.add_argument('--all', action='store_true', help='Every closed recording in the catalog')
+    parser.add_argument('--workers', type=int, default=REPROCESS_WORKERS, help='Worker processes')
+    parser.add_argument('--chunk', type=int, default=REPROCESS_CHUNK_WINDOWS, help='Windows per pool task')
+    args = parser.parse_args()
+
+    storage = get_storage_backend()
+    storage.connect()
+
+    if args.id:
+        ids = args.id
+    elif args.stale:
+        ids = stale_recording_ids(storage)
+    else:
+        ids = [r.id for r in storage.list_recordings(limit=10000) if r.ended_at is not None]
+
+    print(f"🔁 Reprocessing {len(ids)} recording(s) ({storage.name}) → analysis v{ANALYSIS_VERSION}, "
+          f"{args.workers} worker(s)...")
+    t0 = time.perf_counter()
+    results = reprocess_sessions(storage, ids, workers=args.workers, chunk_windows=args.chunk)
+    ok = [r for r in results if 'error' not in r]
+    windows = sum(r['windows'] for r in ok)
+    elapsed = time.perf_counter() - t0
+    print(f"✅ {len(ok)}/{len(results)} session(s), {windows} windows in {elapsed:.1f}s "
+          f"({windows / elapsed if elapsed else 0:.0f} windows/s)")
+
+
+if __name__ == '__main__':
+    main()
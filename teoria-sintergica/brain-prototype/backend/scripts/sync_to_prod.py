@@ -8,6 +8,7 @@ Arquitectura:
   local PostgreSQL  →  prod PostgreSQL  (metadatos de sesión)
   local InfluxDB    →  prod InfluxDB    (métricas + samples + eventos)
   local JSONs       →  prod server      (validation logs vía SCP)
+  session archives  →  prod server      (raw samples chunked/comprimidos vía SCP)
 
 Requiere que tunnel-prod-db.sh esté corriendo en background:
   ./tunnel-prod-db.sh --bg
@@ -54,6 +55,7 @@ from influxdb_client import InfluxDBClient, Point, WritePrecision
 from influxdb_client.client.write_api import SYNCHRONOUS
 from database.postgres_client import PostgresClientSync, get_postgres_client_sync
 from database.influx_client import InfluxDBEEGClient, get_influx_client
+from database.session_archive import archive_path, has_archive, write_archive
 
 # ── config local ──────────────────────────────────────────────────────────────
 LOCAL_PG = dict(
@@ -280,6 +282,8 @@ def upload_influx_samples(session_id: int):
         print(f"   ⚠️  InfluxDB: sin samples locales para sesión #{session_id}")
         return 0
 
+    ensure_local_archive(session_id, samples)
+
     with prod_influx_client() as pclient:
         wapi = pclient.write_api(write_options=SYNCHRONOUS)
         points = []
@@ -309,6 +313,18 @@ def upload_influx_samples(session_id: int):
     return len(samples)
 
 
+def ensure_local_archive(session_id: int, samples: list):
+    """Escribe el session archive local a partir de los samples leídos (si falta)."""
+    path = archive_path(session_id)
+    if has_archive(path):
+        return
+    import numpy as np
+    timestamps = np.array([s["time"].timestamp() for s in samples], dtype=np.float64)
+    data = np.array([[s["tp9"], s["af7"], s["af8"], s["tp10"]] for s in samples], dtype=np.float32).T
+    write_archive(path, timestamps, data, fs=256, metadata={"recording_id": session_id, "source": "influx"})
+    print(f"   ✓ Archive: {len(samples)} samples → {path}")
+
+
 def upload_influx_events(session_id: int):
     """
     Lee los eventos/marcadores de protocolo de local InfluxDB
@@ -371,6 +387,8 @@ PROD_SSH_HOST = os.getenv("PROD_SSH_HOST", "api.random-lab.es")
 PROD_SSH_USER = os.getenv("PROD_SSH_USER", "root")
 PROD_REMOTE_LOGS_DIR = os.getenv("PROD_VALIDATION_LOGS_DIR",
     "/root/random/teoria-sintergica/brain-prototype/backend/validation_logs")
+PROD_REMOTE_ARCHIVE_DIR = os.getenv("PROD_SESSION_ARCHIVE_DIR",
+    "/root/random/teoria-sintergica/brain-prototype/backend/data/archives")
 
 
 def upload_validation_json(session_id: int):
@@ -393,6 +411,26 @@ def upload_validation_json(session_id: int):
     return True
 
 
+def upload_session_archive(session_id: int):
+    """Sube el directorio del session archive a prod vía SCP."""
+    path = archive_path(session_id)
+    if not has_archive(path):
+        print(f"   ⚠️  Archive #{session_id} no existe localmente")
+        return False
+
+    remote = f"{PROD_SSH_USER}@{PROD_SSH_HOST}:{PROD_REMOTE_ARCHIVE_DIR}/"
+    result = subprocess.run(
+        ["scp", "-q", "-r", str(path), remote],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(f"   ❌ SCP archive #{session_id} falló: {result.stderr.strip()}")
+        return False
+
+    print(f"   ✓ SCP: archive #{session_id} → prod")
+    return True
+
+
 def upload_protocol_logs():
     """Sube todos los protocol logs COMPLETE a prod vía SCP (si no existen allá)."""
     complete_logs = sorted(VALIDATION_LOGS_DIR.glob("validation_*_COMPLETE.json"))
@@ -474,6 +512,9 @@ def sync_session(session_id: int, force: bool = False, validate: bool = False):
         # 3. InfluxDB raw samples (256Hz EEG)
         n_samples = upload_influx_samples(session_id)
 
+        # 3b. Session archive (playback sin pasar por InfluxDB)
+        upload_session_archive(session_id)
+
         # 4. InfluxDB events (protocol markers)
         n_events = upload_influx_events(session_id)
 
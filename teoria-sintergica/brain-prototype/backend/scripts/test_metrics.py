@@ -13,13 +13,14 @@ player = pm.load_session(3)
 
 print()
 print("=== Session loaded ===")
-print(f"Has metrics: {hasattr(player, '_recorded_metrics')}")
+timeline = player._metric_timeline
+print(f"Has metrics: {timeline is not None}")
 
-if hasattr(player, '_recorded_metrics'):
-    print(f"Num metrics: {len(player._recorded_metrics)}")
-    if player._recorded_metrics:
-        print(f"First metric keys: {player._recorded_metrics[0].keys()}")
-        print(f"First relative_time: {player._recorded_metrics[0].get('relative_time')}")
+if timeline is not None:
+    print(f"Num metrics: {len(timeline)}")
+    if len(timeline):
+        print(f"First metric keys: {timeline.row(0).keys()}")
+        print(f"First relative_time: {timeline.row(0).get('relative_time')}")
         print()
         
         # Test getting metrics at position
@@ -0,0 +1,86 @@
+"""
+serialization.py — Fast JSON for HTTP responses and the WebSocket stream.
+
+orjson (si está instalado) serializa directamente dicts, dataclasses,
+datetimes y arrays/escalares de numpy, y convierte NaN/Infinity en null,
+así que las respuestas no necesitan pasar por jsonable_encoder ni sanear
+valores a mano. Sin orjson se usa json de la stdlib con el mismo contrato.
+"""
+
+import json
+import math
+from dataclasses import asdict, is_dataclass
+from datetime import date, datetime
+from typing import Any
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+ORJSON_AVAILABLE = orjson is not None
+
+if ORJSON_AVAILABLE:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """Types neither orjson nor json handle natively."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if hasattr(obj, 'model_dump'):  # pydantic v2
+        return obj.model_dump()
+    if hasattr(obj, 'dict'):  # pydantic v1
+        return obj.dict()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if is_dataclass(obj):
+        return asdict(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def _finite(obj: Any) -> Any:
+    """stdlib fallback: NaN/Infinity → None (lo que orjson hace nativamente)."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    if isinstance(obj, (np.generic, np.ndarray)) or is_dataclass(obj) or hasattr(obj, 'model_dump'):
+        return _finite(_default(obj))
+    return obj
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(
+        _finite(obj), default=_default, ensure_ascii=False, allow_nan=False, separators=(',', ':')
+    ).encode('utf-8')
+
+
+def dumps_str(obj: Any) -> str:
+    """dumps() as text (WebSocket send_text)."""
+    return dumps(obj).decode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with dumps().
+
+    Usada como default_response_class de la app. Devolverla directamente
+    desde un endpoint evita además el paso por jsonable_encoder.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
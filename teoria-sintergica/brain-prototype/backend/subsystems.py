@@ -0,0 +1,220 @@
+"""
+subsystems.py — Lazy initialization + readiness of the heavy backend parts.
+
+Cada subsistema (cerebro/VAE, datasets PhysioNet, session player, playlist,
+copilots, audit, SQLite legacy) se construye la primera vez que se usa, o
+en un thread de fondo al arrancar (warm()). El servidor HTTP queda
+escuchando en cuanto se importan los routers; lo que aún no está listo
+responde 503 {"status": "warming"} y /health/ready reporta el estado de
+cada subsistema más el perfil de imports de main.py.
+
+    brain_sub = register('brain', create_brain)
+    brain = LazyProxy(brain_sub)       # brain.x → SubsystemNotReady si no está listo
+    warm()                             # calentar en background (WARM_SUBSYSTEMS)
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+
+# Subsistemas a calentar al arrancar: 'all', 'none' o lista separada por comas
+WARM_SUBSYSTEMS = os.getenv('WARM_SUBSYSTEMS', 'all')
+
+PENDING = 'pending'
+WARMING = 'warming'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class SubsystemNotReady(RuntimeError):
+    """Se pidió un subsistema que todavía se está inicializando (o falló)."""
+
+    def __init__(self, name: str, state: str, error: Optional[str] = None):
+        self.name = name
+        self.state = state
+        self.error = error
+        detail = f": {error}" if error else ""
+        super().__init__(f"Subsystem '{name}' is {state}{detail}")
+
+
+class Subsystem:
+    """Un valor construido una sola vez por `factory`, bajo demanda o en background."""
+
+    def __init__(self, name: str, factory: Callable[[], Any], depends_on: Sequence[str] = ()):
+        self.name = name
+        self.factory = factory
+        self.depends_on = tuple(depends_on)
+        self.state = PENDING
+        self.error: Optional[str] = None
+        self.seconds: Optional[float] = None
+        self._value: Any = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def _run(self):
+        t0 = time.perf_counter()
+        try:
+            for dep in self.depends_on:
+                get_subsystem(dep).get()
+            value = self.factory()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.state = FAILED
+            print(f"⚠️  Subsystem '{self.name}' failed: {self.error}")
+        else:
+            self._value = value
+            self.state = READY
+            print(f"✓ Subsystem '{self.name}' ready ({time.perf_counter() - t0:.2f}s)")
+        finally:
+            self.seconds = time.perf_counter() - t0
+            self._done.set()
+
+    def _claim(self) -> bool:
+        """True si este caller debe ejecutar la factory."""
+        with self._lock:
+            if self.state != PENDING:
+                return False
+            self.state = WARMING
+            return True
+
+    def start(self):
+        """Inicializa en un thread de fondo (idempotente)."""
+        if self._claim():
+            threading.Thread(target=self._run, name=f'warm-{self.name}', daemon=True).start()
+
+    def get(self, wait: bool = True, timeout: Optional[float] = None) -> Any:
+        """
+        Valor del subsistema.
+
+        wait=True: lo construye en este thread (o espera al que lo está
+        construyendo). wait=False: dispara el warm-up y lanza
+        SubsystemNotReady si todavía no está listo.
+        """
+        if self.state == READY:
+            return self._value
+        if self.state == FAILED:
+            raise SubsystemNotReady(self.name, FAILED, self.error)
+        if not wait:
+            self.start()
+            raise SubsystemNotReady(self.name, self.state)
+        if self._claim():
+            self._run()
+        elif not self._done.wait(timeout):
+            raise SubsystemNotReady(self.name, self.state)
+        return self.get(wait=False)
+
+    def set(self, value: Any):
+        """Reemplaza el valor (p.ej. el player activo tras cambiar de sesión)."""
+        with self._lock:
+            self._value = value
+            self.state = READY
+            self.error = None
+            self._done.set()
+
+    def reset(self):
+        """Vuelve a PENDING (reintentar tras un fallo)."""
+        with self._lock:
+            if self.state == WARMING:
+                return
+            self._value = None
+            self.state = PENDING
+            self.error = None
+            self._done = threading.Event()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'seconds': round(self.seconds, 3) if self.seconds is not None else None,
+            'error': self.error,
+        }
+
+
+class LazyProxy:
+    """
+    Objeto que reenvía atributos al valor de un subsistema.
+
+    Permite dejar `brain.session_player...` en los endpoints: si el
+    subsistema no está listo se lanza SubsystemNotReady (→ 503). Con
+    wait=True (p.ej. SQLite legacy, que abre en ms) se construye bajo demanda.
+    """
+
+    __slots__ = ('_subsystem', '_wait')
+
+    def __init__(self, subsystem: Subsystem, wait: bool = False):
+        object.__setattr__(self, '_subsystem', subsystem)
+        object.__setattr__(self, '_wait', wait)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._subsystem.get(wait=self._wait), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._subsystem.get(wait=self._wait), name, value)
+
+    def __repr__(self) -> str:
+        return f"<LazyProxy {self._subsystem.name} ({self._subsystem.state})>"
+
+
+# ==================== REGISTRY ====================
+
+_registry: Dict[str, Subsystem] = {}
+_import_profile: Dict[str, float] = {}
+_process_start = time.perf_counter()
+
+
+def register(name_or_subsystem, factory: Optional[Callable[[], Any]] = None,
+             depends_on: Sequence[str] = ()) -> Subsystem:
+    """Registra un subsistema (por nombre + factory, o una instancia ya creada)."""
+    if isinstance(name_or_subsystem, Subsystem):
+        subsystem = name_or_subsystem
+    else:
+        subsystem = Subsystem(name_or_subsystem, factory, depends_on)
+    _registry[subsystem.name] = subsystem
+    return subsystem
+
+
+def get_subsystem(name: str) -> Subsystem:
+    return _registry[name]
+
+
+def _warm_enabled(name: str) -> bool:
+    configured = WARM_SUBSYSTEMS.strip().lower()
+    if configured == 'all':
+        return True
+    if configured in ('', 'none'):
+        return False
+    return name in {n.strip() for n in configured.split(',')}
+
+
+def warm(names: Optional[Iterable[str]] = None):
+    """Arranca en background los subsistemas habilitados en WARM_SUBSYSTEMS."""
+    for name in list(names if names is not None else _registry):
+        if name in _registry and _warm_enabled(name):
+            _registry[name].start()
+
+
+def readiness() -> Dict[str, Any]:
+    """Estado de cada subsistema + perfil de imports (para /health/ready)."""
+    subsystems = {name: s.status() for name, s in _registry.items()}
+    return {
+        'ready': all(s.state == READY for s in _registry.values()),
+        'uptime_seconds': round(time.perf_counter() - _process_start, 3),
+        'subsystems': subsystems,
+        'import_profile_ms': dict(_import_profile),
+    }
+
+
+@contextmanager
+def profile_import(label: str):
+    """Mide el tiempo de un bloque de imports (ver readiness()['import_profile_ms'])."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _import_profile[label] = round((time.perf_counter() - t0) * 1000, 1)
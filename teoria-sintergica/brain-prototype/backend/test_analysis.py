@@ -14,6 +14,7 @@ from analysis.spectral import SpectralAnalyzer
 from analysis.coherence import CoherenceAnalyzer
 from analysis.entropy import EntropyAnalyzer
 from analysis.metrics import SyntergicMetrics
+from analysis.neurofeedback import NeurofeedbackProcessor, benchmark_onset_latency
 
 
 def test_spectral_analysis():
@@ -187,6 +188,90 @@ def test_full_metrics():
     return True
 
 
+def test_neurofeedback():
+    """Test neurofeedback: envolventes IIR por chunks, umbral con histéresis"""
+    print("\n" + "="*60)
+    print("TEST 5: Neurofeedback (IIR + histéresis)")
+    print("="*60)
+    
+    fs = 256
+    t = np.arange(fs * 6) / fs
+    rng = np.random.default_rng(3)
+    noise = rng.standard_normal((4, len(t))) * 0.5
+    
+    # Estado de los filtros entre chunks: trocear distinto da el mismo resultado
+    alpha = np.sin(2 * np.pi * 10 * t)[None, :] * 10 + noise
+    whole = NeurofeedbackProcessor(fs=fs).process(alpha)
+    chunked = NeurofeedbackProcessor(fs=fs)
+    edges = [0, 7, 13, 200, 201, 640, 1100, len(t)]
+    for a, b in zip(edges, edges[1:]):
+        frame = chunked.process(alpha[:, a:b])
+    print(f"  alpha relativo: {whole['value']:.3f} (entero) / {frame['value']:.3f} (chunks)")
+    assert np.isclose(frame['value'], whole['value'], rtol=1e-9)
+    assert np.allclose(frame['bands'], whole['bands'], rtol=1e-9)
+    assert whole['value'] > 0.7 and whole['settled']
+    assert chunked.process(np.empty((4, 0))) is None
+    
+    # La banda objetivo manda: un beta puro deja alpha bajo
+    beta = np.sin(2 * np.pi * 20 * t)[None, :] * 10 + noise
+    beta_frame = NeurofeedbackProcessor(fs=fs, band='beta').process(beta)
+    assert beta_frame['value'] > 0.7 and beta_frame['bands'][2] < 0.1
+    
+    # Latencia: suavizado ≈ constante de tiempo, pasabanda con retardo positivo
+    processor = NeurofeedbackProcessor(fs=fs, envelope_ms=50)
+    assert abs(processor.envelope_delay_ms() - 50) < 3
+    assert 0 < processor.filter_delay_ms() < 200
+    budget = processor.latency_budget(interval_ms=50)
+    assert budget['pipeline_p95_ms'] is None and budget['total_ms'] >= 50
+    for ms in (4.0, 6.0, 30.0):
+        processor.record_pipeline_latency(ms)
+    assert processor.latency_budget()['frames_measured'] == 3
+    
+    # Umbral con histéresis sobre alpha modulado lentamente (0.25 Hz)
+    threshold, hysteresis = 0.5, 0.15
+    envelope = 6 + 5 * np.sin(2 * np.pi * 0.25 * t)
+    modulated = np.sin(2 * np.pi * 10 * t)[None, :] * envelope + rng.standard_normal((4, len(t))) * 2.0
+    processor = NeurofeedbackProcessor(fs=fs, threshold=threshold, hysteresis=hysteresis)
+    step = int(fs * 0.05)
+    frames = [processor.process(modulated[:, i:i + step]) for i in range(0, len(t), step)]
+    
+    reward, band_hits = False, 0
+    for frame in frames:
+        if not frame['settled']:
+            expected = False
+        elif reward:
+            expected = frame['value'] >= threshold - hysteresis
+        else:
+            expected = frame['value'] >= threshold
+        assert frame['reward'] == expected
+        if frame['reward'] and frame['value'] < threshold:
+            band_hits += 1  # sigue en recompensa dentro de la banda de histéresis
+        reward = frame['reward']
+    rewards = [f['reward'] for f in frames]
+    toggles = sum(a != b for a, b in zip(rewards, rewards[1:]))
+    print(f"  frames={len(frames)} con recompensa={sum(rewards)} cambios={toggles} en histéresis={band_hits}")
+    assert not any(f['reward'] for f in frames if not f['settled'])
+    assert 0 < sum(rewards) < len(frames) and band_hits > 0
+    
+    processor.configure(threshold=0.9)
+    assert processor.threshold == 0.9 and processor.hysteresis == hysteresis
+    for kwargs in ({'band': 'kappa'}, {'envelope_ms': 0}):
+        try:
+            NeurofeedbackProcessor(fs=fs, **kwargs)
+            assert False, f"configuración inválida aceptada: {kwargs}"
+        except ValueError:
+            pass
+    
+    # Burst alpha sintético: recompensa poco después del inicio, ninguna antes
+    result = benchmark_onset_latency(seed=0)
+    print(f"  onset → reward: {result['onset_to_reward_ms']} ms, presupuesto {result['budget']['total_ms']} ms")
+    assert result['onset_to_reward_ms'] is not None and result['onset_to_reward_ms'] < 500
+    assert result['false_reward_frames'] == 0
+    
+    print("\n✓ Test neurofeedback PASSED")
+    return True
+
+
 if __name__ == "__main__":
     print("\n" + "="*60)
     print("SYNTERGIC METRICS - Test Suite")
@@ -197,6 +282,7 @@ if __name__ == "__main__":
         test_coherence_analysis()
         test_entropy_analysis()
         test_full_metrics()
+        test_neurofeedback()
         
         print("\n" + "="*60)
         print("✓ TODOS LOS TESTS PASARON")
@@ -0,0 +1,137 @@
+"""
+Script de prueba para los contextos del cerebro (ai/brain_context.py).
+Valida tokens emitidos, expiración por inactividad y desalojo LRU.
+"""
+
+import sys
+import os
+import time
+
+# Agregar path del backend
+sys.path.insert(0, os.path.dirname(__file__))
+
+from ai.brain_context import (
+    BrainContextRegistry, InvalidBrainContext, UnknownBrainContext, validate_token, DEFAULT_CONTEXT,
+)
+
+
+def test_issued_tokens():
+    """Test tokens: sólo los emitidos por create(); default siempre; formato validado"""
+    print("\n" + "="*60)
+    print("TEST 1: Tokens emitidos")
+    print("="*60)
+
+    registry = BrainContextRegistry(ttl_seconds=60, max_contexts=8)
+    assert registry.get() is registry.default and registry.get('') is registry.default
+    assert registry.get(DEFAULT_CONTEXT) is registry.default
+
+    # Un token inventado no crea contexto (no puede desalojar a nadie)
+    for _ in range(20):
+        try:
+            registry.get('made-up')
+            assert False, "token no emitido aceptado"
+        except UnknownBrainContext:
+            pass
+    assert registry.all() == [registry.default]
+
+    ctx = registry.create()
+    print(f"  emitido: {ctx.token}")
+    assert registry.get(ctx.token) is ctx and len(registry.all()) == 2
+    ctx.current_mode = 'relax'
+    assert registry.get(ctx.token).current_mode == 'relax' and registry.default.current_mode == 'focus'
+
+    assert not registry.drop(DEFAULT_CONTEXT)
+    assert registry.drop(ctx.token) and not registry.drop(ctx.token)
+    try:
+        registry.get(ctx.token)
+        assert False, "contexto descartado sigue accesible"
+    except UnknownBrainContext:
+        pass
+
+    for bad in ('bad token!', 'x' * 65, '../etc'):
+        try:
+            validate_token(bad)
+            assert False, f"token inválido aceptado: {bad!r}"
+        except InvalidBrainContext:
+            pass
+
+    print("\n✓ Test tokens emitidos PASSED")
+    return True
+
+
+def test_eviction():
+    """Test descarte: TTL por inactividad y tope (incluido default) con LRU"""
+    print("\n" + "="*60)
+    print("TEST 2: Expiración TTL + desalojo LRU")
+    print("="*60)
+
+    # Tope 3 = default + 2 emitidos
+    registry = BrainContextRegistry(ttl_seconds=60, max_contexts=3)
+    a, b = registry.create(), registry.create()
+    registry.get(a.token)            # a pasa a ser el más reciente
+    c = registry.create()            # desaloja b (menos usado)
+    tokens = [ctx.token for ctx in registry.all()]
+    print(f"  activos: {tokens}")
+    assert len(tokens) == 3 and tokens[0] == DEFAULT_CONTEXT
+    assert set(tokens[1:]) == {a.token, c.token}
+    try:
+        registry.get(b.token)
+        assert False, "contexto desalojado sigue accesible"
+    except UnknownBrainContext:
+        pass
+
+    # Tope mínimo: default + 1 (max_contexts=1 no deja dos contextos emitidos)
+    tiny = BrainContextRegistry(ttl_seconds=60, max_contexts=1)
+    first, second = tiny.create(), tiny.create()
+    assert tiny.max_contexts == 2 and [x.token for x in tiny.all()] == [DEFAULT_CONTEXT, second.token]
+    try:
+        tiny.get(first.token)
+        assert False, "el primer contexto no fue desalojado"
+    except UnknownBrainContext:
+        pass
+    for _ in range(10):
+        tiny.create()
+    assert len(tiny.all()) == tiny.max_contexts
+
+    # TTL: un contexto inactivo expira al pedirlo y al emitir otro
+    registry = BrainContextRegistry(ttl_seconds=60, max_contexts=8)
+    idle, busy, stale = registry.create(), registry.create(), registry.create()
+    idle.last_seen -= 120
+    stale.last_seen -= 120
+    registry.default.last_seen -= 120
+    try:
+        registry.get(idle.token)
+        assert False, "contexto expirado sigue accesible"
+    except UnknownBrainContext:
+        pass
+    assert registry.get(busy.token) is busy and busy.last_seen > time.time() - 1
+    registry.create()
+    remaining = {ctx.token for ctx in registry.all()}
+    assert stale.token not in remaining and busy.token in remaining
+    assert registry.get() is registry.default  # default nunca expira
+
+    print("\n✓ Test expiración + desalojo PASSED")
+    return True
+
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("BRAIN CONTEXTS - Test Suite")
+    print("="*60)
+
+    try:
+        test_issued_tokens()
+        test_eviction()
+
+        print("\n" + "="*60)
+        print("✓ TODOS LOS TESTS PASARON")
+        print("="*60)
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n✗ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,534 @@
+"""
+Script de prueba para el módulo de base de datos.
+Valida los componentes que no necesitan PostgreSQL/InfluxDB en ejecución.
+"""
+
+import math
+import sys
+import os
+import tempfile
+from datetime import datetime
+
+# Agregar path del backend
+sys.path.insert(0, os.path.dirname(__file__))
+
+from database.influx_client import EEGSample, MetricSnapshot, InfluxDBEEGClient
+from database.session_aggregator import SessionAggregator
+from database.session_archive import SessionArchive, SessionArchiveWriter
+from database.recorder_v2 import SampleBlockBuffer, _finalize_closed_recording
+from database.models import SessionDatabase
+from database.storage import EmbeddedBackend
+
+
+def _snapshot(t, coherence, alpha):
+    return MetricSnapshot(
+        timestamp=t, coherence=coherence, entropy=0.5, plv=0.4,
+        delta=0.1, theta=0.2, alpha=alpha, beta=0.15, gamma=0.05,
+    )
+
+
+def test_session_aggregator():
+    """Test agregados incrementales vs cálculo directo"""
+    print("\n" + "="*60)
+    print("TEST 1: SessionAggregator (agregados incrementales)")
+    print("="*60)
+
+    agg = SessionAggregator()
+    coherences = [0.2, 0.8, 0.5, 0.6]
+    alphas = [0.3, 0.4, 0.5, 0.6]
+    for i, (c, a) in enumerate(zip(coherences, alphas)):
+        agg.add_metrics(_snapshot(i * 0.2, c, a))
+
+    agg.add_marker('protocol_start', 0.0)
+    agg.add_band_power(0.5, {'alpha': {'tp9': 4.0, 'af7': 1.0, 'af8': 2.0, 'tp10': 6.0}})
+    agg.add_marker('baseline_closed_start', 1.0)
+    agg.add_band_power(1.5, {'alpha': {'tp9': 8.0, 'af7': 2.0, 'af8': 2.0, 'tp10': 9.0}})
+    agg.add_band_power(2.0, {'alpha': {'tp9': 6.0, 'af7': 1.0, 'af8': 4.0, 'tp10': 7.0}})
+    agg.add_marker('baseline_closed_end', 2.5)
+    agg.add_marker('protocol_end', 3.0)
+
+    result = agg.finalize()
+    for key, value in result.items():
+        print(f"  {key:26s}: {value}")
+
+    assert math.isclose(result['avg_coherence'], sum(coherences) / 4)
+    assert math.isclose(result['avg_alpha'], sum(alphas) / 4)
+    assert result['peak_coherence'] == 0.8
+    assert math.isclose(result['alpha_tp9_avg'], 6.0)
+    assert math.isclose(result['faa_mean'], (math.log(2) + 0 + math.log(4)) / 3)
+    assert math.isclose(result['faa_baseline_closed'], math.log(4) / 2)
+    assert math.isclose(result['posterior_asymmetry_mean'], (2 + 1 + 1) / 3)
+    assert result['per_channel_version'] == 1
+
+    phases = agg.by_phase()
+    print(f"\nFases: {phases}")
+    assert list(phases) == ['baseline_closed'], "protocol no debe contar como fase"
+    assert math.isclose(phases['baseline_closed']['alpha']['tp10'], 8.0)
+
+    print("\n✓ Test SessionAggregator PASSED")
+    return True
+
+
+def test_embedded_storage():
+    """Test backend embebido (SQLite + archivos) sin servidores"""
+    print("\n" + "="*60)
+    print("TEST 2: EmbeddedBackend (round-trip)")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = EmbeddedBackend(root=tmp)
+        storage.connect()
+
+        rid = storage.create_recording(name="test", tags=["offline"])
+        base = datetime.utcnow()
+
+        # 2 flushes de 256 samples @ 256 Hz
+        for chunk in range(2):
+            samples = [
+                EEGSample(timestamp=(chunk * 256 + i) / 256, tp9=i, af7=-i, af8=0.5 * i, tp10=1.0)
+                for i in range(256)
+            ]
+            storage.write_samples(rid, samples, base_timestamp=base)
+
+        storage.write_metrics(rid, [_snapshot(0.2 * i, 0.5, 0.4) for i in range(10)], base_timestamp=base)
+        storage.write_event(rid, 0.1, "protocol", "baseline_closed_start", base_timestamp=base)
+        storage.write_event(rid, 1.9, "protocol", "baseline_closed_end", base_timestamp=base)
+        for i in range(4):
+            ts_ns = int((base.timestamp() + 0.5 * i) * 1e9)
+            storage.write_band_power(rid, ts_ns, {
+                'alpha': {'tp9': 4.0, 'af7': 1.0, 'af8': 2.0, 'tp10': 6.0},
+                'theta': {'tp9': 4.0, 'af7': 1.0, 'af8': 2.0, 'tp10': 2.0},
+            })
+
+        timestamps, data = storage.get_sample_array(rid)
+        print(f"  samples: {data.shape}, duración: {timestamps[-1] - timestamps[0]:.2f}s")
+        assert data.shape == (4, 512)
+        assert len(storage.get_samples(rid, start=1.0)) == 256
+
+        assert len(storage.get_metrics(rid)) == 10
+        assert [e['label'] for e in storage.get_events(rid)] == ['baseline_closed_start', 'baseline_closed_end']
+
+        per_channel = storage.get_per_channel_metrics(rid)
+        assert len(per_channel['timestamps']) == 4
+        assert math.isclose(per_channel['alpha']['tp10'][0], 0.75)
+
+        agg = storage.compute_aggregates(rid)
+        print(f"  aggregates: faa_mean={agg['faa_mean']:.3f}  faa_baseline_closed={agg['faa_baseline_closed']:.3f}")
+        assert math.isclose(agg['faa_mean'], math.log(2))
+        assert agg['faa_baseline_closed'] is not None
+        assert 'baseline_closed' in storage.get_per_channel_by_phase(rid)
+
+        recording = storage.end_recording(rid, duration_seconds=2.0, sample_count=512,
+                                          metrics_count=10, aggregated_metrics=agg)
+        assert recording.tags == ["offline"] and recording.per_channel_version == 1
+        assert [r.id for r in storage.list_recordings()] == [rid]
+
+        assert storage.delete_recording(rid)
+        assert storage.get_recording(rid) is None
+        assert storage.get_sample_array(rid)[1].shape == (4, 0)
+
+    print("\n✓ Test EmbeddedBackend PASSED")
+    return True
+
+
+def test_session_archive():
+    """Test formato binario: round-trip exacto, compresión y seek"""
+    print("\n" + "="*60)
+    print("TEST 3: SessionArchive (chunks comprimidos)")
+    print("="*60)
+
+    import numpy as np
+
+    fs = 256
+    n = fs * 35  # 3 chunks completos de 10 s + uno parcial
+    rng = np.random.default_rng(0)
+    t = np.arange(n) / fs
+    timestamps = 1.7e9 + t
+    data = np.array([
+        40 * np.sin(2 * np.pi * 10 * t + k) + rng.normal(0, 3, n) for k in range(4)
+    ], dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = SessionArchiveWriter(tmp, fs=fs, metadata={'recording_id': 1})
+        # Bloques irregulares como los flushes del recorder
+        for i0 in range(0, n, 300):
+            writer.append(timestamps[i0:i0 + 300], data[:, i0:i0 + 300])
+
+        # Grabación en curso: chunks completos visibles vía index.part
+        partial = SessionArchive(tmp)
+        assert partial.n_chunks == 3 and not partial.complete
+        writer.close()
+
+        archive = SessionArchive(tmp)
+        size = os.path.getsize(os.path.join(tmp, 'chunks.bin'))
+        ratio = (timestamps.nbytes + data.nbytes) / size
+        print(f"  {archive.n_samples} samples, {archive.n_chunks} chunks, {size} bytes ({ratio:.2f}x)")
+        assert archive.n_samples == n and archive.n_chunks == 4
+        assert archive.metadata['recording_id'] == 1
+        assert ratio > 1.2
+
+        ts_all, data_all = archive.read_all()
+        assert np.array_equal(ts_all, timestamps) and np.array_equal(data_all, data)
+
+        # Seek: ventana que cruza el borde entre chunks
+        ts_win, win = archive.read_time(9.5, 11.5)
+        assert win.shape == (4, 2 * fs)
+        assert np.array_equal(win, data[:, int(9.5 * fs):int(11.5 * fs)])
+        assert archive.sample_at(20.0) == 20 * fs
+
+    print("\n✓ Test SessionArchive PASSED")
+    return True
+
+
+def test_sample_block_buffer():
+    """Test buffer columnar del recorder + escritura por bloques"""
+    print("\n" + "="*60)
+    print("TEST 4: SampleBlockBuffer (columnar)")
+    print("="*60)
+
+    import numpy as np
+
+    buf = SampleBlockBuffer(capacity=16)
+    for k in range(10):  # ventanas de 26 samples, 4 canales (sin aux)
+        t = (k * 26 + np.arange(26)) / 256
+        buf.append(t, np.vstack([t, -t, 2 * t, np.ones(26)]))
+
+    timestamps, data = buf.view()
+    print(f"  {len(buf)} samples, data {data.shape}")
+    assert len(buf) == 260 and data.shape == (5, 260)
+    assert np.allclose(data[1], -timestamps) and not data[4].any()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = EmbeddedBackend(root=tmp)
+        rid = storage.create_recording(name="block")
+        storage.write_sample_block(rid, timestamps, data, base_timestamp=datetime.utcnow())
+        _, stored = storage.get_sample_array(rid)
+        assert np.allclose(stored, data[:4].astype(np.float32))
+
+    buf.clear()
+    assert len(buf) == 0
+
+    print("\n✓ Test SampleBlockBuffer PASSED")
+    return True
+
+
+def test_legacy_sqlite_ranges():
+    """Test SessionDatabase legacy: conexiones persistentes y lecturas por rango"""
+    print("\n" + "="*60)
+    print("TEST 5: SessionDatabase (SQLite legacy)")
+    print("="*60)
+
+    import threading
+    from pathlib import Path
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = SessionDatabase(Path(tmp) / 'sessions.db')
+        sid = db.create_session("legacy")
+        db.add_eeg_samples(sid, [(i / 256, i, -i, 0.5, 1.0, None) for i in range(1024)])
+
+        timestamps, data = db.get_eeg_array(sid, 1.0, 2.0)
+        print(f"  rango 1-2 s: {data.shape}")
+        assert data.shape == (4, 257) and timestamps[0] == 1.0 and data[0, 0] == 256
+        assert db.get_eeg_samples(sid).shape == (1024, 6)
+
+        # Otro thread → otra conexión, mismos datos (WAL)
+        counts = []
+        reader = threading.Thread(target=lambda: counts.append(len(db.get_eeg_array(sid)[0])))
+        reader.start()
+        reader.join()
+        assert counts == [1024]
+
+        plan = db._conn().execute(
+            'EXPLAIN QUERY PLAN SELECT timestamp, tp9, af7, af8, tp10, aux FROM eeg_samples '
+            'WHERE session_id = ? AND timestamp >= ? ORDER BY timestamp', (sid, 0)
+        ).fetchall()
+        assert 'COVERING INDEX' in str(plan)
+
+        # Métricas: misma ventana [start, end) desde la primera que iter_metrics
+        t0 = 1_700_000_000.0
+        for i in range(50):
+            db.add_metric(sid, t0 + 0.2 * i, {'coherence': i / 50, 'bands': {'alpha': 0.4}})
+        assert len(db.get_metrics(sid)) == 50
+        window = db.get_metrics(sid, start=2.0, end=4.0)
+        assert len(window) == 10 and window[0]['timestamp'] == t0 + 2.0
+        assert all(t0 + 2.0 <= m['timestamp'] < t0 + 4.0 for m in window)
+        assert len(db.get_metrics(sid, start=9.0)) == 5
+        assert db.get_metrics(sid + 1, start=1.0) == []
+        db.close()
+
+    print("\n✓ Test SessionDatabase PASSED")
+    return True
+
+
+def test_session_catalog():
+    """Test catálogo: paginación keyset, filtros y columnas de resumen"""
+    print("\n" + "="*60)
+    print("TEST 6: Session catalog (keyset + summary)")
+    print("="*60)
+
+    from database.storage import encode_catalog_cursor, decode_catalog_cursor
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = EmbeddedBackend(root=tmp)
+        storage.connect()
+        ids = [
+            storage.create_recording(
+                name=f"rec {i}",
+                tags=["protocol"] if i % 2 else ["free"],
+                recording_type="protocol" if i % 3 == 0 else "session"
+            )
+            for i in range(7)
+        ]
+
+        # Páginas de 3 siguiendo el cursor: sin huecos ni duplicados
+        seen, after = [], None
+        while True:
+            page = storage.list_recordings_catalog(limit=3, after=after)
+            seen.extend(r.id for r in page)
+            if len(page) < 3:
+                break
+            cursor = encode_catalog_cursor(page[-1])
+            after = decode_catalog_cursor(cursor)
+        print(f"  keyset: {seen}")
+        assert seen == sorted(ids, reverse=True)
+
+        tagged = storage.list_recordings_catalog(tag="protocol")
+        typed = storage.list_recordings_catalog(recording_type="protocol")
+        assert [r.id for r in tagged] == [rid for i, rid in enumerate(ids) if i % 2][::-1]
+        assert {r.id for r in typed} == {ids[0], ids[3], ids[6]}
+
+        try:
+            decode_catalog_cursor("not-a-cursor")
+            assert False, "cursor inválido aceptado"
+        except ValueError:
+            pass
+
+        assert storage.update_summary(ids[0], {
+            'quality_grade': 'B',
+            'validation_status': 'good',
+            'alpha_by_phase': {'baseline_closed': {'tp9': 2.0, 'mean': 2.0}},
+            'summary_version': 1,
+        })
+        recording = storage.get_recording(ids[0])
+        assert recording.quality_grade == 'B'
+        assert recording.alpha_by_phase['baseline_closed']['mean'] == 2.0
+        assert recording.to_dict()['summary_version'] == 1
+
+    print("\n✓ Test Session catalog PASSED")
+    return True
+
+
+def test_finalize_closed_recording():
+    """Test post-stop en background: summary del catálogo desde el read cache"""
+    print("\n" + "="*60)
+    print("TEST 7: Summary al cerrar (background)")
+    print("="*60)
+
+    from database import recording_cache
+    from database.recording_cache import RecordingCache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = EmbeddedBackend(root=tmp)
+        rid = storage.create_recording(name="closing")
+        storage.write_metrics(rid, [_snapshot(0.2 * i, 0.5 + 0.01 * (i % 7), 0.4) for i in range(300)],
+                              base_timestamp=datetime.utcnow())
+        storage.write_event(rid, timestamp=1.0, event_type="marker", label="baseline_closed")
+        storage.end_recording(rid, duration_seconds=60.0, metrics_count=300)
+
+        previous = recording_cache._recording_cache
+        recording_cache._recording_cache = cache = RecordingCache(max_bytes=1 << 22)
+        try:
+            phases = {'baseline_closed': {'alpha': {'tp9': 3.0, 'af7': 1.0}}}
+            _finalize_closed_recording(storage, rid, phases)
+        finally:
+            recording_cache._recording_cache = previous
+
+        recording = storage.get_recording(rid)
+        print(f"  grade={recording.quality_grade} validation={recording.validation_status} cache={cache.stats()}")
+        assert recording.summary_version == 1 and recording.quality_grade is not None
+        assert recording.alpha_by_phase['baseline_closed']['mean'] == 2.0
+        # Una sola lectura completa: el summary usa las vistas precargadas
+        assert cache.misses == 3 and cache.hits == 2
+
+    print("\n✓ Test Summary al cerrar PASSED")
+    return True
+
+
+def test_recording_cache():
+    """Test read cache: sólo grabaciones cerradas, copias, ETag, disco, invalidación"""
+    print("\n" + "="*60)
+    print("TEST 8: RecordingCache (grabaciones inmutables)")
+    print("="*60)
+
+    from pathlib import Path
+    from database.recording_cache import RecordingCache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = EmbeddedBackend(root=Path(tmp) / 'store')
+        rid = storage.create_recording(name="cached")
+        storage.write_metrics(rid, [_snapshot(0.2 * i, 0.5, 0.4) for i in range(10)], base_timestamp=datetime.utcnow())
+
+        cache = RecordingCache(max_bytes=1 << 20, disk_dir=Path(tmp) / 'cache')
+
+        # Abierta → se lee siempre del storage, sin ETag
+        metrics, etag = cache.read(storage, rid, 'metrics')
+        assert len(metrics) == 10 and etag is None
+
+        storage.end_recording(rid, duration_seconds=2.0, metrics_count=10)
+        metrics, etag = cache.read(storage, rid, 'metrics')
+        assert etag is not None and cache.misses == 1
+
+        # Hit: mismo ETag, copia independiente (SessionPlayer muta las métricas)
+        metrics[0]['coherence'] = -1
+        again, etag2 = cache.read(storage, rid, 'metrics')
+        assert etag2 == etag and cache.hits == 1 and again[0]['coherence'] != -1
+
+        # Tier en disco: otra instancia (reinicio) encuentra la entrada
+        restarted = RecordingCache(max_bytes=1 << 20, disk_dir=Path(tmp) / 'cache')
+        assert restarted.etag(rid, 'metrics') == etag
+
+        # Presupuesto en bytes: el LRU expulsa lo más viejo
+        small = RecordingCache(max_bytes=4096)
+        for view in range(8):
+            small.put(rid, f'blob{view}', b'x' * 900)
+        print(f"  stats: {small.stats()}")
+        assert small.stats()['bytes'] <= 4096 and small.get(rid, 'blob0') is None
+
+        cache.invalidate(rid)
+        assert cache.etag(rid, 'metrics') is None
+        assert not (Path(tmp) / 'cache' / str(rid)).exists()
+
+    print("\n✓ Test RecordingCache PASSED")
+    return True
+
+
+def test_streaming_reads():
+    """Test lecturas en streaming: ventanas, bloques acotados, NDJSON y binario"""
+    print("\n" + "="*60)
+    print("TEST 9: Streaming (NDJSON / binario)")
+    print("="*60)
+
+    import io
+    import json
+    import numpy as np
+    from database import streaming
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = EmbeddedBackend(root=tmp)
+        rid = storage.create_recording(name="stream")
+        n = 256 * 30
+        timestamps = np.arange(n) / 256
+        data = np.vstack([np.arange(n) * (k + 1) for k in range(4)]).astype(np.float32)
+        storage.write_sample_block(rid, timestamps, data, base_timestamp=datetime.utcnow())
+        storage.write_metrics(rid, [_snapshot(0.2 * i, 0.5, 0.4) for i in range(50)], base_timestamp=datetime.utcnow())
+        storage.end_recording(rid, duration_seconds=30)
+
+        blocks = list(storage.iter_sample_blocks(rid, start=5, end=25, block_samples=1000))
+        sizes = [len(ts) for ts, _ in blocks]
+        print(f"  bloques 5-25 s: {sizes}")
+        assert max(sizes) <= 1000 and sum(sizes) == 20 * 256
+        assert blocks[0][1][0, 0] == 5 * 256
+
+        lines = list(streaming.ndjson_sample_blocks(blocks))
+        assert len(lines) == len(blocks)
+        assert json.loads(lines[0])['af7'][0] == 2 * 5 * 256
+
+        decoded = list(streaming.read_binary_blocks(io.BytesIO(b''.join(streaming.binary_sample_blocks(blocks)))))
+        assert np.array_equal(np.concatenate([d for _, d in decoded], axis=1),
+                              np.concatenate([d for _, d in blocks], axis=1))
+
+        window = list(storage.iter_metrics(rid, start=2, end=4))
+        assert len(window) == 10
+
+    print("\n✓ Test Streaming PASSED")
+    return True
+
+
+
+class _RecordingWriteAPI:
+    """write_api de Influx que guarda las líneas en vez de enviarlas."""
+
+    def __init__(self):
+        self.lines = []
+
+    def write(self, bucket, org, record, write_precision=None):
+        self.lines.extend(record)
+
+
+def test_influx_line_protocol_non_finite():
+    """Test write_sample_block: nan/inf no llegan al line protocol"""
+    print("\n" + "="*60)
+    print("TEST 10: Influx line protocol (nan / inf)")
+    print("="*60)
+
+    import numpy as np
+
+    client = InfluxDBEEGClient()
+    client._connected = True
+    client.write_api = api = _RecordingWriteAPI()
+
+    t = np.arange(5) / 256
+    data = np.array([
+        [1.0, np.nan, 3.0, np.nan, 5.0],        # tp9
+        [1.5, 2.5, np.inf, np.nan, 5.5],        # af7
+        [0.5, 0.5, 0.5, -np.inf, 0.5],          # af8
+        [2.0, 2.0, 2.0, np.nan, 2.0],           # tp10
+        [0.0, 7.0, np.nan, 0.0, np.inf],        # aux
+    ])
+    client.write_sample_block(3, t, data, base_timestamp=datetime(2026, 1, 1))
+    for line in api.lines:
+        print(f"  {line}")
+
+    # La fila 3 no tiene ningún campo finito → se omite
+    assert len(api.lines) == 4
+    assert not any(bad in line for line in api.lines for bad in ('nan', 'inf'))
+    fields = [line.split(' ')[1] for line in api.lines]
+    assert fields[0] == 'tp9=1.0,af7=1.5,af8=0.5,tp10=2.0'
+    assert fields[1] == 'af7=2.5,af8=0.5,tp10=2.0,aux=7.0'
+    assert fields[2] == 'tp9=3.0,af8=0.5,tp10=2.0'
+    assert fields[3] == 'tp9=5.0,af7=5.5,af8=0.5,tp10=2.0'
+    assert all(line.startswith('eeg_sample,recording_id=3 ') for line in api.lines)
+
+    # Bloque todo finito: mismo camino rápido de siempre
+    api.lines.clear()
+    client.write_sample_block(3, t, np.ones((4, 5)), base_timestamp=datetime(2026, 1, 1))
+    assert len(api.lines) == 5 and api.lines[0].split(' ')[1] == 'tp9=1.0,af7=1.0,af8=1.0,tp10=1.0'
+
+    # Sin ningún valor finito no se llama a Influx
+    api.lines.clear()
+    client.write_sample_block(3, t, np.full((4, 5), np.nan), base_timestamp=datetime(2026, 1, 1))
+    assert api.lines == []
+
+    print("\n✓ Test Influx line protocol PASSED")
+    return True
+
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("DATABASE - Test Suite")
+    print("="*60)
+
+    try:
+        test_session_aggregator()
+        test_embedded_storage()
+        test_session_archive()
+        test_sample_block_buffer()
+        test_legacy_sqlite_ranges()
+        test_session_catalog()
+        test_finalize_closed_recording()
+        test_recording_cache()
+        test_streaming_reads()
+        test_influx_line_protocol_non_finite()
+
+        print("\n" + "="*60)
+        print("✓ TODOS LOS TESTS PASARON")
+        print("="*60)
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n✗ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
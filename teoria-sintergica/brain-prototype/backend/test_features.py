@@ -0,0 +1,194 @@
+"""
+Script de prueba para el feature store y el índice de momentos similares.
+Valida las features por ventana de una grabación y la búsqueda k-NN.
+"""
+
+import sys
+import os
+import json
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# Agregar path del backend
+sys.path.insert(0, os.path.dirname(__file__))
+
+from ai import feature_store
+from ai.feature_store import (
+    build_session_features, open_session_features, load_feature_matrix, delete_session_features,
+    FEATURE_DIM, FEATURE_STORE_VERSION, NO_PHASE,
+)
+from ai.muse_features import MuseFeatureExtractor
+from ai.similarity_index import SimilarityIndex
+from database.reprocess import window_ends
+from database.storage import EmbeddedBackend
+
+
+def _write_session_features(root: Path, recording_id: int, features: np.ndarray, step: float = 0.2):
+    """Feature store de una sesión con vectores conocidos (mismo layout que build_session_features)."""
+    path = root / str(recording_id)
+    path.mkdir(parents=True)
+    times = 2.0 + step * np.arange(len(features))
+    np.save(path / 'features.npy', features.astype(np.float32))
+    np.save(path / 'times.npy', times)
+    np.save(path / 'phases.npy', np.full(len(features), NO_PHASE, dtype=np.int16))
+    with open(path / 'meta.json', 'w') as f:
+        json.dump({'version': FEATURE_STORE_VERSION, 'recording_id': recording_id,
+                   'n_windows': len(features), 'phases': []}, f)
+    return times
+
+
+def test_feature_store():
+    """Test feature store: grilla 2 s / 200 ms, fases de los eventos, lectura mmap"""
+    print("\n" + "="*60)
+    print("TEST 1: Feature store (build + lectura)")
+    print("="*60)
+
+    fs, seconds = 256, 40
+    t = np.arange(fs * seconds) / fs
+    rng = np.random.default_rng(1)
+    # Alpha fuerte sólo entre 10 y 25 s (fase baseline_closed)
+    alpha = np.where((t >= 10) & (t < 25), 40.0, 4.0) * np.sin(2 * np.pi * 10 * t)
+    data = (alpha[None, :] + rng.standard_normal((4, t.size)) * 5.0).astype(np.float32)
+
+    previous = feature_store.FEATURE_STORE_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        feature_store.FEATURE_STORE_DIR = Path(tmp) / 'features'
+        try:
+            storage = EmbeddedBackend(root=Path(tmp) / 'store')
+            base = datetime.utcnow()
+            rid = storage.create_recording(name="features")
+            storage.write_sample_block(rid, t, data, base_timestamp=base)
+            for label, ts in [('protocol_start', 0.0), ('baseline_closed_start', 10.0),
+                              ('baseline_closed_end', 25.0), ('task_start', 30.0)]:
+                storage.write_event(rid, timestamp=ts, event_type='marker', label=label, base_timestamp=base)
+            storage.end_recording(rid, duration_seconds=seconds)
+
+            result = build_session_features(storage, rid)
+            print(f"  build: {result}")
+            ends = window_ends(t.size, fs)  # paso de 51 muestras a 256 Hz
+            assert result['windows'] == len(ends)
+            assert result['phases'] == ['baseline_closed']  # protocol no es fase, task sin _end
+            assert build_session_features(storage, rid)['skipped']
+
+            features = open_session_features(rid)
+            assert len(features) == result['windows'] and features.features.shape[1] == FEATURE_DIM
+            assert np.allclose(features.times, t[ends - 1], atol=1e-6)
+
+            # Cada fila = MuseFeatureExtractor.extract de su ventana
+            for i in (0, 57, len(features) - 1):
+                end = ends[i]
+                expected = MuseFeatureExtractor.extract(data[:, end - 2 * fs:end].astype(np.float64), fs)
+                assert np.allclose(features.features[i], expected, rtol=1e-4, atol=1e-5)
+
+            closed = features.phase('baseline_closed')
+            in_phase = (features.times >= 10) & (features.times <= 25)
+            assert len(closed) == in_phase.sum() and len(features.phase('task')) == 0
+            times, rows = features.window(10, 12)
+            assert len(times) == 10 and rows.shape == (10, FEATURE_DIM)
+            means = features.phase_means()
+            assert set(means) == {'session', 'baseline_closed'}
+
+            X, owners = load_feature_matrix(phase='baseline_closed')
+            assert X.shape == (len(closed), FEATURE_DIM) and set(owners) == {rid}
+
+            # Otra versión del store → se ignora hasta reconstruir
+            meta_path = feature_store.session_path(rid) / 'meta.json'
+            meta = json.loads(meta_path.read_text())
+            meta_path.write_text(json.dumps({**meta, 'version': FEATURE_STORE_VERSION + 1}))
+            assert open_session_features(rid) is None
+            assert not build_session_features(storage, rid).get('skipped')
+            assert delete_session_features(rid) and open_session_features(rid) is None
+        finally:
+            feature_store.FEATURE_STORE_DIR = previous
+
+    print("\n✓ Test feature store PASSED")
+    return True
+
+
+def test_similarity_search():
+    """Test índice de similitud: top-k exacto, exclusiones, separación mínima, persistencia"""
+    print("\n" + "="*60)
+    print("TEST 2: Similarity index (top-k)")
+    print("="*60)
+
+    rng = np.random.default_rng(7)
+    previous = feature_store.FEATURE_STORE_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        feature_store.FEATURE_STORE_DIR = Path(tmp) / 'features'
+        try:
+            sessions = {rid: rng.standard_normal((300, FEATURE_DIM)) * (1 + rid) for rid in (1, 2, 3)}
+            times = {rid: _write_session_features(feature_store.FEATURE_STORE_DIR, rid, x)
+                     for rid, x in sessions.items()}
+
+            index = SimilarityIndex(Path(tmp) / 'index')
+            stats = index.rebuild([1, 2])
+            assert stats['n_windows'] == 600 and index.session_ids == [1, 2]
+            assert index.add_session(3) == 300 and index.stats()['segments'] == 2
+
+            # Top-k == fuerza bruta sobre los vectores estandarizados (sin separación mínima)
+            query = sessions[2][123]
+            X = np.concatenate([sessions[r] for r in (1, 2, 3)]).astype(np.float32)
+            owners = np.repeat([1, 2, 3], 300)
+            brute = np.linalg.norm(index.standardize(X) - index.standardize(query), axis=1)
+            order = np.argsort(brute, kind='stable')[:10]
+            results = index.search(query, k=10, min_gap_seconds=0)
+            print(f"  top-3: {results[:3]}")
+            assert [r['session_id'] for r in results] == owners[order].tolist()
+            assert np.allclose([r['distance'] for r in results], brute[order], atol=1e-3)
+            assert results[0] == {'session_id': 2, 'timestamp': round(float(times[2][123]), 3), 'distance': 0.0}
+
+            # Excluir la vecindad de la consulta y exigir separación entre resultados
+            t_query = float(times[2][123])
+            results = index.search(query, k=20, exclude_session=2, exclude_around=t_query,
+                                   exclude_seconds=10, min_gap_seconds=5)
+            assert len(results) == 20
+            assert all(abs(r['timestamp'] - t_query) >= 10 for r in results if r['session_id'] == 2)
+            for rid in (1, 2, 3):
+                picked = sorted(r['timestamp'] for r in results if r['session_id'] == rid)
+                assert all(b - a >= 5 - 1e-3 for a, b in zip(picked, picked[1:]))
+            assert 2 not in {r['session_id'] for r in index.search(query, k=5, exclude_session=2, same_session=False)}
+
+            # Consulta por timestamp / media de sesión desde el feature store
+            vector, at = index.query_vector(2, timestamp=t_query + 0.05)
+            assert at == t_query and np.allclose(vector, sessions[2][123])
+            assert np.allclose(index.query_vector(1)[0], sessions[1].mean(axis=0), atol=1e-4)
+
+            # De disco: mismo resultado; tras quitar una sesión no aparece
+            reloaded = SimilarityIndex(Path(tmp) / 'index')
+            assert reloaded.load() and reloaded.n_windows == 900
+            assert reloaded.search(query, k=10) == index.search(query, k=10)
+            assert reloaded.remove_session(2) and reloaded.session_ids == [1, 3]
+            assert 2 not in {r['session_id'] for r in reloaded.search(query, k=50)}
+            again = SimilarityIndex(Path(tmp) / 'index')
+            assert again.load() and again.n_windows == 600
+        finally:
+            feature_store.FEATURE_STORE_DIR = previous
+
+    print("\n✓ Test similarity index PASSED")
+    return True
+
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("FEATURES - Test Suite")
+    print("="*60)
+
+    try:
+        test_feature_store()
+        test_similarity_search()
+
+        print("\n" + "="*60)
+        print("✓ TODOS LOS TESTS PASARON")
+        print("="*60)
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n✗ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
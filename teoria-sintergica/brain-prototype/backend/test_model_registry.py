@@ -0,0 +1,76 @@
+"""
+Script de prueba para ai/model_registry.py.
+Valida que sólo se registran pesos dentro del registro o de ai/.
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+# Agregar path del backend
+sys.path.insert(0, os.path.dirname(__file__))
+
+from ai import model_registry
+from ai.model_registry import ModelRegistry, WeightsPathNotAllowed, AI_WEIGHTS_DIR
+
+
+def test_register_rejects_outside_paths():
+    """Test rutas: fuera del registro / ai/ → WeightsPathNotAllowed antes de tocar torch"""
+    print("\n" + "="*60)
+    print("TEST 1: Rutas de pesos permitidas")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = ModelRegistry(root=Path(tmp) / 'registry')
+        outside = Path(tmp) / 'evil.pth'
+        outside.write_bytes(b'not a state_dict')
+        escape = registry.root / '..' / 'evil.pth'
+        link = AI_WEIGHTS_DIR / f'.test-link-{os.getpid()}.pth'
+        link.symlink_to(outside)
+        try:
+            for path in (outside, escape, link, '/etc/passwd', 'evil.pth'):
+                try:
+                    registry.register(path)
+                    assert False, f"ruta fuera del registro aceptada: {path}"
+                except WeightsPathNotAllowed as e:
+                    print(f"  rechazada: {e}")
+                    assert isinstance(e, ValueError)
+        finally:
+            link.unlink()
+        assert registry.versions() == []
+
+        # Dentro del registro o de ai/: ruta resuelta (el fichero puede no existir aún)
+        inside = registry.root / 'v1' / model_registry.WEIGHTS_FILE
+        assert registry.allowed_weights_path(inside) == inside.resolve()
+        assert registry.allowed_weights_path(AI_WEIGHTS_DIR / 'syntergic_vae.pth').parent == AI_WEIGHTS_DIR.resolve()
+        try:
+            registry.register(AI_WEIGHTS_DIR / 'missing-weights.pth')
+            assert False, "pesos inexistentes aceptados"
+        except LookupError:
+            pass
+
+    print("\n✓ Test rutas permitidas PASSED")
+    return True
+
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("MODEL REGISTRY - Test Suite")
+    print("="*60)
+
+    try:
+        test_register_rejects_outside_paths()
+
+        print("\n" + "="*60)
+        print("✓ TODOS LOS TESTS PASARON")
+        print("="*60)
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n✗ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
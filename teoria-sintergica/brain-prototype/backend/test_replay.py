@@ -0,0 +1,388 @@
+"""
+Script de prueba para la reproducción de sesiones (ai/).
+Valida los índices temporales, el replay cache del VAE, la lectura lazy
+de EDF/BDF y la carga de grabaciones en el SessionPlayer.
+"""
+
+import sys
+import os
+import tempfile
+import importlib.util
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+# Agregar path del backend
+sys.path.insert(0, os.path.dirname(__file__))
+
+from ai import replay_cache
+from ai.session_timeline import MetricTimeline, MarkerTimeline
+from ai.edf_reader import LazyEDFReader
+from ai.replay_cache import ReplayArray, build_replay_array, get_replay_array, VAE_FS, VAE_SAMPLES
+from database import storage as storage_module
+from database import recording_cache
+from database.recording_cache import RecordingCache
+from database.storage import EmbeddedBackend
+
+
+HAS_MNE = importlib.util.find_spec('mne') is not None
+
+
+class _NoArchiveBackend(EmbeddedBackend):
+    """Como Influx + PostgreSQL: samples por query, sin session archive."""
+
+    def get_archive(self, recording_id):
+        return None
+
+    def get_sample_array(self, recording_id, limit=None):
+        archive = EmbeddedBackend.get_archive(self, recording_id)
+        return archive.read(0, min(limit, archive.n_samples) if limit else archive.n_samples)
+
+
+def _empty_player():
+    """SessionPlayer sin la sesión de meditación/PhysioNet por defecto."""
+    from ai.session_player import SessionPlayer
+
+    class _Player(SessionPlayer):
+        def load_meditation_session(self):
+            return True
+
+    return _Player()
+
+
+@pytest.mark.skipif(not HAS_MNE, reason="mne no instalado")
+def test_recorded_session_without_archive():
+    """Test SessionPlayer: grabación del storage sin archive → MNE Raw"""
+    print("\n" + "="*60)
+    print("TEST 1: Grabación sin archive (samples del storage)")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = _NoArchiveBackend(root=tmp)
+        rid = storage.create_recording(name="no archive")
+        n = 256 * 20
+        t = np.arange(n) / 256
+        data = np.vstack([np.sin(2 * np.pi * 10 * t) * (k + 1) for k in range(4)]).astype(np.float32)
+        storage.write_sample_block(rid, t, data, base_timestamp=datetime.utcnow())
+        storage.end_recording(rid, duration_seconds=20.0)
+        assert storage.get_archive(rid) is None
+
+        previous = storage_module._storage_backend, recording_cache._recording_cache
+        storage_module._storage_backend = storage
+        recording_cache._recording_cache = RecordingCache(max_bytes=1 << 22)
+        try:
+            player = _empty_player()
+            assert player.load_recorded_session_v2(rid)
+        finally:
+            storage_module._storage_backend, recording_cache._recording_cache = previous
+
+        print(f"  fs={player.fs} duration={player.total_duration:.1f}s")
+        assert player.raw is not None and player._archive is None
+        assert player.fs == 256 and abs(player.total_duration - 20.0) < 0.1
+        window = player.get_window_at(5.0)
+        assert window.shape == (4, 512)
+
+    print("\n✓ Test grabación sin archive PASSED")
+    return True
+
+
+def test_session_timeline():
+    """Test timelines: métrica más cercana por searchsorted, huecos y rangos"""
+    print("\n" + "="*60)
+    print("TEST 2: Session timeline (searchsorted)")
+    print("="*60)
+
+    t0 = 1_700_000_000.0
+    # Desordenadas, 5 Hz, con un hueco de 3 s entre 10 y 13 s
+    times = [i * 0.2 for i in range(51)] + [13.0 + i * 0.2 for i in range(10)]
+    metrics = [
+        {'timestamp': t0 + t, 'coherence': round(t, 1), 'state': 'relax' if t < 5 else 'focus',
+         'blink_contaminated': False, 'alpha': None if i == 3 else 0.5}
+        for i, t in enumerate(times)
+    ][::-1]
+    timeline = MetricTimeline(metrics)
+    print(f"  {len(timeline)} métricas, duración {timeline.duration:.1f}s")
+    assert len(timeline) == 61 and timeline.t0 == t0 and abs(timeline.duration - 14.8) < 1e-6
+
+    row = timeline.at(4.33)
+    assert row['coherence'] == 4.4 and row['state'] == 'relax' and row['index'] == 22
+    assert abs(row['relative_time'] - 4.4) < 1e-6 and row['blink_contaminated'] is False
+    assert timeline.at(0.6)['alpha'] is None          # NaN de la columna → None
+    assert timeline.at(-0.5)['coherence'] == 0.0      # antes del inicio: la primera
+    assert timeline.at(11.4) is None                  # a > 1 s de cualquier métrica
+    assert timeline.at(11.4, max_gap=2.0)['coherence'] == 10.0
+    assert timeline.at(20.0) is None
+
+    window = timeline.window(2.0, 3.0)
+    assert timeline.times[window].tolist() == pytest.approx([2.0, 2.2, 2.4, 2.6, 2.8])
+    assert list(timeline.columns['coherence'][timeline.window(10.0, 13.5)]) == [10.0, 13.0, 13.2, 13.4]
+
+    events = [
+        {'timestamp': t0 + 30.0, 'label': 'task', 'event_type': 'marker'},
+        {'timestamp': t0 + 0.0, 'label': 'baseline_open', 'event_type': 'marker'},
+        {'timestamp': t0 + 10.0, 'label': 'baseline_closed'},
+    ]
+    markers = MarkerTimeline(events, t0=t0)
+    assert [m['label'] for m in markers.between(0, 30)] == ['baseline_open', 'baseline_closed']
+    assert [m['label'] for m in markers.between(10, 31)] == ['baseline_closed', 'task']
+    assert markers.between(11, 29) == []
+    assert markers.last_before(9.99)['label'] == 'baseline_open'
+    assert markers.last_before(10.0) == {'time': 10.0, 'label': 'baseline_closed', 'type': 'event'}
+    assert markers.last_before(-1) is None
+    assert MarkerTimeline([], t0=t0).last_before(5) is None
+
+    print("\n✓ Test session timeline PASSED")
+    return True
+
+
+class _FailingSession:
+    """Datos de sesión que fallan al leer un canal (disco / decodificación)."""
+
+    shape = (4, 1024)
+
+    def __getitem__(self, ch):
+        if ch == 2:
+            raise OSError("read error on channel 2")
+        return np.ones(1024)
+
+
+def test_replay_array():
+    """Test replay array: resample a 160 Hz, reapertura del .npy y limpieza ante errores"""
+    print("\n" + "="*60)
+    print("TEST 3: Replay array (64 ch @ 160 Hz, memmap)")
+    print("="*60)
+
+    from pathlib import Path
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 10 Hz @ 256 Hz → 160 Hz: misma frecuencia, canales 4..63 en cero
+        fs = 256
+        t = np.arange(fs * 10) / fs
+        data = np.vstack([np.sin(2 * np.pi * 10 * t) * (k + 1) for k in range(4)])
+        path = Path(tmp) / 'session.v1.npy'
+        array = build_replay_array(data, fs, path)
+        print(f"  shape={array.shape} dtype={array.dtype}")
+        assert array.shape == (64, 10 * VAE_FS) and array.dtype == np.float32
+        expected = np.sin(2 * np.pi * 10 * np.arange(array.shape[1]) / VAE_FS)
+        assert np.abs(array[0, 160:-160] - expected[160:-160]).max() < 0.05
+        assert np.allclose(array[3, 160:-160], 4 * expected[160:-160], atol=0.2)
+        assert not array[4:].any()
+
+        window = ReplayArray(array, path).window(9.5)
+        assert window.shape == (64, VAE_SAMPLES) and not window[:, 80:].any()  # padding al final
+
+        # get_replay_array: construye una vez; después abre el .npy sin llamar al loader
+        previous = replay_cache.REPLAY_CACHE_DIR
+        replay_cache.REPLAY_CACHE_DIR = Path(tmp) / 'cache'
+        calls = []
+        try:
+            loader = lambda: calls.append(1) or (data, fs)
+            first = get_replay_array('recording-test-1', loader)
+            again = get_replay_array('recording-test-1', loader)
+        finally:
+            replay_cache.REPLAY_CACHE_DIR = previous
+        assert calls == [1] and np.array_equal(first.array, again.array)
+        assert abs(again.duration - 10.0) < 1e-9
+
+        # Error a mitad de la construcción: se propaga el error original y no queda .tmp
+        broken = Path(tmp) / 'broken.v1.npy'
+        try:
+            build_replay_array(_FailingSession(), fs, broken)
+            assert False, "error de lectura ignorado"
+        except OSError as e:
+            assert "channel 2" in str(e)
+        # Error al mover el .tmp a su sitio (destino ocupado por un directorio)
+        blocked = Path(tmp) / 'blocked.v1.npy'
+        blocked.mkdir()
+        (blocked / 'keep').touch()
+        try:
+            build_replay_array(data, fs, blocked)
+            assert False, "os.replace sobre un directorio no falló"
+        except OSError:
+            pass
+        leftovers = sorted(p.name for p in Path(tmp).iterdir() if p.name.endswith('.tmp'))
+        print(f"  tras los errores: {leftovers}")
+        assert leftovers == []
+
+    print("\n✓ Test replay array PASSED")
+    return True
+
+
+def _write_edf(path, signals, n_records, bdf=False):
+    """
+    EDF (int16) / BDF (int24) mínimo, records de 1 s.
+
+    signals: [(label, spr, digital (n_records * spr,))], físico ±500 uV
+    """
+    dig_max = (1 << 23) - 1 if bdf else 32767
+    ns = len(signals)
+
+    def fields(values, size):
+        return b''.join(str(v).ljust(size)[:size].encode('latin-1') for v in values)
+
+    head = (
+        (b'\xffBIOSEMI' if bdf else b'0'.ljust(8))
+        + b''.ljust(80) + b''.ljust(80) + b'01.01.24' + b'00.00.00'
+        + str(256 * (ns + 1)).ljust(8).encode() + (b'24BIT' if bdf else b'').ljust(44)
+        + str(n_records).ljust(8).encode() + b'1'.ljust(8) + str(ns).ljust(4).encode()
+    )
+    head += (
+        fields([label for label, _, _ in signals], 16) + fields([''] * ns, 80)
+        + fields(['uV'] * ns, 8) + fields([-500] * ns, 8) + fields([500] * ns, 8)
+        + fields([-dig_max - 1] * ns, 8) + fields([dig_max] * ns, 8) + fields([''] * ns, 80)
+        + fields([spr for _, spr, _ in signals], 8) + fields([''] * ns, 32)
+    )
+    records = []
+    for r in range(n_records):
+        for _, spr, digital in signals:
+            chunk = np.asarray(digital[r * spr:(r + 1) * spr], dtype=np.int32)
+            if bdf:
+                records.append((chunk.astype('<i4').view(np.uint8).reshape(-1, 4)[:, :3]).tobytes())
+            else:
+                records.append(chunk.astype('<i2').tobytes())
+    with open(path, 'wb') as f:
+        f.write(head + b''.join(records))
+    gain = 1000.0 / (2 * dig_max + 1)
+    # digital → Volts, como MNE
+    return lambda digital: ((np.asarray(digital, dtype=np.float64) - (-dig_max - 1)) * gain - 500) * 1e-6
+
+
+def test_lazy_edf_reader():
+    """Test LazyEDFReader: ventanas entre bloques, LRU acotado, BDF 24 bits y MNE"""
+    print("\n" + "="*60)
+    print("TEST 4: Lazy EDF/BDF reader")
+    print("="*60)
+
+    from pathlib import Path
+
+    fs, n_records = 256, 10
+    rng = np.random.default_rng(0)
+    t = np.arange(fs * n_records) / fs
+    with tempfile.TemporaryDirectory() as tmp:
+        for bdf in (False, True):
+            full_scale = (1 << 23) if bdf else (1 << 15)
+            eeg = [np.round(np.sin(2 * np.pi * (5 + k) * t) * full_scale * 0.8 + rng.integers(-50, 50, t.size))
+                   for k in range(3)]
+            resp = np.round(np.linspace(-1, 1, 32 * n_records) * full_scale * 0.5)
+            signals = [('Fp1', fs, eeg[0]), ('Resp', 32, resp), ('Fp2', fs, eeg[1]), ('Oz', fs, eeg[2])]
+            path = Path(tmp) / ('session.bdf' if bdf else 'session.edf')
+            to_volts = _write_edf(path, signals, n_records, bdf=bdf)
+            expected = np.vstack([to_volts(x) for x in eeg])
+
+            reader = LazyEDFReader(path, cache_blocks=2, block_records=3)
+            print(f"  {path.name}: {reader.ch_names} @ {reader.fs:.0f} Hz, {reader.n_chunks} bloques")
+            assert reader.is_bdf == bdf and reader.ch_names == ['Fp1', 'Fp2', 'Oz']
+            assert reader.fs == fs and reader.n_samples == fs * n_records and reader.n_chunks == 4
+
+            # Adelante cruzando bloques (3 records = 768 muestras), atrás y bordes
+            for start, stop in [(700, 1600), (0, 10), (2200, 2600), (1500, 1900), (-5, 3), (2550, 9999)]:
+                ts, data = reader.read(start, stop)
+                a, b = max(start, 0), min(stop, reader.n_samples)
+                assert data.dtype == np.float32 and data.shape == (3, b - a)
+                assert np.allclose(data, expected[:, a:b], rtol=1e-6, atol=1e-9)
+                assert np.allclose(ts, np.arange(a, b) / fs)
+            assert reader.read(500, 500)[1].shape == (3, 0)
+            assert len(reader._cache) <= 2
+
+            if HAS_MNE:
+                import mne
+                raw = mne.io.read_raw_edf(path, preload=True, verbose=False) if not bdf else \
+                    mne.io.read_raw_bdf(path, preload=True, verbose=False)
+                reference = raw.get_data(picks=reader.ch_names)
+                _, data = reader.read(0, reader.n_samples)
+                assert np.allclose(data, reference, rtol=1e-5, atol=1e-9)
+                print(f"  {path.name}: ventanas == mne.io.read_raw_{path.suffix[1:]}")
+
+    print("\n✓ Test lazy EDF reader PASSED")
+    return True
+
+
+@pytest.mark.skipif(not HAS_MNE, reason="mne no instalado")
+def test_lazy_edf_matches_mne():
+    """Test SessionPlayer: EDF lazy == read_raw_edf + standardize + pick + filter de MNE"""
+    print("\n" + "="*60)
+    print("TEST 5: EDF lazy vs MNE (misma ventana)")
+    print("="*60)
+
+    from pathlib import Path
+    from mne.datasets import eegbci
+    from ai import session_player
+    from ai.session_player import SessionPlayer
+
+    fs, n_records = 160, 30
+    rng = np.random.default_rng(3)
+    t = np.arange(fs * n_records) / fs
+    labels = ['Fc5.', 'Fpz.', 'Cz..', 'Oz..']
+    eeg = [np.round((np.sin(2 * np.pi * f * t) * 0.4 + np.sin(2 * np.pi * 0.3 * t) * 0.3) * 32767
+                    + rng.integers(-2000, 2000, t.size)) for f in (6, 10, 22, 45)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / 'S001R02.edf')
+        _write_edf(path, [(label, fs, x) for label, x in zip(labels, eeg)], n_records)
+
+        previous = session_player.SESSION_LAZY_EDF
+        try:
+            session_player.SESSION_LAZY_EDF = True
+            lazy = SessionPlayer(session_path=path)
+            session_player.SESSION_LAZY_EDF = False
+            full = SessionPlayer(session_path=path)
+        finally:
+            session_player.SESSION_LAZY_EDF = previous
+        assert lazy.raw is None and full.raw is not None
+        assert lazy.fs == full.fs and abs(lazy.total_duration - full.total_duration) < 1e-9
+
+        # Cada ventana (bordes de la grabación incluidos) == Raw filtrado completo
+        scale = np.abs(full.raw.get_data()).max()
+        last = full.total_duration - full.window_duration
+        for position in (0.0, 0.4, 1.7, 12.35, last - 1.0, last):
+            a, b = lazy.get_window_at(position), full.get_window_at(position)
+            err = np.abs(a - b).max() / scale
+            print(f"  t={position:6.2f}s  error relativo máx {err:.1e}")
+            assert a.shape == b.shape and err < 1e-4
+        data, _ = lazy._replay_data()
+        assert np.abs(data - full.raw.get_data()).max() / scale < 1e-4
+
+        # Mismo EDF por cada loader → claves de replay cache distintas
+        assert lazy._replay_source == ('edf-lazy', [path]) and full._replay_source == ('edf-mne', [path])
+
+        # Nombres como eegbci.standardize (carga PhysioNet); pick EEG ya en el lector
+        import mne
+        raw = mne.io.read_raw_edf(path, preload=False, verbose=False)
+        eegbci.standardize(raw)
+        raw.pick_types(eeg=True, exclude='bads')
+        lazy._load_lazy_edf(path, filtered=True, standardize=True)
+        print(f"  canales: {lazy._archive.ch_names}")
+        assert lazy._archive.ch_names == raw.ch_names == ['FC5', 'Fpz', 'Cz', 'Oz']
+
+    print("\n✓ Test EDF lazy vs MNE PASSED")
+    return True
+
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("REPLAY - Test Suite")
+    print("="*60)
+
+    try:
+        if HAS_MNE:
+            test_recorded_session_without_archive()
+        else:
+            print("\n⚠️ mne no instalado: se omiten los tests del SessionPlayer")
+        test_session_timeline()
+        test_replay_array()
+        test_lazy_edf_reader()
+        if HAS_MNE:
+            test_lazy_edf_matches_mne()
+
+        print("\n" + "="*60)
+        print("✓ TODOS LOS TESTS PASARON")
+        print("="*60)
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n✗ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,247 @@
+"""
+Script de prueba para serialization.py y compression.py.
+Valida el JSON de las respuestas (NaN/inf, numpy, datetime) y la
+compresión negociada gzip/brotli del middleware ASGI.
+"""
+
+import sys
+import os
+import json
+import zlib
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, date
+
+import numpy as np
+
+# Agregar path del backend
+sys.path.insert(0, os.path.dirname(__file__))
+
+import serialization
+from serialization import dumps, dumps_str, FastJSONResponse
+from compression import CompressionMiddleware, negotiate_encoding
+
+
+@dataclass
+class _Point:
+    t: float
+    label: str
+
+
+def _payload():
+    return {
+        'nan': float('nan'),
+        'inf': float('inf'),
+        'ninf': -np.inf,
+        'np_nan': np.float64('nan'),
+        'nested': [1.5, float('nan'), {'x': np.float32('inf')}],
+        'int': np.int64(7),
+        'float': np.float32(0.5),
+        'bool': np.bool_(True),
+        'array': np.array([[1, 2], [3, 4]], dtype=np.int16),
+        'float_array': np.array([0.25, 0.5]),
+        'when': datetime(2026, 1, 2, 3, 4, 5),
+        'day': date(2026, 1, 2),
+        'point': _Point(1.0, 'a'),
+        'tags': {'b'},
+    }
+
+
+def _check_payload(raw: bytes):
+    data = json.loads(raw)
+    assert data['nan'] is None and data['inf'] is None and data['ninf'] is None
+    assert data['np_nan'] is None
+    assert data['nested'] == [1.5, None, {'x': None}]
+    assert data['int'] == 7 and data['float'] == 0.5 and data['bool'] is True
+    assert data['array'] == [[1, 2], [3, 4]] and data['float_array'] == [0.25, 0.5]
+    assert data['when'].startswith('2026-01-02T03:04:05') and data['day'] == '2026-01-02'
+    assert data['point'] == {'t': 1.0, 'label': 'a'} and data['tags'] == ['b']
+    assert b'NaN' not in raw and b'Infinity' not in raw
+
+
+def test_dumps():
+    """Test dumps: NaN/inf → null; numpy, datetime y dataclasses serializables"""
+    print("\n" + "="*60)
+    print("TEST 1: serialization.dumps")
+    print("="*60)
+
+    raw = dumps(_payload())
+    print(f"  orjson={serialization.ORJSON_AVAILABLE} {len(raw)} bytes")
+    _check_payload(raw)
+    assert isinstance(dumps_str({'a': 1}), str)
+
+    # Fallback stdlib (sin orjson): mismo contrato
+    previous = serialization.ORJSON_AVAILABLE
+    serialization.ORJSON_AVAILABLE = False
+    try:
+        _check_payload(dumps(_payload()))
+        assert dumps({'a': [1, 2]}) == b'{"a":[1,2]}'
+        try:
+            dumps({'x': object()})
+            assert False, "tipo no serializable aceptado"
+        except TypeError:
+            pass
+    finally:
+        serialization.ORJSON_AVAILABLE = previous
+
+    _check_payload(FastJSONResponse(_payload()).body)
+
+    print("\n✓ Test dumps PASSED")
+    return True
+
+
+async def _call(app, accept_encoding=None):
+    """Llama a una app ASGI y devuelve (start, bodies)."""
+    headers = [(b'accept-encoding', accept_encoding.encode())] if accept_encoding is not None else []
+    scope = {'type': 'http', 'method': 'GET', 'path': '/', 'headers': headers}
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    bodies = [m.get('body', b'') for m in messages[1:]]
+    return start, bodies
+
+
+def _headers(start):
+    return {k.decode().lower(): v.decode() for k, v in start['headers']}
+
+
+def test_compression_negotiation():
+    """Test middleware: Accept-Encoding, umbral de tamaño y tipos comprimibles"""
+    print("\n" + "="*60)
+    print("TEST 2: CompressionMiddleware (negociación + umbral)")
+    print("="*60)
+
+    assert negotiate_encoding('gzip, deflate') == 'gzip'
+    assert negotiate_encoding('gzip;q=0') is None
+    assert negotiate_encoding('') is None
+    assert negotiate_encoding('identity') is None
+    assert negotiate_encoding('*') in ('br', 'gzip')
+    assert negotiate_encoding('br;q=0, gzip') == 'gzip'
+
+    big = {'metrics': [{'t': i * 0.2, 'coherence': 0.5} for i in range(500)]}
+    small = {'status': 'ok'}
+
+    async def endpoint(scope, receive, send):
+        # Una respuesta nueva por request (como en la app)
+        await FastJSONResponse(big)(scope, receive, send)
+
+    app = CompressionMiddleware(endpoint, minimum_size=1024)
+
+    # gzip negociado: cuerpo comprimido, Content-Length/Vary correctos
+    start, bodies = asyncio.run(_call(app, 'gzip'))
+    headers = _headers(start)
+    body = b''.join(bodies)
+    print(f"  json {len(dumps(big))} → gzip {len(body)} bytes")
+    assert headers['content-encoding'] == 'gzip' and 'accept-encoding' in headers['vary'].lower()
+    assert int(headers['content-length']) == len(body) < len(dumps(big))
+    assert json.loads(zlib.decompress(body, 31)) == big
+
+    # Sin Accept-Encoding (o q=0): tal cual
+    for accept in (None, 'gzip;q=0'):
+        start, bodies = asyncio.run(_call(app, accept))
+        assert 'content-encoding' not in _headers(start) and json.loads(b''.join(bodies)) == big
+
+    # Por debajo del umbral: tal cual aunque el cliente acepte gzip
+    start, bodies = asyncio.run(_call(CompressionMiddleware(FastJSONResponse(small), minimum_size=1024), 'gzip'))
+    assert 'content-encoding' not in _headers(start) and json.loads(b''.join(bodies)) == small
+
+    # Tipo no comprimible (binario): tal cual
+    async def binary(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'application/octet-stream')]})
+        await send({'type': 'http.response.body', 'body': b'\x00' * 4096})
+
+    start, bodies = asyncio.run(_call(CompressionMiddleware(binary), 'gzip'))
+    assert 'content-encoding' not in _headers(start) and b''.join(bodies) == b'\x00' * 4096
+
+    print("\n✓ Test negociación + umbral PASSED")
+    return True
+
+
+def test_compression_streaming():
+    """Test middleware: streaming comprimido por chunk, sin acumular la respuesta"""
+    print("\n" + "="*60)
+    print("TEST 3: CompressionMiddleware (streaming)")
+    print("="*60)
+
+    lines = [(json.dumps({'i': i, 'v': [0.5] * 20}) + '\n').encode() for i in range(5)]
+
+    async def run():
+        released = asyncio.Event()
+        sent = []
+
+        async def ndjson(scope, receive, send):
+            await send({'type': 'http.response.start', 'status': 200,
+                        'headers': [(b'content-type', b'application/x-ndjson')]})
+            await send({'type': 'http.response.body', 'body': lines[0], 'more_body': True})
+            # El resto sólo después de que el cliente haya recibido el primer bloque
+            await released.wait()
+            for line in lines[1:]:
+                await send({'type': 'http.response.body', 'body': line, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'GET', 'path': '/', 'headers': [(b'accept-encoding', b'gzip')]}
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        task = asyncio.create_task(CompressionMiddleware(ndjson, minimum_size=1024)(scope, receive, send))
+        for _ in range(50):
+            await asyncio.sleep(0)
+            if len(sent) >= 2:
+                break
+        early = list(sent)
+        released.set()
+        await task
+        return early, sent
+
+    early, sent = asyncio.run(run())
+    print(f"  mensajes antes de liberar: {len(early)}, total: {len(sent)}")
+
+    # El primer bloque ya salió comprimido (sin esperar al resto ni al umbral)
+    assert len(early) == 2 and early[1]['more_body']
+    headers = _headers(early[0])
+    assert headers['content-encoding'] == 'gzip' and 'content-length' not in headers
+    decoder = zlib.decompressobj(31)
+    assert decoder.decompress(early[1]['body']) == lines[0]  # flush por chunk: decodificable ya
+
+    body = b''.join(m.get('body', b'') for m in sent[1:])
+    assert zlib.decompress(body, 31) == b''.join(lines)
+    assert len(sent) == 1 + len(lines) + 1 and not sent[-1].get('more_body', False)
+
+    print("\n✓ Test streaming PASSED")
+    return True
+
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("SERIALIZATION + COMPRESSION - Test Suite")
+    print("="*60)
+
+    try:
+        test_dumps()
+        test_compression_negotiation()
+        test_compression_streaming()
+
+        print("\n" + "="*60)
+        print("✓ TODOS LOS TESTS PASARON")
+        print("="*60)
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n✗ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
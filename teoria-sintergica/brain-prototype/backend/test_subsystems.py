@@ -0,0 +1,156 @@
+"""
+Script de prueba para subsystems.py.
+Valida la inicialización lazy, el warm-up en background y /health/ready.
+"""
+
+import sys
+import os
+import time
+import threading
+
+# Agregar path del backend
+sys.path.insert(0, os.path.dirname(__file__))
+
+import subsystems
+from subsystems import (
+    Subsystem, LazyProxy, SubsystemNotReady, register, warm, readiness,
+    PENDING, READY, FAILED,
+)
+
+
+class _Slow:
+    """Factory que tarda hasta que el test la libera."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        return {'value': 42}
+
+
+def test_lazy_subsystem():
+    """Test subsistema: una sola construcción, 503 mientras calienta, reintento tras fallo"""
+    print("\n" + "="*60)
+    print("TEST 1: Subsystem + LazyProxy")
+    print("="*60)
+
+    factory = _Slow()
+    sub = Subsystem('test-slow', factory)
+    proxy = LazyProxy(sub)
+    assert sub.state == PENDING
+
+    # wait=False (endpoints): dispara el warm-up y responde "not ready"
+    try:
+        proxy.get('value')
+        assert False, "proxy devolvió un valor antes de estar listo"
+    except SubsystemNotReady as e:
+        assert e.name == 'test-slow' and e.state in ('pending', 'warming')
+
+    # Varios callers esperando: la factory corre una sola vez
+    results = []
+    waiters = [threading.Thread(target=lambda: results.append(sub.get()['value'])) for _ in range(4)]
+    for w in waiters:
+        w.start()
+    time.sleep(0.05)
+    factory.release.set()
+    for w in waiters:
+        w.join(5)
+    print(f"  calls={factory.calls} results={results} status={sub.status()}")
+    assert factory.calls == 1 and results == [42] * 4
+    assert sub.ready and proxy.get('value') == 42
+
+    # Fallo: error visible, sin reintento hasta reset()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("disk not mounted")
+        return 'ok'
+
+    failing = Subsystem('test-flaky', flaky)
+    try:
+        failing.get()
+        assert False, "fallo de la factory ignorado"
+    except SubsystemNotReady as e:
+        assert e.state == FAILED and 'disk not mounted' in e.error
+    try:
+        failing.get()
+    except SubsystemNotReady:
+        pass
+    assert len(attempts) == 1
+    failing.reset()
+    assert failing.get() == 'ok' and len(attempts) == 2
+
+    failing.set('replaced')
+    assert failing.get(wait=False) == 'replaced'
+
+    print("\n✓ Test Subsystem PASSED")
+    return True
+
+
+def test_registry_warm_and_readiness():
+    """Test registro: dependencias, warm() en background y readiness()"""
+    print("\n" + "="*60)
+    print("TEST 2: Registry / warm / readiness")
+    print("="*60)
+
+    order = []
+    names = ('test-db', 'test-brain', 'test-broken')
+    try:
+        register('test-db', lambda: order.append('db') or 'db')
+        brain = register('test-brain', lambda: order.append('brain') or 'brain', depends_on=['test-db'])
+        register('test-broken', lambda: 1 / 0)
+
+        report = readiness()
+        assert not report['ready'] and report['subsystems']['test-brain']['state'] == PENDING
+
+        # El cerebro arrastra su dependencia
+        assert LazyProxy(brain, wait=True).upper() == 'BRAIN'
+        assert order == ['db', 'brain']
+
+        warm(['test-broken', 'not-registered'])
+        subsystems.get_subsystem('test-broken')._done.wait(5)
+        report = readiness()
+        print(f"  {dict((n, report['subsystems'][n]['state']) for n in names)}")
+        assert report['subsystems']['test-db']['state'] == READY
+        assert report['subsystems']['test-broken']['state'] == FAILED
+        assert 'ZeroDivisionError' in report['subsystems']['test-broken']['error']
+        assert not report['ready']
+    finally:
+        for name in names:
+            subsystems._registry.pop(name, None)
+
+    with subsystems.profile_import('test block'):
+        time.sleep(0.01)
+    assert readiness()['import_profile_ms']['test block'] >= 10
+    subsystems._import_profile.pop('test block', None)
+
+    print("\n✓ Test registry PASSED")
+    return True
+
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("SUBSYSTEMS - Test Suite")
+    print("="*60)
+
+    try:
+        test_lazy_subsystem()
+        test_registry_warm_and_readiness()
+
+        print("\n" + "="*60)
+        print("✓ TODOS LOS TESTS PASARON")
+        print("="*60)
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n✗ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)